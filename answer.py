@@ -1,10 +1,11 @@
 import json
 import os
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta, date as dt_date
 from typing import Any, Callable, Dict, List, Optional, Set
 
-import requests
+import http_pool
 
 
 DEFAULT_ANSWER_ROUTE_WHITELIST = [
@@ -28,6 +29,128 @@ DEFAULT_ANSWER_ROUTE_WHITELIST = [
 ]
 
 
+# Every keyword set the router and the intent helpers test, by feature name. They are all
+# compiled into one KeywordFeatureTable, so a text is scanned once and each scorer reads bits.
+ROUTE_KEYWORD_FEATURES: Dict[str, List[str]] = {
+    "bills": ["账单", "发票", "到期", "due", "处理新账单", "检查账单", "未来7天", "今天到期", "bpay", "bill", "bills", "invoice", "风险", "逾期"],
+    "bills_neg": ["模板", "样例", "格式", "template", "sample", "example", "form"],
+    "bills_risk": ["风险", "逾期", "risk", "overdue"],
+    "rag_hint": ["资料库", "家庭资料库", "在资料库里", "knowledge base", "home knowledge"],
+    "holiday": ["公众假期", "假期", "holiday", "公休"],
+    "calendar": ["日程", "日历", "安排", "会议", "appointment", "calendar", "提醒"],
+    "calendar_bill": ["账单", "发票", "bill", "invoice"],
+    "weather": ["天气", "温度", "温", "下雨", "降雨", "大风", "风速", "湿度", "rain", "weather", "带伞", "很热", "很冷", "外套"],
+    "music_action": [
+        "播放", "播", "放", "听", "暂停", "继续", "下一首", "上一首", "音量", "静音",
+        "mute", "play", "pause", "next", "previous", "volume", "停止", "listen",
+    ],
+    "music_ctx": ["音乐", "spotify", "song", "music", "白噪音", "歌曲", "歌", "一首", "歌单", "playlist", "专辑"],
+    "music_room": ["卧室", "客厅", "主卧", "游戏室", "车库", "厨房", "音箱", "电视", "speaker", "tv", "media player"],
+    "briefing": ["晨间简报", "morning brief", "早报", "晚间简报", "evening brief", "总结今天"],
+    "plan": ["学习计划", "study plan", "训练计划"],
+    "productivity": ["提高效率", "专注", "拖延"],
+    "chitchat": [
+        "笑话", "讲个笑话", "joke",
+        "晚饭", "今晚吃什么", "吃什么",
+        "周末去哪玩", "去哪玩", "玩什么",
+        "总结今天", "帮我总结今天", "晚间简报", "简报",
+        "明天要准备什么", "焦虑", "压力大", "anxious", "anxiety",
+    ],
+    "template": ["模板", "template", "sample", "example", "form", "格式", "样例", "invoice template", "tax invoice"],
+    "datetime": [
+        "现在几点", "几点了", "当前时间", "今天几号", "今天日期", "几号了", "今天星期几", "星期几", "明天几号", "后天几号",
+        "这周几号到几号", "本周日期范围", "发薪", "发工资", "工资日", "薪水日",
+        "what time", "time now", "today date", "what day today", "tomorrow date",
+    ],
+    "news": ["新闻", "本地新闻", "世界新闻", "科技新闻", "热点", "news", "headline", "headlines"],
+    "rag": ["家庭资料库", "资料库", "在资料库里", "搜内容", "保修", "说明书", "发票", "合同", "knowledge base", "home knowledge", "search home knowledge"],
+    "weather_query": ["天气", "温度", "降雨", "下雨", "气温", "风", "预报", "天氣"],
+    "weather_intent": ["天气", "温度", "气温", "下雨", "降雨", "weather", "rain", "forecast"],
+    "calendar_intent": ["日程", "日历", "日曆", "安排", "行程", "calendar", "schedule", "提醒"],
+    "news_intent": ["新闻", "热点", "news", "headline", "headlines"],
+    "parking_fee": ["停车", "停车费", "parking", "car park", "carpark"],
+    "open_advice": [
+        "学习计划", "study plan", "提高效率", "专注", "拖延",
+        "晚间简报", "晨间简报", "morning brief", "evening brief",
+        "今天需要注意什么", "周末去哪玩", "晚饭吃什么", "今晚吃什么",
+        "讲个笑话", "笑话", "joke",
+    ],
+    "property_info": ["房价走势", "房价", "利率", "电价变化", "租房市场", "租金", "property", "rent", "interest rate", "electricity price"],
+    "home_health_check": ["家里设备有异常吗", "设备异常", "有啥坏了", "有什么提醒", "home device issue", "device abnormal", "alerts"],
+}
+
+
+def _keyword_trie_pattern(keys: List[str]) -> str:
+    trie: Dict[str, Any] = {}
+    for k in keys:
+        node = trie
+        for ch in k:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + _emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional: a longer key wins, the key ending here is the fallback.
+            return "(?:" + body + ")?"
+        return body
+
+    return _emit(trie)
+
+
+class KeywordFeatureTable:
+    """Keyword sets compiled into one trie-shaped regex; scan() returns a feature bitmap.
+
+    Keys are matched case-insensitively (the text is lowercased; CJK keys are unaffected),
+    which is what the old `k in t` / `k in t.lower()` loops did.
+    """
+
+    def __init__(self, features: Dict[str, List[str]]):
+        self.names = list(features.keys())
+        self.bits = {name: 1 << i for i, name in enumerate(self.names)}
+        own: Dict[str, int] = {}
+        for name, keys in features.items():
+            for k in keys:
+                kl = str(k or "").lower()
+                if kl:
+                    own[kl] = own.get(kl, 0) | self.bits[name]
+        # Only the longest key starting at each position is reported, so a key also carries
+        # the bits of every shorter key it contains ("温度" sets "温" too).
+        self._masks: Dict[str, int] = {}
+        for k in own:
+            m = 0
+            for k2, b in own.items():
+                if k2 in k:
+                    m |= b
+            self._masks[k] = m
+        self._re = re.compile("(?=(" + _keyword_trie_pattern(list(own.keys())) + "))")
+
+    def scan(self, text: str) -> int:
+        m = 0
+        masks = self._masks
+        for mo in self._re.finditer(str(text or "").lower()):
+            m |= masks[mo.group(1)]
+        return m
+
+    def bit(self, name: str) -> int:
+        return self.bits[name]
+
+
+ROUTE_KEYWORD_TABLE = KeywordFeatureTable(ROUTE_KEYWORD_FEATURES)
+
+
+@lru_cache(maxsize=512)
+def text_features(text: str) -> int:
+    return ROUTE_KEYWORD_TABLE.scan(text)
+
+
+def text_has(text: str, name: str) -> bool:
+    return bool(text_features(str(text or "")) & ROUTE_KEYWORD_TABLE.bit(name))
+
+
 class RouterContext:
     def __init__(
         self,
@@ -45,6 +168,17 @@ class RouterContext:
         self.now_dt = now_dt if now_dt is not None else datetime.now()
         self.debug = bool(debug)
         self.last_clarify = last_clarify
+        self._features = None
+
+    @property
+    def features(self) -> int:
+        # Scanned on first use; every scorer of the request shares the same bitmap.
+        if self._features is None:
+            self._features = text_features(self.text_raw)
+        return self._features
+
+    def has(self, name: str) -> bool:
+        return bool(self.features & ROUTE_KEYWORD_TABLE.bit(name))
 
 
 class RouteRule:
@@ -95,6 +229,33 @@ def sanitize_route_candidates(candidates: list) -> list:
     return out
 
 
+# Routes whose handlers only read (no HA writes, mail sync, memory upserts); only these
+# may run speculatively, since a losing leg still runs to completion.
+SPECULATIVE_SAFE_ROUTES = frozenset(["weather", "calendar", "news", "rag", "datetime", "holiday"])
+
+
+def speculative_route_pair(candidates: list, allowed_routes: Set[str], margin: float) -> list:
+    """Top two runnable candidates when their final scores are within margin and both are
+    read-only (SPECULATIVE_SAFE_ROUTES), else []."""
+    live = []
+    for c in (candidates or []):
+        if (not isinstance(c, dict)) or (c.get("rule") is None):
+            continue
+        nm = str(c.get("name") or "")
+        if allowed_routes and (nm not in allowed_routes):
+            continue
+        live.append(c)
+        if len(live) >= 2:
+            break
+    if len(live) < 2:
+        return []
+    if (float(live[0].get("final") or 0.0) - float(live[1].get("final") or 0.0)) > float(margin):
+        return []
+    if any(str(c.get("name") or "") not in SPECULATIVE_SAFE_ROUTES for c in live):
+        return []
+    return live
+
+
 def skill_answer_question_core(text: str, mode: str, h) -> dict:
     rid, started = h["skill_call_begin"]("skill.answer_question", {"text": str(text or ""), "mode": str(mode or "")})
     ok = True
@@ -176,20 +337,55 @@ def skill_answer_question_core(text: str, mode: str, h) -> dict:
         if ambiguous_short:
             return h["clarify_result"](ctx, candidates_safe, topic_hint=q)
 
-        if picked.get("special") == "clarify":
-            return h["clarify_result"](ctx, candidates_safe, topic_hint=q)
+        def _run_route(route_name: str, rule: Any) -> dict:
+            raw = rule.handle(ctx)
+            if route_name == "fallback_local_first":
+                return h["answer_fallback_local_first"](ctx, candidates=candidates_safe)
+            return h["skill_wrap_any_result"](raw, route_name, md, {"candidates": candidates_safe})
 
         chosen = picked.get("chosen") or {}
         chosen_name = str(chosen.get("name") or "")
         chosen_rule = chosen.get("rule")
+
+        # Near-tie between the top two routes: run both under one deadline instead of
+        # asking back or paying for the weaker route's fallback chain afterwards.
+        run_speculative = h.get("run_speculative")
+        spec_pair = []
+        if callable(run_speculative):
+            try:
+                margin = float(h["env_get"]("ANSWER_SPECULATIVE_MARGIN", "0.3") or "0.3")
+            except Exception:
+                margin = 0.3
+            spec_pair = speculative_route_pair(candidates, route_whitelist, margin)
+        if spec_pair:
+            spec = run_speculative([(str(c.get("name") or ""), (lambda c=c: _run_route(str(c.get("name") or ""), c.get("rule")))) for c in spec_pair])
+            spec_meta = {"winner": spec.get("winner") or "", "ms": spec.get("ms"), "legs": spec.get("legs") or {}}
+            h["skill_log_json"]("route_speculative", request_id=rid, tool="skill.answer_question", data=spec_meta)
+            results = spec.get("results") or {}
+            ret = results.get(spec.get("winner") or "")
+            if not isinstance(ret, dict):
+                # No strong leg: same outcome as before, minus re-running a route that already finished.
+                if picked.get("special") == "clarify":
+                    ret = None
+                else:
+                    ret = results.get(chosen_name)
+                    if not isinstance(ret, dict):
+                        ret = next((results.get(str(c.get("name") or "")) for c in spec_pair if isinstance(results.get(str(c.get("name") or "")), dict)), None)
+            if isinstance(ret, dict):
+                meta = dict(ret.get("meta") or {}) if isinstance(ret.get("meta"), dict) else {}
+                meta["speculative"] = spec_meta
+                ret["meta"] = meta
+                return ret
+            return h["clarify_result"](ctx, candidates_safe, topic_hint=q)
+
+        if picked.get("special") == "clarify":
+            return h["clarify_result"](ctx, candidates_safe, topic_hint=q)
+
         if not chosen_name or chosen_rule is None:
             return h["clarify_result"](ctx, candidates_safe, topic_hint=q)
 
         try:
-            raw = chosen_rule.handle(ctx)
-            if chosen_name == "fallback_local_first":
-                return h["answer_fallback_local_first"](ctx, candidates=candidates_safe)
-            return h["skill_wrap_any_result"](raw, chosen_name, md, {"candidates": candidates_safe})
+            return _run_route(chosen_name, chosen_rule)
         except Exception as e:
             return h["skill_result"](
                 "我先给你一个简短答复：当前分支处理失败，请换个说法再试。",
@@ -1038,7 +1234,7 @@ def finance_extract_evidence_ai(text: str, qtype: str = "generic", text_norm: st
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(base + "/api/chat", json=req, timeout=12)
+        r = http_pool.post(base + "/api/chat", upstream="ollama", json=req, timeout=12)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return {"evidence": "", "value": None, "confidence": "low", "ai_used": True, "error": "http_" + str(getattr(r, "status_code", ""))}
         data = r.json() if hasattr(r, "json") else {}
@@ -1367,6 +1563,7 @@ def compose_compound_answer(
     wrap_fn: Callable[[Any, str, str, Optional[dict]], dict],
     skill_result_fn: Callable[[str, Optional[list], Optional[list], Optional[list], Optional[dict]], dict],
     debug_log: Optional[Callable[[str], None]] = None,
+    emit_fn: Optional[Callable[[str], None]] = None,
 ) -> dict:
     def _calendar_compound_query(text_raw: str) -> str:
         t = str(text_raw or "").strip()
@@ -1410,6 +1607,9 @@ def compose_compound_answer(
             wrapped = wrap_fn(raw, rn, mode, {"compound": True})
             ft = str((wrapped.get("final_text") if isinstance(wrapped, dict) else "") or "").strip()
             if ft:
+                # Stream each segment as soon as it is ready; final below is " ".join(segs).
+                if callable(emit_fn):
+                    emit_fn((" " if segs else "") + ft)
                 segs.append(ft)
             facts = (wrapped.get("facts") if isinstance(wrapped, dict) and isinstance(wrapped.get("facts"), list) else [])
             sources = (wrapped.get("sources") if isinstance(wrapped, dict) and isinstance(wrapped.get("sources"), list) else [])
@@ -1458,57 +1658,31 @@ def looks_like_local_info_query(text_norm: str) -> bool:
 
 
 def looks_like_parking_fee_query(text_raw: str) -> bool:
-    t = str(text_raw or "").strip()
-    tl = t.lower()
-    keys = ["停车", "停车费", "parking", "car park", "carpark"]
-    return any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+    return text_has(text_raw, "parking_fee")
 
 
 def looks_like_open_advice_general_query(text_raw: str) -> bool:
-    t = str(text_raw or "").strip()
-    tl = t.lower()
-    keys = [
-        "学习计划", "study plan", "提高效率", "专注", "拖延",
-        "晚间简报", "晨间简报", "morning brief", "evening brief",
-        "今天需要注意什么", "周末去哪玩", "晚饭吃什么", "今晚吃什么",
-        "讲个笑话", "笑话", "joke",
-    ]
-    return any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+    return text_has(text_raw, "open_advice")
 
 
 def looks_like_property_info_query(text_raw: str) -> bool:
-    t = str(text_raw or "").strip()
-    tl = t.lower()
-    keys = ["房价走势", "房价", "利率", "电价变化", "租房市场", "租金", "property", "rent", "interest rate", "electricity price"]
-    return any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+    return text_has(text_raw, "property_info")
 
 
 def looks_like_home_health_check_query(text_raw: str) -> bool:
-    t = str(text_raw or "").strip()
-    tl = t.lower()
-    keys = ["家里设备有异常吗", "设备异常", "有啥坏了", "有什么提醒", "home device issue", "device abnormal", "alerts"]
-    return any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+    return text_has(text_raw, "home_health_check")
 
 
 def has_weather_intent(text: str) -> bool:
-    t = str(text or "").strip()
-    tl = t.lower()
-    keys = ["天气", "温度", "气温", "下雨", "降雨", "weather", "rain", "forecast"]
-    return (any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii()))
+    return text_has(text, "weather_intent")
 
 
 def has_calendar_intent(text: str) -> bool:
-    t = str(text or "").strip()
-    tl = t.lower()
-    keys = ["日程", "日历", "日曆", "安排", "行程", "calendar", "schedule", "提醒"]
-    return (any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii()))
+    return text_has(text, "calendar_intent")
 
 
 def has_news_intent(text: str) -> bool:
-    t = str(text or "").strip()
-    tl = t.lower()
-    keys = ["新闻", "热点", "news", "headline", "headlines"]
-    return (any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii()))
+    return text_has(text, "news_intent")
 
 
 def looks_like_home_device_state_query(text_raw: str) -> bool:
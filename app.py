@@ -1,7 +1,6 @@
 # PATCH_CN_FINANCE_TO_CN_ECONOMY_V1
 # NEWS_SUMMARY_V2
 # ---- News voice + optional EN->ZH translation (Ollama) ----
-_NEWS_TR_CACHE = {}  # key -> {"ts": int, "title": str, "snippet": str}
 def _news__dedupe_items_for_voice(items: list) -> list:
     """
     Dedupe near-duplicate news items for voice.
@@ -66,31 +65,6 @@ def _news__dedupe_items_for_voice(items: list) -> list:
     except Exception:
         return items
 
-def _news__tr__cache_get(key: str, ttl_sec: int):
-    try:
-        import time
-        now = int(time.time())
-        it = _NEWS_TR_CACHE.get(key)
-        if not it:
-            return None
-        ts = int(it.get("ts") or 0)
-        if (now - ts) > int(ttl_sec):
-            return None
-        return it
-    except Exception:
-        return None
-
-def _news__tr__cache_put(key: str, title_zh: str, snippet_zh: str):
-    try:
-        import time
-        _NEWS_TR_CACHE[key] = {
-            "ts": int(time.time()),
-            "title": (title_zh or "").strip(),
-            "snippet": (snippet_zh or "").strip(),
-        }
-    except Exception:
-        return
-
 def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "", timeout_sec: int = 12) -> list:
     """
     pairs: [{"title": "...", "snippet": "..."}]
@@ -100,6 +74,7 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
       - chunking (default 2 items per request)
       - temperature=0.0
       - contamination guard: if translated text contains brand keywords not present in source, drop snippet (keep title if safe)
+    Titles and snippets already in the translation memory are not sent again.
     """
     out = []
     try:
@@ -107,7 +82,6 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
             return out
 
         import json
-        import urllib.request
 
         bu = (base_url or os.environ.get("OLLAMA_BASE_URL") or "http://192.168.1.162:11434").strip()
         if not bu:
@@ -116,6 +90,17 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
         if not mdl:
             mdl = "qwen3:1.7b"
 
+        flat = []
+        for p in pairs:
+            p = p if isinstance(p, dict) else {}
+            flat.append(str(p.get("title") or "").strip())
+            flat.append(str(p.get("snippet") or "").strip())
+        known = translation_memory.lookup(mdl, "zh", flat)
+        todo = [i for i in range(len(pairs)) if any(flat[k] and known[k] is None for k in (2 * i, 2 * i + 1))]
+        if todo and not _skill_budget_allows("news_translate"):
+            todo = []
+        done = {}
+
         try:
             bs = int(os.environ.get("NEWS_TRANSLATE_BATCH_SIZE") or "2")
         except Exception:
@@ -193,17 +178,8 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
             }
 
             url = bu.rstrip("/") + "/api/chat"
-            data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(
-                url,
-                data=data,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-
             try:
-                with urllib.request.urlopen(req, timeout=float(timeout_sec)) as resp:
-                    raw = resp.read().decode("utf-8", "ignore")
+                raw = http_pool.post(url, upstream="ollama", json=payload, timeout=float(timeout_sec)).text
             except Exception:
                 return [{"title": "", "snippet": ""} for _ in chunk_pairs]
 
@@ -272,15 +248,16 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
                         return True
             return False
 
-        # chunk loop
-        n = len(pairs)
+        # chunk loop (memory misses only)
+        todo_pairs = [pairs[i] for i in todo]
+        n = len(todo_pairs)
         i = 0
         while i < n:
-            chunk = pairs[i:i + bs]
+            chunk = todo_pairs[i:i + bs]
             tr = _call_ollama(chunk)
 
             # apply guard per item
-            for p, rr in zip(chunk, tr):
+            for off, (p, rr) in enumerate(zip(chunk, tr)):
                 st = str((p or {}).get("title") or "")
                 ss = str((p or {}).get("snippet") or "")
                 zt = str((rr or {}).get("title") or "").strip()
@@ -291,17 +268,13 @@ def _news__translate_batch_to_zh(pairs: list, model: str = "", base_url: str = "
                     if _is_contaminated(st, ss, zt, ""):
                         zt = ""
                     zs = ""
-                out.append({"title": zt, "snippet": zs})
+                done[todo[i + off]] = {"title": zt, "snippet": zs}
 
             i += bs
 
-        # ensure length match
-        if len(out) < n:
-            for _ in range(n - len(out)):
-                out.append({"title": "", "snippet": ""})
-        if len(out) > n:
-            out = out[:n]
-
+        translation_memory.store(mdl, "zh", [(flat[2 * k], v["title"]) for k, v in done.items()] + [(flat[2 * k + 1], v["snippet"]) for k, v in done.items()])
+        for k in range(len(pairs)):
+            out.append(done.get(k) or {"title": known[2 * k] or "", "snippet": known[2 * k + 1] or ""})
         return out
     except Exception:
         for _ in (pairs or []):
@@ -393,7 +366,7 @@ import time
 import socket
 import uuid
 from email.utils import parsedate_to_datetime
-from contextvars import ContextVar
+from contextvars import ContextVar, copy_context
 
 def _music_apply_aliases(user_text: str, ent: str) -> str:
     """Apply HA_MEDIA_PLAYER_ALIASES to override target entity.
@@ -423,7 +396,13 @@ import html
 import unicodedata
 import json
 import hashlib
+import multiprocessing
 import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from queue import Queue, Empty
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait as futures_wait
 from datetime import datetime, timedelta, date
 from datetime import date as dt_date
 from urllib.parse import urlparse
@@ -434,8 +413,14 @@ from typing import Any, Dict, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 import requests
 from starlette.routing import Mount
+import http_pool
+import shared_cache
+import translation_memory
+import warmup
 import router_helpers as rh
 import router_pipeline as rp
+import rag_chunking
+import rag_ann
 from news import (
     build_news_facts_payload,
     skill_news_brief_core as _news_skill_news_brief_core,
@@ -484,6 +469,7 @@ from answer import (
     compose_compound_answer,
     RouterContext,
     RouteRule,
+    text_has,
     looks_like_local_info_query,
     looks_like_parking_fee_query,
     looks_like_open_advice_general_query,
@@ -661,7 +647,7 @@ def _ug_open_url_fetch(url: str, max_chars: int = 4000, timeout_sec: int = 10, a
         headers["Accept-Language"] = al
 
     try:
-        r = requests.get(u, headers=headers, timeout=float(timeout_sec), stream=True, allow_redirects=True)
+        r = http_pool.get(u, upstream="web", headers=headers, timeout=float(timeout_sec), stream=True, allow_redirects=True)
         status_code = int(getattr(r, "status_code", 0) or 0)
         ct = (r.headers.get("content-type") or "").lower()
 
@@ -674,6 +660,8 @@ def _ug_open_url_fetch(url: str, max_chars: int = 4000, timeout_sec: int = 10, a
             buf += chunk
             if len(buf) > max_bytes:
                 break
+        # Return the pooled connection (or drop it if we stopped mid-body).
+        r.close()
 
         enc = r.encoding or "utf-8"
         try:
@@ -750,6 +738,28 @@ _SKILL_TOOL_NAMES = [
 
 _SKILL_REQ_ID = ContextVar("SKILL_REQ_ID", default="")
 _SKILL_REQ_DEPTH = ContextVar("SKILL_REQ_DEPTH", default=0)
+# Request-wide deadline; owned by http_pool so every upstream call clamps its timeout to it.
+_SKILL_REQ_DEADLINE = http_pool.REQUEST_DEADLINE
+_SKILL_REQ_DEADLINE_OWNED = ContextVar("SKILL_REQ_DEADLINE_OWNED", default=False)
+# Set by the OpenAI gateway for stream=true requests: callable(text) receiving answer parts early.
+_STREAM_SINK = ContextVar("STREAM_SINK", default=None)
+
+
+def _stream_emit(text: str):
+    """Hand a finished leading part of the final answer to the streaming client (no-op otherwise).
+
+    Emitted parts must be a prefix of the final_text the skill returns.
+    """
+    _stream_emit_to(_STREAM_SINK.get(), text)
+
+
+def _stream_emit_to(sink, text: str):
+    if (sink is None) or (not str(text or "").strip()):
+        return
+    try:
+        sink(str(text))
+    except Exception:
+        pass
 
 
 def _skill_debug_enabled() -> bool:
@@ -823,6 +833,29 @@ def _skill_log_json(event: str, request_id: str = "", tool: str = "", data: Opti
             pass
 
 
+def _skill_deadline_remaining() -> Optional[float]:
+    return http_pool.deadline_remaining()
+
+
+def _skill_deadline_clamp(timeout_sec: float, floor_sec: float = 0.1) -> float:
+    rem = _skill_deadline_remaining()
+    if rem is None:
+        return float(timeout_sec)
+    return max(float(floor_sec), min(float(timeout_sec), rem))
+
+
+def _skill_budget_allows(step: str) -> bool:
+    """False when the request deadline is too close for an optional step (translation, AI keywords, ...)."""
+    rem = _skill_deadline_remaining()
+    if rem is None:
+        return True
+    min_ms = _safe_int(os.environ.get("SKILL_DEADLINE_OPTIONAL_MIN_MS") or "2500", 2500)
+    if (rem * 1000.0) >= float(min_ms):
+        return True
+    _skill_debug_log("deadline_skip step={0} remaining_ms={1}".format(step, int(rem * 1000.0)))
+    return False
+
+
 def _skill_call_begin(tool_name: str, args: Optional[dict] = None) -> Tuple[str, float]:
     try:
         depth = int(_SKILL_REQ_DEPTH.get() or 0)
@@ -832,6 +865,12 @@ def _skill_call_begin(tool_name: str, args: Optional[dict] = None) -> Tuple[str,
     if (depth <= 0) or (not rid):
         rid = _skill_request_id_new()
         _skill_request_id_set(rid)
+    if depth <= 0:
+        # MCP calls get SKILL_REQUEST_BUDGET_MS unless a caller (the gateway) already set a deadline.
+        budget_ms = _safe_int(os.environ.get("SKILL_REQUEST_BUDGET_MS") or "0", 0)
+        if (budget_ms > 0) and (_skill_deadline_remaining() is None):
+            http_pool.deadline_set(budget_ms / 1000.0)
+            _SKILL_REQ_DEADLINE_OWNED.set(True)
     try:
         _SKILL_REQ_DEPTH.set(depth + 1)
     except Exception:
@@ -856,6 +895,9 @@ def _skill_call_end(tool_name: str, request_id: str, started_ts: float, ok: bool
         try:
             _SKILL_REQ_DEPTH.set(0)
             _SKILL_REQ_ID.set("")
+            if _SKILL_REQ_DEADLINE_OWNED.get():
+                _SKILL_REQ_DEADLINE.set(0.0)
+                _SKILL_REQ_DEADLINE_OWNED.set(False)
         except Exception:
             pass
     else:
@@ -947,7 +989,7 @@ def _ha_headers() -> Dict[str, str]:
     return {"Authorization": "Bearer " + tok, "Content-Type": "application/json"}
 
 
-def _ha_request(method: str, path: str, json_body: Any = None, timeout_sec: int = 10) -> dict:
+def _ha_request(method: str, path: str, json_body: Any = None, timeout_sec: int = 10, coalesce: bool = False) -> dict:
     base = _ha_base_url()
     url = base + path
     headers = _ha_headers()
@@ -955,10 +997,13 @@ def _ha_request(method: str, path: str, json_body: Any = None, timeout_sec: int
         return {"ok": False, "error": "ha_token_missing", "hint": "Set HA_TOKEN env var for HA REST API access."}
 
     try:
-        if method.upper() == "GET":
-            r = requests.get(url, headers=headers, timeout=float(timeout_sec))
+        if method.upper() == "GET" and coalesce:
+            # Identical reads in flight share one call; no memo, so a read after a write is never stale.
+            r = http_pool.coalesced("GET", url, upstream="ha", memo_sec=0, headers=headers, timeout=float(timeout_sec))
+        elif method.upper() == "GET":
+            r = http_pool.get(url, upstream="ha", headers=headers, timeout=float(timeout_sec))
         else:
-            r = requests.request(method.upper(), url, headers=headers, json=json_body, timeout=float(timeout_sec))
+            r = http_pool.request(method.upper(), url, upstream="ha", headers=headers, json=json_body, timeout=float(timeout_sec))
         status = int(getattr(r, "status_code", 0) or 0)
         try:
             data = r.json()
@@ -989,7 +1034,11 @@ def ha_call_service(domain: str, service: str, service_data: Optional[dict] = No
     path = "/api/services/" + d + "/" + s
     if bool(return_response):
         path = path + "?return_response"
-    return _ha_request("POST", path, json_body=body, timeout_sec=int(timeout_sec))
+    rr = _ha_request("POST", path, json_body=body, timeout_sec=int(timeout_sec))
+    if d in ("calendar", "google") and not s.startswith("get_"):
+        # Created/changed/deleted events must show up in the next read, not after the cache TTL.
+        shared_cache.invalidate("calendar")
+    return rr
 
 # @mcp.tool(description="(Structured) Get forecast for a HA weather entity using weather.get_forecasts service.")
 def ha_weather_forecast(entity_id: str, forecast_type: str = "daily", timeout_sec: int = 12) -> dict:
@@ -999,7 +1048,21 @@ def ha_weather_forecast(entity_id: str, forecast_type: str = "daily", timeout_se
         return {"ok": False, "error": "empty_entity_id"}
     if ftype not in ("daily", "hourly", "twice_daily"):
         ftype = "daily"
+    warmup.note_use("weather")
+    return _ha_weather_forecast_cached(eid, ftype, timeout_sec)
+
 
+def _ha_weather_forecast_cached(eid: str, ftype: str, timeout_sec: int = 12, refresh: bool = False) -> dict:
+    fn = shared_cache.refresh if refresh else shared_cache.get_or_load
+    return fn(
+        "weather_forecast",
+        eid + "|" + ftype,
+        lambda: _ha_weather_forecast_remote(eid, ftype, timeout_sec),
+        cacheable=lambda v: isinstance(v, dict) and bool(v.get("ok")),
+    )
+
+
+def _ha_weather_forecast_remote(eid: str, ftype: str, timeout_sec: int) -> dict:
     body = {"entity_id": eid, "type": ftype}
     r = ha_call_service("weather", "get_forecasts", service_data=body, return_response=True, timeout_sec=int(timeout_sec))
     if not r.get("ok"):
@@ -1023,7 +1086,7 @@ def ha_weather_forecast(entity_id: str, forecast_type: str = "daily", timeout_se
 
 # @mcp.tool(description="(Structured) List available HA calendars (entity_id + name).")
 def ha_list_calendars(timeout_sec: int = 12) -> dict:
-    return _ha_request("GET", "/api/calendars", timeout_sec=int(timeout_sec))
+    return _ha_request("GET", "/api/calendars", timeout_sec=int(timeout_sec), coalesce=True)
 
 
 # @mcp.tool(description="(Structured) List events for a HA calendar entity. Dates are ISO 8601, e.g. 2026-01-22T00:00:00+11:00")
@@ -1035,8 +1098,23 @@ def ha_calendar_events(entity_id: str, start: str, end: str, timeout_sec: int =
     e = str(end or "").strip()
     if (not s) or (not e):
         return {"ok": False, "error": "empty_start_or_end", "hint": "Provide start/end ISO strings."}
+    return _ha_calendar_events_cached(eid, s, e, timeout_sec)
+
+
+def _ha_calendar_events_cached(eid: str, s: str, e: str, timeout_sec: int = 12, refresh: bool = False) -> dict:
+    # Event lists are shared cache values: callers copy an event before changing it.
+    fn = shared_cache.refresh if refresh else shared_cache.get_or_load
+    return fn(
+        "calendar",
+        eid + "|" + s + "|" + e,
+        lambda: _ha_calendar_events_remote(eid, s, e, timeout_sec),
+        cacheable=lambda v: isinstance(v, dict) and bool(v.get("ok")),
+    )
+
+
+def _ha_calendar_events_remote(eid: str, s: str, e: str, timeout_sec: int) -> dict:
     path = "/api/calendars/" + eid + "?start=" + requests.utils.quote(s) + "&end=" + requests.utils.quote(e)
-    return _ha_request("GET", path, timeout_sec=int(timeout_sec))
+    return _ha_request("GET", path, timeout_sec=int(timeout_sec), coalesce=True)
 
 
 # ---- Public holidays (offline / deterministic) ----
@@ -1047,6 +1125,10 @@ def holiday_vic(year: int, timeout_sec: int = 3) -> dict:
         y = int(year)
     except Exception:
         y = int(datetime.now().year)
+    return shared_cache.get_or_load("holiday", "AU-VIC|" + str(y), lambda: _holiday_vic_compute(y), cacheable=lambda v: isinstance(v, dict) and bool(v.get("ok")))
+
+
+def _holiday_vic_compute(y: int) -> dict:
     try:
         import holidays  # type: ignore
     except Exception:
@@ -1305,6 +1387,30 @@ def _searxng_search(
     language: str,
     count: int,
     time_range: Optional[str] = None,
+) -> Dict[str, Any]:
+    key = "|".join([
+        str(query or "").strip(),
+        str(categories or ""),
+        str(language or ""),
+        str(int(count)),
+        str(time_range or ""),
+        (os.getenv("BRAVE_SEARCH_COUNTRY") or "AU").strip(),
+    ])
+    return shared_cache.get_or_load(
+        "brave",
+        key,
+        lambda: _brave_search_remote(base_url, query, categories, language, count, time_range),
+        cacheable=lambda v: isinstance(v, dict) and bool(v.get("results")),
+    )
+
+
+def _brave_search_remote(
+    base_url: str,
+    query: str,
+    categories: str,
+    language: str,
+    count: int,
+    time_range: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Brave Search API backend (replaces local SearXNG).
@@ -1363,30 +1469,30 @@ def _searxng_search(
     try:
         import time as _time
         import threading as _threading
-        if not hasattr(_searxng_search, "_brave_lock"):
-            _searxng_search._brave_lock = _threading.Lock()
-            _searxng_search._brave_last_ts = 0.0
+        if not hasattr(_brave_search_remote, "_brave_lock"):
+            _brave_search_remote._brave_lock = _threading.Lock()
+            _brave_search_remote._brave_last_ts = 0.0
         _min_interval = float(os.getenv("BRAVE_MIN_INTERVAL", "1.2"))
         if _min_interval < 0.2:
             _min_interval = 0.2
         def _throttle():
-            with _searxng_search._brave_lock:
+            with _brave_search_remote._brave_lock:
                 now = _time.time()
-                last = float(getattr(_searxng_search, "_brave_last_ts", 0.0))
+                last = float(getattr(_brave_search_remote, "_brave_last_ts", 0.0))
                 wait = _min_interval - (now - last)
                 if wait > 0:
                     # keep it bounded to avoid very long blocking
                     if wait > 3.0:
                         wait = 3.0
                     _time.sleep(wait)
-                _searxng_search._brave_last_ts = _time.time()
+                _brave_search_remote._brave_last_ts = _time.time()
     except Exception:
         def _throttle():
             return
 
     def _do_get(p, h):
         _throttle()
-        return requests.get(api_url, params=p, headers=h, timeout=timeout_s)
+        return http_pool.get(api_url, upstream="brave", params=p, headers=h, timeout=timeout_s)
 
     resp = _do_get(params, headers)
 
@@ -1541,7 +1647,7 @@ def _searxng_http_search(
     if tr:
         params["time_range"] = tr
 
-    r = requests.get(endpoint, params=params, timeout=timeout_s)
+    r = http_pool.coalesced("GET", endpoint, upstream="searxng", params=params, timeout=timeout_s)
     r.raise_for_status()
     j = r.json() if hasattr(r, "json") else {}
     items = j.get("results") if isinstance(j, dict) else None
@@ -2912,12 +3018,7 @@ def _summarise_weather_range(fc_list, start_date, days, tzinfo):
     return "；".join(out) + "。"
 
 def _is_weather_query(t):
-    s = str(t or "")
-    keys = ["天气", "温度", "降雨", "下雨", "气温", "风", "预报", "天氣"]
-    for k in keys:
-        if k in s:
-            return True
-    return False
+    return text_has(str(t or ""), "weather_query")
 
 def _is_calendar_query(t):
     s = str(t or "")
@@ -3328,6 +3429,208 @@ def _strip_trailing_paren_block(s: str):
     return trimmed, ""
 
 
+# ---- Shared SQLite connection manager ----
+# One long-lived connection per (thread, database file). Schema init runs once per
+# process and file (again if the file is replaced); callers keep their connect/close
+# shape: each _sqlite_conn() returns its own handle whose close() only releases.
+_SQLITE_LOCAL = threading.local()
+_SQLITE_LOCK = threading.Lock()
+_SQLITE_INIT_LOCK = threading.RLock()
+_SQLITE_INIT_DONE = {}  # path -> (st_dev, st_ino) of the file the schema was created in
+_SQLITE_STATS = {"opens": 0, "reuses": 0, "statements": 0, "stmt_ms_total": 0.0, "stmt_ms_max": 0.0, "by_db": {}}
+
+
+def _sqlite_note_stmt(db_name: str, started: float):
+    ms = (time.perf_counter() - started) * 1000.0
+    with _SQLITE_LOCK:
+        _SQLITE_STATS["statements"] += 1
+        _SQLITE_STATS["stmt_ms_total"] += ms
+        if ms > _SQLITE_STATS["stmt_ms_max"]:
+            _SQLITE_STATS["stmt_ms_max"] = ms
+        it = _SQLITE_STATS["by_db"].setdefault(db_name, {"opens": 0, "statements": 0, "stmt_ms_total": 0.0})
+        it["statements"] += 1
+        it["stmt_ms_total"] += ms
+
+
+class _SqliteCursor:
+    def __init__(self, cur, db_name: str):
+        self._cur = cur
+        self._db_name = db_name
+
+    def execute(self, sql, params=()):
+        t0 = time.perf_counter()
+        try:
+            self._cur.execute(sql, params)
+        finally:
+            _sqlite_note_stmt(self._db_name, t0)
+        return self
+
+    def executemany(self, sql, seq):
+        t0 = time.perf_counter()
+        try:
+            self._cur.executemany(sql, seq)
+        finally:
+            _sqlite_note_stmt(self._db_name, t0)
+        return self
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _SqlitePooled:
+    # The per-thread connection behind the handles; depth counts handles not yet closed.
+    def __init__(self, conn, db_name: str, file_id):
+        self.conn = conn
+        self.db_name = db_name
+        self.file_id = file_id
+        self.depth = 0
+
+
+class _SqliteConn:
+    def __init__(self, pooled: _SqlitePooled):
+        self._pooled = pooled
+        self._conn = pooled.conn
+        self._db_name = pooled.db_name
+        self._closed = False
+        pooled.depth += 1
+
+    def cursor(self):
+        return _SqliteCursor(self._conn.cursor(), self._db_name)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def close(self):
+        # Pooled: keep the connection. When the last open handle is released, drop an
+        # unfinished transaction the way a real close() would. Closing twice is a no-op.
+        if self._closed:
+            return
+        self._closed = True
+        pooled = self._pooled
+        pooled.depth = max(0, pooled.depth - 1)
+        if pooled.depth == 0 and self._conn.in_transaction:
+            try:
+                self._conn.rollback()
+            except Exception:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _sqlite_pragmas(conn):
+    try:
+        mmap_mb = int(os.environ.get("SQLITE_MMAP_MB") or "64")
+    except Exception:
+        mmap_mb = 64
+    try:
+        cache_kb = int(os.environ.get("SQLITE_CACHE_KB") or "8192")
+    except Exception:
+        cache_kb = 8192
+    for stmt in [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=" + str(max(0, mmap_mb) * 1024 * 1024),
+        "PRAGMA cache_size=-" + str(max(256, cache_kb)),
+    ]:
+        try:
+            conn.execute(stmt)
+        except Exception:
+            # e.g. WAL is unavailable on some network filesystems
+            pass
+
+
+def _sqlite_file_id(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def _sqlite_conn(path: str, init_fn=None, db_name: str = ""):
+    p = os.path.abspath(str(path or ""))
+    name = str(db_name or os.path.basename(p))
+    conns = getattr(_SQLITE_LOCAL, "conns", None)
+    if conns is None:
+        conns = {}
+        _SQLITE_LOCAL.conns = conns
+    pooled = conns.get(p)
+    file_id = _sqlite_file_id(p)
+    if (pooled is not None) and (pooled.file_id != file_id) and (pooled.depth == 0):
+        # The file was deleted or replaced: the old connection still points at the unlinked
+        # copy, and the new file (which may reuse the inode) needs its schema again.
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        pooled = None
+        with _SQLITE_INIT_LOCK:
+            _SQLITE_INIT_DONE.pop(p, None)
+    if pooled is None:
+        raw = sqlite3.connect(p, timeout=10, cached_statements=256)
+        _sqlite_pragmas(raw)
+        pooled = _SqlitePooled(raw, name, _sqlite_file_id(p))
+        conns[p] = pooled
+        with _SQLITE_LOCK:
+            _SQLITE_STATS["opens"] += 1
+            it = _SQLITE_STATS["by_db"].setdefault(name, {"opens": 0, "statements": 0, "stmt_ms_total": 0.0})
+            it["opens"] += 1
+    else:
+        with _SQLITE_LOCK:
+            _SQLITE_STATS["reuses"] += 1
+    c = _SqliteConn(pooled)
+    if (init_fn is not None) and (_SQLITE_INIT_DONE.get(p) != pooled.file_id):
+        with _SQLITE_INIT_LOCK:
+            if _SQLITE_INIT_DONE.get(p) != pooled.file_id:
+                try:
+                    init_fn(c)
+                    c.commit()
+                except Exception:
+                    c.close()
+                    raise
+                _SQLITE_INIT_DONE[p] = pooled.file_id
+    return c
+
+
+def _sqlite_stats() -> dict:
+    with _SQLITE_LOCK:
+        n = int(_SQLITE_STATS["statements"])
+        by_db = {}
+        for k, v in _SQLITE_STATS["by_db"].items():
+            cnt = int(v.get("statements") or 0)
+            by_db[k] = {
+                "opens": int(v.get("opens") or 0),
+                "statements": cnt,
+                "stmt_ms_avg": round(float(v.get("stmt_ms_total") or 0.0) / cnt, 3) if cnt else 0.0,
+            }
+        return {
+            "opens": int(_SQLITE_STATS["opens"]),
+            "reuses": int(_SQLITE_STATS["reuses"]),
+            "statements": n,
+            "stmt_ms_avg": round(float(_SQLITE_STATS["stmt_ms_total"]) / n, 3) if n else 0.0,
+            "stmt_ms_max": round(float(_SQLITE_STATS["stmt_ms_max"]), 3),
+            "by_db": by_db,
+        }
+
+
+def _sqlite_migrate_all():
+    # Startup hook: run every schema init once before serving requests.
+    for fn in [_rag_db_conn, _news_cache_conn, _bills_db_connect, _embed_cache_conn, _route_cache_conn]:
+        try:
+            fn().close()
+        except Exception:
+            pass
+
+
 def _rag_data_dir() -> str:
     try:
         base = os.path.dirname(os.path.abspath(__file__))
@@ -3353,6 +3656,10 @@ def _rag_index_db_path() -> str:
     return os.path.join(_rag_data_dir(), "rag_index.sqlite3")
 
 
+def _rag_db_conn():
+    return _sqlite_conn(_rag_index_db_path(), _rag_db_init, "rag_index")
+
+
 def _rag_db_init(conn):
     cur = conn.cursor()
     cur.execute("CREATE TABLE IF NOT EXISTS files(path TEXT PRIMARY KEY, name TEXT, ext TEXT, mtime REAL, size INTEGER)")
@@ -3361,20 +3668,178 @@ def _rag_db_init(conn):
     cur.execute("CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime)")
     cur.execute("CREATE TABLE IF NOT EXISTS doc_text(path TEXT PRIMARY KEY, mtime REAL, text TEXT)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_doc_text_mtime ON doc_text(mtime)")
+    _rag_db_init_chunks(conn)
+    _rag_db_init_fts(conn)
+    _rag_db_init_sync_state(conn)
     conn.commit()
 
 
+def _rag_db_init_sync_state(conn):
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(files)")
+    cols = [str(r[1] or "") for r in cur.fetchall()]
+    if "dir" not in cols:
+        cur.execute("ALTER TABLE files ADD COLUMN dir TEXT")
+        cur.execute("SELECT path FROM files")
+        rows = [(os.path.dirname(str(r[0] or "")), str(r[0] or "")) for r in cur.fetchall()]
+        cur.executemany("UPDATE files SET dir=? WHERE path=?", rows)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir)")
+    cur.execute("CREATE TABLE IF NOT EXISTS rag_dirs(path TEXT PRIMARY KEY, parent TEXT, mtime REAL, checked_ts REAL)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_rag_dirs_parent ON rag_dirs(parent)")
+    cur.execute("CREATE TABLE IF NOT EXISTS rag_meta(key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _rag_fts_enabled() -> bool:
+    v = str(os.environ.get("RAG_FTS_ENABLE") or "1").strip().lower()
+    return v in ["1", "true", "yes", "on"]
+
+
+def _rag_db_init_chunks(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='doc_chunks'")
+    existed = bool(cur.fetchone())
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS doc_chunks("
+        "path TEXT, chunk_idx INTEGER, page INTEGER, char_start INTEGER, char_end INTEGER, text TEXT, "
+        "PRIMARY KEY(path, chunk_idx))"
+    )
+    if existed:
+        return
+    # One-time backfill from text cached before chunking existed (page unknown -> 0).
+    cur.execute("SELECT path, text FROM doc_text")
+    for row in cur.fetchall():
+        _rag_db_write_chunks(conn, str(row[0] or ""), [(0, str(row[1] or ""))])
+
+
+def _rag_db_init_fts(conn) -> bool:
+    # doc_chunks_fts is an external-content FTS5 index over doc_chunks (rowid-linked),
+    # kept in sync by triggers so every writer of doc_chunks maintains it.
+    if not _rag_fts_enabled():
+        return False
+    cur = conn.cursor()
+    # The first FTS layout indexed whole documents; passages live in doc_chunks now.
+    for trg in ["doc_text_fts_ai", "doc_text_fts_ad", "doc_text_fts_au"]:
+        cur.execute("DROP TRIGGER IF EXISTS " + trg)
+    cur.execute("DROP TABLE IF EXISTS doc_text_fts")
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='doc_chunks_fts'")
+    if cur.fetchone():
+        _rag_db_init_cjk(conn)
+        return True
+    try:
+        cur.execute(
+            "CREATE VIRTUAL TABLE doc_chunks_fts USING fts5("
+            "text, content='doc_chunks', content_rowid='rowid', tokenize='trigram')"
+        )
+    except Exception:
+        # SQLite < 3.34 has no trigram tokenizer; content search falls back to scanning.
+        return False
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS doc_chunks_fts_ai AFTER INSERT ON doc_chunks BEGIN "
+        "INSERT INTO doc_chunks_fts(rowid, text) VALUES (new.rowid, new.text); END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS doc_chunks_fts_ad AFTER DELETE ON doc_chunks BEGIN "
+        "INSERT INTO doc_chunks_fts(doc_chunks_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS doc_chunks_fts_au AFTER UPDATE ON doc_chunks BEGIN "
+        "INSERT INTO doc_chunks_fts(doc_chunks_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+        "INSERT INTO doc_chunks_fts(rowid, text) VALUES (new.rowid, new.text); END"
+    )
+    # One-time backfill of chunks written before the index existed.
+    cur.execute("INSERT INTO doc_chunks_fts(doc_chunks_fts) VALUES ('rebuild')")
+    _rag_db_init_cjk(conn)
+    return True
+
+
+_RAG_CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+
+def _rag_cjk_segment(text) -> str:
+    # Each CJK run becomes its overlapping bigrams plus its last character, as separate
+    # tokens; everything else is left for the unicode61 tokenizer to split into words.
+    def _split(m):
+        run = m.group(0)
+        return " " + " ".join([run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]) + " "
+
+    return _RAG_CJK_RUN_RE.sub(_split, str(text or "").lower())
+
+
+def _rag_cjk_match(term: str) -> str:
+    # MATCH expression over doc_chunks_cjk that every chunk containing term satisfies:
+    # CJK bigrams exactly, other tokens as prefixes. Callers confirm the substring with instr().
+    parts = []
+    for tok in re.findall(r"[^\W_]+", _rag_cjk_segment(term)):
+        if len(tok) == 2 and _RAG_CJK_RUN_RE.fullmatch(tok):
+            parts.append(_rag_fts_quote(tok))
+        else:
+            parts.append(_rag_fts_quote(tok) + "*")
+    return " AND ".join(_rag_unique_keep_order(parts))
+
+
+def _rag_db_init_cjk(conn):
+    # doc_chunks_cjk indexes every chunk with CJK runs split into bigrams, so terms too short
+    # for the trigram index (most two-character Chinese words) still go through MATCH. The
+    # segmentation is Python, so the chunk writers keep it in sync instead of triggers.
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='doc_chunks_cjk'")
+    if cur.fetchone():
+        return
+    cur.execute("CREATE VIRTUAL TABLE doc_chunks_cjk USING fts5(text, tokenize='unicode61')")
+    cur.execute("SELECT rowid, text FROM doc_chunks")
+    rows = [(r[0], _rag_cjk_segment(r[1])) for r in cur.fetchall()]
+    cur.executemany("INSERT INTO doc_chunks_cjk(rowid, text) VALUES(?, ?)", rows)
+
+
+def _rag_db_has_cjk(cur) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='doc_chunks_cjk'")
+    return bool(cur.fetchone())
+
+
+def _rag_db_delete_chunks(cur, path: str):
+    if _rag_db_has_cjk(cur):
+        cur.execute("DELETE FROM doc_chunks_cjk WHERE rowid IN (SELECT rowid FROM doc_chunks WHERE path=?)", (path,))
+    cur.execute("DELETE FROM doc_chunks WHERE path=?", (path,))
+
+
+def _rag_db_has_fts(conn) -> bool:
+    if not _rag_fts_enabled():
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='doc_chunks_fts'")
+        return bool(cur.fetchone())
+    except Exception:
+        return False
+
+
+def _rag_db_file_params(row: dict) -> tuple:
+    path = str(row.get("path") or "")
+    return (
+        path,
+        str(row.get("name") or ""),
+        str(row.get("ext") or ""),
+        float(row.get("mtime") or 0.0),
+        int(row.get("size") or 0),
+        os.path.dirname(path),
+    )
+
+
 def _rag_db_upsert_file(conn, row: dict):
     cur = conn.cursor()
     cur.execute(
-        "INSERT OR REPLACE INTO files(path, name, ext, mtime, size) VALUES(?,?,?,?,?)",
-        (
-            str(row.get("path") or ""),
-            str(row.get("name") or ""),
-            str(row.get("ext") or ""),
-            float(row.get("mtime") or 0.0),
-            int(row.get("size") or 0),
-        ),
+        "INSERT OR REPLACE INTO files(path, name, ext, mtime, size, dir) VALUES(?,?,?,?,?,?)",
+        _rag_db_file_params(row),
+    )
+
+
+def _rag_db_upsert_files(conn, rows: list):
+    if not rows:
+        return
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR REPLACE INTO files(path, name, ext, mtime, size, dir) VALUES(?,?,?,?,?,?)",
+        [_rag_db_file_params(r) for r in rows],
     )
 
 
@@ -3383,14 +3848,73 @@ def _rag_db_delete_path(conn, path: str):
     p = str(path or "")
     cur.execute("DELETE FROM files WHERE path=?", (p,))
     cur.execute("DELETE FROM doc_text WHERE path=?", (p,))
+    _rag_db_delete_chunks(cur, p)
+
+
+def _rag_db_write_chunks(conn, path: str, pages: list):
+    # pages: [(page_no, page_text)] in document order, page_no 0 for unpaged text.
+    # Offsets are into the "\n"-joined document text stored in doc_text.
+    p = str(path or "")
+    rows = []
+    base = 0
+    for page_no, page_text in pages or []:
+        body = str(page_text or "")
+        for start, end in rag_chunking.split_text_spans(body, _RAG_CHUNK_SIZE, _RAG_CHUNK_OVERLAP):
+            rows.append((p, len(rows), int(page_no or 0), base + start, base + end, body[start:end]))
+        base += len(body) + 1
+    cur = conn.cursor()
+    _rag_db_delete_chunks(cur, p)
+    if rows:
+        cur.executemany(
+            "INSERT INTO doc_chunks(path, chunk_idx, page, char_start, char_end, text) VALUES(?,?,?,?,?,?)",
+            rows,
+        )
+        if _rag_db_has_cjk(cur):
+            cur.execute("SELECT rowid, text FROM doc_chunks WHERE path=?", (p,))
+            seg = [(r[0], _rag_cjk_segment(r[1])) for r in cur.fetchall()]
+            cur.executemany("INSERT INTO doc_chunks_cjk(rowid, text) VALUES(?, ?)", seg)
 
 
-def _rag_db_upsert_doc_text(conn, path: str, mtime: float, text: str):
+def _rag_db_upsert_doc_text(conn, path: str, mtime: float, text: str, pages: list = None):
     cur = conn.cursor()
     cur.execute(
-        "INSERT OR REPLACE INTO doc_text(path, mtime, text) VALUES(?,?,?)",
+        "INSERT INTO doc_text(path, mtime, text) VALUES(?,?,?) "
+        "ON CONFLICT(path) DO UPDATE SET mtime=excluded.mtime, text=excluded.text",
         (str(path or ""), float(mtime or 0.0), str(text or "")),
     )
+    if pages is None:
+        pages = [(0, str(text or ""))]
+    _rag_db_write_chunks(conn, path, pages)
+
+
+def _rag_db_prune_dir(conn, dir_path: str) -> int:
+    # Drop a vanished directory subtree: its files (with cached text) and dir rows.
+    d = str(dir_path or "").rstrip("/\\")
+    if not d:
+        return 0
+    lo = d + "/"
+    hi = d + "0"  # "0" sorts right after "/", bounding the prefix range
+    cur = conn.cursor()
+    cur.execute("SELECT path FROM files WHERE path >= ? AND path < ?", (lo, hi))
+    paths = [str(r[0] or "") for r in cur.fetchall()]
+    for p in paths:
+        _rag_db_delete_path(conn, p)
+    cur.execute("DELETE FROM rag_dirs WHERE path = ? OR (path >= ? AND path < ?)", (d, lo, hi))
+    return len(paths)
+
+
+def _rag_meta_get(conn, key: str, default_val: str = "") -> str:
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM rag_meta WHERE key=?", (str(key or ""),))
+    row = cur.fetchone()
+    if not row:
+        return default_val
+    return str(row[0] or "")
+
+
+def _rag_meta_set(conn, key: str, value: str):
+    cur = conn.cursor()
+    cur.execute("INSERT OR REPLACE INTO rag_meta(key, value) VALUES(?,?)", (str(key or ""), str(value or "")))
 
 
 def _rag_doc_text_get(conn, path: str):
@@ -3404,24 +3928,28 @@ def _rag_doc_text_get(conn, path: str):
     return old_mtime, old_text
 
 
-_RAG_TEXT_MAX_BYTES = 524288
-_RAG_TEXT_MAX_PAGES = 20
-_RAG_TEXT_MAX_CHARS = 200000
+_RAG_TEXT_MAX_BYTES = 4194304
+_RAG_TEXT_MAX_PAGES = 500
+_RAG_TEXT_MAX_CHARS = 2000000
+_RAG_CHUNK_SIZE = 900
+_RAG_CHUNK_OVERLAP = 120
 _RAG_CONTENT_TOPN = 3
 _RAG_CONTENT_CANDIDATES = 200
+_RAG_FTS_HITS_LIMIT = 50
 _RAG_CONTENT_EXTRACT_EXTS = {"md", "txt", "pdf"}
 
 
-def _rag_extract_plain_text(path: str, ext: str) -> str:
+def _rag_extract_pages(path: str, ext: str) -> list:
+    # [(page_no, text)]; PDFs are 1-based per page, plain text is one page 0.
     ext_norm = str(ext or "").strip().lower().lstrip(".")
     try:
         if ext_norm in {"md", "txt"}:
             with open(path, "r", encoding="utf-8", errors="ignore") as f:
                 content = f.read(_RAG_TEXT_MAX_BYTES)
-            return str(content or "")
+            return [(0, str(content or ""))]
         if ext_norm == "pdf":
             if PdfReader is None:
-                return ""
+                return []
             pieces = []
             total_len = 0
             reader = PdfReader(path)
@@ -3439,14 +3967,18 @@ def _rag_extract_plain_text(path: str, ext: str) -> str:
                     break
                 if len(part) > remain:
                     part = part[:remain]
-                pieces.append(part)
+                pieces.append((i + 1, part))
                 total_len += len(part)
                 if total_len >= _RAG_TEXT_MAX_CHARS:
                     break
-            return "\n".join(pieces)
+            return pieces
     except Exception:
-        return ""
-    return ""
+        return []
+    return []
+
+
+def _rag_extract_plain_text(path: str, ext: str) -> str:
+    return "\n".join([str(t or "") for _p, t in _rag_extract_pages(path, ext)])
 
 
 def _rag_ensure_doc_text_cache_meta(conn, path: str, ext: str, mtime: float):
@@ -3458,9 +3990,10 @@ def _rag_ensure_doc_text_cache_meta(conn, path: str, ext: str, mtime: float):
     if cached_mtime is not None:
         if abs(float(cached_mtime) - current_mtime) < 0.000001:
             return str(cached_text or ""), "hit"
-    text = _rag_extract_plain_text(path, ext)
+    pages = _rag_extract_pages(path, ext)
+    text = "\n".join([str(t or "") for _p, t in pages])
     try:
-        _rag_db_upsert_doc_text(conn, path, current_mtime, text)
+        _rag_db_upsert_doc_text(conn, path, current_mtime, text, pages)
     except Exception:
         return "", "error"
     if str(text or "").strip():
@@ -3473,6 +4006,159 @@ def _rag_ensure_doc_text_cache(conn, path: str, ext: str, mtime: float) -> str:
     return str(text or "")
 
 
+# ---- Text extraction service ----
+# pypdf work runs in a bounded process pool; one daemon writer thread owns all
+# doc_text writes and commits finished extractions in batches.
+_RAG_EXTRACT_LOCK = threading.Lock()
+_RAG_EXTRACT_STATE = {"pool": None, "writer": None, "inflight": {}}
+_RAG_EXTRACT_RESULTS = Queue()
+_RAG_EXTRACT_WRITE_BATCH = 20
+
+
+def _rag_extract_workers() -> int:
+    try:
+        n = int(os.environ.get("RAG_EXTRACT_WORKERS") or "0")
+    except Exception:
+        n = 0
+    if n < 1:
+        n = min(4, int(os.cpu_count() or 1))
+    return max(1, min(n, 16))
+
+
+def _rag_extract_timed(path: str, ext: str) -> tuple:
+    # Runs inside a worker process.
+    t0 = time.perf_counter()
+    pages = _rag_extract_pages(path, ext)
+    return pages, round(time.perf_counter() - t0, 3)
+
+
+def _rag_extract_pool():
+    with _RAG_EXTRACT_LOCK:
+        pool = _RAG_EXTRACT_STATE.get("pool")
+        if pool is not None:
+            return pool
+        mode = str(os.environ.get("RAG_EXTRACT_MODE") or "process").strip().lower()
+        workers = _rag_extract_workers()
+        pool = None
+        if mode != "thread":
+            # Never fork: the server process holds pooled SQLite connections, locks and
+            # HTTP sessions owned by other threads, none of which survive into a forked child.
+            start = str(os.environ.get("RAG_EXTRACT_START_METHOD") or "spawn").strip().lower()
+            if start not in ("spawn", "forkserver"):
+                start = "spawn"
+            try:
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start))
+            except Exception:
+                pool = None
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-extract")
+        _RAG_EXTRACT_STATE["pool"] = pool
+        return pool
+
+
+def _rag_extract_pool_reset():
+    with _RAG_EXTRACT_LOCK:
+        pool = _RAG_EXTRACT_STATE.get("pool")
+        _RAG_EXTRACT_STATE["pool"] = None
+    if pool is not None:
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+
+def _rag_extract_writer_loop():
+    while True:
+        batch = [_RAG_EXTRACT_RESULTS.get()]
+        while len(batch) < _RAG_EXTRACT_WRITE_BATCH:
+            try:
+                batch.append(_RAG_EXTRACT_RESULTS.get_nowait())
+            except Empty:
+                break
+        conn = None
+        try:
+            conn = _rag_db_conn()
+            for job, fut in batch:
+                try:
+                    pages, elapsed = fut.result()
+                except Exception:
+                    job["status"] = "error"
+                    continue
+                job["elapsed"] = float(elapsed or 0.0)
+                text = "\n".join([str(t or "") for _p, t in pages])
+                _rag_db_upsert_doc_text(conn, job["path"], job["mtime"], text, pages)
+                job["status"] = "updated" if str(text or "").strip() else "empty"
+            conn.commit()
+        except Exception:
+            for job, _fut in batch:
+                job["status"] = "error"
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        with _RAG_EXTRACT_LOCK:
+            for job, _fut in batch:
+                if _RAG_EXTRACT_STATE["inflight"].get(job["path"]) is job:
+                    _RAG_EXTRACT_STATE["inflight"].pop(job["path"], None)
+        for job, _fut in batch:
+            job["written"].set()
+
+
+def _rag_extract_writer_start():
+    with _RAG_EXTRACT_LOCK:
+        t = _RAG_EXTRACT_STATE.get("writer")
+        if t is not None and t.is_alive():
+            return
+        t = threading.Thread(target=_rag_extract_writer_loop, name="rag-extract-writer", daemon=True)
+        _RAG_EXTRACT_STATE["writer"] = t
+    t.start()
+
+
+def _rag_extract_submit(path: str, ext: str, mtime: float) -> dict:
+    p = str(path or "")
+    with _RAG_EXTRACT_LOCK:
+        job = _RAG_EXTRACT_STATE["inflight"].get(p)
+        if job is not None and abs(float(job.get("mtime") or 0.0) - float(mtime or 0.0)) < 0.000001:
+            return job
+        job = {
+            "path": p,
+            "ext": str(ext or ""),
+            "mtime": float(mtime or 0.0),
+            "status": "",
+            "elapsed": 0.0,
+            "written": threading.Event(),
+        }
+        _RAG_EXTRACT_STATE["inflight"][p] = job
+    _rag_extract_writer_start()
+    try:
+        fut = _rag_extract_pool().submit(_rag_extract_timed, p, job["ext"])
+    except Exception:
+        # Broken process pool (e.g. a worker was killed): rebuild once.
+        _rag_extract_pool_reset()
+        try:
+            fut = _rag_extract_pool().submit(_rag_extract_timed, p, job["ext"])
+        except Exception:
+            with _RAG_EXTRACT_LOCK:
+                _RAG_EXTRACT_STATE["inflight"].pop(p, None)
+            job["status"] = "error"
+            job["written"].set()
+            return job
+    fut.add_done_callback(lambda f, j=job: _RAG_EXTRACT_RESULTS.put((j, f)))
+    return job
+
+
+def _rag_extract_wait(jobs: list, timeout_sec: float) -> int:
+    deadline = time.monotonic() + max(0.0, float(timeout_sec or 0.0))
+    done = 0
+    for job in jobs:
+        remain = deadline - time.monotonic()
+        if job["written"].wait(max(0.0, remain)):
+            done += 1
+    return done
+
+
 def _rag_content_exts_from_sources() -> list:
     sources = _rag_load_json(_rag_sources_path(), {})
     allowed = []
@@ -3635,8 +4321,7 @@ def _rag_obsidian_index_upsert_md(path: str):
     except Exception:
         text = ""
     try:
-        conn = sqlite3.connect(_rag_index_db_path())
-        _rag_db_init(conn)
+        conn = _rag_db_conn()
         _rag_db_upsert_file(
             conn,
             {
@@ -3662,8 +4347,7 @@ def _rag_obsidian_index_delete(path: str):
     if not full:
         return
     try:
-        conn = sqlite3.connect(_rag_index_db_path())
-        _rag_db_init(conn)
+        conn = _rag_db_conn()
         _rag_db_delete_path(conn, full)
         conn.commit()
         conn.close()
@@ -3934,16 +4618,16 @@ def _rag_prewarm_source(name: str, language: str, folder: str = "") -> dict:
     allow_exts = _rag_source_allowed_exts(source)
     placeholders = ",".join(["?"] * len(allow_exts))
     sql = (
-        "SELECT path, ext, mtime "
-        "FROM files "
-        "WHERE lower(ext) IN (" + placeholders + ")"
+        "SELECT f.path, f.ext, f.mtime, d.mtime "
+        "FROM files f LEFT JOIN doc_text d ON d.path = f.path "
+        "WHERE lower(f.ext) IN (" + placeholders + ")"
     )
     params = list(allow_exts)
     if folder_like:
-        sql = sql + " AND lower(path) LIKE lower(?)"
+        sql = sql + " AND lower(f.path) LIKE lower(?)"
         params.append(folder_like)
     limit_val = _rag_parse_limit_env("RAG_PREWARM_LIMIT", 200)
-    sql = sql + " ORDER BY mtime DESC LIMIT ?"
+    sql = sql + " ORDER BY f.mtime DESC LIMIT ?"
     params.append(limit_val)
 
     processed = 0
@@ -3951,31 +4635,26 @@ def _rag_prewarm_source(name: str, language: str, folder: str = "") -> dict:
     hit = 0
     empty = 0
     error = 0
+    unfinished = 0
     started = datetime.now().timestamp()
+    jobs = []
 
     try:
-        conn = sqlite3.connect(db_path)
-        _rag_db_init(conn)
+        conn = _rag_db_conn()
         cur = conn.cursor()
         cur.execute(sql, tuple(params))
         rows = cur.fetchall()
+        conn.close()
         for row in rows:
             path = str(row[0] or "")
             ext = str(row[1] or "").strip().lower()
             mtime = float(row[2] or 0.0)
-            _text, status = _rag_ensure_doc_text_cache_meta(conn, path, ext, mtime)
+            cached_mtime = row[3]
             processed += 1
-            if status == "hit":
+            if (cached_mtime is not None) and abs(float(cached_mtime) - mtime) < 0.000001:
                 hit += 1
-            elif status == "updated":
-                updated += 1
-            elif status == "empty":
-                updated += 1
-                empty += 1
-            else:
-                error += 1
-        conn.commit()
-        conn.close()
+                continue
+            jobs.append(_rag_extract_submit(path, ext, mtime))
     except Exception:
         try:
             conn.close()
@@ -3983,10 +4662,45 @@ def _rag_prewarm_source(name: str, language: str, folder: str = "") -> dict:
             pass
         return {"final": "预热失败：无法访问索引或文件内容。"}
 
-    elapsed = round(max(0.0, datetime.now().timestamp() - started), 2)
-    if folder:
-        final = (
-            name
+    timeout_sec = max(1, _safe_int(os.environ.get("RAG_PREWARM_TIMEOUT_SEC") or "600", 600))
+    _rag_extract_wait(jobs, timeout_sec)
+    slowest_path = ""
+    slowest_sec = 0.0
+    total_sec = 0.0
+    timed = 0
+    for job in jobs:
+        if not job["written"].is_set():
+            # Still queued or extracting when the timeout ran out; the pool finishes it later.
+            unfinished += 1
+            continue
+        status = str(job.get("status") or "")
+        if status == "updated":
+            updated += 1
+        elif status == "empty":
+            updated += 1
+            empty += 1
+        else:
+            error += 1
+            continue
+        sec = float(job.get("elapsed") or 0.0)
+        total_sec += sec
+        timed += 1
+        if sec >= slowest_sec:
+            slowest_sec = sec
+            slowest_path = str(job.get("path") or "")
+    timing = ""
+    if timed:
+        timing = (
+            "；并行=" + str(_rag_extract_workers())
+            + "；单文件平均=" + str(round(total_sec / timed, 2)) + "s"
+            + "；最慢=" + _rag_rel_path_for_display(slowest_path) + "（" + str(round(slowest_sec, 2)) + "s）"
+        )
+
+    pending = ("；未完成（后台继续）=" + str(unfinished)) if unfinished else ""
+    elapsed = round(max(0.0, datetime.now().timestamp() - started), 2)
+    if folder:
+        final = (
+            name
             + " 预热完成（限定目录："
             + folder
             + "）：处理="
@@ -3999,6 +4713,8 @@ def _rag_prewarm_source(name: str, language: str, folder: str = "") -> dict:
             + str(empty)
             + "；失败="
             + str(error)
+            + pending
+            + timing
             + "；用时="
             + str(elapsed)
             + "s。"
@@ -4016,6 +4732,8 @@ def _rag_prewarm_source(name: str, language: str, folder: str = "") -> dict:
             + str(empty)
             + "；失败="
             + str(error)
+            + pending
+            + timing
             + "；用时="
             + str(elapsed)
             + "s。"
@@ -4206,86 +4924,285 @@ def _rag_collect_snippets(text: str, text_lower: str, terms: dict, max_items: in
     return out
 
 
-def _rag_search_content(keyword: str, language: str, folder: str = "") -> str:
+def _rag_content_all_terms(terms: dict) -> list:
+    merged = []
+    merged.extend(terms.get("phrases") or [])
+    merged.extend(terms.get("must_terms") or [])
+    merged.extend(terms.get("any_terms") or [])
+    return _rag_unique_keep_order(merged)
+
+
+def _rag_content_name_score(name: str, terms: dict) -> int:
+    name_low = str(name or "").lower()
+    score = 0
+    for t in _rag_content_all_terms(terms):
+        tl = str(t).lower()
+        if tl and (tl in name_low):
+            score += 50
+    return score
+
+
+def _rag_content_candidates(conn, terms: dict, exts: list, folder_like: str = "") -> list:
+    placeholders = ",".join(["?"] * len(exts))
+    sql = (
+        "SELECT f.path, f.name, f.ext, f.mtime, d.mtime "
+        "FROM files f LEFT JOIN doc_text d ON d.path = f.path "
+        "WHERE lower(f.ext) IN (" + placeholders + ")"
+    )
+    params = list(exts)
+    if folder_like:
+        sql = sql + " AND lower(f.path) LIKE lower(?)"
+        params.append(folder_like)
+    sql = sql + " ORDER BY f.mtime DESC LIMIT ?"
+    params.append(int(_RAG_CONTENT_CANDIDATES))
+    cur = conn.cursor()
+    cur.execute(sql, tuple(params))
+    candidates = []
+    for row in cur.fetchall():
+        candidates.append({
+            "path": str(row[0] or ""),
+            "name": str(row[1] or ""),
+            "ext": str(row[2] or "").strip().lower(),
+            "mtime": float(row[3] or 0.0),
+            "cached_mtime": (float(row[4]) if row[4] is not None else None),
+            "pre_score": _rag_content_name_score(str(row[1] or ""), terms),
+        })
+    candidates.sort(key=lambda x: (int(x.get("pre_score") or 0), float(x.get("mtime") or 0.0)), reverse=True)
+    return candidates[:30]
+
+
+def _rag_fts_quote(term: str) -> str:
+    return "\"" + str(term or "").replace("\"", "\"\"") + "\""
+
+
+def _rag_fts_build_filter(terms: dict):
+    # Trigram MATCH needs >= 3 characters per term; shorter terms (typical
+    # two-character Chinese words) are checked with instr() on the chunk text,
+    # which only filters rows the MATCH selected. Without any trigram term the
+    # bigram index (doc_chunks_cjk) drives the query instead.
+    match_parts = []
+    cjk_parts = []
+    where_parts = []
+    params = []
+    for t in list(terms.get("phrases") or []) + list(terms.get("must_terms") or []):
+        tl = str(t or "").strip().lower()
+        if not tl:
+            continue
+        # A term without any word character has no bigram expression ("" disables the index).
+        cjk_parts.append("(" + _rag_cjk_match(tl) + ")" if _rag_cjk_match(tl) else "")
+        if len(tl) >= 3:
+            match_parts.append(_rag_fts_quote(tl))
+        else:
+            where_parts.append("instr(lower(c.text), ?) > 0")
+            params.append(tl)
+    any_terms = [str(t or "").strip().lower() for t in (terms.get("any_terms") or []) if str(t or "").strip()]
+    if any_terms:
+        any_cjk = [_rag_cjk_match(t) for t in any_terms]
+        cjk_parts.append("(" + " OR ".join(["(" + x + ")" for x in any_cjk]) + ")" if all(any_cjk) else "")
+        if all(len(t) >= 3 for t in any_terms):
+            match_parts.append("(" + " OR ".join([_rag_fts_quote(t) for t in any_terms]) + ")")
+        else:
+            where_parts.append("(" + " OR ".join(["instr(lower(c.text), ?) > 0"] * len(any_terms)) + ")")
+            params.extend(any_terms)
+    cjk_expr = " AND ".join(cjk_parts) if all(cjk_parts) else ""
+    return " AND ".join(match_parts), cjk_expr, where_parts, params
+
+
+def _rag_page_label(page: int) -> str:
+    try:
+        n = int(page or 0)
+    except Exception:
+        n = 0
+    if n <= 0:
+        return ""
+    return "第" + str(n) + "页"
+
+
+def _rag_search_content_fts(conn, terms: dict, exts: list, folder_like: str = "") -> list:
+    # Every term must occur somewhere in the document (any_terms: at least one of them), not
+    # necessarily in one passage. Each term's files come from the chunk index, grouped per
+    # file, and the sets are intersected; ranking uses each file's best passage per term.
+    # Files where one passage holds every term rank first; the rest are marked partial.
+    required = _rag_unique_keep_order([str(t or "").strip().lower() for t in list(terms.get("phrases") or []) + list(terms.get("must_terms") or [])])
+    any_terms = _rag_unique_keep_order([str(t or "").strip().lower() for t in (terms.get("any_terms") or [])])
+    all_terms = _rag_unique_keep_order(required + any_terms)
+    hits = {}
+    for t in all_terms:
+        hits[t] = _rag_fts_term_paths(conn, t, exts, folder_like)
+    paths = None
+    for t in required:
+        paths = set(hits[t]) if paths is None else (paths & set(hits[t]))
+    if any_terms:
+        found = set()
+        for t in any_terms:
+            found |= set(hits[t])
+        paths = found if paths is None else (paths & found)
+    if not paths:
+        return []
+    ranked = []
+    for path in paths:
+        own = [hits[t][path] for t in all_terms if path in hits[t]]
+        # More of the query's terms first (any_terms), then the best passages per term.
+        ranked.append((-len(own), sum(h["rank"] for h in own), path))
+    ranked.sort()
+    ranked = ranked[: int(_RAG_FTS_HITS_LIMIT)]
+    keep = [r[2] for r in ranked]
+    if len(all_terms) > 1:
+        whole = _rag_fts_passage_hits(conn, terms, keep)
+    else:
+        whole = dict((p, hits[all_terms[0]][p]["rowid"]) for p in keep)
+    order = {}
+    for path in keep:
+        rowids = ([whole[path]] if path in whole else []) + [hits[t][path]["rowid"] for t in all_terms if path in hits[t]]
+        order[path] = [r for i, r in enumerate(rowids) if r not in rowids[:i]]
+    chunks = _rag_fts_chunks(conn, [r for rowids in order.values() for r in rowids])
+    matches = []
+    for idx, (neg_cov, _rank, path) in enumerate(ranked):
+        head = next(hits[t][path] for t in all_terms if path in hits[t])
+        snippets = []
+        for rid in order[path]:
+            page, chunk = chunks.get(rid, (0, ""))
+            found = _rag_collect_snippets(chunk, chunk.lower(), terms, 1)
+            if not found:
+                continue
+            label = _rag_page_label(page)
+            snip = ("[" + label + "] " + found[0]) if label else found[0]
+            if snip not in snippets:
+                snippets.append(snip)
+            if len(snippets) >= 2:
+                break
+        item = {
+            "path": path,
+            "mtime": head["mtime"],
+            "snippets": snippets,
+            # Rank of the file stands in for the hit-count bonus of the scan path.
+            "score": _rag_content_name_score(head["name"], terms) + max(0, int(_RAG_FTS_HITS_LIMIT) - idx) * 2,
+            "coverage": -neg_cov,
+        }
+        if path not in whole:
+            item["partial"] = True
+        matches.append(item)
+    return matches
+
+
+def _rag_fts_term_paths(conn, term: str, exts: list, folder_like: str = "") -> dict:
+    # path -> {"rank", "rowid", "name", "mtime"} of the file's best passage containing term,
+    # grouped per file so one long document cannot crowd out the others. The FTS rank column
+    # is bm25; bm25() itself cannot be used inside an aggregate.
+    tl = str(term or "").strip().lower()
+    if len(tl) >= 3:
+        table, expr, where_sql, params = "doc_chunks_fts", _rag_fts_quote(tl), "", []
+    else:
+        table, expr, where_sql, params = "doc_chunks_cjk", _rag_cjk_match(tl), " AND instr(lower(c.text), ?) > 0", [tl]
+    if not expr:
+        return {}
+    sql = (
+        "SELECT c.path, MIN(" + table + ".rank), c.rowid, f.name, f.mtime "
+        "FROM " + table + " "
+        "JOIN doc_chunks c ON c.rowid = " + table + ".rowid "
+        "JOIN files f ON f.path = c.path "
+        "WHERE " + table + " MATCH ? AND lower(f.ext) IN (" + ",".join(["?"] * len(exts)) + ")" + where_sql
+    )
+    sql_params = [expr] + list(exts) + params
+    if folder_like:
+        sql = sql + " AND lower(f.path) LIKE lower(?)"
+        sql_params.append(folder_like)
+    cur = conn.cursor()
+    cur.execute(sql + " GROUP BY c.path", tuple(sql_params))
+    out = {}
+    for row in cur.fetchall():
+        out[str(row[0] or "")] = {"rank": float(row[1] or 0.0), "rowid": int(row[2]), "name": str(row[3] or ""), "mtime": float(row[4] or 0.0)}
+    return out
+
+
+def _rag_fts_passage_hits(conn, terms: dict, paths: list) -> dict:
+    # path -> rowid of its best passage holding every term, for the given files only.
+    match_expr, cjk_expr, where_parts, params = _rag_fts_build_filter(terms)
+    table, expr = ("doc_chunks_fts", match_expr) if match_expr else ("doc_chunks_cjk", cjk_expr)
+    if (not expr) or (not paths):
+        return {}
+    sql = (
+        "SELECT c.path, MIN(" + table + ".rank), c.rowid "
+        "FROM " + table + " "
+        "JOIN doc_chunks c ON c.rowid = " + table + ".rowid "
+        "WHERE " + table + " MATCH ? AND c.path IN (" + ",".join(["?"] * len(paths)) + ")"
+    )
+    for w in where_parts:
+        sql = sql + " AND " + w
+    cur = conn.cursor()
+    cur.execute(sql + " GROUP BY c.path", tuple([expr] + list(paths) + list(params)))
+    return dict((str(r[0] or ""), int(r[2])) for r in cur.fetchall())
+
+
+def _rag_fts_chunks(conn, rowids: list) -> dict:
+    if not rowids:
+        return {}
+    cur = conn.cursor()
+    cur.execute("SELECT rowid, page, text FROM doc_chunks WHERE rowid IN (" + ",".join(["?"] * len(rowids)) + ")", tuple(rowids))
+    return dict((int(r[0]), (r[1], str(r[2] or ""))) for r in cur.fetchall())
+
+
+def _rag_search_content_scan(conn, terms: dict, candidates: list) -> list:
+    matches = []
+    for item in candidates:
+        path = str(item.get("path") or "")
+        ext = str(item.get("ext") or "").strip().lower()
+        mtime = float(item.get("mtime") or 0.0)
+        pre_score = int(item.get("pre_score") or 0)
+        text = _rag_ensure_doc_text_cache(conn, path, ext, mtime)
+        text_low = text.lower() if text else ""
+        if not text_low:
+            continue
+        if not _rag_content_match(text_low, terms):
+            continue
+        total_hits = _rag_content_total_hits(text_low, terms)
+        score = pre_score + (min(total_hits, 50) * 2)
+        snippets = _rag_collect_snippets(text, text_low, terms, 2)
+        matches.append({"path": path, "mtime": mtime, "snippets": snippets, "score": score})
+    return matches
+
+
+def _rag_search_content_matches(keyword: str, folder: str = "") -> dict:
+    # Structured form of _rag_search_content: ranked file matches (best first) or
+    # a user-facing message when the search could not run.
     raw_query = str(keyword or "").strip()
     if not raw_query:
-        return "请补充要搜索的内容关键词。"
+        return {"ok": False, "message": "请补充要搜索的内容关键词。"}
     parsed_terms = _rag_parse_content_terms(raw_query)
     if (not parsed_terms.get("must_terms")) and (not parsed_terms.get("any_terms")) and (not parsed_terms.get("phrases")):
-        return "请补充要搜索的内容关键词。"
+        return {"ok": False, "message": "请补充要搜索的内容关键词。"}
     db_path = _rag_index_db_path()
     if not os.path.exists(db_path):
-        return "索引尚未建立，请先同步数据源。"
+        return {"ok": False, "message": "索引尚未建立，请先同步数据源。"}
     folder = _map_folder_alias(folder)
     folder_like = ""
     if folder:
         folder_like = "%/" + folder.strip("/\\").lower() + "/%"
     exts = _rag_content_exts_from_sources()
-    placeholders = ",".join(["?"] * len(exts))
-    sql = (
-        "SELECT path, name, ext, mtime "
-        "FROM files "
-        "WHERE lower(ext) IN (" + placeholders + ")"
-    )
-    params = list(exts)
-    if folder_like:
-        sql = sql + " AND lower(path) LIKE lower(?)"
-        params.append(folder_like)
-    sql = sql + " ORDER BY mtime DESC LIMIT ?"
-    params.append(int(_RAG_CONTENT_CANDIDATES))
 
     matches = []
+    pending_extract = 0
     topn = _rag_parse_limit_env("RAG_SEARCH_TOPN", 3)
     if topn > 10:
         topn = 10
     try:
-        conn = sqlite3.connect(db_path)
-        _rag_db_init(conn)
-        cur = conn.cursor()
-        cur.execute(sql, tuple(params))
-        rows = cur.fetchall()
-        candidates = []
-        for row in rows:
-            path = str(row[0] or "")
-            name = str(row[1] or "")
-            ext = str(row[2] or "").strip().lower()
-            mtime = float(row[3] or 0.0)
-            name_low = name.lower()
-            terms_for_name = []
-            terms_for_name.extend(parsed_terms.get("phrases") or [])
-            terms_for_name.extend(parsed_terms.get("must_terms") or [])
-            terms_for_name.extend(parsed_terms.get("any_terms") or [])
-            pre_score = 0
-            for t in _rag_unique_keep_order(terms_for_name):
-                tl = str(t).lower()
-                if tl and (tl in name_low):
-                    pre_score += 50
-            candidates.append({
-                "path": path,
-                "name": name,
-                "ext": ext,
-                "mtime": mtime,
-                "pre_score": pre_score,
-            })
-
-        candidates.sort(key=lambda x: (int(x.get("pre_score") or 0), float(x.get("mtime") or 0.0)), reverse=True)
-        top_candidates = candidates[:30]
-
-        for item in top_candidates:
-            path = str(item.get("path") or "")
-            ext = str(item.get("ext") or "").strip().lower()
-            mtime = float(item.get("mtime") or 0.0)
-            pre_score = int(item.get("pre_score") or 0)
-            text = _rag_ensure_doc_text_cache(conn, path, ext, mtime)
-            text_low = text.lower() if text else ""
-            if not text_low:
-                continue
-            if not _rag_content_match(text_low, parsed_terms):
-                continue
-            total_hits = _rag_content_total_hits(text_low, parsed_terms)
-            score = pre_score + (min(total_hits, 50) * 2)
-            snippets = _rag_collect_snippets(text, text_low, parsed_terms, 2)
-            matches.append({"path": path, "mtime": mtime, "snippets": snippets, "score": score})
+        conn = _rag_db_conn()
+        candidates = _rag_content_candidates(conn, parsed_terms, exts, folder_like)
+        if _rag_db_has_fts(conn):
+            # Queue likely files that were never extracted (or changed) for background
+            # extraction, wait briefly, then answer from whatever is indexed.
+            jobs = []
+            for item in candidates:
+                cached_mtime = item.get("cached_mtime")
+                if (cached_mtime is not None) and abs(float(cached_mtime) - float(item.get("mtime") or 0.0)) < 0.000001:
+                    continue
+                jobs.append(_rag_extract_submit(item["path"], item["ext"], item["mtime"]))
+            if jobs:
+                budget_ms = max(0, _safe_int(os.environ.get("RAG_SEARCH_EXTRACT_BUDGET_MS") or "1500", 1500))
+                pending_extract = len(jobs) - _rag_extract_wait(jobs, budget_ms / 1000.0)
+            matches = _rag_search_content_fts(conn, parsed_terms, exts, folder_like)
+        else:
+            matches = _rag_search_content_scan(conn, parsed_terms, candidates)
         conn.commit()
         conn.close()
     except Exception:
@@ -4293,13 +5210,35 @@ def _rag_search_content(keyword: str, language: str, folder: str = "") -> str:
             conn.close()
         except Exception:
             pass
-        return "资料库内容搜索失败，请稍后重试。"
+        return {"ok": False, "message": "资料库内容搜索失败，请稍后重试。"}
+    # Files matching every term in one passage rank ahead of partial (spread-out) matches.
+    matches.sort(key=lambda x: (not x.get("partial"), int(x.get("score") or 0), float(x.get("mtime") or 0.0)), reverse=True)
+    return {"ok": True, "matches": matches, "pending_extract": pending_extract, "folder": folder, "topn": topn}
+
+
+def _rag_match_day(item: dict) -> str:
+    try:
+        return datetime.fromtimestamp(float(item.get("mtime") or 0.0)).strftime("%Y-%m-%d")
+    except Exception:
+        return ""
 
+
+def _rag_search_content(keyword: str, language: str, folder: str = "") -> str:
+    raw_query = str(keyword or "").strip()
+    res = _rag_search_content_matches(raw_query, folder)
+    if not res.get("ok"):
+        return str(res.get("message") or "")
+    matches = res.get("matches") or []
+    pending_extract = int(res.get("pending_extract") or 0)
+    folder = str(res.get("folder") or "")
+    topn = int(res.get("topn") or 3)
+    pending_note = ""
+    if pending_extract > 0:
+        pending_note = "（另有 " + str(pending_extract) + " 个文件正在后台提取内容，稍后再搜可覆盖更多结果。）"
     if not matches:
         if folder:
-            return "资料库检索完成：当前目录「" + folder + "」里暂未检索到与「" + raw_query + "」匹配的内容。"
-        return "资料库检索完成：暂未检索到与「" + raw_query + "」匹配的内容。"
-    matches.sort(key=lambda x: (int(x.get("score") or 0), float(x.get("mtime") or 0.0)), reverse=True)
+            return "资料库检索完成：当前目录「" + folder + "」里暂未检索到与「" + raw_query + "」匹配的内容。" + pending_note
+        return "资料库检索完成：暂未检索到与「" + raw_query + "」匹配的内容。" + pending_note
     if folder:
         title = "内容命中「" + raw_query + "」的文件（限定目录：" + folder + "）："
     else:
@@ -4307,13 +5246,8 @@ def _rag_search_content(keyword: str, language: str, folder: str = "") -> str:
     lines = [title]
     for item in matches[:topn]:
         path = str(item.get("path") or "")
-        mtime = float(item.get("mtime") or 0.0)
         snippets = item.get("snippets") or []
-        day = ""
-        try:
-            day = datetime.fromtimestamp(float(mtime or 0.0)).strftime("%Y-%m-%d")
-        except Exception:
-            day = ""
+        day = _rag_match_day(item)
         line = "- " + _rag_rel_path_for_display(path)
         if day:
             line = line + " （" + day + "）"
@@ -4322,6 +5256,8 @@ def _rag_search_content(keyword: str, language: str, folder: str = "") -> str:
             sn = str(snip or "").strip()
             if sn:
                 lines.append("  * " + sn)
+    if pending_note:
+        lines.append(pending_note)
     return "\n".join(lines)
 
 
@@ -4523,8 +5459,7 @@ def _rag_search_index(keyword: str, language: str, folder: str = "") -> str:
     if not os.path.exists(db_path):
         return "索引尚未建立，请先同步数据源。"
     try:
-        conn = sqlite3.connect(db_path)
-        _rag_db_init(conn)
+        conn = _rag_db_conn()
         cur = conn.cursor()
         like_q = "%" + kw + "%"
         folder = _map_folder_alias(folder)
@@ -4682,7 +5617,7 @@ def _rag_run_nas(source: dict, name: str, language: str, text: str) -> str:
     if _is_rag_preview_intent(text):
         return _rag_preview_nas(source, name, language)
     if _is_rag_sync_intent(text):
-        return _rag_sync_nas_index(source, name, language)
+        return _rag_sync_nas_index(source, name, language, full=_rag_is_full_sync_intent(text))
     details = _rag_run_source_detail(source)
     if str(language or "").lower().startswith("en"):
         return "Run request received for nas (" + details + "). Sync logic is not implemented yet."
@@ -4770,7 +5705,47 @@ def _rag_preview_nas(source: dict, name: str, language: str) -> str:
     return "\n".join(lines)
 
 
-def _rag_sync_nas_index(source: dict, name: str, language: str) -> str:
+def _rag_is_full_sync_intent(text: str) -> bool:
+    s = str(text or "").strip().lower()
+    if not s:
+        return False
+    keys = ["全量同步", "全量", "重新扫描", "full sync", "full rescan", "rescan"]
+    return any(k in s for k in keys)
+
+
+def _rag_sync_scan_dir(dir_path: str, allow_exts: list, exclude_dirs: set):
+    subdirs = []
+    files = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.lower() not in exclude_dirs:
+                        subdirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+            except Exception:
+                continue
+            ext = os.path.splitext(entry.name)[1].lstrip(".").lower()
+            if allow_exts and (ext not in allow_exts):
+                continue
+            try:
+                st = entry.stat()
+            except Exception:
+                continue
+            files.append({
+                "path": entry.path,
+                "name": entry.name,
+                "ext": ext,
+                "mtime": float(getattr(st, "st_mtime", 0.0) or 0.0),
+                "size": int(getattr(st, "st_size", 0) or 0),
+            })
+    subdirs.sort()
+    return subdirs, files
+
+
+def _rag_sync_nas_index(source: dict, name: str, language: str, full: bool = False) -> str:
     base = str(source.get("target") or "").strip()
     if not base:
         return "nas 同步失败：未配置目标路径。"
@@ -4778,6 +5753,7 @@ def _rag_sync_nas_index(source: dict, name: str, language: str) -> str:
         return "nas 同步失败：目录不存在。"
     if not os.path.isdir(base):
         return "nas 同步失败：目标不是目录。"
+    base = os.path.abspath(base)
 
     filetypes = str(source.get("filetypes") or "").strip()
     allow_exts = [x.strip().lower() for x in filetypes.split(",") if x.strip()]
@@ -4785,41 +5761,124 @@ def _rag_sync_nas_index(source: dict, name: str, language: str) -> str:
         allow_exts = ["pdf", "md"]
     exclude_dirs = {".git", "@eadir", "#recycle", "$recycle.bin", "node_modules", "__pycache__"}
 
-    db_path = _rag_index_db_path()
-    max_files = 5000
-    touched = 0
+    # Per-run budget of stat() calls; the directory queue is persisted so the
+    # next run resumes where this one stopped instead of rescanning the top.
+    max_entries = max(100, _safe_int(os.environ.get("RAG_NAS_SYNC_MAX_ENTRIES") or "20000", 20000))
+    batch_size = 500
+    # A directory whose mtime is unchanged has the same entries, so it is not listed again
+    # (until this interval passes); its known files are still stat'ed every run, since
+    # in-place edits do not touch the dir mtime.
+    recheck_sec = max(0, _safe_int(os.environ.get("RAG_NAS_DIR_RECHECK_SEC") or "86400", 86400))
+    cursor_key = "nas_sync_cursor:" + base
     started = datetime.now().timestamp()
-    hit_limit = False
-    try:
-        conn = sqlite3.connect(db_path)
-        _rag_db_init(conn)
-        for root, dirs, files in os.walk(base):
-            dirs[:] = [d for d in dirs if d.lower() not in exclude_dirs]
-            for fn in files:
-                ext = os.path.splitext(fn)[1].lstrip(".").lower()
-                if allow_exts and (ext not in allow_exts):
-                    continue
-                full_path = os.path.join(root, fn)
-                try:
-                    st = os.stat(full_path)
-                except Exception:
+    now_ts = time.time()
+    upserted = 0
+    unchanged = 0
+    deleted = 0
+    dirs_scanned = 0
+    dirs_skipped = 0
+    stat_count = 0
+    pending = []
+    queue = []
+    try:
+        conn = _rag_db_conn()
+        cur = conn.cursor()
+        if full:
+            _rag_meta_set(conn, cursor_key, "")
+        try:
+            state = json.loads(_rag_meta_get(conn, cursor_key, "") or "{}")
+        except Exception:
+            state = {}
+        queue = [str(x) for x in (state.get("queue") or []) if str(x or "").strip()] if isinstance(state, dict) else []
+        resumed = bool(queue)
+        if not queue:
+            queue = [base]
+        pos = 0
+        while pos < len(queue) and stat_count < max_entries:
+            d = queue[pos]
+            pos += 1
+            try:
+                dst = os.stat(d)
+            except FileNotFoundError:
+                deleted += _rag_db_prune_dir(conn, d)
+                continue
+            except Exception:
+                continue
+            stat_count += 1
+            d_mtime = float(getattr(dst, "st_mtime", 0.0) or 0.0)
+            cur.execute("SELECT mtime, checked_ts FROM rag_dirs WHERE path=?", (d,))
+            known = cur.fetchone()
+            cur.execute("SELECT path FROM rag_dirs WHERE parent=?", (d,))
+            known_children = [str(r[0] or "") for r in cur.fetchall()]
+            if (not full) and known and (abs(float(known[0] or 0.0) - d_mtime) < 0.000001) and ((now_ts - float(known[1] or 0.0)) < recheck_sec):
+                dirs_skipped += 1
+                cur.execute("SELECT path, mtime, size FROM files WHERE dir=?", (d,))
+                for fp, f_mtime, f_size in cur.fetchall():
+                    fp = str(fp or "")
+                    try:
+                        fst = os.stat(fp)
+                    except FileNotFoundError:
+                        _rag_db_delete_path(conn, fp)
+                        deleted += 1
+                        continue
+                    except Exception:
+                        continue
+                    stat_count += 1
+                    mt = float(getattr(fst, "st_mtime", 0.0) or 0.0)
+                    sz = int(getattr(fst, "st_size", 0) or 0)
+                    if (abs(float(f_mtime or 0.0) - mt) < 0.000001) and (int(f_size or 0) == sz):
+                        unchanged += 1
+                        continue
+                    name_f = os.path.basename(fp)
+                    pending.append({"path": fp, "name": name_f, "ext": os.path.splitext(name_f)[1].lstrip(".").lower(), "mtime": mt, "size": sz})
+                queue.extend(sorted(known_children))
+                continue
+            try:
+                subdirs, files = _rag_sync_scan_dir(d, allow_exts, exclude_dirs)
+            except Exception:
+                continue
+            dirs_scanned += 1
+            stat_count += len(files)
+            cur.execute("SELECT path, mtime, size FROM files WHERE dir=?", (d,))
+            existing = {}
+            for r in cur.fetchall():
+                existing[str(r[0] or "")] = (float(r[1] or 0.0), int(r[2] or 0))
+            for row in files:
+                old = existing.pop(row["path"], None)
+                if old and (abs(old[0] - row["mtime"]) < 0.000001) and (old[1] == row["size"]):
+                    unchanged += 1
                     continue
-                row = {
-                    "path": full_path,
-                    "name": fn,
-                    "ext": ext,
-                    "mtime": float(getattr(st, "st_mtime", 0.0) or 0.0),
-                    "size": int(getattr(st, "st_size", 0) or 0),
-                }
-                _rag_db_upsert_file(conn, row)
-                touched += 1
-                if touched >= max_files:
-                    hit_limit = True
-                    break
-            if hit_limit:
-                break
+                pending.append(row)
+            for gone in existing.keys():
+                _rag_db_delete_path(conn, gone)
+                deleted += 1
+            live = set(subdirs)
+            for child in known_children:
+                if child not in live:
+                    deleted += _rag_db_prune_dir(conn, child)
+            cur.executemany(
+                "INSERT OR IGNORE INTO rag_dirs(path, parent, mtime, checked_ts) VALUES(?,?,?,?)",
+                [(sd, d, -1.0, 0.0) for sd in subdirs],
+            )
+            cur.execute(
+                "INSERT OR REPLACE INTO rag_dirs(path, parent, mtime, checked_ts) VALUES(?,?,?,?)",
+                (d, os.path.dirname(d) if d != base else "", d_mtime, now_ts),
+            )
+            queue.extend(subdirs)
+            if len(pending) >= batch_size:
+                _rag_db_upsert_files(conn, pending)
+                upserted += len(pending)
+                pending = []
+                conn.commit()
+        _rag_db_upsert_files(conn, pending)
+        upserted += len(pending)
+        pending = []
+        remaining = queue[pos:]
+        if remaining:
+            _rag_meta_set(conn, cursor_key, json.dumps({"queue": remaining, "ts": now_ts}, ensure_ascii=False))
+        else:
+            _rag_meta_set(conn, cursor_key, "")
         conn.commit()
-        cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM files")
         total = int((cur.fetchone() or [0])[0] or 0)
         conn.close()
@@ -4831,9 +5890,19 @@ def _rag_sync_nas_index(source: dict, name: str, language: str) -> str:
         return "nas 同步失败：无权限访问该目录。"
 
     elapsed = round(max(0.0, datetime.now().timestamp() - started), 2)
-    msg = "nas 索引完成：新增/更新=" + str(touched) + "；总计=" + str(total) + "；用时=" + str(elapsed) + "秒。"
-    if hit_limit:
-        msg = msg + " 已达到上限，建议分批/降低频率。"
+    msg = (
+        "nas 索引完成：新增/更新=" + str(upserted)
+        + "；未变化=" + str(unchanged)
+        + "；删除=" + str(deleted)
+        + "；扫描目录=" + str(dirs_scanned)
+        + "；跳过未变目录=" + str(dirs_skipped)
+        + "；总计=" + str(total)
+        + "；用时=" + str(elapsed) + "秒。"
+    )
+    if resumed:
+        msg = msg + " 已从上次中断位置继续。"
+    if remaining:
+        msg = msg + " 本轮已达上限，剩余 " + str(len(remaining)) + " 个目录将在下次同步继续。"
     return msg
 
 
@@ -5113,13 +6182,17 @@ def _calendar_entities_for_query(default_entity: str) -> list:
     if d:
         out.append(d)
     extra = _calendar_extra_entity_for_merge()
-    if extra and (extra not in out):
-        st = ha_get_state(extra, timeout_sec=8)
-        if st.get("ok"):
-            out.append(extra)
+    if extra and (extra not in out) and _calendar_entity_available(extra):
+        out.append(extra)
     return out
 
 
+def _calendar_entity_available(eid: str, refresh: bool = False) -> bool:
+    fn = shared_cache.refresh if refresh else shared_cache.get_or_load
+    ok = fn("ha_registry", "calendar_available|" + eid, lambda: bool(ha_get_state(eid, timeout_sec=8).get("ok")), cacheable=lambda v: v is True)
+    return bool(ok)
+
+
 def _calendar_event_dedupe_key(it: dict) -> str:
     if not isinstance(it, dict):
         return ""
@@ -5149,6 +6222,7 @@ def _calendar_fetch_merged_events(entities: list, start_iso: str, end_iso: str)
     merged = []
     errors = []
     seen = set()
+    warmup.note_use("calendar")
     for eid in entities or []:
         rr = ha_calendar_events(str(eid or ""), start_iso, end_iso)
         if not rr.get("ok"):
@@ -5158,6 +6232,7 @@ def _calendar_fetch_merged_events(entities: list, start_iso: str, end_iso: str)
         for it in ev:
             if not isinstance(it, dict):
                 continue
+            it = dict(it)
             try:
                 if "__entity_id" not in it:
                     it["__entity_id"] = str(eid or "")
@@ -5702,7 +6777,7 @@ def news_hot(limit: int = 10,
         url = base_url.rstrip("/") + path
         headers = {"X-Auth-Token": token}
         try:
-            r = requests.get(url, headers=headers, params=(params or {}), timeout=8)
+            r = http_pool.coalesced("GET", url, upstream="miniflux", headers=headers, params=(params or {}), timeout=8)
             if int(getattr(r, "status_code", 0) or 0) >= 400:
                 return {"ok": False, "status": int(r.status_code), "text": (r.text or "")[:500]}
             return {"ok": True, "data": r.json()}
@@ -5721,7 +6796,7 @@ def news_hot(limit: int = 10,
             return (s or "").strip()
 
     import time as _time
-    after_ts = int(_time.time()) - 24 * 3600
+    after_ts = (int(_time.time()) // 60) * 60 - 24 * 3600  # minute-aligned so concurrent reads coalesce
 
     try:
         lim_int = int(limit)
@@ -5821,89 +6896,443 @@ def news_hot(limit: int = 10,
     return {"ok": True, "items": items, "final": final, "final_voice": final}
 
 
-def news_digest(category: str = "world",
-               limit: int = 5,
-               time_range: str = "24h",
-               prefer_lang: str = "zh",
-               user_text: str = "",
-               **kwargs) -> dict:
-    """
-    Miniflux-backed news digest.
-
-    Hard rules:
-    - Source of truth: Miniflux (RSS aggregator)
-    - Window: last 24 hours (rolling 24h), regardless of time_range input
-    - Output: default 5 items, Chinese-first; if not enough, fallback to English
-    - Lightweight topic filter to reduce category pollution:
-        * blacklist keywords -> drop
-        * whitelist keywords (when available) -> keep if hit, otherwise filtered
-        * if filtered results not enough -> relax whitelist, then cross-language fill
-    """
+def _news_digest_strip_html(s: str) -> str:
+    if not s:
+        return ""
+    try:
+        s2 = re.sub(r"<[^>]+>", " ", s)
+        s2 = html.unescape(s2)
+        s2 = re.sub(r"\s+", " ", s2).strip()
+        return s2
+    except Exception:
+        return (s or "").strip()
 
-    base_url = os.environ.get("MINIFLUX_BASE_URL") or "http://192.168.1.162:19091"
-    token = os.environ.get("MINIFLUX_API_TOKEN") or ""
-    if not token.strip():
-        return {
-            "ok": False,
-            "error": "MINIFLUX_API_TOKEN is not set",
-            "category": category,
-            "time_range": "24h",
-            "limit": limit,
-            "items": [],
-            "final": "Miniflux API Token 未配置（MINIFLUX_API_TOKEN）。"
-        }
 
-    # NEWS_FORCE_CHAT_TRANSLATE_V4
-    def _translate_titles_chat(titles: list) -> list:
-        # NEWS_TIMEOUT_BUDGET_V1
-        """Robust batch title translation with a hard time budget.
-        - Prefer one batch /api/chat.
-        - If output parsing is odd, try to split numbered blob.
-        - Do NOT do per-title fallback by default (too slow for HA tool timeout).
-        Budget is controlled by NEWS_TRANSLATE_BUDGET_SEC (default 8s).
-        """
-        if not titles:
-            return []
-        t0 = time.time()
-        budget = float(os.environ.get("NEWS_TRANSLATE_BUDGET_SEC") or "8")
-        base = str(os.environ.get("OLLAMA_BASE_URL") or "http://192.168.1.162:11434").strip().rstrip("/")
-        model = str(os.environ.get("NEWS_TRANSLATE_MODEL") or os.environ.get("OLLAMA_TRANSLATE_MODEL") or "qwen3:1.7b").strip() or "qwen3:1.7b"
-        want_n = len(titles)
+def _news_digest_local_time(iso_str: str) -> str:
+    if not iso_str:
+        return ""
+    try:
+        dt = datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
+        tzname = os.environ.get("TZ") or "Australia/Melbourne"
+        dt2 = dt.astimezone(ZoneInfo(tzname))
+        return dt2.strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return iso_str
 
-        def _strip_num_prefix(s: str) -> str:
-            return re.sub(r"^\s*\d+\s*[\.|\)|、]\s*", "", str(s or "").strip()).strip()
 
-        def _split_numbered_blob(s: str) -> list:
-            t = str(s or "").strip()
-            if not t:
-                return []
-            pat = re.compile(r"(?:^|\s)(\d{1,2})\s*[\.|\)|、]\s+")
-            ms = list(pat.finditer(t))
-            if not ms:
-                return []
-            parts = []
-            for idx, m in enumerate(ms):
-                c0 = m.start(0)
-                c1 = ms[idx+1].start(0) if (idx+1)<len(ms) else len(t)
-                seg = t[c0:c1].strip()
-                seg = _strip_num_prefix(seg)
-                if seg:
-                    parts.append(seg)
-            return parts
+def _news_digest_has_cjk(s: str) -> bool:
+    if not s:
+        return False
+    try:
+        han = 0
+        total = 0
+        for ch in s:
+            oc = ord(ch)
+            if ch.isspace():
+                continue
+            total += 1
+            if (0x4E00 <= oc <= 0x9FFF) or (0x3400 <= oc <= 0x4DBF) or (0x20000 <= oc <= 0x2A6DF):
+                han += 1
+        if total <= 0:
+            return False
+        if han >= 8:
+            return True
+        return (float(han) / float(total)) >= 0.12
+    except Exception:
+        return False
 
-        # build batch prompt
-        in_lines = []
-        k = 1
-        for tt in titles:
-            s = str(tt or "").strip() or "(empty)"
-            if len(s) > 180:
-                s = s[:180].rstrip() + "…"
-            in_lines.append(str(k) + ". " + s)
-            k += 1
 
-        user_prompt = (
-            "把下面每一行英文标题翻译成中文。\n"
-            "要求：只输出对应的中文标题列表，每行一个。\n"
+def _news_digest_kw_hit(text_s: str, kws: list) -> bool:
+    if not text_s:
+        return False
+    t0 = (text_s or "").lower()
+    for k in (kws or []):
+        kk = (k or "").strip().lower()
+        if not kk:
+            continue
+        if kk in t0:
+            return True
+    return False
+
+
+# Category map and topic filters of news_digest. Filter outcomes are computed once per
+# entry when the category window is refreshed, not per request.
+_NEWS_DIGEST_ALIASES = {
+    "world": ["world（世界新闻）", "世界新闻", "国际"],
+    "cn_economy": ["cn_finance（中国财经）", "中国财经", "财经", "中国经济"],
+    "au_politics": [
+    "australia",
+    "australian",
+    "canberra",
+    "parliament house",
+    "commonwealth",
+    "federal",
+    "government",
+    "opposition",
+    "prime minister",
+    "pm",
+    "minister",
+    "mp",
+    "senator",
+    "treasurer",
+    "albanese",
+    "dutton",
+    "labor",
+    "liberal",
+    "greens",
+    "coalition",
+    "new south wales",
+    "victoria",
+    "queensland",
+    "western australia",
+    "south australia",
+    "tasmania",
+    "northern territory",
+    "australian capital territory",
+    "australian parliament",
+    "澳",
+    "澳洲",
+    "澳大利亚",
+    "联邦",
+    "堪培拉",
+    "议会",
+    "政府",
+    "反对党",
+    "总理",
+    "部长",
+    "议员",
+    "工党",
+    "自由党",
+    "绿党",
+],
+    "mel_life": ["mel_life（墨尔本民生）", "墨尔本民生", "维州民生", "Victoria"],
+    "tech_internet": ["tech_internet（互联网科技）", "互联网科技", "科技", "Tech"],
+    "tech_gadgets": ["tech_gadgets（数码产品）", "数码产品", "评测", "Gadgets"],
+    "gaming": ["gaming（电子游戏）", "电子游戏", "游戏", "Gaming"],
+}
+
+_NEWS_DIGEST_STRICT_WL_CATS = set(["au_politics"])
+_NEWS_DIGEST_FILTERS = {
+    "world": {"whitelist": [], "blacklist": ["ufc", "mma", "boxing odds", "celebrity gossip", "porn", "onlyfans"]},
+    "cn_economy": {"whitelist": ["财经", "经济", "金融", "股", "a股", "港股", "美股", "债", "基金", "利率", "通胀", "人民币", "央行", "证监", "bank", "stocks", "market", "bond", "yields", "cpi", "gdp"],
+                  "blacklist": ["ufc", "mma", "赛后", "足球", "篮球", "综艺", "八卦", "明星", "电影", "电视剧"]},
+    "au_politics": {"whitelist": ["parliament", "senate", "house", "election", "labor", "coalition", "liberal", "greens", "albanese", "dutton", "budget", "treasury", "immigration", "visa", "minister", "cabinet", "议会", "选举", "工党", "自由党", "绿党", "预算", "内阁", "移民", "签证"],
+                    "blacklist": ["ufc", "mma", "sport", "match preview", "odds", "celebrity"]},
+    "mel_life": {"whitelist": ["melbourne", "victoria", "vic", "cbd", "ptv", "metro", "tram", "train", "bus", "police", "fire", "ambulance", "road", "freeway", "yarra", "docklands", "st kilda", "墨尔本", "维州", "本地", "民生", "交通", "电车", "火车", "警方", "火警", "道路"],
+                 "blacklist": ["ufc", "mma", "celebrity", "gossip", "crypto shill"]},
+    "tech_internet": {"whitelist": ["ai", "openai", "google", "microsoft", "meta", "apple", "amazon", "tiktok", "x.com", "twitter", "github", "open source", "linux", "android", "ios", "cloud", "security", "privacy", "regulation", "chip", "semiconductor", "人工智能", "开源", "网络安全", "隐私", "监管", "芯片", "半导体"],
+                     "blacklist": ["ufc", "mma", "crime", "murder", "celebrity", "gossip", "lottery", "horoscope"]},
+    "tech_gadgets": {"whitelist": ["review", "hands-on", "launch", "iphone", "ipad", "mac", "samsung", "pixel", "camera", "laptop", "headphones", "oled", "cpu", "gpu", "benchmark", "评测", "上手", "新品", "发布", "开箱", "相机", "手机", "耳机", "笔记本"],
+                    "blacklist": ["ufc", "mma", "crime", "celebrity", "gossip"]},
+    "gaming": {"whitelist": ["game", "gaming", "steam", "playstation", "ps5", "xbox", "nintendo", "switch", "patch", "update", "dlc", "release", "trailer", "esports", "游戏", "主机", "更新", "补丁", "发售", "预告"],
+               "blacklist": ["ufc", "mma", "boxing", "wwe", "football", "basketball", "cricket", "horse racing"]},
+}
+
+_NEWS_DIGEST_MUST_ANCHOR = {
+
+    "au_politics": [
+
+        "australia", "australian", "canberra", "parliament house", "commonwealth",
+
+        "aec", "aph.gov.au", "pm.gov.au",
+
+        "act", "nsw", "vic", "qld", "wa", "sa", "tas", "nt",
+
+        "albanese", "dutton", "labor", "liberal", "greens", "coalition",
+
+        "澳", "澳洲", "澳大利亚", "联邦", "堪培拉", "议会", "工党", "自由党", "绿党",
+
+    ],
+
+    "mel_life": [
+
+        "melbourne", "victoria", "vic", "cbd", "ptv", "metro", "tram", "train", "bus",
+
+        "yarra", "docklands", "st kilda",
+
+        "墨尔本", "维州", "本地", "民生", "交通", "电车", "火车",
+
+    ],
+
+}
+
+
+_NEWS_DIGEST_TOPIC_KWS = {
+
+    "au_politics": [
+    "parliament",
+    "senate",
+    "house",
+    "cabinet",
+    "minister",
+    "shadow minister",
+    "opposition",
+    "election",
+    "vote",
+    "ballot",
+    "campaign",
+    "budget",
+    "treasury",
+    "tax",
+    "spending",
+    "funding",
+    "policy",
+    "bill",
+    "law",
+    "laws",
+    "legislation",
+    "reform",
+    "inquiry",
+    "royal commission",
+    "immigration",
+    "visa",
+    "citizenship",
+    "asylum",
+    "home affairs",
+    "national security",
+    "defence",
+    "foreign minister",
+    "议会",
+    "参议院",
+    "众议院",
+    "内阁",
+    "部长",
+    "影子部长",
+    "反对党",
+    "选举",
+    "投票",
+    "竞选",
+    "预算",
+    "财政",
+    "税",
+    "拨款",
+    "政策",
+    "法案",
+    "法律",
+    "立法",
+    "改革",
+    "调查",
+    "移民",
+    "签证",
+    "国籍",
+    "内政",
+    "国防",
+    "外交",
+],
+
+}
+
+
+def _news_digest_match_cat_id(k: str, categories: list):
+    if not k:
+        return None
+    for c in categories:
+        try:
+            title = (c.get("title") or "").strip()
+            if title == k:
+                return int(c.get("id"))
+        except Exception:
+            continue
+    for c in categories:
+        try:
+            title = (c.get("title") or "").strip()
+            if title.startswith(k) or (k in title):
+                return int(c.get("id"))
+        except Exception:
+            continue
+    for al in (_NEWS_DIGEST_ALIASES.get(k) or []):
+        for c in categories:
+            try:
+                title = (c.get("title") or "").strip()
+                if (al in title) or title == al:
+                    return int(c.get("id"))
+            except Exception:
+                continue
+    return None
+
+
+def _news_digest_passes_anchor_topic(key: str, it: dict) -> bool:
+    anchors0 = _NEWS_DIGEST_MUST_ANCHOR.get(key) or []
+    topics0 = _NEWS_DIGEST_TOPIC_KWS.get(key) or []
+    if (not anchors0) and (not topics0):
+        return True
+
+    title0 = it.get("title") or ""
+    sn0 = it.get("snippet") or ""
+    src0 = it.get("source") or ""
+    txt_ts = "{0} {1}".format(title0, sn0)
+    txt_all = "{0} {1} {2}".format(title0, sn0, src0)
+
+    if key == "au_politics":
+        # 只用 title/snippet 做判断，避免 source(Just In) 等导致误命中
+        anchors = []
+        for a in (anchors0 or []):
+            aa = (a or "").strip()
+            if not aa:
+                continue
+            # 中文锚点保留；英文锚点要求长度>=4，避免 act/vic/wa 这类子串误命中
+            try:
+                is_cjk = _news_digest_has_cjk(aa)
+            except Exception:
+                is_cjk = False
+            if is_cjk:
+                anchors.append(aa)
+                continue
+            if len(aa) >= 4:
+                anchors.append(aa)
+
+        topics = topics0
+        intl_ban = ["bangladesh", "pakistan", "dhaka", "sheikh hasina", "孟加拉", "巴基斯坦", "达卡", "哈西娜", "谢赫"]
+        if _news_digest_kw_hit(txt_ts, intl_ban):
+            return False
+
+        # au_politics：必须同时满足 AU anchor + politics topic
+        if anchors and (not _news_digest_kw_hit(txt_ts, anchors)):
+            return False
+        if topics and (not _news_digest_kw_hit(txt_ts, topics)):
+            return False
+        return True
+
+    # 其它分类：允许 source 参与 anchor 判断（保持原行为）
+    if anchors0 and (not _news_digest_kw_hit(txt_all, anchors0)):
+        return False
+    return True
+
+
+def _news_digest_filter_flags(key: str, it: dict) -> list:
+    """[passes blacklist, passes whitelist, passes anchor/topic] for one item of category key."""
+    cfg = _NEWS_DIGEST_FILTERS.get(key) or {"whitelist": [], "blacklist": []}
+    wl = cfg.get("whitelist") or []
+    bl = cfg.get("blacklist") or []
+    txt_bl = "{0} {1} {2}".format(it.get("title") or "", it.get("snippet") or "", it.get("source") or "")
+    txt_wl = "{0} {1}".format(it.get("title") or "", it.get("snippet") or "")
+    return [
+        0 if _news_digest_kw_hit(txt_bl, bl) else 1,
+        1 if ((not wl) or _news_digest_kw_hit(txt_wl, wl)) else 0,
+        1 if _news_digest_passes_anchor_topic(key, it) else 0,
+    ]
+
+
+def _news_digest_entry_item(e: dict) -> dict:
+    title = (e.get("title") or "").strip()
+    url = (e.get("url") or "").strip() or (e.get("comments_url") or "").strip()
+    published_at_raw = (e.get("published_at") or "").strip()
+    feed = e.get("feed") or {}
+    content_plain = _news_digest_strip_html((e.get("content") or "").strip())
+    snippet = content_plain
+    if len(snippet) > 180:
+        snippet = snippet[:180].rstrip() + "..."
+    return {
+        "title": title,
+        "url": url,
+        "published_at": _news_digest_local_time(published_at_raw),
+        "published_at_raw": published_at_raw,
+        "source": (feed.get("title") or "").strip(),
+        "snippet": snippet,
+        "is_zh": _news_digest_has_cjk((title or "") + " " + (content_plain or "")),
+        "content_plain": content_plain,
+    }
+
+
+def _news_digest_translate_enabled() -> bool:
+    # Translation is DISABLED by default. Only enable if NEWS_TRANSLATE_DISABLE is explicitly set to 0/false/off.
+    _raw = os.environ.get("NEWS_TRANSLATE_DISABLE")
+    if _raw is None:
+        return False
+    return str(_raw).strip().lower() in ["0", "false", "no", "off"]
+
+
+def news_digest(category: str = "world",
+               limit: int = 5,
+               time_range: str = "24h",
+               prefer_lang: str = "zh",
+               user_text: str = "",
+               **kwargs) -> dict:
+    """
+    Miniflux-backed news digest.
+
+    Hard rules:
+    - Source of truth: Miniflux (RSS aggregator)
+    - Window: last 24 hours (rolling 24h), regardless of time_range input
+    - Output: default 5 items, Chinese-first; if not enough, fallback to English
+    - Lightweight topic filter to reduce category pollution:
+        * blacklist keywords -> drop
+        * whitelist keywords (when available) -> keep if hit, otherwise filtered
+        * if filtered results not enough -> relax whitelist, then cross-language fill
+    """
+
+    token = os.environ.get("MINIFLUX_API_TOKEN") or ""
+    if not token.strip():
+        return {
+            "ok": False,
+            "error": "MINIFLUX_API_TOKEN is not set",
+            "category": category,
+            "time_range": "24h",
+            "limit": limit,
+            "items": [],
+            "final": "Miniflux API Token 未配置（MINIFLUX_API_TOKEN）。"
+        }
+
+    _tr_model = str(os.environ.get("NEWS_TRANSLATE_MODEL") or os.environ.get("OLLAMA_TRANSLATE_MODEL") or "qwen3:1.7b").strip() or "qwen3:1.7b"
+
+    # NEWS_FORCE_CHAT_TRANSLATE_V4
+    def _translate_titles_chat(titles: list) -> list:
+        # Titles already in the translation memory skip Ollama; failures fall back to the original.
+        got = translation_memory.translate(_tr_model, "zh", titles, _translate_titles_chat_llm)
+        return [g or str(t or "").strip() for g, t in zip(got, titles)]
+
+    def _translate_titles_chat_llm(titles: list) -> list:
+        # NEWS_TIMEOUT_BUDGET_V1
+        """Robust batch title translation with a hard time budget.
+        - Prefer one batch /api/chat.
+        - If output parsing is odd, try to split numbered blob.
+        - Do NOT do per-title fallback by default (too slow for HA tool timeout).
+        Budget is controlled by NEWS_TRANSLATE_BUDGET_SEC (default 8s).
+        """
+        if not titles:
+            return []
+        if not _skill_budget_allows("news_digest_translate"):
+            return []
+        t0 = time.time()
+        budget = _skill_deadline_clamp(float(os.environ.get("NEWS_TRANSLATE_BUDGET_SEC") or "8"))
+        base = str(os.environ.get("OLLAMA_BASE_URL") or "http://192.168.1.162:11434").strip().rstrip("/")
+        model = str(os.environ.get("NEWS_TRANSLATE_MODEL") or os.environ.get("OLLAMA_TRANSLATE_MODEL") or "qwen3:1.7b").strip() or "qwen3:1.7b"
+        want_n = len(titles)
+
+        def _strip_num_prefix(s: str) -> str:
+            return re.sub(r"^\s*\d+\s*[\.|\)|、]\s*", "", str(s or "").strip()).strip()
+
+        def _split_numbered_blob(s: str) -> list:
+            t = str(s or "").strip()
+            if not t:
+                return []
+            pat = re.compile(r"(?:^|\s)(\d{1,2})\s*[\.|\)|、]\s+")
+            ms = list(pat.finditer(t))
+            if not ms:
+                return []
+            parts = []
+            for idx, m in enumerate(ms):
+                c0 = m.start(0)
+                c1 = ms[idx+1].start(0) if (idx+1)<len(ms) else len(t)
+                seg = t[c0:c1].strip()
+                seg = _strip_num_prefix(seg)
+                if seg:
+                    parts.append(seg)
+            return parts
+
+        # build batch prompt
+        in_lines = []
+        k = 1
+        for tt in titles:
+            s = str(tt or "").strip() or "(empty)"
+            if len(s) > 180:
+                s = s[:180].rstrip() + "…"
+            in_lines.append(str(k) + ". " + s)
+            k += 1
+
+        user_prompt = (
+            "把下面每一行英文标题翻译成中文。\n"
+            "要求：只输出对应的中文标题列表，每行一个。\n"
             "如果无法逐行输出，可以用 1) 2) 3) 的形式，但必须一一对应。\n\n"
             + "\n".join(in_lines)
         )
@@ -5923,7 +7352,7 @@ def news_digest(category: str = "world",
 
         txt = ""
         try:
-            r = requests.post(base + "/api/chat", json=payload, timeout=timeout_sec)
+            r = http_pool.post(base + "/api/chat", upstream="ollama", json=payload, timeout=timeout_sec)
             if int(getattr(r, "status_code", 0) or 0) < 400:
                 j = r.json() if hasattr(r, "json") else {}
                 msg = j.get("message") if isinstance(j, dict) else None
@@ -5953,60 +7382,7 @@ def news_digest(category: str = "world",
             out_list.append(v)
         return out_list
 
-    def _mf_req(path: str, params: dict = None) -> dict:
-        url = base_url.rstrip("/") + path
-        headers = {"X-Auth-Token": token}
-        try:
-            r = requests.get(url, headers=headers, params=(params or {}), timeout=12)
-            if int(getattr(r, "status_code", 0) or 0) >= 400:
-                return {"ok": False, "status": int(r.status_code), "text": (r.text or "")[:500]}
-            return {"ok": True, "data": r.json()}
-        except Exception as e:
-            return {"ok": False, "error": str(e)}
-
-    def _strip_html(s: str) -> str:
-        if not s:
-            return ""
-        try:
-            s2 = re.sub(r"<[^>]+>", " ", s)
-            s2 = html.unescape(s2)
-            s2 = re.sub(r"\s+", " ", s2).strip()
-            return s2
-        except Exception:
-            return (s or "").strip()
-
-    def _to_local_time(iso_str: str) -> str:
-        if not iso_str:
-            return ""
-        try:
-            dt = datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
-            tzname = os.environ.get("TZ") or "Australia/Melbourne"
-            dt2 = dt.astimezone(ZoneInfo(tzname))
-            return dt2.strftime("%Y-%m-%d %H:%M")
-        except Exception:
-            return iso_str
-
-    def _has_cjk(s: str) -> bool:
-        if not s:
-            return False
-        try:
-            han = 0
-            total = 0
-            for ch in s:
-                oc = ord(ch)
-                if ch.isspace():
-                    continue
-                total += 1
-                if (0x4E00 <= oc <= 0x9FFF) or (0x3400 <= oc <= 0x4DBF) or (0x20000 <= oc <= 0x2A6DF):
-                    han += 1
-            if total <= 0:
-                return False
-            if han >= 8:
-                return True
-            return (float(han) / float(total)) >= 0.12
-        except Exception:
-            return False
-
+    _has_cjk = _news_digest_has_cjk
 
     # normalize prefer_lang
     pl = str(prefer_lang or "").strip().lower()
@@ -6018,10 +7394,20 @@ def news_digest(category: str = "world",
         prefer_lang = "zh" if _has_cjk(user_text) else "en"
 
     def _ollama_translate_batch(titles: list) -> list:
+        # Same memory as above; "" where a title could not be translated.
+        def _llm(miss: list) -> list:
+            got = _ollama_translate_batch_llm(miss)
+            return got[: len(miss)] if len(got) >= len(miss) else []
+
+        return translation_memory.translate(_tr_model, "zh", titles, _llm)
+
+    def _ollama_translate_batch_llm(titles: list) -> list:
         # Best-effort batch translation (titles only).
         # Try /api/generate first; fallback to /api/chat if generate returns empty.
         if not titles:
             return []
+        if not _skill_budget_allows("news_digest_translate"):
+            return []
 
         # base url candidates (env first)
         base_candidates = []
@@ -6080,7 +7466,7 @@ def news_digest(category: str = "world",
                     "keep_alive": -1,
                     "options": {"temperature": 0.0, "num_ctx": 2048, "num_predict": 256},
                 }
-                r = requests.post(b + "/api/generate", json=gen_payload, timeout=30)
+                r = http_pool.post(b + "/api/generate", upstream="ollama", json=gen_payload, timeout=30)
                 sc = int(getattr(r, "status_code", 0) or 0)
                 if sc < 400:
                     j = r.json() if hasattr(r, "json") else {}
@@ -6103,7 +7489,7 @@ def news_digest(category: str = "world",
                     "keep_alive": -1,
                     "options": {"temperature": 0.0, "num_ctx": 2048},
                 }
-                r2 = requests.post(b + "/api/chat", json=chat_payload, timeout=45)
+                r2 = http_pool.post(b + "/api/chat", upstream="ollama", json=chat_payload, timeout=45)
                 sc2 = int(getattr(r2, "status_code", 0) or 0)
                 if sc2 >= 400:
                     continue
@@ -6123,135 +7509,14 @@ def news_digest(category: str = "world",
 
         return []
 
-    def _kw_hit(text_s: str, kws: list) -> bool:
-        if not text_s:
-            return False
-        t0 = (text_s or "").lower()
-        for k in (kws or []):
-            kk = (k or "").strip().lower()
-            if not kk:
-                continue
-            if kk in t0:
-                return True
-        return False
-
     def _norm_title(s: str) -> str:
         s2 = _ug_clean_unicode(s or "")
         s2 = s2.lower()
         s2 = re.sub(r"\s+", " ", s2).strip()
         return s2
 
-    cats = _mf_req("/v1/categories")
-    if not cats.get("ok"):
-        return {"ok": False, "error": "failed to fetch miniflux categories", "detail": cats, "category": category, "time_range": "24h", "limit": limit, "items": [], "final": "Miniflux categories 拉取失败。"}
-
-    categories = cats.get("data") or []
     key = (category or "").strip()
-
-    aliases_map = {
-        "world": ["world（世界新闻）", "世界新闻", "国际"],
-        "cn_economy": ["cn_finance（中国财经）", "中国财经", "财经", "中国经济"],
-        "au_politics": [
-        "australia",
-        "australian",
-        "canberra",
-        "parliament house",
-        "commonwealth",
-        "federal",
-        "government",
-        "opposition",
-        "prime minister",
-        "pm",
-        "minister",
-        "mp",
-        "senator",
-        "treasurer",
-        "albanese",
-        "dutton",
-        "labor",
-        "liberal",
-        "greens",
-        "coalition",
-        "new south wales",
-        "victoria",
-        "queensland",
-        "western australia",
-        "south australia",
-        "tasmania",
-        "northern territory",
-        "australian capital territory",
-        "australian parliament",
-        "澳",
-        "澳洲",
-        "澳大利亚",
-        "联邦",
-        "堪培拉",
-        "议会",
-        "政府",
-        "反对党",
-        "总理",
-        "部长",
-        "议员",
-        "工党",
-        "自由党",
-        "绿党",
-],
-        "mel_life": ["mel_life（墨尔本民生）", "墨尔本民生", "维州民生", "Victoria"],
-        "tech_internet": ["tech_internet（互联网科技）", "互联网科技", "科技", "Tech"],
-        "tech_gadgets": ["tech_gadgets（数码产品）", "数码产品", "评测", "Gadgets"],
-        "gaming": ["gaming（电子游戏）", "电子游戏", "游戏", "Gaming"],
-    }
-
-    def _match_cat_id(k: str):
-        if not k:
-            return None
-        for c in categories:
-            try:
-                title = (c.get("title") or "").strip()
-                if title == k:
-                    return int(c.get("id"))
-            except Exception:
-                continue
-        for c in categories:
-            try:
-                title = (c.get("title") or "").strip()
-                if title.startswith(k) or (k in title):
-                    return int(c.get("id"))
-            except Exception:
-                continue
-        for al in (aliases_map.get(k) or []):
-            for c in categories:
-                try:
-                    title = (c.get("title") or "").strip()
-                    if (al in title) or title == al:
-                        return int(c.get("id"))
-                except Exception:
-                    continue
-        return None
-
-    cat_id = _match_cat_id(key)
-    if cat_id is None:
-        return {"ok": True, "category": key, "time_range": "24h", "limit": limit, "items": [], "final": "Miniflux 中找不到对应分类：{0}".format(key), "query_used": "miniflux categories title match"}
-
-    STRICT_WHITELIST_CATS = set(["au_politics"])
-    FILTERS = {
-        "world": {"whitelist": [], "blacklist": ["ufc", "mma", "boxing odds", "celebrity gossip", "porn", "onlyfans"]},
-        "cn_economy": {"whitelist": ["财经", "经济", "金融", "股", "a股", "港股", "美股", "债", "基金", "利率", "通胀", "人民币", "央行", "证监", "bank", "stocks", "market", "bond", "yields", "cpi", "gdp"],
-                      "blacklist": ["ufc", "mma", "赛后", "足球", "篮球", "综艺", "八卦", "明星", "电影", "电视剧"]},
-        "au_politics": {"whitelist": ["parliament", "senate", "house", "election", "labor", "coalition", "liberal", "greens", "albanese", "dutton", "budget", "treasury", "immigration", "visa", "minister", "cabinet", "议会", "选举", "工党", "自由党", "绿党", "预算", "内阁", "移民", "签证"],
-                        "blacklist": ["ufc", "mma", "sport", "match preview", "odds", "celebrity"]},
-        "mel_life": {"whitelist": ["melbourne", "victoria", "vic", "cbd", "ptv", "metro", "tram", "train", "bus", "police", "fire", "ambulance", "road", "freeway", "yarra", "docklands", "st kilda", "墨尔本", "维州", "本地", "民生", "交通", "电车", "火车", "警方", "火警", "道路"],
-                     "blacklist": ["ufc", "mma", "celebrity", "gossip", "crypto shill"]},
-        "tech_internet": {"whitelist": ["ai", "openai", "google", "microsoft", "meta", "apple", "amazon", "tiktok", "x.com", "twitter", "github", "open source", "linux", "android", "ios", "cloud", "security", "privacy", "regulation", "chip", "semiconductor", "人工智能", "开源", "网络安全", "隐私", "监管", "芯片", "半导体"],
-                         "blacklist": ["ufc", "mma", "crime", "murder", "celebrity", "gossip", "lottery", "horoscope"]},
-        "tech_gadgets": {"whitelist": ["review", "hands-on", "launch", "iphone", "ipad", "mac", "samsung", "pixel", "camera", "laptop", "headphones", "oled", "cpu", "gpu", "benchmark", "评测", "上手", "新品", "发布", "开箱", "相机", "手机", "耳机", "笔记本"],
-                        "blacklist": ["ufc", "mma", "crime", "celebrity", "gossip"]},
-        "gaming": {"whitelist": ["game", "gaming", "steam", "playstation", "ps5", "xbox", "nintendo", "switch", "patch", "update", "dlc", "release", "trailer", "esports", "游戏", "主机", "更新", "补丁", "发售", "预告"],
-                   "blacklist": ["ufc", "mma", "boxing", "wwe", "football", "basketball", "cricket", "horse racing"]},
-    }
-
-    import time as _time
-    after_ts = int(_time.time()) - 24 * 3600
+    STRICT_WHITELIST_CATS = _NEWS_DIGEST_STRICT_WL_CATS
 
     try:
         lim_int = int(limit)
@@ -6268,209 +7533,36 @@ def news_digest(category: str = "world",
     if fetch_lim > 80:
         fetch_lim = 80
 
-    params = {"order": "published_at", "direction": "desc", "limit": fetch_lim, "after": after_ts}
-    ent = _mf_req("/v1/categories/{0}/entries".format(cat_id), params=params)
-    if not ent.get("ok"):
-        return {"ok": False, "error": "failed to fetch entries", "detail": ent, "category": key, "time_range": "24h", "limit": lim_int, "items": [], "final": "Miniflux entries 拉取失败。"}
-
-    payload = ent.get("data") or {}
-    entries = payload.get("entries") or []
-    if not entries:
+    # Local read-and-rank: the per-category 24h window lives in the news cache DB and is
+    # kept current by the background refresher (see _news_digest_window).
+    win = _news_digest_window(key, fetch_lim)
+    if not win.get("ok"):
+        if win.get("error") == "categories":
+            return {"ok": False, "error": "failed to fetch miniflux categories", "detail": win.get("detail"), "category": category, "time_range": "24h", "limit": limit, "items": [], "final": "Miniflux categories 拉取失败。"}
+        return {"ok": False, "error": "failed to fetch entries", "detail": win.get("detail"), "category": key, "time_range": "24h", "limit": lim_int, "items": [], "final": "Miniflux entries 拉取失败。"}
+    cat_id = win.get("cat_id")
+    if cat_id is None:
+        return {"ok": True, "category": key, "time_range": "24h", "limit": limit, "items": [], "final": "Miniflux 中找不到对应分类：{0}".format(key), "query_used": "miniflux categories title match"}
+    after_ts = win.get("after_ts")
+    all_items = win.get("items") or []
+    if not all_items:
         return {"ok": True, "category": key, "time_range": "24h", "limit": lim_int, "items": [], "final": "暂无符合最近24小时的条目。", "query_used": "miniflux category_id={0} after={1}".format(cat_id, after_ts)}
 
-    all_items = []
-    for e in entries:
-        try:
-            title = (e.get("title") or "").strip()
-            url = (e.get("url") or "").strip() or (e.get("comments_url") or "").strip()
-            drop_video = (os.environ.get("NEWS_DROP_VIDEO") or "1").strip().lower()
-            if drop_video not in ("0", "false", "no", "off"):
-                if _news__is_video_entry(title, url):
-                    continue
-            published_at_raw = (e.get("published_at") or "").strip()
-            published_at = _to_local_time(published_at_raw)
-            feed = e.get("feed") or {}
-            src = (feed.get("title") or "").strip()
-            content_plain = _strip_html((e.get("content") or "").strip())
-            snippet = content_plain
-            if len(snippet) > 180:
-                snippet = snippet[:180].rstrip() + "..."
-            is_zh = _has_cjk((title or "") + " " + (content_plain or ""))
-            all_items.append({
-                "title": title,
-                "url": url,
-                "published_at": published_at,
-                "published_at_raw": published_at_raw,
-                "source": src,
-                "snippet": snippet,
-                "is_zh": is_zh,
-                "content_plain": content_plain,
-            })
-        except Exception:
-            continue
-
-    cfg = FILTERS.get(key) or {"whitelist": [], "blacklist": []}
-    wl = cfg.get("whitelist") or []
-    bl = cfg.get("blacklist") or []
     dropped_blacklist = 0
     dropped_whitelist = 0
     dropped_anchor = 0
     dropped_intlban = 0
     relax_used = 0
-    STRICT_WL_CATS = set(["au_politics"])
-    require_wl = True if (key in STRICT_WL_CATS) else False
 
     def _passes_blacklist(it: dict) -> bool:
-        txt = "{0} {1} {2}".format(it.get("title") or "", it.get("snippet") or "", it.get("source") or "")
-        return (not _kw_hit(txt, bl))
+        return bool(it["_filter"][0])
 
     def _passes_whitelist(it: dict) -> bool:
-        if not wl:
-            return True
-        txt = "{0} {1}".format(it.get("title") or "", it.get("snippet") or "")
-        return _kw_hit(txt, wl)
-
-    MUST_ANCHOR = {
-
-        "au_politics": [
-
-            "australia", "australian", "canberra", "parliament house", "commonwealth",
-
-            "aec", "aph.gov.au", "pm.gov.au",
-
-            "act", "nsw", "vic", "qld", "wa", "sa", "tas", "nt",
-
-            "albanese", "dutton", "labor", "liberal", "greens", "coalition",
-
-            "澳", "澳洲", "澳大利亚", "联邦", "堪培拉", "议会", "工党", "自由党", "绿党",
-
-        ],
-
-        "mel_life": [
-
-            "melbourne", "victoria", "vic", "cbd", "ptv", "metro", "tram", "train", "bus",
-
-            "yarra", "docklands", "st kilda",
-
-            "墨尔本", "维州", "本地", "民生", "交通", "电车", "火车",
-
-        ],
-
-    }
-
-
-    TOPIC_KWS = {
-
-        "au_politics": [
-        "parliament",
-        "senate",
-        "house",
-        "cabinet",
-        "minister",
-        "shadow minister",
-        "opposition",
-        "election",
-        "vote",
-        "ballot",
-        "campaign",
-        "budget",
-        "treasury",
-        "tax",
-        "spending",
-        "funding",
-        "policy",
-        "bill",
-        "law",
-        "laws",
-        "legislation",
-        "reform",
-        "inquiry",
-        "royal commission",
-        "immigration",
-        "visa",
-        "citizenship",
-        "asylum",
-        "home affairs",
-        "national security",
-        "defence",
-        "foreign minister",
-        "议会",
-        "参议院",
-        "众议院",
-        "内阁",
-        "部长",
-        "影子部长",
-        "反对党",
-        "选举",
-        "投票",
-        "竞选",
-        "预算",
-        "财政",
-        "税",
-        "拨款",
-        "政策",
-        "法案",
-        "法律",
-        "立法",
-        "改革",
-        "调查",
-        "移民",
-        "签证",
-        "国籍",
-        "内政",
-        "国防",
-        "外交",
-],
-
-    }
-
+        return bool(it["_filter"][1])
 
     def _passes_anchor_topic(it: dict, strict: bool) -> bool:
-        anchors0 = MUST_ANCHOR.get(key) or []
-        topics0 = TOPIC_KWS.get(key) or []
-        if (not anchors0) and (not topics0):
-            return True
-
-        title0 = it.get("title") or ""
-        sn0 = it.get("snippet") or ""
-        src0 = it.get("source") or ""
-        txt_ts = "{0} {1}".format(title0, sn0)
-        txt_all = "{0} {1} {2}".format(title0, sn0, src0)
-
-        if key == "au_politics":
-            # 只用 title/snippet 做判断，避免 source(Just In) 等导致误命中
-            anchors = []
-            for a in (anchors0 or []):
-                aa = (a or "").strip()
-                if not aa:
-                    continue
-                # 中文锚点保留；英文锚点要求长度>=4，避免 act/vic/wa 这类子串误命中
-                try:
-                    is_cjk = _has_cjk(aa)
-                except Exception:
-                    is_cjk = False
-                if is_cjk:
-                    anchors.append(aa)
-                    continue
-                if len(aa) >= 4:
-                    anchors.append(aa)
+        return bool(it["_filter"][2])
 
-            topics = topics0
-            intl_ban = ["bangladesh", "pakistan", "dhaka", "sheikh hasina", "孟加拉", "巴基斯坦", "达卡", "哈西娜", "谢赫"]
-            if _kw_hit(txt_ts, intl_ban):
-                return False
-
-            # au_politics：必须同时满足 AU anchor + politics topic
-            if anchors and (not _kw_hit(txt_ts, anchors)):
-                return False
-            if topics and (not _kw_hit(txt_ts, topics)):
-                return False
-            return True
-
-        # 其它分类：允许 source 参与 anchor 判断（保持原行为）
-        if anchors0 and (not _kw_hit(txt_all, anchors0)):
-            return False
-        return True
     def _pick(items_in: list, require_wl: bool, need: int, picked: list, seen_titles: set):
         nonlocal dropped_blacklist, dropped_whitelist, dropped_anchor, dropped_intlban, relax_used
         # Strict categories: never relax whitelist (keep category clean even if fewer items)
@@ -6536,7 +7628,13 @@ def news_digest(category: str = "world",
             seen.add(nt)
             picked.append(it)
 
-    out_items = picked[:lim_int]
+    out_items = [{k: v for k, v in it.items() if k != "_filter"} for it in picked[:lim_int]]
+
+    # With title translation locked off (the default, see NEWS_DISABLE_TRANSLATE_LOCK_V1
+    # below) the spoken answer is settled once items are picked: stream it now instead of
+    # after the translation passes, whose titles only feed "final".
+    if out_items and (not _news_digest_translate_enabled()):
+        _stream_emit(_news__format_voice_miniflux([dict(it, title_voice=str(it.get("title") or "").strip()) for it in out_items], lim_int or 5))
 
     # Build voice title field (translate EN titles when prefer_lang=zh)
     try:
@@ -6656,7 +7754,7 @@ def news_digest(category: str = "world",
         "limit": lim_int,
         "items": out_items,
         "final": "\n".join(lines).strip(),
-        "query_used": "miniflux category_id={0} after={1} fetch_limit={2}".format(cat_id, after_ts, fetch_lim),
+        "query_used": "news_digest window category_id={0} after={1} fetch_limit={2} synced={3}".format(cat_id, after_ts, fetch_lim, win.get("synced_ts")),
         "stats": {"fetched": len(all_items), "zh_fetched": len(zh_items), "en_fetched": len(en_items), "returned": len(out_items)},
         "stats_detail": {"dropped_blacklist": dropped_blacklist, "dropped_whitelist": dropped_whitelist, "dropped_anchor": dropped_anchor, "dropped_intlban": dropped_intlban, "relax_used": relax_used},
     }
@@ -6680,13 +7778,7 @@ def news_digest(category: str = "world",
         # NEWS_DISABLE_TRANSLATE_LOCK_V1
         # Translation is DISABLED by default. Only enable if NEWS_TRANSLATE_DISABLE is explicitly set to 0/false/off.
         try:
-            _raw = os.environ.get("NEWS_TRANSLATE_DISABLE")
-            if _raw is None:
-                _dis = "1"  # default disabled
-            else:
-                _dis = str(_raw).strip().lower()
-            _enabled = (_dis in ["0", "false", "no", "off"])
-            if not _enabled:
+            if not _news_digest_translate_enabled():
                 _its = ret.get("items") or []
                 if isinstance(_its, list):
                     for _it in _its:
@@ -6810,6 +7902,18 @@ def _llm_route_decide(text: str, prefer_lang: str):
     t = str(text or "").strip()
     if not t:
         return None
+    key = _route_cache_key("llm", t[:500], prefer_lang)
+    hit = _route_cache_get("llm", key)
+    if isinstance(hit, dict) and hit.get("label"):
+        return dict(hit, cached=True)
+    dec = _llm_route_decide_remote(t, prefer_lang)
+    if isinstance(dec, dict):
+        # Failures (timeouts, bad labels) are not cached; the next request asks again.
+        _route_cache_put("llm", key, dec)
+    return dec
+
+
+def _llm_route_decide_remote(t: str, prefer_lang: str):
     # Keep latency bounded on very long prompts.
     if len(t) > 500:
         t = t[:500]
@@ -6847,7 +7951,7 @@ def _llm_route_decide(text: str, prefer_lang: str):
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(url, json=payload, timeout=_llm_router_timeout())
+        r = http_pool.post(url, upstream="ollama", json=payload, timeout=_llm_router_timeout())
     except Exception:
         return None
     code = int(getattr(r, "status_code", 0) or 0)
@@ -7153,6 +8257,11 @@ def _skill_translate_rag_query(text: str, target_lang: str = "en") -> str:
     model = str(os.environ.get("RAG_QUERY_TRANSLATE_MODEL") or "qwen3:8b").strip()
     if not model:
         model = "qwen3:8b"
+    known = translation_memory.lookup(model, "rag_query:" + tgt, [q])[0]
+    if known:
+        return known
+    if not _skill_budget_allows("rag_query_translate"):
+        return ""
     try:
         timeout_sec = float(os.environ.get("RAG_QUERY_TRANSLATE_TIMEOUT_SEC") or "10")
     except Exception:
@@ -7193,7 +8302,7 @@ def _skill_translate_rag_query(text: str, target_lang: str = "en") -> str:
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(base + "/api/chat", json=payload, timeout=timeout_sec)
+        r = http_pool.post(base + "/api/chat", upstream="ollama", json=payload, timeout=timeout_sec)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return ""
         data = r.json() if hasattr(r, "json") else {}
@@ -7212,6 +8321,7 @@ def _skill_translate_rag_query(text: str, target_lang: str = "en") -> str:
             out = re.sub(r"\s+", " ", out).strip()
         if len(out) > 160:
             out = out[:160].strip()
+        translation_memory.store(model, "rag_query:" + tgt, [(q, out)])
         return out
     except Exception:
         return ""
@@ -7268,10 +8378,204 @@ def _skill_qdrant_vector_size() -> int:
     return n
 
 
-def _skill_embed_text(text: str) -> list:
+# ---- Embedding cache (memory LRU in front of a SQLite float32 store) ----
+_EMBED_CACHE_LOCK = threading.Lock()
+_EMBED_CACHE_MEM = OrderedDict()
+_EMBED_CACHE_STATE = {"sig": "", "writes": 0}
+_EMBED_CACHE_STATS = {"hits_mem": 0, "hits_disk": 0, "misses": 0, "embed_calls": 0, "embed_errors": 0, "embed_ms_total": 0.0, "embed_ms_max": 0.0}
+
+
+def _embed_cache_enabled() -> bool:
+    v = str(os.environ.get("EMBED_CACHE_ENABLE") or "1").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def _embed_cache_db_path() -> str:
+    p = str(os.environ.get("EMBED_CACHE_DB") or "").strip()
+    if p:
+        try:
+            os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+        except Exception:
+            pass
+        return p
+    return os.path.join(_rag_data_dir(), "embed_cache.sqlite3")
+
+
+def _embed_cache_init(conn):
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS embed_cache(key TEXT PRIMARY KEY, sig TEXT, dim INTEGER, vec BLOB, ts INTEGER)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_embed_cache_ts ON embed_cache(ts)")
+
+
+def _embed_cache_conn():
+    return _sqlite_conn(_embed_cache_db_path(), _embed_cache_init, "embed_cache")
+
+
+def _embed_cache_normalize(text: str) -> str:
+    t = unicodedata.normalize("NFKC", str(text or ""))
+    return re.sub(r"\s+", " ", t).strip()
+
+
+def _embed_cache_sig() -> str:
+    return _skill_embed_model() + "|" + str(_skill_qdrant_vector_size())
+
+
+def _embed_cache_key(sig: str, norm: str) -> str:
+    return hashlib.sha1((sig + "\n" + norm).encode("utf-8", errors="ignore")).hexdigest()
+
+
+def _embed_cache_check_sig(sig: str):
+    # Model or dimension changed: vectors from the old space are useless, drop them.
+    with _EMBED_CACHE_LOCK:
+        if _EMBED_CACHE_STATE.get("sig") == sig:
+            return
+        _EMBED_CACHE_MEM.clear()
+        _EMBED_CACHE_STATE["sig"] = sig
+    conn = None
+    try:
+        conn = _embed_cache_conn()
+        conn.execute("DELETE FROM embed_cache WHERE sig<>?", (sig,))
+        conn.commit()
+    except Exception:
+        pass
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _embed_cache_mem_max() -> int:
+    n = _safe_int(os.environ.get("EMBED_CACHE_MEM_ITEMS") or "2048", 2048)
+    return max(0, min(100000, n))
+
+
+def _embed_cache_mem_put(key: str, vec: list):
+    limit = _embed_cache_mem_max()
+    if limit <= 0:
+        return
+    with _EMBED_CACHE_LOCK:
+        _EMBED_CACHE_MEM[key] = vec
+        _EMBED_CACHE_MEM.move_to_end(key)
+        while len(_EMBED_CACHE_MEM) > limit:
+            _EMBED_CACHE_MEM.popitem(last=False)
+
+
+def _embed_cache_get(key: str, dim: int) -> list:
+    with _EMBED_CACHE_LOCK:
+        vec = _EMBED_CACHE_MEM.get(key)
+        if vec is not None:
+            _EMBED_CACHE_MEM.move_to_end(key)
+            _EMBED_CACHE_STATS["hits_mem"] += 1
+            return list(vec)
+    conn = None
+    row = None
+    try:
+        conn = _embed_cache_conn()
+        row = conn.execute("SELECT dim, vec FROM embed_cache WHERE key=? LIMIT 1", (key,)).fetchone()
+    except Exception:
+        row = None
+    finally:
+        if conn is not None:
+            conn.close()
+    if row and int(row[0] or 0) == int(dim) and row[1]:
+        arr = array("f")
+        try:
+            arr.frombytes(bytes(row[1]))
+        except Exception:
+            arr = array("f")
+        if len(arr) == int(dim):
+            vec = [float(x) for x in arr]
+            _embed_cache_mem_put(key, vec)
+            with _EMBED_CACHE_LOCK:
+                _EMBED_CACHE_STATS["hits_disk"] += 1
+            return list(vec)
+    with _EMBED_CACHE_LOCK:
+        _EMBED_CACHE_STATS["misses"] += 1
+    return []
+
+
+def _embed_cache_put(key: str, sig: str, vec: list):
+    _embed_cache_mem_put(key, list(vec))
+    max_rows = max(100, _safe_int(os.environ.get("EMBED_CACHE_MAX_ROWS") or "50000", 50000))
+    conn = None
+    try:
+        conn = _embed_cache_conn()
+        conn.execute(
+            "INSERT INTO embed_cache(key, sig, dim, vec, ts) VALUES(?,?,?,?,?) "
+            "ON CONFLICT(key) DO UPDATE SET sig=excluded.sig, dim=excluded.dim, vec=excluded.vec, ts=excluded.ts",
+            (key, sig, int(len(vec)), sqlite3.Binary(array("f", vec).tobytes()), int(time.time())),
+        )
+        with _EMBED_CACHE_LOCK:
+            _EMBED_CACHE_STATE["writes"] = int(_EMBED_CACHE_STATE.get("writes") or 0) + 1
+            do_trim = (_EMBED_CACHE_STATE["writes"] % 200) == 0
+        if do_trim:
+            conn.execute(
+                "DELETE FROM embed_cache WHERE key IN (SELECT key FROM embed_cache ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                (int(max_rows),),
+            )
+        conn.commit()
+    except Exception:
+        pass
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _embed_cache_stats() -> dict:
+    with _EMBED_CACHE_LOCK:
+        st = dict(_EMBED_CACHE_STATS)
+        mem_items = len(_EMBED_CACHE_MEM)
+    hits = int(st["hits_mem"]) + int(st["hits_disk"])
+    total = hits + int(st["misses"])
+    calls = int(st["embed_calls"])
+    return {
+        "enabled": _embed_cache_enabled(),
+        "hits_mem": int(st["hits_mem"]),
+        "hits_disk": int(st["hits_disk"]),
+        "misses": int(st["misses"]),
+        "hit_rate": round(float(hits) / total, 3) if total else 0.0,
+        "mem_items": mem_items,
+        "embed_calls": calls,
+        "embed_errors": int(st["embed_errors"]),
+        "embed_ms_avg": round(float(st["embed_ms_total"]) / calls, 1) if calls else 0.0,
+        "embed_ms_max": round(float(st["embed_ms_max"]), 1),
+    }
+
+
+def _skill_embed_text(text: str, cache: bool = True) -> list:
+    # The normalized form only keys the cache; Ollama embeds the text as given.
+    # Stored documents pass cache=False: they are embedded once and rarely repeat.
     q = str(text or "").strip()
     if not q:
         return []
+    use_cache = cache and _embed_cache_enabled()
+    if use_cache:
+        sig = _embed_cache_sig()
+        _embed_cache_check_sig(sig)
+        key = _embed_cache_key(sig, _embed_cache_normalize(q))
+        cached = _embed_cache_get(key, _skill_qdrant_vector_size())
+        if cached:
+            return cached
+    vec = _skill_embed_text_remote(q)
+    if vec and use_cache:
+        _embed_cache_put(key, sig, vec)
+    return vec
+
+
+def _skill_embed_text_remote(q: str) -> list:
+    t0 = time.perf_counter()
+    vec = _skill_embed_text_request(q)
+    ms = (time.perf_counter() - t0) * 1000.0
+    with _EMBED_CACHE_LOCK:
+        _EMBED_CACHE_STATS["embed_calls"] += 1
+        _EMBED_CACHE_STATS["embed_ms_total"] += ms
+        if ms > _EMBED_CACHE_STATS["embed_ms_max"]:
+            _EMBED_CACHE_STATS["embed_ms_max"] = ms
+        if not vec:
+            _EMBED_CACHE_STATS["embed_errors"] += 1
+    return vec
+
+
+def _skill_embed_text_request(q: str) -> list:
     payload = {"model": _skill_embed_model(), "input": q}
     try:
         timeout_sec = float(os.environ.get("EMBED_TIMEOUT_SEC") or "20")
@@ -7282,7 +8586,7 @@ def _skill_embed_text(text: str) -> list:
     if timeout_sec > 60:
         timeout_sec = 60.0
     try:
-        r = requests.post(_skill_ollama_base_url() + "/api/embed", json=payload, timeout=timeout_sec)
+        r = http_pool.post(_skill_ollama_base_url() + "/api/embed", upstream="ollama", json=payload, timeout=timeout_sec)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return []
         obj = r.json() if hasattr(r, "json") else {}
@@ -7338,6 +8642,90 @@ def _skill_scope_to_tags(scope: str) -> list:
     return out
 
 
+# ---- Local ANN fallback (rag_ann, mirrors the Qdrant collection on disk) ----
+_LOCAL_ANN_LOCK = threading.Lock()
+_LOCAL_ANN_STATE = {"index": None, "key": "", "error": ""}
+_LOCAL_ANN_STATS = {"fallback_searches": 0, "fallback_hits": 0, "mirror_points": 0, "last_ms": 0.0}
+
+
+def _skill_local_ann_enabled() -> bool:
+    v = str(os.environ.get("LOCAL_ANN_ENABLE") or "").strip().lower()
+    return (v in ("1", "true", "yes", "on")) and rag_ann.available()
+
+
+def _skill_local_ann_dir() -> str:
+    p = str(os.environ.get("LOCAL_ANN_DIR") or "").strip()
+    return p or os.path.join(_rag_data_dir(), "local_ann")
+
+
+def _skill_local_ann():
+    if not _skill_local_ann_enabled():
+        return None
+    key = _skill_local_ann_dir() + "|" + str(_skill_qdrant_vector_size())
+    with _LOCAL_ANN_LOCK:
+        idx = _LOCAL_ANN_STATE.get("index")
+        if (idx is not None) and _LOCAL_ANN_STATE.get("key") == key:
+            return idx
+        try:
+            nprobe = max(1, _safe_int(os.environ.get("LOCAL_ANN_NPROBE") or "8", 8))
+            idx = rag_ann.LocalVectorIndex(_skill_local_ann_dir(), _skill_qdrant_vector_size(), nprobe=nprobe)
+            _LOCAL_ANN_STATE.update({"index": idx, "key": key, "error": ""})
+            return idx
+        except Exception as e:
+            _LOCAL_ANN_STATE.update({"index": None, "key": "", "error": str(e)[:200]})
+            return None
+
+
+def _skill_local_ann_search(vec: list, lim: int, score_threshold: float, user_id: str, stags: list) -> list:
+    idx = _skill_local_ann()
+    if idx is None:
+        return []
+    t0 = time.perf_counter()
+    try:
+        rows = idx.search(vec, top_k=lim, score_threshold=float(score_threshold or 0.0), user_id=user_id, tags=stags)
+        # Same behaviour as the Qdrant path: an empty scoped search retries unscoped.
+        if (not rows) and stags:
+            rows = idx.search(vec, top_k=lim, score_threshold=float(score_threshold or 0.0), user_id=user_id)
+    except Exception as e:
+        _skill_log_json("local_ann_error", data={"error": str(e)[:200]})
+        rows = []
+    ms = (time.perf_counter() - t0) * 1000.0
+    with _LOCAL_ANN_LOCK:
+        _LOCAL_ANN_STATS["fallback_searches"] += 1
+        _LOCAL_ANN_STATS["fallback_hits"] += 1 if rows else 0
+        _LOCAL_ANN_STATS["last_ms"] = round(ms, 2)
+    for it in rows:
+        it["via"] = "local_ann"
+    return rows
+
+
+def _skill_local_ann_mirror(points: list):
+    idx = _skill_local_ann()
+    if idx is None:
+        return
+    try:
+        n = idx.upsert(points)
+        with _LOCAL_ANN_LOCK:
+            _LOCAL_ANN_STATS["mirror_points"] += int(n)
+    except Exception as e:
+        _skill_log_json("local_ann_error", data={"error": str(e)[:200]})
+
+
+def _skill_local_ann_stats() -> dict:
+    out = {"enabled": _skill_local_ann_enabled(), "numpy": rag_ann.available()}
+    with _LOCAL_ANN_LOCK:
+        out.update(dict(_LOCAL_ANN_STATS))
+        idx = _LOCAL_ANN_STATE.get("index")
+        if _LOCAL_ANN_STATE.get("error"):
+            out["error"] = _LOCAL_ANN_STATE.get("error")
+    if idx is not None:
+        try:
+            out.update(idx.stats())
+        except Exception:
+            pass
+    return out
+
+
 def _skill_qdrant_upsert_points(points: list) -> dict:
     if not isinstance(points, list) or len(points) <= 0:
         return {"ok": False, "error": "empty_points"}
@@ -7351,9 +8739,10 @@ def _skill_qdrant_upsert_points(points: list) -> dict:
     if timeout_sec > 60:
         timeout_sec = 60.0
     try:
-        r = requests.put(url, json={"points": points}, timeout=timeout_sec)
+        r = http_pool.put(url, upstream="qdrant", json={"points": points}, timeout=timeout_sec)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return {"ok": False, "error": "http_" + str(int(getattr(r, "status_code", 0) or 0)), "body": str(getattr(r, "text", "") or "")[:800]}
+        _skill_local_ann_mirror(points)
         return {"ok": True, "data": (r.json() if hasattr(r, "json") else {})}
     except Exception as e:
         return {"ok": False, "error": "request_failed", "message": str(e)}
@@ -7399,14 +8788,21 @@ def _skill_qdrant_search(query: str, top_k: int = 5, score_threshold: float = 0.
         timeout_sec = 3.0
     if timeout_sec > 60:
         timeout_sec = 60.0
+    local_ann = _skill_local_ann_enabled()
+    if local_ann:
+        # With a local index to fall back on, don't wait long for a busy Qdrant.
+        try:
+            timeout_sec = min(timeout_sec, max(0.3, float(os.environ.get("LOCAL_ANN_QDRANT_TIMEOUT_SEC") or "2")))
+        except Exception:
+            timeout_sec = min(timeout_sec, 2.0)
     try:
-        r = requests.post(url, json=body, timeout=timeout_sec)
+        r = http_pool.post(url, upstream="qdrant", json=body, timeout=timeout_sec)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
-            return []
+            return _skill_local_ann_search(vec, lim, score_threshold, uid, stags) if local_ann else []
         obj = r.json() if hasattr(r, "json") else {}
         out = obj.get("result") if isinstance(obj, dict) else []
         if not isinstance(out, list):
-            return []
+            return _skill_local_ann_search(vec, lim, score_threshold, uid, stags) if local_ann else []
         # If scope filter produced no hits, retry unscoped to avoid user confusion.
         if (len(out) == 0) and stags:
             body2 = dict(body)
@@ -7419,7 +8815,7 @@ def _skill_qdrant_search(query: str, top_k: int = 5, score_threshold: float = 0.
                             body2.pop("filter", None)
                         else:
                             body2["filter"] = f2
-                r2 = requests.post(url, json=body2, timeout=timeout_sec)
+                r2 = http_pool.post(url, upstream="qdrant", json=body2, timeout=timeout_sec)
                 if int(getattr(r2, "status_code", 0) or 0) < 400:
                     obj2 = r2.json() if hasattr(r2, "json") else {}
                     out2 = obj2.get("result") if isinstance(obj2, dict) else []
@@ -7443,7 +8839,7 @@ def _skill_qdrant_search(query: str, top_k: int = 5, score_threshold: float = 0.
             )
         return rows
     except Exception:
-        return []
+        return _skill_local_ann_search(vec, lim, score_threshold, uid, stags) if local_ann else []
 
 
 def _skill_qdrant_merge_hits(hits_a: list, hits_b: list, limit: int = 10) -> list:
@@ -7591,6 +8987,221 @@ def _skill_qdrant_hits_to_final(query: str, hits: list, language: str = "zh") ->
     return "\n".join([x for x in lines if x]).strip()
 
 
+# ---- Hybrid retrieval (vector + local keyword, fused) ----
+_RAG_HYBRID_LOCK = threading.Lock()
+_RAG_HYBRID_STATE = {"pool": None}
+
+
+def _rag_retrieval_mode() -> str:
+    v = str(os.environ.get("RAG_RETRIEVAL_MODE") or "vector_first").strip().lower()
+    return "hybrid" if v == "hybrid" else "vector_first"
+
+
+def _rag_hybrid_pool():
+    with _RAG_HYBRID_LOCK:
+        pool = _RAG_HYBRID_STATE.get("pool")
+        if pool is None:
+            workers = max(2, min(16, _safe_int(os.environ.get("RAG_HYBRID_WORKERS") or "6", 6)))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-hybrid")
+            _RAG_HYBRID_STATE["pool"] = pool
+        return pool
+
+
+def _rag_hybrid_timed(fn):
+    t0 = time.perf_counter()
+    res = fn()
+    return res, int((time.perf_counter() - t0) * 1000.0)
+
+
+def _rag_hybrid_run_legs(legs: dict, timeout_sec: float) -> dict:
+    # Legs run concurrently (request context copied in); stragglers past the
+    # timeout are reported and ignored rather than waited for.
+    pool = _rag_hybrid_pool()
+    futs = {}
+    timeout_sec = _skill_deadline_clamp(max(0.1, float(timeout_sec or 0.0)))
+    for name, fn in legs.items():
+        futs[name] = pool.submit(copy_context().run, _rag_hybrid_timed, fn)
+    futures_wait(list(futs.values()), timeout=timeout_sec)
+    out = {}
+    for name, fut in futs.items():
+        if not fut.done():
+            fut.cancel()
+            out[name] = {"ok": False, "ms": int(float(timeout_sec) * 1000.0), "error": "timeout", "result": None}
+            continue
+        try:
+            res, ms = fut.result()
+            out[name] = {"ok": True, "ms": ms, "result": res}
+        except Exception as e:
+            out[name] = {"ok": False, "ms": 0, "error": str(e)[:200], "result": None}
+    return out
+
+
+def _rag_hybrid_path_key(path: str) -> str:
+    p = str(path or "").replace("\\", "/").strip().lower()
+    if p.startswith("/mnt/nas/"):
+        p = p[len("/mnt/nas/"):]
+    return p.strip("/")
+
+
+def _rag_hybrid_same_source(a: str, b: str) -> bool:
+    # Vector payloads carry export-relative paths, local hits absolute NAS paths.
+    if (not a) or (not b):
+        return False
+    return (a == b) or a.endswith("/" + b) or b.endswith("/" + a)
+
+
+def _rag_hybrid_vector_key(hit: dict) -> str:
+    payload = hit.get("payload") if isinstance(hit.get("payload"), dict) else {}
+    p = str(payload.get("path") or payload.get("relpath") or "").strip()
+    if p:
+        return _rag_hybrid_path_key(p)
+    return "id:" + str(hit.get("id") or "")
+
+
+def _rag_hybrid_fuse(ranked_lists: list, k: int = 60, limit: int = 8) -> list:
+    """Reciprocal-rank fusion over [(leg, weight, [(key, item), ...])], deduped by source."""
+    fused = []
+    for leg, weight, rows in ranked_lists:
+        for rank, (key, item) in enumerate(rows or [], start=1):
+            hit = None
+            for f in fused:
+                if _rag_hybrid_same_source(f["key"], key):
+                    hit = f
+                    break
+            if hit is None:
+                hit = {"key": key, "score": 0.0, "legs": {}, "items": {}}
+                fused.append(hit)
+            if leg in hit["legs"]:
+                continue
+            hit["legs"][leg] = rank
+            hit["items"][leg] = item
+            hit["score"] += float(weight) / float(k + rank)
+    fused.sort(key=lambda x: float(x.get("score") or 0.0), reverse=True)
+    return fused[: int(limit)]
+
+
+def _rag_hybrid_render(query: str, fused: list, language: str = "zh") -> dict:
+    is_zh = str(language or "").lower().startswith("zh")
+    lines = []
+    facts = []
+    sources = []
+    vec_n = len([f for f in fused if "vector" in f.get("legs", {})])
+    kw_n = len([f for f in fused if ("keyword" in f.get("legs", {})) or ("keyword_alt" in f.get("legs", {}))])
+    if is_zh:
+        lines.append("资料库混合检索命中 " + str(len(fused)) + " 条（向量 " + str(vec_n) + "，关键词 " + str(kw_n) + "）。")
+    else:
+        lines.append("Hybrid knowledge search hit " + str(len(fused)) + " items (vector " + str(vec_n) + ", keyword " + str(kw_n) + ").")
+    if query:
+        lines.append(("查询：" if is_zh else "Query: ") + str(query))
+    for idx, f in enumerate(fused[:5], start=1):
+        items = f.get("items") or {}
+        local = items.get("keyword") or items.get("keyword_alt")
+        vhit = items.get("vector")
+        if isinstance(local, dict):
+            title = _rag_rel_path_for_display(str(local.get("path") or ""))
+            day = _rag_match_day(local)
+            snips = local.get("snippets") or []
+            body = str(snips[0] if snips else "").strip()
+            sources.append(_skill_source_item("local_rag", title, day, ""))
+        else:
+            payload = vhit.get("payload") if isinstance(vhit, dict) and isinstance(vhit.get("payload"), dict) else {}
+            title = str(payload.get("title") or payload.get("path") or "").strip()
+            day = ""
+            body = str(payload.get("text") or "").strip()
+            sources.extend(_skill_qdrant_hits_to_sources([vhit], limit=1))
+        if (not body) and isinstance(vhit, dict):
+            payload = vhit.get("payload") if isinstance(vhit.get("payload"), dict) else {}
+            body = str(payload.get("text") or "").strip()
+        if len(body) > 200:
+            body = body[:200].rstrip() + "..."
+        head = title + ((" （" + day + "）") if day else "")
+        lines.append(str(idx) + ". " + head + ("：" + body if body else ""))
+        if body:
+            facts.append(body[:180])
+    return {"final_text": "\n".join([x for x in lines if x]).strip(), "facts": facts[:6], "sources": sources[:8]}
+
+
+def _skill_rag_lookup_hybrid(q: str, folder: str, scope_tags: list, vec_top_k: int, vec_threshold: float, bilingual_enable: bool, language: str = "zh") -> dict:
+    q_has_zh = bool(re.search(r"[\u4e00-\u9fff]", q))
+
+    def _vector_leg():
+        if bilingual_enable:
+            hits, _q_cn, q_en_v, _bi = _skill_qdrant_search_bilingual(q, top_k=vec_top_k, score_threshold=vec_threshold, scope_tags=scope_tags)
+            return {"hits": hits, "query_en": q_en_v}
+        return {"hits": _skill_qdrant_search(q, top_k=vec_top_k, score_threshold=vec_threshold, scope_tags=scope_tags), "query_en": ""}
+
+    def _keyword_leg():
+        return {"query": q, "res": _rag_search_content_matches(q, folder)}
+
+    def _keyword_alt_leg():
+        alt = _skill_translate_rag_query(q, "en" if q_has_zh else "zh")
+        if (not alt) or (alt.strip().lower() == q.lower()):
+            return {"query": "", "res": {"ok": True, "matches": []}}
+        return {"query": alt, "res": _rag_search_content_matches(alt, folder)}
+
+    try:
+        timeout_sec = float(os.environ.get("RAG_HYBRID_TIMEOUT_SEC") or "8")
+    except Exception:
+        timeout_sec = 8.0
+    legs = _rag_hybrid_run_legs({"vector": _vector_leg, "keyword": _keyword_leg, "keyword_alt": _keyword_alt_leg}, timeout_sec)
+
+    vec_hits = []
+    q_en = ""
+    leg_meta = {}
+    ranked = []
+    try:
+        w_vec = float(os.environ.get("RAG_HYBRID_VECTOR_WEIGHT") or "1.0")
+    except Exception:
+        w_vec = 1.0
+    try:
+        w_kw = float(os.environ.get("RAG_HYBRID_KEYWORD_WEIGHT") or "1.0")
+    except Exception:
+        w_kw = 1.0
+    for name in ["vector", "keyword", "keyword_alt"]:
+        leg = legs.get(name) or {}
+        res = leg.get("result") if isinstance(leg.get("result"), dict) else {}
+        rows = []
+        if name == "vector":
+            vec_hits = [h for h in (res.get("hits") or []) if isinstance(h, dict)]
+            q_en = str(res.get("query_en") or "")
+            rows = [(_rag_hybrid_vector_key(h), h) for h in vec_hits]
+            ranked.append((name, w_vec, rows))
+        else:
+            mres = res.get("res") if isinstance(res.get("res"), dict) else {}
+            matches = mres.get("matches") if mres.get("ok") else []
+            rows = [(_rag_hybrid_path_key(m.get("path")), m) for m in (matches or []) if isinstance(m, dict)]
+            ranked.append((name, w_kw, rows))
+            if name == "keyword_alt" and res.get("query"):
+                q_en = q_en or (str(res.get("query")) if q_has_zh else "")
+        leg_meta[name] = {"ok": bool(leg.get("ok")), "ms": int(leg.get("ms") or 0), "hits": len(rows)}
+        if leg.get("error"):
+            leg_meta[name]["error"] = str(leg.get("error"))
+
+    fused = _rag_hybrid_fuse(ranked, k=60, limit=8)
+    keyword_hits = len([f for f in fused if ("keyword" in f["legs"]) or ("keyword_alt" in f["legs"])])
+    if not fused:
+        final = "资料库检索完成：暂未检索到与「" + q + "」匹配的内容。"
+        if folder:
+            final = "资料库检索完成：当前目录「" + folder + "」里暂未检索到与「" + q + "」匹配的内容。"
+        rendered = {"final_text": final, "facts": [], "sources": []}
+    else:
+        rendered = _rag_hybrid_render(q, fused, language=language)
+    return {
+        "final_text": rendered["final_text"],
+        "facts": rendered["facts"],
+        "sources": rendered["sources"],
+        "hit_count": int(len(fused)),
+        "query_cn": q if q_has_zh else "",
+        "query_en": q_en,
+        "bilingual": bool(q_en),
+        "vector_hit_count": int(len(vec_hits)),
+        "keyword_hit_count": int(keyword_hits),
+        "scope_tags": scope_tags,
+        "legs": leg_meta,
+        "route": "hybrid",
+    }
+
+
 def _skill_rag_lookup_core(query: str, scope: str = "", language: str = "zh") -> dict:
     q = str(query or "").strip()
     folder = str(scope or "").strip()
@@ -7615,6 +9226,8 @@ def _skill_rag_lookup_core(query: str, scope: str = "", language: str = "zh") ->
         vec_threshold = 1.0
 
     bilingual_enable = str(os.environ.get("MEMORY_BILINGUAL_ENABLE") or "").strip().lower() in ("1", "true", "yes", "on")
+    if _rag_retrieval_mode() == "hybrid":
+        return _skill_rag_lookup_hybrid(q, folder, scope_tags, vec_top_k, vec_threshold, bilingual_enable, language=language)
     if bilingual_enable:
         qdrant_hits, q_cn, q_en, bilingual = _skill_qdrant_search_bilingual(q, top_k=vec_top_k, score_threshold=vec_threshold, scope_tags=scope_tags)
     else:
@@ -7837,12 +9450,6 @@ def _skill_news_translate_items_zh(items: list, max_items: int = 3, timeout_sec:
     out = []
     if not isinstance(items, list) or len(items) == 0:
         return out
-    try:
-        ttl_sec = int(os.environ.get("NEWS_TRANSLATE_CACHE_TTL_SEC") or "21600")
-    except Exception:
-        ttl_sec = 21600
-    if ttl_sec < 60:
-        ttl_sec = 60
     try:
         timeout_sec = int(os.environ.get("NEWS_TRANSLATE_TIMEOUT_SEC") or str(timeout_sec))
     except Exception:
@@ -7883,16 +9490,10 @@ def _skill_news_translate_items_zh(items: list, max_items: int = 3, timeout_sec:
         if not need_tr:
             out.append(cp)
             continue
-        cache_key_src = str(cp.get("url") or "").strip()
-        if not cache_key_src:
-            cache_key_src = title_raw + "|" + snip_raw
-        cache_key = "news_rt:" + hashlib.md5(cache_key_src.encode("utf-8", "ignore")).hexdigest()
-        cache_hit = _news__tr__cache_get(cache_key, ttl_sec)
-        if isinstance(cache_hit, dict):
-            zh_t = str(cache_hit.get("title") or "").strip()
-            zh_s = str(cache_hit.get("snippet") or "").strip()
-            if zh_t:
-                cp["title_voice"] = zh_t
+        # Known translations are applied whatever max_items says; only misses count against it.
+        zh_t, zh_s = translation_memory.lookup(model, "zh", [title_raw, snip_raw])
+        if zh_t and (zh_s or not snip_raw):
+            cp["title_voice"] = zh_t
             if zh_s:
                 cp["snippet"] = zh_s
             out.append(cp)
@@ -7900,7 +9501,7 @@ def _skill_news_translate_items_zh(items: list, max_items: int = 3, timeout_sec:
         out.append(cp)
         if len(pairs) < max_items_i:
             pairs.append({"title": title_raw, "snippet": snip_raw})
-            pair_map.append({"out_idx": idx, "cache_key": cache_key})
+            pair_map.append({"out_idx": idx})
 
     if len(pairs) > 0:
         trs = _news__translate_batch_to_zh(pairs, model=model, timeout_sec=timeout_sec)
@@ -7919,7 +9520,6 @@ def _skill_news_translate_items_zh(items: list, max_items: int = 3, timeout_sec:
                 if zh_s:
                     cp["snippet"] = zh_s
                 out[oi] = cp
-                _news__tr__cache_put(str(map_it.get("cache_key") or ""), zh_t, zh_s)
 
     for i, it in enumerate(items):
         if i >= len(out):
@@ -7936,6 +9536,14 @@ def _skill_translate_lines_to_zh(lines: list, timeout_sec: int = 12) -> list:
     model = str(os.environ.get("NEWS_RETURN_TRANSLATE_MODEL") or "qwen3-vl:2b").strip()
     if not model:
         model = "qwen3-vl:2b"
+    got = translation_memory.translate(model, "zh", [str(x or "").strip() for x in lines], lambda miss: _skill_translate_lines_to_zh_llm(miss, model, timeout_sec))
+    return [g or str(x or "").strip() for g, x in zip(got, lines)]
+
+
+def _skill_translate_lines_to_zh_llm(lines: list, model: str, timeout_sec: int = 12) -> list:
+    # One numbered batch per call; "" for lines the model did not answer.
+    if not _skill_budget_allows("news_lines_translate"):
+        return []
     base = str(os.environ.get("OLLAMA_BASE_URL") or "http://192.168.1.162:11434").strip().rstrip("/")
     if not base:
         base = "http://192.168.1.162:11434"
@@ -7962,9 +9570,9 @@ def _skill_translate_lines_to_zh(lines: list, timeout_sec: int = 12) -> list:
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(base + "/api/chat", json=req, timeout=float(timeout_sec))
+        r = http_pool.post(base + "/api/chat", upstream="ollama", json=req, timeout=float(timeout_sec))
         if int(getattr(r, "status_code", 0) or 0) >= 400:
-            return [str(x or "").strip() for x in lines]
+            return []
         data = r.json() if hasattr(r, "json") else {}
         content = str(((data.get("message") or {}).get("content")) or "").strip()
         out_map = {}
@@ -7977,13 +9585,9 @@ def _skill_translate_lines_to_zh(lines: list, timeout_sec: int = 12) -> list:
             except Exception:
                 continue
             out_map[idx] = str(m.group(2) or "").strip()
-        out = []
-        for i, s in enumerate(lines, 1):
-            tr = str(out_map.get(i) or "").strip()
-            out.append(tr if tr else str(s or "").strip())
-        return out
+        return [str(out_map.get(i) or "").strip() for i in range(1, len(lines) + 1)]
     except Exception:
-        return [str(x or "").strip() for x in lines]
+        return []
 
 
 def _skill_news_query_from_topic(topic: str) -> str:
@@ -8014,6 +9618,11 @@ def _skill_translate_news_query_to_en(topic: str) -> str:
     model = str(os.environ.get("NEWS_QUERY_TRANSLATE_MODEL") or "qwen3-vl:2b").strip()
     if not model:
         model = "qwen3-vl:2b"
+    known = translation_memory.lookup(model, "news_query:en", [text])[0]
+    if known:
+        return known
+    if not _skill_budget_allows("news_query_translate"):
+        return ""
     prompt = (
         "Translate the Chinese news query into concise English search keywords.\n"
         "Rules:\n"
@@ -8033,7 +9642,7 @@ def _skill_translate_news_query_to_en(topic: str) -> str:
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(base + "/api/chat", json=payload, timeout=2)
+        r = http_pool.post(base + "/api/chat", upstream="ollama", json=payload, timeout=2)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return ""
         data = r.json() if hasattr(r, "json") else {}
@@ -8045,6 +9654,7 @@ def _skill_translate_news_query_to_en(topic: str) -> str:
         out = re.sub(r"\s+", " ", out).strip()
         if len(out) > 120:
             out = out[:120].strip()
+        translation_memory.store(model, "news_query:en", [(text, out)])
         return out
     except Exception:
         return ""
@@ -8063,52 +9673,121 @@ def _news_cache_db_path() -> str:
 
 
 def _news_cache_conn():
-    return sqlite3.connect(_news_cache_db_path())
+    return _sqlite_conn(_news_cache_db_path(), _news_cache_init_schema, "news_cache")
 
 
 def _news_cache_init():
-    conn = _news_cache_conn()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS news_cache_entries (
-                url TEXT PRIMARY KEY,
-                title TEXT,
-                snippet TEXT,
-                title_zh TEXT,
-                snippet_zh TEXT,
-                source TEXT,
-                published_at TEXT,
-                topic_tags TEXT,
-                keywords_en TEXT,
-                keywords_zh TEXT,
-                updated_ts INTEGER
-            )
-            """
+    # Schema is created once per process by the connection manager.
+    _news_cache_conn().close()
+
+
+def _news_cache_init_schema(conn):
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS news_cache_entries (
+            url TEXT PRIMARY KEY,
+            title TEXT,
+            snippet TEXT,
+            title_zh TEXT,
+            snippet_zh TEXT,
+            source TEXT,
+            published_at TEXT,
+            topic_tags TEXT,
+            keywords_en TEXT,
+            keywords_zh TEXT,
+            updated_ts INTEGER,
+            content_hash TEXT,
+            entry_id INTEGER,
+            search_text TEXT,
+            anchor_text TEXT,
+            enriched_ts INTEGER,
+            enrich_attempts INTEGER DEFAULT 0,
+            enrich_retry_ts INTEGER DEFAULT 0
         )
-        try:
-            cur.execute("PRAGMA table_info(news_cache_entries)")
-            cols = [str(r[1] or "").strip().lower() for r in (cur.fetchall() or []) if isinstance(r, (list, tuple)) and len(r) >= 2]
-            if "title_zh" not in cols:
-                cur.execute("ALTER TABLE news_cache_entries ADD COLUMN title_zh TEXT")
-            if "snippet_zh" not in cols:
-                cur.execute("ALTER TABLE news_cache_entries ADD COLUMN snippet_zh TEXT")
-        except Exception:
-            pass
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_news_cache_published ON news_cache_entries(published_at)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_news_cache_source ON news_cache_entries(source)")
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS news_cache_meta (
-                k TEXT PRIMARY KEY,
-                v TEXT
-            )
-            """
+        """
+    )
+    try:
+        cur.execute("PRAGMA table_info(news_cache_entries)")
+        cols = [str(r[1] or "").strip().lower() for r in (cur.fetchall() or []) if isinstance(r, (list, tuple)) and len(r) >= 2]
+        if "title_zh" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN title_zh TEXT")
+        if "snippet_zh" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN snippet_zh TEXT")
+        if "content_hash" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN content_hash TEXT")
+        if "entry_id" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN entry_id INTEGER")
+        if "search_text" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN search_text TEXT")
+        if "anchor_text" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN anchor_text TEXT")
+        if "enriched_ts" not in cols:
+            # Rows from before the enrichment worker were enriched inline (or never will be).
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN enriched_ts INTEGER")
+            cur.execute("UPDATE news_cache_entries SET enriched_ts=COALESCE(updated_ts, 1)")
+        if "enrich_attempts" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN enrich_attempts INTEGER DEFAULT 0")
+        if "enrich_retry_ts" not in cols:
+            cur.execute("ALTER TABLE news_cache_entries ADD COLUMN enrich_retry_ts INTEGER DEFAULT 0")
+    except Exception:
+        pass
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_news_cache_published ON news_cache_entries(published_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_news_cache_source ON news_cache_entries(source)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_news_cache_enriched ON news_cache_entries(enriched_ts)")
+    # Inverted index of each row's tags/keywords: kind is tag | kw_en | kw_zh (tag and kw_en lowercased).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS news_keywords (
+            url TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            term TEXT NOT NULL,
+            PRIMARY KEY(url, kind, term)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_news_keywords_term ON news_keywords(term, kind)")
+    _news_cache_backfill_index(cur)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS news_cache_meta (
+            k TEXT PRIMARY KEY,
+            v TEXT
         )
-        conn.commit()
-    finally:
-        conn.close()
+        """
+    )
+    # news_digest: rolling 24h window per Miniflux category id; filter outcomes precomputed
+    # per requested category key, since aliases of one category carry different filters.
+    cur.execute("PRAGMA table_info(news_digest_window)")
+    if "cat_key" in [r[1] for r in (cur.fetchall() or [])]:
+        # Windows used to be keyed by the request string; they are only a cache, so rebuild.
+        cur.execute("DROP TABLE news_digest_window")
+        cur.execute("DELETE FROM news_cache_meta WHERE k LIKE 'digest:%'")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS news_digest_window (
+            cat_id INTEGER NOT NULL,
+            entry_id INTEGER NOT NULL,
+            published_ts INTEGER,
+            is_video INTEGER,
+            item_json TEXT,
+            PRIMARY KEY(cat_id, entry_id)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_news_digest_window_pub ON news_digest_window(cat_id, published_ts)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS news_digest_flags (
+            cat_key TEXT NOT NULL,
+            entry_id INTEGER NOT NULL,
+            bl_ok INTEGER,
+            wl_ok INTEGER,
+            anchor_ok INTEGER,
+            PRIMARY KEY(cat_key, entry_id)
+        ) WITHOUT ROWID
+        """
+    )
 
 
 def _news_cache_get_meta(key: str, default_val: str = "") -> str:
@@ -8352,6 +10031,8 @@ def _news_keywords_extract_ai(title: str, snippet: str) -> dict:
     text = (str(title or "") + "\n" + str(snippet or "")).strip()
     if not text:
         return {"topic_tags": [], "keywords_en": [], "keywords_zh": []}
+    if not _skill_budget_allows("news_keywords_ai"):
+        return {"topic_tags": [], "keywords_en": [], "keywords_zh": []}
     base = str(os.environ.get("OLLAMA_BASE_URL") or "http://192.168.1.162:11434").strip().rstrip("/")
     model = str(os.environ.get("NEWS_KEYWORD_MODEL") or "qwen3-vl:2b").strip()
     if not model:
@@ -8384,7 +10065,7 @@ def _news_keywords_extract_ai(title: str, snippet: str) -> dict:
         "options": {"temperature": 0.0},
     }
     try:
-        r = requests.post(base + "/api/chat", json=payload, timeout=10)
+        r = http_pool.post(base + "/api/chat", upstream="ollama", json=payload, timeout=10)
         if int(getattr(r, "status_code", 0) or 0) >= 400:
             return {"topic_tags": [], "keywords_en": [], "keywords_zh": []}
         data = r.json() if hasattr(r, "json") else {}
@@ -8404,9 +10085,82 @@ def _news_keywords_extract_ai(title: str, snippet: str) -> dict:
         return {"topic_tags": [], "keywords_en": [], "keywords_zh": []}
 
 
-def _news_cache_upsert_item(item: dict, use_ai: bool = True):
+def _news_cache_content_hash(title: str, snippet: str) -> str:
+    return hashlib.sha1((str(title or "") + "\n" + str(snippet or "")).encode("utf-8", "ignore")).hexdigest()
+
+
+def _news_cache_row_key(url: str, title: str) -> str:
+    return url if url else ("title:" + hashlib.sha1(str(title or "").encode("utf-8")).hexdigest())
+
+
+_NEWS_CACHE_UPSERT_SQL = """
+    INSERT INTO news_cache_entries(url, title, snippet, title_zh, snippet_zh, source, published_at, topic_tags, keywords_en, keywords_zh, updated_ts, content_hash, entry_id, search_text, anchor_text, enriched_ts)
+    VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+      title=excluded.title,
+      snippet=excluded.snippet,
+      title_zh=excluded.title_zh,
+      snippet_zh=excluded.snippet_zh,
+      source=excluded.source,
+      published_at=excluded.published_at,
+      topic_tags=excluded.topic_tags,
+      keywords_en=excluded.keywords_en,
+      keywords_zh=excluded.keywords_zh,
+      updated_ts=excluded.updated_ts,
+      content_hash=excluded.content_hash,
+      entry_id=excluded.entry_id,
+      search_text=excluded.search_text,
+      anchor_text=excluded.anchor_text,
+      enriched_ts=excluded.enriched_ts,
+      enrich_attempts=0,
+      enrich_retry_ts=0
+"""
+
+
+def _news_cache_search_fields(title: str, snippet: str, source: str, tags: list, kws_en: list, kws_zh: list) -> tuple:
+    """(search_text, anchor_text) precomputed for _news_cache_query's instr() checks."""
+    search_text = (str(title or "") + " " + str(snippet or "")).lower()
+    parts = [title, snippet, source, " ".join([str(x) for x in tags or []]), " ".join([str(x) for x in kws_en or []]), " ".join([str(x) for x in kws_zh or []])]
+    anchor_text = " ".join([str(x or "").lower() for x in parts]).strip()
+    return search_text, anchor_text
+
+
+def _news_cache_terms(url: str, tags: list, kws_en: list, kws_zh: list) -> list:
+    out = set()
+    for kind, vals, low in (("tag", tags, True), ("kw_en", kws_en, True), ("kw_zh", kws_zh, False)):
+        for x in vals or []:
+            t = str(x).lower() if low else str(x)
+            if t:
+                out.add((url, kind, t))
+    return sorted(out)
+
+
+def _news_json_list(raw) -> list:
+    try:
+        v = json.loads(str(raw or "[]"))
+    except Exception:
+        return []
+    return v if isinstance(v, list) else []
+
+
+def _news_cache_backfill_index(cur):
+    # Rows written before the search columns existed; runs once, on the first schema init.
+    cur.execute("SELECT url, title, snippet, source, topic_tags, keywords_en, keywords_zh FROM news_cache_entries WHERE search_text IS NULL")
+    rows = cur.fetchall() or []
+    upd = []
+    terms = []
+    for url, title, snippet, source, tags_j, en_j, zh_j in rows:
+        tags, kws_en, kws_zh = _news_json_list(tags_j), _news_json_list(en_j), _news_json_list(zh_j)
+        upd.append(_news_cache_search_fields(title, snippet, source, tags, kws_en, kws_zh) + (url,))
+        terms.extend(_news_cache_terms(str(url or ""), tags, kws_en, kws_zh))
+    if upd:
+        cur.executemany("UPDATE news_cache_entries SET search_text=?, anchor_text=? WHERE url=?", upd)
+        cur.executemany("INSERT OR IGNORE INTO news_keywords(url, kind, term) VALUES(?, ?, ?)", terms)
+
+
+def _news_cache_row(item: dict, use_ai: bool = True):
     if not isinstance(item, dict):
-        return
+        return None
     url = str(item.get("url") or "").strip()
     title = str(item.get("title") or "").strip()
     snippet = str(item.get("snippet") or "").strip()
@@ -8415,7 +10169,7 @@ def _news_cache_upsert_item(item: dict, use_ai: bool = True):
     source = str(item.get("source") or "").strip()
     published_at = str(item.get("published_at") or "").strip()
     if (not url) and (not title):
-        return
+        return None
     ai = {"topic_tags": [], "keywords_en": [], "keywords_zh": []}
     if use_ai:
         ai = _news_keywords_extract_ai(title, snippet)
@@ -8428,39 +10182,43 @@ def _news_cache_upsert_item(item: dict, use_ai: bool = True):
         ai.get("keywords_en") if isinstance(ai.get("keywords_en"), list) else [],
         ai.get("keywords_zh") if isinstance(ai.get("keywords_zh"), list) else [],
     )
+    return (
+        _news_cache_row_key(url, title),
+        title,
+        snippet,
+        title_zh,
+        snippet_zh,
+        source,
+        published_at,
+        json.dumps(ai.get("topic_tags") or [], ensure_ascii=False),
+        json.dumps(ai.get("keywords_en") or [], ensure_ascii=False),
+        json.dumps(ai.get("keywords_zh") or [], ensure_ascii=False),
+        int(time.time()),
+        str(item.get("content_hash") or "") or _news_cache_content_hash(title, snippet),
+        _safe_int(item.get("entry_id"), 0),
+    ) + _news_cache_search_fields(title, snippet, source, ai.get("topic_tags"), ai.get("keywords_en"), ai.get("keywords_zh")) + (
+        # 0 = waiting for the enrichment worker (LLM keywords, zh translation).
+        int(time.time()) if use_ai else 0,
+    )
+
+
+def _news_cache_write(rows: list, meta: Optional[dict] = None):
+    # Rows and meta (cursor, refresh stamp) commit together or not at all.
     conn = _news_cache_conn()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO news_cache_entries(url, title, snippet, title_zh, snippet_zh, source, published_at, topic_tags, keywords_en, keywords_zh, updated_ts)
-            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(url) DO UPDATE SET
-              title=excluded.title,
-              snippet=excluded.snippet,
-              title_zh=excluded.title_zh,
-              snippet_zh=excluded.snippet_zh,
-              source=excluded.source,
-              published_at=excluded.published_at,
-              topic_tags=excluded.topic_tags,
-              keywords_en=excluded.keywords_en,
-              keywords_zh=excluded.keywords_zh,
-              updated_ts=excluded.updated_ts
-            """,
-            (
-                url if url else ("title:" + hashlib.sha1(title.encode("utf-8")).hexdigest()),
-                title,
-                snippet,
-                title_zh,
-                snippet_zh,
-                source,
-                published_at,
-                json.dumps(ai.get("topic_tags") or [], ensure_ascii=False),
-                json.dumps(ai.get("keywords_en") or [], ensure_ascii=False),
-                json.dumps(ai.get("keywords_zh") or [], ensure_ascii=False),
-                int(time.time()),
-            ),
-        )
+        if rows:
+            cur.executemany(_NEWS_CACHE_UPSERT_SQL, rows)
+            cur.executemany("DELETE FROM news_keywords WHERE url=?", [(r[0],) for r in rows])
+            terms = []
+            for r in rows:
+                terms.extend(_news_cache_terms(r[0], _news_json_list(r[7]), _news_json_list(r[8]), _news_json_list(r[9])))
+            cur.executemany("INSERT OR IGNORE INTO news_keywords(url, kind, term) VALUES(?, ?, ?)", terms)
+        for k, v in (meta or {}).items():
+            cur.execute(
+                "INSERT INTO news_cache_meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+                (str(k or ""), str(v or "")),
+            )
         conn.commit()
     except Exception:
         pass
@@ -8468,14 +10226,68 @@ def _news_cache_upsert_item(item: dict, use_ai: bool = True):
         conn.close()
 
 
-def _news_cache_refresh_if_due(force: bool = False):
+def _news_cache_upsert_item(item: dict, use_ai: bool = True):
+    row = _news_cache_row(item, use_ai=use_ai)
+    if row is not None:
+        _news_cache_write([row])
+
+
+def _news_cache_known_hashes(keys: list) -> dict:
+    out = {}
+    if not keys:
+        return out
+    conn = _news_cache_conn()
+    try:
+        cur = conn.cursor()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cur.execute(
+                "SELECT url, content_hash FROM news_cache_entries WHERE url IN (" + ",".join(["?"] * len(chunk)) + ")",
+                tuple(chunk),
+            )
+            for row in cur.fetchall() or []:
+                out[str(row[0] or "")] = str(row[1] or "")
+    except Exception:
+        pass
+    finally:
+        conn.close()
+    return out
+
+
+def _news_cache_fetch_entries(cursor: int, fetch_limit: int, full: bool) -> tuple:
+    """(entries, ok) from Miniflux: the newest fetch_limit on a full sync, else only ids after cursor."""
+    if full:
+        r = _skill_miniflux_req("/v1/entries", {"order": "published_at", "direction": "desc", "limit": fetch_limit})
+        if not r.get("ok"):
+            return [], False
+        entries = (r.get("data") or {}).get("entries") or []
+        return [e for e in entries if isinstance(e, dict)], True
+    page = min(100, fetch_limit)
+    out = []
+    after = int(cursor)
+    while len(out) < fetch_limit:
+        r = _skill_miniflux_req("/v1/entries", {"order": "id", "direction": "asc", "after_entry_id": after, "limit": page})
+        if not r.get("ok"):
+            # Keep what was read; the cursor only moves past entries that get stored.
+            return out, bool(out)
+        entries = [e for e in ((r.get("data") or {}).get("entries") or []) if isinstance(e, dict)]
+        out.extend(entries)
+        ids = [_safe_int(e.get("id"), 0) for e in entries]
+        if len(entries) < page or not ids or max(ids) <= after:
+            break
+        after = max(ids)
+    return out[:fetch_limit], True
+
+
+def _news_cache_refresh_if_due(force: bool = False, grace_sec: int = 0):
     _news_cache_init()
     try:
-        interval = int(os.environ.get("NEWS_CACHE_REFRESH_SEC") or "1800")
+        interval = int(os.environ.get("NEWS_CACHE_REFRESH_SEC") or "300")
     except Exception:
-        interval = 1800
+        interval = 300
     if interval < 60:
         interval = 60
+    interval += max(0, int(grace_sec or 0))
     now_ts = int(time.time())
     last = 0
     try:
@@ -8484,6 +10296,7 @@ def _news_cache_refresh_if_due(force: bool = False):
         last = 0
     if (not force) and ((now_ts - last) < interval):
         return
+    t0 = time.perf_counter()
     try:
         fetch_limit = int(os.environ.get("NEWS_CACHE_FETCH_LIMIT") or "120")
     except Exception:
@@ -8492,113 +10305,520 @@ def _news_cache_refresh_if_due(force: bool = False):
         fetch_limit = 20
     if fetch_limit > 300:
         fetch_limit = 300
+    # Incremental by Miniflux entry id; a periodic full top-N pass picks up edited entries
+    # and recovers if the Miniflux database was rebuilt (ids restarting below the cursor).
+    cursor = _safe_int(_news_cache_get_meta("miniflux_cursor_entry_id", "0"), 0)
+    last_full = _safe_int(_news_cache_get_meta("last_full_sync_ts", "0"), 0)
+    resync_sec = max(600, _safe_int(os.environ.get("NEWS_CACHE_RESYNC_SEC") or "86400", 86400))
+    full = bool(force) or cursor <= 0 or (now_ts - last_full) >= resync_sec
+    entries, fetched_ok = _news_cache_fetch_entries(cursor, fetch_limit, full)
     base_items = []
-    r = _skill_miniflux_req(
-        "/v1/entries",
-        {
-            "order": "published_at",
-            "direction": "desc",
-            "limit": fetch_limit,
-        },
+    seen_keys = set()
+    new_cursor = cursor
+    for e in entries:
+        new_cursor = max(new_cursor, _safe_int(e.get("id"), 0))
+        title = str(e.get("title") or "").strip()
+        if not title:
+            continue
+        feed = e.get("feed") or {}
+        source = str(feed.get("title") or "").strip()
+        url = str(e.get("url") or "").strip() or str(e.get("comments_url") or "").strip()
+        key = _news_cache_row_key(url, title)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        raw_pub = str(e.get("published_at") or "").strip()
+        content = str(e.get("content") or "").strip()
+        plain = re.sub(r"<[^>]+>", " ", content)
+        plain = html.unescape(plain)
+        plain = re.sub(r"\s+", " ", plain).strip()
+        if len(plain) > 220:
+            plain = plain[:220].rstrip() + "..."
+        base_items.append(
+            {
+                "title": title,
+                "url": url,
+                "source": source,
+                "published_at": raw_pub,
+                "snippet": plain,
+                "entry_id": _safe_int(e.get("id"), 0),
+                "content_hash": _news_cache_content_hash(title, plain),
+                "_key": key,
+            }
+        )
+    # Rows whose title/snippet did not change keep their translation and keywords.
+    known = _news_cache_known_hashes([it["_key"] for it in base_items])
+    base_items = [it for it in base_items if known.get(it["_key"]) != it["content_hash"]]
+    # Rows go in now with heuristic keywords; LLM keywords and translation come from the
+    # enrichment worker, so a refresh (and the request that may trigger it) never waits on Ollama.
+    rows = []
+    for it in base_items:
+        if _news_has_zh(it.get("title")) and ((not it.get("snippet")) or _news_has_zh(it.get("snippet"))):
+            it["title_zh"] = it.get("title")
+            it["snippet_zh"] = it.get("snippet")
+        row = _news_cache_row(it, use_ai=False)
+        if row is not None:
+            rows.append(row)
+    meta = {"last_refresh_ts": str(now_ts)}
+    if fetched_ok:
+        meta["miniflux_cursor_entry_id"] = str(new_cursor)
+        if full:
+            meta["last_full_sync_ts"] = str(now_ts)
+    meta["last_refresh_info"] = json.dumps(
+        {"mode": "full" if full else "incremental", "fetched": len(entries), "changed": len(rows), "ms": round((time.perf_counter() - t0) * 1000.0, 1)}
     )
-    if r.get("ok"):
-        data = r.get("data") or {}
-        entries = data.get("entries") or []
-        for e in entries:
-            if not isinstance(e, dict):
-                continue
-            title = str(e.get("title") or "").strip()
-            if not title:
-                continue
-            feed = e.get("feed") or {}
-            source = str(feed.get("title") or "").strip()
-            url = str(e.get("url") or "").strip() or str(e.get("comments_url") or "").strip()
-            raw_pub = str(e.get("published_at") or "").strip()
-            content = str(e.get("content") or "").strip()
-            plain = re.sub(r"<[^>]+>", " ", content)
-            plain = html.unescape(plain)
-            plain = re.sub(r"\s+", " ", plain).strip()
-            if len(plain) > 220:
-                plain = plain[:220].rstrip() + "..."
-            base_items.append(
-                {
-                    "title": title,
-                    "url": url,
-                    "source": source,
-                    "published_at": raw_pub,
-                    "snippet": plain,
-                }
+    _news_cache_write(rows, meta)
+    if rows:
+        _news_enrich_kick()
+
+
+def _news_has_zh(s) -> bool:
+    return bool(re.search(r"[\u4e00-\u9fff]", str(s or "")))
+
+
+# ---- News enrichment worker: upgrades heuristic rows with LLM keywords + zh translation ----
+_NEWS_ENRICH_LOCK = threading.Lock()
+_NEWS_ENRICH_STATE: Dict[str, Any] = {"thread": None, "kick": False}
+_NEWS_ENRICH_STATS: Dict[str, Any] = {"passes": 0, "rows": 0, "translated": 0, "ai_keywords": 0, "retries": 0, "gave_up": 0, "errors": 0, "last_ms": 0.0, "last_ts": 0}
+
+
+def _news_enrich_enabled() -> bool:
+    v = str(os.environ.get("NEWS_ENRICH_ENABLE") or "1").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def _news_enrich_kick():
+    """Make sure a worker pass runs soon; returns at once."""
+    if not _news_enrich_enabled():
+        return
+    with _NEWS_ENRICH_LOCK:
+        _NEWS_ENRICH_STATE["kick"] = True
+        t = _NEWS_ENRICH_STATE.get("thread")
+        if t is not None and t.is_alive():
+            return
+        t = threading.Thread(target=_news_enrich_loop, name="news-enrich", daemon=True)
+        _NEWS_ENRICH_STATE["thread"] = t
+    t.start()
+
+
+def _news_enrich_loop():
+    while True:
+        with _NEWS_ENRICH_LOCK:
+            if not _NEWS_ENRICH_STATE["kick"]:
+                _NEWS_ENRICH_STATE["thread"] = None
+                return
+            _NEWS_ENRICH_STATE["kick"] = False
+        try:
+            _news_enrich_pending()
+        except Exception:
+            with _NEWS_ENRICH_LOCK:
+                _NEWS_ENRICH_STATS["errors"] += 1
+
+
+def _news_enrich_pending(max_rows: Optional[int] = None) -> int:
+    """Enrich waiting rows (newest first) in batches; returns how many rows were attempted.
+
+    Rows whose last attempt failed are skipped until their enrich_retry_ts.
+    """
+    cap = max_rows if max_rows is not None else _safe_int(os.environ.get("NEWS_ENRICH_MAX_PER_PASS") or "48", 48)
+    batch_n = min(32, max(1, _safe_int(os.environ.get("NEWS_ENRICH_BATCH") or "8", 8)))
+    t0 = time.perf_counter()
+    done = 0
+    while done < max(0, int(cap)):
+        conn = _news_cache_conn()
+        try:
+            rows = conn.execute(
+                "SELECT url, title, snippet, source, title_zh, snippet_zh, content_hash, enrich_attempts FROM news_cache_entries"
+                " WHERE enriched_ts=0 AND COALESCE(enrich_retry_ts, 0)<=? ORDER BY published_at DESC LIMIT ?",
+                (int(time.time()), min(batch_n, int(cap) - done)),
+            ).fetchall() or []
+        finally:
+            conn.close()
+        if not rows:
+            break
+        _news_enrich_batch(rows)
+        done += len(rows)
+    with _NEWS_ENRICH_LOCK:
+        _NEWS_ENRICH_STATS["passes"] += 1
+        _NEWS_ENRICH_STATS["rows"] += done
+        _NEWS_ENRICH_STATS["last_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        _NEWS_ENRICH_STATS["last_ts"] = int(time.time())
+    return done
+
+
+def _news_enrich_batch(rows: list):
+    items = [
+        {"url": r[0], "title": str(r[1] or ""), "snippet": str(r[2] or ""), "source": str(r[3] or ""), "title_zh": str(r[4] or ""), "snippet_zh": str(r[5] or ""), "hash": r[6], "attempts": int(r[7] or 0)}
+        for r in rows
+    ]
+    tr_idx = [i for i, it in enumerate(items) if not it["title_zh"] and (it["title"] or it["snippet"])]
+    if tr_idx:
+        model = str(os.environ.get("NEWS_CACHE_TRANSLATE_MODEL") or "qwen3-vl:2b").strip() or "qwen3-vl:2b"
+        tr_timeout = min(20, max(3, _safe_int(os.environ.get("NEWS_CACHE_TRANSLATE_TIMEOUT_SEC") or "8", 8)))
+        tr_ret = _news__translate_batch_to_zh([{"title": items[i]["title"], "snippet": items[i]["snippet"]} for i in tr_idx], model=model, timeout_sec=tr_timeout)
+        for j, i in enumerate(tr_idx):
+            tr = tr_ret[j] if isinstance(tr_ret, list) and j < len(tr_ret) and isinstance(tr_ret[j], dict) else {}
+            items[i]["title_zh"] = str(tr.get("title") or "").strip()
+            items[i]["snippet_zh"] = str(tr.get("snippet") or "").strip()
+            if items[i]["title_zh"]:
+                with _NEWS_ENRICH_LOCK:
+                    _NEWS_ENRICH_STATS["translated"] += 1
+    # Keyword extraction is one Ollama call per row; a small pool bounds the load on Ollama.
+    workers = min(4, max(1, _safe_int(os.environ.get("NEWS_ENRICH_CONCURRENCY") or "2", 2)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-enrich-ai") as ex:
+        ais = list(ex.map(lambda it: _news_keywords_extract_ai(it["title"], it["snippet"]), items))
+    now_ts = int(time.time())
+    # A failed translation or extraction leaves the row pending: it is retried after an
+    # exponential backoff and only settles on what it has after NEWS_ENRICH_MAX_ATTEMPTS.
+    max_attempts = max(1, _safe_int(os.environ.get("NEWS_ENRICH_MAX_ATTEMPTS") or "4", 4))
+    retry_base = max(60, _safe_int(os.environ.get("NEWS_ENRICH_RETRY_SEC") or "600", 600))
+    updates = []
+    terms = []
+    for idx, (it, ai) in enumerate(zip(items, ais)):
+        ai = ai if isinstance(ai, dict) else {}
+        ok = (idx not in tr_idx) or bool(it["title_zh"])
+        if ai.get("topic_tags") or ai.get("keywords_en") or ai.get("keywords_zh"):
+            with _NEWS_ENRICH_LOCK:
+                _NEWS_ENRICH_STATS["ai_keywords"] += 1
+        else:
+            ok = False
+            ai = _news_keywords_heuristic(it["title"], it["snippet"])
+        attempts = it["attempts"] + 1
+        settled = ok or (attempts >= max_attempts)
+        with _NEWS_ENRICH_LOCK:
+            if not ok:
+                _NEWS_ENRICH_STATS["gave_up" if settled else "retries"] += 1
+        ai = _news_finalize_keyword_schema(
+            it["title"],
+            it["snippet"],
+            ai.get("topic_tags") if isinstance(ai.get("topic_tags"), list) else [],
+            ai.get("keywords_en") if isinstance(ai.get("keywords_en"), list) else [],
+            ai.get("keywords_zh") if isinstance(ai.get("keywords_zh"), list) else [],
+        )
+        search_text, anchor_text = _news_cache_search_fields(it["title"], it["snippet"], it["source"], ai["topic_tags"], ai["keywords_en"], ai["keywords_zh"])
+        updates.append((
+            it["title_zh"],
+            it["snippet_zh"],
+            json.dumps(ai["topic_tags"], ensure_ascii=False),
+            json.dumps(ai["keywords_en"], ensure_ascii=False),
+            json.dumps(ai["keywords_zh"], ensure_ascii=False),
+            search_text,
+            anchor_text,
+            now_ts if settled else 0,
+            attempts,
+            0 if settled else now_ts + min(21600, retry_base * (2 ** (attempts - 1))),
+            it["url"],
+            it["hash"],
+        ))
+        terms.append((it["url"], _news_cache_terms(it["url"], ai["topic_tags"], ai["keywords_en"], ai["keywords_zh"])))
+    conn = _news_cache_conn()
+    try:
+        cur = conn.cursor()
+        for up, (url, tt) in zip(updates, terms):
+            # A refresh may have rewritten the row meanwhile; then its new content waits for the next pass.
+            cur.execute(
+                "UPDATE news_cache_entries SET title_zh=?, snippet_zh=?, topic_tags=?, keywords_en=?, keywords_zh=?, search_text=?, anchor_text=?, enriched_ts=?, enrich_attempts=?, enrich_retry_ts=?"
+                " WHERE url=? AND content_hash IS ? AND enriched_ts=0",
+                up,
+            )
+            if cur.rowcount == 1:
+                cur.execute("DELETE FROM news_keywords WHERE url=?", (url,))
+                cur.executemany("INSERT OR IGNORE INTO news_keywords(url, kind, term) VALUES(?, ?, ?)", tt)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _news_enrich_stats() -> dict:
+    with _NEWS_ENRICH_LOCK:
+        out = dict(_NEWS_ENRICH_STATS)
+        t = _NEWS_ENRICH_STATE.get("thread")
+    out["running"] = bool(t is not None and t.is_alive())
+    conn = _news_cache_conn()
+    try:
+        out["pending"] = int(conn.execute("SELECT COUNT(*) FROM news_cache_entries WHERE enriched_ts=0").fetchone()[0])
+    except Exception:
+        out["pending"] = -1
+    finally:
+        conn.close()
+    return out
+
+
+# ---- news_digest category windows: refreshed in the background, read locally ----
+_NEWS_DIGEST_LOCK = threading.Lock()
+_NEWS_DIGEST_INFLIGHT: set = set()
+
+
+def _news_digest_categories():
+    """Miniflux category list, cached in the shared "miniflux" namespace; None when unavailable."""
+
+    def _load():
+        rr = _skill_miniflux_req("/v1/categories")
+        if not rr.get("ok") or not isinstance(rr.get("data"), list):
+            raise RuntimeError("miniflux categories: " + str(rr.get("error") or rr.get("status") or "failed"))
+        return rr.get("data")
+
+    try:
+        return shared_cache.get_or_load("miniflux", "categories", _load, cacheable=lambda v: isinstance(v, list))
+    except Exception:
+        return None
+
+
+def _news_digest_meta(name: str) -> dict:
+    try:
+        st = json.loads(_news_cache_get_meta(name) or "{}")
+    except Exception:
+        st = {}
+    return st if isinstance(st, dict) else {}
+
+
+def _news_digest_keys() -> dict:
+    """Every category key a digest request has used: key -> {"cat_id", "used_ts"}."""
+    conn = _news_cache_conn()
+    try:
+        rows = conn.execute("SELECT k, v FROM news_cache_meta WHERE k LIKE 'digest:%'").fetchall() or []
+    finally:
+        conn.close()
+    out = {}
+    for k, v in rows:
+        try:
+            st = json.loads(v or "{}")
+        except Exception:
+            st = {}
+        out[str(k)[len("digest:"):]] = st if isinstance(st, dict) else {}
+    return out
+
+
+def _news_digest_flag_rows(keys, entries) -> list:
+    return [(k, eid) + tuple(_news_digest_filter_flags(k, it)) for k in keys for eid, it in entries]
+
+
+def _news_digest_attach(key: str, cat_id: int, recompute: bool = True):
+    """Record that key resolves to cat_id and was just used; recompute its flags over the window."""
+    now_ts = int(time.time())
+    conn = _news_cache_conn()
+    try:
+        cur = conn.cursor()
+        if recompute:
+            entries = []
+            for eid, raw in cur.execute("SELECT entry_id, item_json FROM news_digest_window WHERE cat_id=?", (int(cat_id),)).fetchall() or []:
+                try:
+                    entries.append((int(eid), json.loads(raw)))
+                except Exception:
+                    continue
+            cur.execute("DELETE FROM news_digest_flags WHERE cat_key=?", (key,))
+            cur.executemany(
+                "INSERT OR REPLACE INTO news_digest_flags(cat_key, entry_id, bl_ok, wl_ok, anchor_ok) VALUES(?, ?, ?, ?, ?)",
+                _news_digest_flag_rows([key], entries),
             )
-    # Pre-translate title/snippet during cache refresh to avoid request-time LLM latency.
-    def _has_zh_local(s: str) -> bool:
+        cur.execute(
+            "INSERT INTO news_cache_meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            ("digest:" + key, json.dumps({"cat_id": int(cat_id), "used_ts": now_ts})),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _news_digest_window_refresh(cat_id: int) -> dict:
+    """Pull entries newer than the category's cursor into its window; drop what left the 24h range.
+
+    New entries get filter flags for every key currently attached to the category.
+    """
+    cat_id = int(cat_id)
+    now_ts = int(time.time())
+    st = _news_digest_meta("digest_cat:%d" % cat_id)
+    keys = [k for k, ks in _news_digest_keys().items() if ks.get("cat_id") == cat_id]
+    after_ts = now_ts - 24 * 3600
+    path = "/v1/categories/{0}/entries".format(cat_id)
+    cursor = _safe_int(st.get("cursor"), 0)
+    entries = []
+    if cursor <= 0:
+        # Cold window: the newest entries of the last 24h, like the old per-request fetch.
+        rr = _skill_miniflux_req(path, params={"order": "published_at", "direction": "desc", "limit": 100, "after": after_ts})
+        if not rr.get("ok"):
+            return {"ok": False, "error": "entries", "detail": rr}
+        entries = (rr.get("data") or {}).get("entries") or []
+    else:
+        max_pages = min(20, max(1, _safe_int(os.environ.get("NEWS_DIGEST_MAX_PAGES") or "5", 5)))
+        for _ in range(max_pages):
+            rr = _skill_miniflux_req(path, params={"order": "id", "direction": "asc", "after_entry_id": cursor, "after": after_ts, "limit": 100})
+            if not rr.get("ok"):
+                if not entries:
+                    return {"ok": False, "error": "entries", "detail": rr}
+                break
+            page = (rr.get("data") or {}).get("entries") or []
+            entries.extend(page)
+            for e in page:
+                cursor = max(cursor, _safe_int(e.get("id"), 0))
+            if len(page) < 100:
+                break
+    rows = []
+    fresh = []
+    for e in entries:
+        eid = _safe_int(e.get("id"), 0)
+        if eid <= 0:
+            continue
+        cursor = max(cursor, eid)
+        it = _news_digest_entry_item(e)
         try:
-            return bool(re.search(r"[\u4e00-\u9fff]", str(s or "")))
+            pub_ts = int(datetime.fromisoformat(it["published_at_raw"].replace("Z", "+00:00")).timestamp())
         except Exception:
-            return False
+            pub_ts = now_ts
+        is_video = 1 if _news__is_video_entry(it["title"], it["url"]) else 0
+        rows.append((cat_id, eid, pub_ts, is_video, json.dumps(it, ensure_ascii=False)))
+        fresh.append((eid, it))
+    conn = _news_cache_conn()
+    try:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT OR REPLACE INTO news_digest_window(cat_id, entry_id, published_ts, is_video, item_json) VALUES(?, ?, ?, ?, ?)",
+            rows,
+        )
+        cur.executemany(
+            "INSERT OR REPLACE INTO news_digest_flags(cat_key, entry_id, bl_ok, wl_ok, anchor_ok) VALUES(?, ?, ?, ?, ?)",
+            _news_digest_flag_rows(keys, fresh),
+        )
+        cur.execute("DELETE FROM news_digest_window WHERE cat_id=? AND published_ts<?", (cat_id, after_ts))
+        cur.execute("DELETE FROM news_digest_flags WHERE entry_id NOT IN (SELECT entry_id FROM news_digest_window)")
+        cur.execute(
+            "INSERT INTO news_cache_meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            ("digest_cat:%d" % cat_id, json.dumps({"cursor": cursor, "synced_ts": now_ts})),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return {"ok": True, "cat_id": cat_id, "added": len(rows)}
+
+
+def _news_digest_refresh_async(cat_id: int):
+    with _NEWS_DIGEST_LOCK:
+        if cat_id in _NEWS_DIGEST_INFLIGHT:
+            return
+        _NEWS_DIGEST_INFLIGHT.add(cat_id)
+
+    def _run():
+        try:
+            _news_digest_window_refresh(cat_id)
+        except Exception:
+            pass
+        finally:
+            with _NEWS_DIGEST_LOCK:
+                _NEWS_DIGEST_INFLIGHT.discard(cat_id)
+
+    threading.Thread(target=_run, name="news-digest-refresh", daemon=True).start()
+
+
+def _news_digest_window(key: str, fetch_lim: int) -> dict:
+    """Newest fetch_lim items of the category's last 24h, each with its precomputed "_filter" flags.
+
+    The window belongs to the Miniflux category the key resolves to, so aliases share it; a key
+    that matches no category keeps no state. Only a category that was never synced is fetched
+    inline; a stale window is served as is while a background refresh runs (NEWS_DIGEST_STALE_SEC).
+    """
+    warmup.note_use("news_digest")
+    now_ts = int(time.time())
+    after_ts = now_ts - 24 * 3600
+    ks = _news_digest_meta("digest:" + key)
+    cat_id = ks.get("cat_id")
+    if not isinstance(cat_id, int):
+        cats = _news_digest_categories()
+        if cats is None:
+            return {"ok": False, "error": "categories"}
+        cat_id = _news_digest_match_cat_id(key, cats)
+        if cat_id is None:
+            return {"ok": True, "cat_id": None, "after_ts": after_ts, "synced_ts": 0, "items": []}
+        _news_digest_attach(key, cat_id)
+    elif (now_ts - _safe_int(ks.get("used_ts"), 0)) > 3600:
+        # Last-use stamp for expiry; written at most hourly per key.
+        _news_digest_attach(key, cat_id, recompute=False)
+    cs = _news_digest_meta("digest_cat:%d" % cat_id)
+    if not cs:
+        res = _news_digest_window_refresh(cat_id)
+        if not res.get("ok"):
+            return res
+        cs = _news_digest_meta("digest_cat:%d" % cat_id)
+    elif (now_ts - _safe_int(cs.get("synced_ts"), 0)) > max(30, _safe_int(os.environ.get("NEWS_DIGEST_STALE_SEC") or "600", 600)):
+        _news_digest_refresh_async(cat_id)
+    out = {"ok": True, "cat_id": cat_id, "after_ts": after_ts, "synced_ts": _safe_int(cs.get("synced_ts"), 0), "items": []}
+    drop_video = (os.environ.get("NEWS_DROP_VIDEO") or "1").strip().lower() not in ("0", "false", "no", "off")
+    conn = _news_cache_conn()
     try:
-        tr_cap = int(os.environ.get("NEWS_CACHE_TRANSLATE_PER_REFRESH") or "40")
-    except Exception:
-        tr_cap = 40
-    if tr_cap < 0:
-        tr_cap = 0
-    if tr_cap > 120:
-        tr_cap = 120
-    tr_pairs = []
-    tr_idx = []
-    for i, it in enumerate(base_items):
-        if len(tr_pairs) >= tr_cap:
-            break
-        if not isinstance(it, dict):
-            continue
-        ttl = str(it.get("title") or "").strip()
-        sn = str(it.get("snippet") or "").strip()
-        if (not ttl) and (not sn):
+        rows = conn.execute(
+            "SELECT w.item_json, w.is_video, f.bl_ok, f.wl_ok, f.anchor_ok FROM news_digest_window w"
+            " JOIN news_digest_flags f ON f.cat_key=? AND f.entry_id=w.entry_id"
+            " WHERE w.cat_id=? AND w.published_ts>=? ORDER BY w.published_ts DESC, w.entry_id DESC LIMIT ?",
+            (key, cat_id, after_ts, int(fetch_lim)),
+        ).fetchall() or []
+    finally:
+        conn.close()
+    for raw, is_video, bl_ok, wl_ok, anchor_ok in rows:
+        if drop_video and is_video:
             continue
-        if _has_zh_local(ttl) and ((not sn) or _has_zh_local(sn)):
-            it["title_zh"] = ttl
-            if sn:
-                it["snippet_zh"] = sn
-            continue
-        tr_pairs.append({"title": ttl, "snippet": sn})
-        tr_idx.append(i)
-    if len(tr_pairs) > 0:
-        model = str(os.environ.get("NEWS_CACHE_TRANSLATE_MODEL") or "qwen3-vl:2b").strip()
-        if not model:
-            model = "qwen3-vl:2b"
         try:
-            tr_timeout = int(os.environ.get("NEWS_CACHE_TRANSLATE_TIMEOUT_SEC") or "8")
+            it = json.loads(raw)
         except Exception:
-            tr_timeout = 8
-        if tr_timeout < 3:
-            tr_timeout = 3
-        if tr_timeout > 20:
-            tr_timeout = 20
-        tr_ret = _news__translate_batch_to_zh(tr_pairs, model=model, timeout_sec=tr_timeout)
-        if isinstance(tr_ret, list):
-            for j in range(min(len(tr_ret), len(tr_idx))):
-                item_idx = int(tr_idx[j])
-                if item_idx < 0 or item_idx >= len(base_items):
-                    continue
-                tr = tr_ret[j] if isinstance(tr_ret[j], dict) else {}
-                zh_t = str(tr.get("title") or "").strip()
-                zh_s = str(tr.get("snippet") or "").strip()
-                if zh_t:
-                    base_items[item_idx]["title_zh"] = zh_t
-                if zh_s:
-                    base_items[item_idx]["snippet_zh"] = zh_s
-    # limit AI extraction per refresh to keep latency bounded
+            continue
+        it["_filter"] = (bl_ok, wl_ok, anchor_ok)
+        out["items"].append(it)
+    return out
+
+
+def _news_digest_expire(dead_keys: list, live_cats: list):
+    """Drop the state and flags of dead_keys, and the window of every category not in live_cats."""
+    live = sorted(set(int(c) for c in live_cats))
+    qs = ",".join("?" * len(live))
+    conn = _news_cache_conn()
     try:
-        ai_cap = int(os.environ.get("NEWS_CACHE_AI_PER_REFRESH") or "24")
-    except Exception:
-        ai_cap = 24
-    if ai_cap < 0:
-        ai_cap = 0
-    i = 0
-    for it in base_items:
-        use_ai = (i < ai_cap)
-        _news_cache_upsert_item(it, use_ai=use_ai)
-        i += 1
-    _news_cache_set_meta("last_refresh_ts", str(now_ts))
+        cur = conn.cursor()
+        for key in dead_keys:
+            cur.execute("DELETE FROM news_cache_meta WHERE k=?", ("digest:" + key,))
+            cur.execute("DELETE FROM news_digest_flags WHERE cat_key=?", (key,))
+        cur.execute("DELETE FROM news_digest_window WHERE cat_id NOT IN ({0})".format(qs), live)
+        cur.execute(
+            "DELETE FROM news_cache_meta WHERE k LIKE 'digest_cat:%' AND k NOT IN ({0})".format(qs),
+            ["digest_cat:%d" % c for c in live],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _news_digest_refresh_known():
+    """Refresh every category window a digest request used in the last NEWS_DIGEST_KEEP_DAYS (the warm-up job).
+
+    Keys are re-resolved against the current category list; keys unused for longer, or that no
+    longer match a category, are forgotten along with windows no remaining key points at.
+    """
+    keys = _news_digest_keys()
+    if not keys:
+        _news_digest_expire([], [])
+        return
+    cats = _news_digest_categories()
+    if cats is None:
+        raise RuntimeError("news_digest windows failed: categories")
+    now_ts = int(time.time())
+    keep_sec = max(1, _safe_int(os.environ.get("NEWS_DIGEST_KEEP_DAYS") or "7", 7)) * 86400
+    live = {}
+    dead = []
+    for key, st in keys.items():
+        cat_id = None
+        if (now_ts - _safe_int(st.get("used_ts"), 0)) <= keep_sec:
+            cat_id = _news_digest_match_cat_id(key, cats)
+        if cat_id is None:
+            dead.append(key)
+            continue
+        if st.get("cat_id") != cat_id:
+            _news_digest_attach(key, cat_id)
+        live.setdefault(cat_id, []).append(key)
+    _news_digest_expire(dead, list(live))
+    errs = []
+    for cat_id in sorted(live):
+        res = _news_digest_window_refresh(cat_id)
+        if not res.get("ok"):
+            errs.append(str(cat_id))
+    if errs:
+        raise RuntimeError("news_digest windows failed: " + ",".join(errs))
 
 
 def _news_query_anchor_profile(q_raw: str, q_en: str) -> dict:
@@ -8627,24 +10847,14 @@ def _news_query_anchor_profile(q_raw: str, q_en: str) -> dict:
     return {"groups": matched, "anchors": anchors}
 
 
-def _news_count_anchor_hits(anchor_list: list, texts: list) -> int:
-    if not anchor_list:
-        return 0
-    mix = " ".join([str(x or "").lower() for x in (texts or [])]).strip()
-    if not mix:
-        return 0
-    c = 0
-    for a in anchor_list:
-        s = str(a or "").lower().strip()
-        if s and (s in mix):
-            c += 1
-    return c
-
-
 def _news_cache_query(topic: str, limit: int = 5, do_refresh: bool = True) -> dict:
     _news_cache_init()
     if bool(do_refresh):
-        _news_cache_refresh_if_due(False)
+        warmup.note_use("news")
+        # With the warm-up job refreshing in the background, a request only refreshes inline
+        # when that job has fallen far behind (or never ran).
+        grace = _safe_int(os.environ.get("WARMUP_NEWS_INLINE_GRACE_SEC") or "1800", 1800) if warmup.enabled() else 0
+        _news_cache_refresh_if_due(False, grace_sec=grace)
     q_raw = str(topic or "").strip()
     q_en = _skill_translate_news_query_to_en(q_raw)
     q_mix = (q_raw + " " + q_en).strip()
@@ -8663,100 +10873,65 @@ def _news_cache_query(topic: str, limit: int = 5, do_refresh: bool = True) -> di
         s = _news_normalize_keyword_en(x)
         if s and (s not in tset_en):
             tset_en.append(s)
+    # Scored in SQL over the newest NEWS_QUERY_WINDOW_ROWS rows: exact tag/keyword hits come from
+    # the news_keywords index, substring and anchor hits from the precomputed lowercase columns.
+    window = min(50000, max(50, _safe_int(os.environ.get("NEWS_QUERY_WINDOW_ROWS") or "400", 400)))
+    need_n = max(1, int(limit))
+    anchors = [str(a or "").lower().strip() for a in anchor_list]
+    anchors = [a for a in anchors if a]
+    kw_conds = []
+    kw_params = []
+    if tset_en:
+        kw_conds.append("(term IN (" + ",".join(["?"] * len(tset_en)) + ") AND kind IN ('tag', 'kw_en'))")
+        kw_params += tset_en
+    if tset_zh:
+        kw_conds.append("(term IN (" + ",".join(["?"] * len(tset_zh)) + ") AND kind = 'kw_zh')")
+        kw_params += tset_zh
+    toks = tset_en + tset_zh
+    text_sql = " + ".join(["(instr(w.search_text, ?) > 0)"] * len(toks)) or "0"
+    anchor_sql = " + ".join(["(instr(w.anchor_text, ?) > 0)"] * len(anchors)) or "0"
+    local_q = ("墨尔本" in q_raw) or ("维州" in q_raw) or ("澳洲" in q_raw)
+    local_src = " OR ".join(["instr(lower(source), '" + x + "') > 0" for x in ("abc", "9news", "the age", "smh", "guardian")])
+    kw_sql = "0"
+    if kw_conds:
+        kw_sql = "(SELECT COALESCE(SUM(CASE kind WHEN 'tag' THEN 3.0 ELSE 2.5 END), 0) FROM news_keywords k WHERE k.url = w.url AND (" + " OR ".join(kw_conds) + "))"
+    sql = (
+        "WITH w AS (SELECT url, source, published_at, search_text, anchor_text FROM news_cache_entries ORDER BY published_at DESC LIMIT ?),"
+        " m AS MATERIALIZED (SELECT w.url, w.source, w.published_at, " + kw_sql + " AS kw_score,"
+        "  (" + text_sql + ") AS text_hits, (" + anchor_sql + ") AS anchor_hits FROM w),"
+        " s AS MATERIALIZED (SELECT url, published_at, anchor_hits, kw_score + 1.4 * text_hits"
+        "  + CASE WHEN anchor_hits > 0 THEN 2.2 * anchor_hits WHEN ? THEN -2.5 ELSE 0 END"
+        "  + CASE WHEN ? AND (" + local_src + ") THEN 0.7 ELSE 0 END + ? AS score FROM m),"
+        " top AS (SELECT url, anchor_hits, score, published_at FROM s WHERE score > 0"
+        "  ORDER BY (? AND anchor_hits > 0) DESC, score DESC, published_at DESC LIMIT ?)"
+        " SELECT e.url, e.title, e.snippet, e.title_zh, e.snippet_zh, e.source, e.published_at, top.anchor_hits, top.score"
+        " FROM top JOIN news_cache_entries e ON e.url = top.url"
+        " ORDER BY (? AND top.anchor_hits > 0) DESC, top.score DESC, top.published_at DESC"
+    )
+    grp = 1 if anchor_groups else 0
+    params = [window] + kw_params + toks + anchors + [grp, 1 if local_q else 0, 0.2 if not toks else 0.0, grp, need_n, grp]
     conn = _news_cache_conn()
     rows = []
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT url, title, snippet, title_zh, snippet_zh, source, published_at, topic_tags, keywords_en, keywords_zh FROM news_cache_entries ORDER BY published_at DESC LIMIT 400"
-        )
-        rows = cur.fetchall() or []
+        rows = conn.execute(sql, tuple(params)).fetchall() or []
     except Exception:
         rows = []
     finally:
         conn.close()
-    scored = []
-    for row in rows:
-        url = str(row[0] or "")
-        title = str(row[1] or "")
-        snippet = str(row[2] or "")
-        title_zh = str(row[3] or "")
-        snippet_zh = str(row[4] or "")
-        source = str(row[5] or "")
-        published_at = str(row[6] or "")
-        try:
-            tags = json.loads(str(row[7] or "[]"))
-        except Exception:
-            tags = []
-        try:
-            kws_en = json.loads(str(row[8] or "[]"))
-        except Exception:
-            kws_en = []
-        try:
-            kws_zh = json.loads(str(row[9] or "[]"))
-        except Exception:
-            kws_zh = []
-        score = 0.0
-        tl = (title + " " + snippet).lower()
-        tc = title + " " + snippet
-        for t in tset_en:
-            if t in [str(x).lower() for x in tags]:
-                score += 3.0
-            if t in [str(x).lower() for x in kws_en]:
-                score += 2.5
-            if t in tl:
-                score += 1.4
-        for t in tset_zh:
-            if t in [str(x) for x in kws_zh]:
-                score += 2.5
-            if t in tc:
-                score += 1.4
-        anchor_hits = _news_count_anchor_hits(
-            anchor_list,
-            [
-                title,
-                snippet,
-                source,
-                " ".join([str(x) for x in tags or []]),
-                " ".join([str(x) for x in kws_en or []]),
-                " ".join([str(x) for x in kws_zh or []]),
-            ],
-        )
-        if anchor_hits > 0:
-            score += float(anchor_hits) * 2.2
-        elif len(anchor_groups) > 0:
-            # For topic-constrained queries, down-rank rows with zero anchor hits.
-            score -= 2.5
-        if ("墨尔本" in q_raw) or ("维州" in q_raw) or ("澳洲" in q_raw):
-            src_l = source.lower()
-            if ("abc" in src_l) or ("9news" in src_l) or ("the age" in src_l) or ("smh" in src_l) or ("guardian" in src_l):
-                score += 0.7
-        if (len(tset_en) + len(tset_zh)) == 0:
-            score += 0.2
-        if score <= 0:
-            continue
-        scored.append(
+    out_items = []
+    for url, title, snippet, title_zh, snippet_zh, source, published_at, anchor_hits, score in rows:
+        out_items.append(
             {
-                "score": score,
-                "anchor_hits": anchor_hits,
-                "title": title,
-                "title_voice": (title_zh if title_zh else title),
-                "snippet": (snippet_zh if snippet_zh else snippet),
-                "source": source,
-                "url": url,
-                "published_at": published_at,
+                "score": float(score or 0.0),
+                "anchor_hits": int(anchor_hits or 0),
+                "title": str(title or ""),
+                "title_voice": str(title_zh or "") or str(title or ""),
+                "snippet": str(snippet_zh or "") or str(snippet or ""),
+                "source": str(source or ""),
+                "url": str(url or ""),
+                "published_at": str(published_at or ""),
             }
         )
-    scored.sort(key=lambda x: float(x.get("score") or 0.0), reverse=True)
-    out_items = scored[: max(1, int(limit))]
-    if len(anchor_groups) > 0:
-        anchored = [x for x in scored if int(x.get("anchor_hits") or 0) > 0]
-        if len(anchored) >= 1:
-            need_n = max(1, int(limit))
-            out_items = anchored[:need_n]
-            if len(out_items) < need_n:
-                rest = [x for x in scored if x not in out_items]
-                out_items = out_items + rest[: (need_n - len(out_items))]
     return {"ok": True, "items": out_items, "query_raw": q_raw, "query_en": q_en, "query_mix": q_mix}
 
 
@@ -8768,7 +10943,7 @@ def _skill_miniflux_req(path: str, params: dict = None) -> dict:
     url = base_url.rstrip("/") + str(path or "")
     headers = {"X-Auth-Token": token}
     try:
-        r = requests.get(url, headers=headers, params=(params or {}), timeout=6)
+        r = http_pool.coalesced("GET", url, upstream="miniflux", headers=headers, params=(params or {}), timeout=6)
         code = int(getattr(r, "status_code", 0) or 0)
         if code >= 400:
             return {"ok": False, "status": code, "text": str(r.text or "")[:500]}
@@ -8815,7 +10990,7 @@ def _skill_miniflux_search(topic: str, limit: int = 5, days: int = 14) -> dict:
         now_dt = datetime.now(ZoneInfo(tz_name))
     except Exception:
         now_dt = datetime.now()
-    published_after = (now_dt - timedelta(days=dd)).isoformat()
+    published_after = (now_dt - timedelta(days=dd)).replace(second=0, microsecond=0).isoformat()
 
     if _skill_debug_enabled():
         _skill_debug_log("news_search_query_raw=" + q_raw)
@@ -9066,6 +11241,7 @@ def skill_knowledge_lookup(query: str, scope: str = "") -> dict:
     hit_count = int(rr.get("hit_count") or 0)
     vector_hit_count = int(rr.get("vector_hit_count") or 0)
     rag_route = str(rr.get("route") or "").strip()
+    rag_legs = rr.get("legs") if isinstance(rr.get("legs"), dict) else {}
     query_cn = str(rr.get("query_cn") or "").strip()
     query_en = str(rr.get("query_en") or "").strip()
     bilingual = bool(rr.get("bilingual"))
@@ -9093,14 +11269,14 @@ def skill_knowledge_lookup(query: str, scope: str = "") -> dict:
             facts=facts[:5],
             sources=sources[:5],
             next_actions=next_actions,
-            meta={"skill": "knowledge_lookup", "query": q, "scope": sc, "hit_count": hit_count, "vector_hit_count": vector_hit_count, "route": rag_route, "query_cn": query_cn, "query_en": query_en, "bilingual": bilingual},
+            meta={"skill": "knowledge_lookup", "query": q, "scope": sc, "hit_count": hit_count, "vector_hit_count": vector_hit_count, "route": rag_route, "query_cn": query_cn, "query_en": query_en, "bilingual": bilingual, "legs": rag_legs},
         )
     except Exception as e:
         ok = False
         _skill_log_json("tool_call_error", request_id=rid, tool="skill.knowledge_lookup", data={"error": str(e)})
         return _skill_result("资料库查询失败。", facts=["资料库查询失败，请稍后再试。"])
     finally:
-        _skill_call_end("skill.knowledge_lookup", rid, started, ok=ok, data={"hit_count": hit_count, "vector_hit_count": vector_hit_count, "route": rag_route})
+        _skill_call_end("skill.knowledge_lookup", rid, started, ok=ok, data={"hit_count": hit_count, "vector_hit_count": vector_hit_count, "route": rag_route, "legs": rag_legs})
 
 
 @mcp.tool(name="skill.memory_upsert", description="Upsert one text memory into Qdrant with embedding.")
@@ -9119,7 +11295,7 @@ def skill_memory_upsert(text: str, source: str = "manual", user_id: str = "defau
         q = str(text or "").strip()
         if not q:
             return _skill_result("写入失败：text 不能为空。", facts=["参数 text 不能为空。"])
-        vec = _skill_embed_text(q)
+        vec = _skill_embed_text(q, cache=False)
         if not vec:
             return _skill_result("写入失败：embedding 失败或维度不匹配。", facts=["请确认 EMBED_MODEL 与 QDRANT_VECTOR_SIZE 一致。"])
         meta = {}
@@ -9343,6 +11519,179 @@ def _score_and_pick_rule(rules: list, ctx: RouterContext) -> dict:
     )
 
 
+# ---- Route decision cache (memory LRU + TTL, persisted to SQLite) ----
+# Keyed by normalized utterance + language + router model. Only the LLM router's label is
+# stored: it is the one routing step that costs an upstream call. The rule scorer is cheap
+# and changes with the code, so its picks are recomputed on every request.
+_ROUTE_CACHE_VERSION = "1"
+_ROUTE_CACHE_LOCK = threading.Lock()
+_ROUTE_CACHE_MEM = OrderedDict()
+_ROUTE_CACHE_STATE = {"loaded_path": "", "writes": 0}
+_ROUTE_CACHE_STATS = {}
+
+
+def _route_cache_enabled() -> bool:
+    v = str(os.environ.get("ROUTE_CACHE_ENABLE") or "1").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def _route_cache_db_path() -> str:
+    p = str(os.environ.get("ROUTE_CACHE_DB") or "").strip()
+    if p:
+        try:
+            os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+        except Exception:
+            pass
+        return p
+    return os.path.join(_rag_data_dir(), "route_cache.sqlite3")
+
+
+def _route_cache_init(conn):
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS route_cache(key TEXT PRIMARY KEY, kind TEXT, value TEXT, ts INTEGER)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_route_cache_ts ON route_cache(ts)")
+
+
+def _route_cache_conn():
+    return _sqlite_conn(_route_cache_db_path(), _route_cache_init, "route_cache")
+
+
+def _route_cache_ttl_sec() -> int:
+    return max(60, _safe_int(os.environ.get("ROUTE_CACHE_TTL_SEC") or "604800", 604800))
+
+
+def _route_cache_mem_max() -> int:
+    n = _safe_int(os.environ.get("ROUTE_CACHE_MEM_ITEMS") or "2048", 2048)
+    return max(16, min(100000, n))
+
+
+def _route_cache_normalize(text: str) -> str:
+    t = unicodedata.normalize("NFKC", str(text or "")).lower()
+    t = re.sub(r"\s+", " ", t).strip()
+    return t.rstrip("?？!！。.,，~～ ")
+
+
+def _route_cache_key(kind: str, text: str, language: str = "") -> str:
+    norm = _route_cache_normalize(text)
+    if not norm:
+        return ""
+    raw = "\n".join([_ROUTE_CACHE_VERSION, kind, _llm_router_model(), str(language or ""), norm])
+    return hashlib.sha1(raw.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def _route_cache_stat(kind: str, field: str):
+    st = _ROUTE_CACHE_STATS.setdefault(kind, {"hits": 0, "misses": 0, "writes": 0})
+    st[field] += 1
+
+
+def _route_cache_mem_put(key: str, kind: str, value: dict, ts: int):
+    _ROUTE_CACHE_MEM[key] = (kind, value, ts)
+    _ROUTE_CACHE_MEM.move_to_end(key)
+    limit = _route_cache_mem_max()
+    while len(_ROUTE_CACHE_MEM) > limit:
+        _ROUTE_CACHE_MEM.popitem(last=False)
+
+
+def _route_cache_load():
+    # First use per DB path: pull the most recent entries back into memory, so restarts
+    # keep their hit rate and the request path never has to read SQLite.
+    path = _route_cache_db_path()
+    with _ROUTE_CACHE_LOCK:
+        if _ROUTE_CACHE_STATE.get("loaded_path") == path:
+            return
+        _ROUTE_CACHE_MEM.clear()
+        _ROUTE_CACHE_STATE["loaded_path"] = path
+    rows = []
+    conn = None
+    if not os.path.exists(path):
+        return
+    try:
+        conn = _route_cache_conn()
+        rows = conn.execute(
+            "SELECT key, kind, value, ts FROM route_cache WHERE ts>=? ORDER BY ts DESC LIMIT ?",
+            (int(time.time()) - _route_cache_ttl_sec(), _route_cache_mem_max()),
+        ).fetchall()
+    except Exception:
+        rows = []
+    finally:
+        if conn is not None:
+            conn.close()
+    with _ROUTE_CACHE_LOCK:
+        for key, kind, value, ts in reversed(rows):
+            try:
+                obj = json.loads(value)
+            except Exception:
+                continue
+            if isinstance(obj, dict):
+                _route_cache_mem_put(str(key), str(kind), obj, int(ts or 0))
+
+
+def _route_cache_get(kind: str, key: str):
+    if (not key) or (not _route_cache_enabled()):
+        return None
+    _route_cache_load()
+    with _ROUTE_CACHE_LOCK:
+        it = _ROUTE_CACHE_MEM.get(key)
+        if it is not None and (int(time.time()) - int(it[2])) > _route_cache_ttl_sec():
+            _ROUTE_CACHE_MEM.pop(key, None)
+            it = None
+        if it is None:
+            _route_cache_stat(kind, "misses")
+            return None
+        _ROUTE_CACHE_MEM.move_to_end(key)
+        _route_cache_stat(kind, "hits")
+        return it[1]
+
+
+def _route_cache_put(kind: str, key: str, value: dict):
+    if (not key) or (not _route_cache_enabled()):
+        return
+    now = int(time.time())
+    with _ROUTE_CACHE_LOCK:
+        _route_cache_mem_put(key, kind, value, now)
+        _route_cache_stat(kind, "writes")
+        _ROUTE_CACHE_STATE["writes"] = int(_ROUTE_CACHE_STATE.get("writes") or 0) + 1
+        do_trim = (_ROUTE_CACHE_STATE["writes"] % 200) == 0
+    conn = None
+    try:
+        conn = _route_cache_conn()
+        conn.execute(
+            "INSERT INTO route_cache(key, kind, value, ts) VALUES(?,?,?,?) "
+            "ON CONFLICT(key) DO UPDATE SET kind=excluded.kind, value=excluded.value, ts=excluded.ts",
+            (key, kind, json.dumps(value, ensure_ascii=False), now),
+        )
+        if do_trim:
+            conn.execute("DELETE FROM route_cache WHERE ts<?", (now - _route_cache_ttl_sec(),))
+            conn.execute(
+                "DELETE FROM route_cache WHERE key IN (SELECT key FROM route_cache ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                (max(1000, _route_cache_mem_max() * 4),),
+            )
+        conn.commit()
+    except Exception:
+        pass
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _route_cache_stats() -> dict:
+    with _ROUTE_CACHE_LOCK:
+        by_kind = {k: dict(v) for k, v in _ROUTE_CACHE_STATS.items()}
+        mem_items = len(_ROUTE_CACHE_MEM)
+    out = {"enabled": _route_cache_enabled(), "mem_items": mem_items, "ttl_sec": _route_cache_ttl_sec(), "by_kind": {}}
+    hits = 0
+    total = 0
+    for k, v in by_kind.items():
+        n = int(v["hits"]) + int(v["misses"])
+        hits += int(v["hits"])
+        total += n
+        out["by_kind"][k] = dict(v, hit_rate=round(float(v["hits"]) / n, 3) if n else 0.0)
+    out["hits"] = hits
+    out["misses"] = total - hits
+    out["hit_rate"] = round(float(hits) / total, 3) if total else 0.0
+    return out
+
+
 def _clarify_route_to_utterance(route_name: str) -> str:
     return clarify_route_to_utterance(route_name)
 
@@ -9391,15 +11740,23 @@ def _consume_clarify_followup_route(ctx: RouterContext) -> str:
 
 
 def _compose_compound_answer(ctx: RouterContext, md: str, rule_by_name: dict) -> dict:
-    return compose_compound_answer(
-        ctx,
-        md,
-        rule_by_name,
-        route_request_fn=lambda text, language, llm_allow: _route_request_impl_impl(text=text, language=language, _llm_allow=llm_allow),
-        wrap_fn=_skill_wrap_any_result,
-        skill_result_fn=_skill_result,
-        debug_log=_skill_debug_log,
-    )
+    # Segments stream as whole parts of the joined answer; what a segment's skill emits on
+    # its own (e.g. news_digest) would not be a prefix of it, so it is kept off the sink.
+    sink = _STREAM_SINK.get()
+    token = _STREAM_SINK.set(None)
+    try:
+        return compose_compound_answer(
+            ctx,
+            md,
+            rule_by_name,
+            route_request_fn=lambda text, language, llm_allow: _route_request_impl_impl(text=text, language=language, _llm_allow=llm_allow),
+            wrap_fn=_skill_wrap_any_result,
+            skill_result_fn=_skill_result,
+            debug_log=_skill_debug_log,
+            emit_fn=lambda text: _stream_emit_to(sink, text),
+        )
+    finally:
+        _STREAM_SINK.reset(token)
 
 
 def _skill_wrap_any_result(raw, route_name: str, mode: str, extra_meta: Optional[dict] = None) -> dict:
@@ -9413,6 +11770,85 @@ def _skill_wrap_any_result(raw, route_name: str, mode: str, extra_meta: Optional
     )
 
 
+# --- ANSWER: speculative execution of near-tied routes ---
+_ANSWER_SPEC_LOCK = threading.Lock()
+_ANSWER_SPEC_STATE = {"pool": None}
+
+
+def _answer_speculative_enabled() -> bool:
+    v = str(os.environ.get("ANSWER_SPECULATIVE_ENABLE") or "1").strip().lower()
+    return v not in ("0", "false", "no", "off")
+
+
+def _answer_spec_pool():
+    with _ANSWER_SPEC_LOCK:
+        pool = _ANSWER_SPEC_STATE.get("pool")
+        if pool is None:
+            workers = max(2, min(16, _safe_int(os.environ.get("ANSWER_SPECULATIVE_WORKERS") or "8", 8)))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="answer-spec")
+            _ANSWER_SPEC_STATE["pool"] = pool
+        return pool
+
+
+def _answer_run_speculative(legs: list) -> dict:
+    """Run [(route, fn), ...] concurrently; the first strong result wins.
+
+    Strong means _skill_text_is_weak_or_empty() is false for its final_text. Legs
+    still pending when a winner appears (or at the deadline) are cancelled; one
+    already running finishes in its worker and its result is dropped. Ties within
+    one wake-up go to the earlier (higher-scored) leg.
+
+    Legs do not stream: each records its _stream_emit parts, and only the winner's are
+    passed on to the caller's stream sink.
+    """
+    pool = _answer_spec_pool()
+    sink = _STREAM_SINK.get()
+    deadline = _skill_deadline_clamp(max(0.5, float(_safe_int(os.environ.get("ANSWER_SPECULATIVE_DEADLINE_MS") or "12000", 12000)) / 1000.0))
+    order = [name for name, _fn in legs]
+    t0 = time.perf_counter()
+
+    emitted = {name: [] for name in order}
+
+    def _timed(name, fn):
+        _STREAM_SINK.set(emitted[name].append)
+        t = time.perf_counter()
+        res = fn()
+        return res, int((time.perf_counter() - t) * 1000.0)
+
+    futs = {}
+    for name, fn in legs:
+        futs[pool.submit(copy_context().run, _timed, name, fn)] = name
+    pending = set(futs.keys())
+    info = {}
+    results = {}
+    winner = ""
+    while pending and (not winner):
+        remain = deadline - (time.perf_counter() - t0)
+        if remain <= 0:
+            break
+        done, pending = futures_wait(pending, timeout=remain, return_when=FIRST_COMPLETED)
+        for fut in sorted(done, key=lambda f: order.index(futs[f])):
+            name = futs[fut]
+            try:
+                res, ms = fut.result()
+            except Exception as e:
+                info[name] = {"ms": int((time.perf_counter() - t0) * 1000.0), "status": "error", "error": str(e)[:200]}
+                continue
+            results[name] = res
+            strong = isinstance(res, dict) and (not _skill_text_is_weak_or_empty(str(res.get("final_text") or "")))
+            info[name] = {"ms": ms, "status": "weak"}
+            if strong and (not winner):
+                winner = name
+                info[name]["status"] = "won"
+    for fut in pending:
+        fut.cancel()
+        info[futs[fut]] = {"ms": int((time.perf_counter() - t0) * 1000.0), "status": "cancelled" if winner else "timeout"}
+    if winner and sink is not None:
+        for part in list(emitted[winner]):
+            _stream_emit_to(sink, part)
+    return {"winner": winner, "results": results, "legs": {n: info.get(n) for n in order}, "ms": int((time.perf_counter() - t0) * 1000.0)}
+
+
 # --- ANSWER: fallback chain implementation ---
 def _answer_fallback_local_first_impl(ctx: RouterContext, candidates=None) -> dict:
     q = str(ctx.text_raw or "").strip()
@@ -9827,16 +12263,9 @@ def _is_calendar_create_intent(text: str) -> bool:
 
 def _build_answer_route_rules_impl() -> list:
     def _score_bills(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["账单", "发票", "到期", "due", "处理新账单", "检查账单", "未来7天", "今天到期", "bpay", "bill", "bills", "invoice", "风险", "逾期"]
-        neg_keys = ["模板", "样例", "格式", "template", "sample", "example", "form"]
-        rag_hints = ["资料库", "家庭资料库", "在资料库里", "knowledge base", "home knowledge"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        neg_hit = False
-        if hit:
-            neg_hit = any(k in t for k in neg_keys if not k.isascii()) or any(k in tl for k in neg_keys if k.isascii())
-        rag_hint_hit = any(k in t for k in rag_hints if not k.isascii()) or any(k in tl for k in rag_hints if k.isascii())
+        hit = ctx.has("bills")
+        neg_hit = hit and ctx.has("bills_neg")
+        rag_hint_hit = ctx.has("rag_hint")
         if ctx.debug:
             _skill_debug_log("bills_neg_hit=" + str(bool(neg_hit)))
             _skill_debug_log("bills_rag_hint_hit=" + str(bool(hit and rag_hint_hit)))
@@ -9844,7 +12273,7 @@ def _build_answer_route_rules_impl() -> list:
             return 0.0
         if hit and rag_hint_hit:
             return 0.0
-        if hit and (("风险" in t) or ("逾期" in t) or ("risk" in tl) or ("overdue" in tl)):
+        if hit and ctx.has("bills_risk"):
             return 0.98
         return 0.95 if hit else 0.0
 
@@ -9860,10 +12289,8 @@ def _build_answer_route_rules_impl() -> list:
 
     def _score_holiday(ctx: RouterContext) -> float:
         t = ctx.text_raw
-        tl = t.lower()
-        keys = ["公众假期", "假期", "holiday", "公休"]
         hit = (("下一个" in t) and ("假期" in t)) or (("最近" in t) and ("假期" in t))
-        hit = hit or any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+        hit = hit or ctx.has("holiday")
         return 0.93 if hit else 0.0
 
     def _handle_holiday(ctx: RouterContext):
@@ -9877,13 +12304,12 @@ def _build_answer_route_rules_impl() -> list:
     def _score_calendar(ctx: RouterContext) -> float:
         t = ctx.text_raw
         tl = t.lower()
-        keys = ["日程", "日历", "安排", "会议", "appointment", "calendar", "提醒"]
         if _is_calendar_create_intent(t):
             return 0.94
-        if ("账单" in t) or ("发票" in t) or ("bill" in tl) or ("invoice" in tl):
+        if ctx.has("calendar_bill"):
             return 0.0
         hit = (("今天有什么" in t) or ("接下来" in t and "天" in t and "日程" in t))
-        hit = hit or any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+        hit = hit or ctx.has("calendar")
         if hit:
             return 0.91
         availability_hit = (
@@ -9939,42 +12365,25 @@ def _build_answer_route_rules_impl() -> list:
 
     def _score_weather(ctx: RouterContext) -> float:
         t = ctx.text_raw
-        tl = t.lower()
-        keys = ["天气", "温度", "温", "下雨", "降雨", "大风", "风速", "湿度", "rain", "weather", "带伞", "很热", "很冷", "外套"]
         hit = (("明天天气" in t) or ("接下来" in t and "天" in t and "天气" in t))
-        hit = hit or any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+        hit = hit or ctx.has("weather")
         return 0.9 if hit else 0.0
 
     def _handle_weather(ctx: RouterContext):
         return _route_request_impl(text=("天气 " + ctx.text_raw), language=ctx.language, _llm_allow=False)
 
     def _score_music(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        actions = [
-            "播放", "播", "放", "听", "暂停", "继续", "下一首", "上一首", "音量", "静音",
-            "mute", "play", "pause", "next", "previous", "volume", "停止", "listen"
-        ]
-        music_ctx = ["音乐", "spotify", "song", "music", "白噪音", "歌曲", "歌", "一首", "歌单", "playlist", "专辑"]
-        room_ctx = ["卧室", "客厅", "主卧", "游戏室", "车库", "厨房", "音箱", "电视", "speaker", "tv", "media player"]
-        action_hit = any(k in t for k in actions if not k.isascii()) or any(k in tl for k in actions if k.isascii())
-        if not action_hit:
+        if not ctx.has("music_action"):
             return 0.0
-        ctx_hit = any(k in t for k in music_ctx if not k.isascii()) or any(k in tl for k in music_ctx if k.isascii())
-        if ctx_hit:
+        if ctx.has("music_ctx"):
             return 0.89
-        room_hit = any(k in t for k in room_ctx if not k.isascii()) or any(k in tl for k in room_ctx if k.isascii())
-        return 0.82 if room_hit else 0.7
+        return 0.82 if ctx.has("music_room") else 0.7
 
     def _handle_music(ctx: RouterContext):
         return _route_request_impl(text=ctx.text_raw, language=ctx.language, _llm_allow=False)
 
     def _score_briefing_rule(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["晨间简报", "morning brief", "早报", "晚间简报", "evening brief", "总结今天"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.96 if hit else 0.0
+        return 0.96 if ctx.has("briefing") else 0.0
 
     def _handle_briefing_rule(ctx: RouterContext):
         t = str(ctx.text_raw or "").strip().lower()
@@ -9995,11 +12404,7 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(final, facts=facts, sources=[], next_actions=actions, meta={"route": "briefing_rule"})
 
     def _score_plan_rule(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["学习计划", "study plan", "训练计划"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.95 if hit else 0.0
+        return 0.95 if ctx.has("plan") else 0.0
 
     def _handle_plan_rule(ctx: RouterContext):
         final = "给你一个 4 周学习框架：第1周打基础，第2周做小练习，第3周做一个完整小项目，第4周复盘并补弱项。每周至少一次输出总结。"
@@ -10012,11 +12417,7 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(final, facts=facts, sources=[], next_actions=actions, meta={"route": "plan_rule"})
 
     def _score_productivity_rule(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["提高效率", "专注", "拖延"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.94 if hit else 0.0
+        return 0.94 if ctx.has("productivity") else 0.0
 
     def _handle_productivity_rule(ctx: RouterContext):
         final = "可执行建议：1) 用 25 分钟专注块启动任务；2) 每次只保留一个当前任务；3) 先做 5 分钟最小动作打破拖延。你要的话我可以按你的作息给一个今日版执行表。"
@@ -10027,17 +12428,7 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(final, facts=facts, sources=[], next_actions=actions, meta={"route": "productivity_rule"})
 
     def _score_chitchat(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = [
-            "笑话", "讲个笑话", "joke",
-            "晚饭", "今晚吃什么", "吃什么",
-            "周末去哪玩", "去哪玩", "玩什么",
-            "总结今天", "帮我总结今天", "晚间简报", "简报",
-            "明天要准备什么", "焦虑", "压力大", "anxious", "anxiety",
-        ]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.94 if hit else 0.0
+        return 0.94 if ctx.has("chitchat") else 0.0
 
     def _handle_chitchat(ctx: RouterContext):
         q = str(ctx.text_raw or "").strip()
@@ -10096,11 +12487,7 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(final, facts=["目标", "三步拆分", "25 分钟专注块"], sources=[], next_actions=[], meta={"route": "chitchat"})
 
     def _score_template(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["模板", "template", "sample", "example", "form", "格式", "样例", "invoice template", "tax invoice"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.95 if hit else 0.0
+        return 0.95 if ctx.has("template") else 0.0
 
     def _handle_template(ctx: RouterContext):
         t = str(ctx.text_raw or "").strip()
@@ -10158,12 +12545,7 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(final, facts=facts[:5], sources=sources[:5], next_actions=[], meta={"route": "template_web", "query": used_query, "fallback_candidates": True})
 
     def _score_datetime(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys_cn = ["现在几点", "几点了", "当前时间", "今天几号", "今天日期", "几号了", "今天星期几", "星期几", "明天几号", "后天几号", "这周几号到几号", "本周日期范围", "发薪", "发工资", "工资日", "薪水日"]
-        keys_en = ["what time", "time now", "today date", "what day today", "tomorrow date"]
-        hit = any(k in t for k in keys_cn) or any(k in tl for k in keys_en)
-        return 0.92 if hit else 0.0
+        return 0.92 if ctx.has("datetime") else 0.0
 
     def _handle_datetime(ctx: RouterContext):
         now = ctx.now_dt
@@ -10198,21 +12580,13 @@ def _build_answer_route_rules_impl() -> list:
         return _skill_result(txt, facts=[txt], sources=[], next_actions=[], meta={"route": "datetime"})
 
     def _score_news(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["新闻", "本地新闻", "世界新闻", "科技新闻", "热点", "news", "headline", "headlines"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.87 if hit else 0.0
+        return 0.87 if ctx.has("news") else 0.0
 
     def _handle_news(ctx: RouterContext):
         return _skill_news_brief_core(topic=ctx.text_raw, limit=5)
 
     def _score_rag(ctx: RouterContext) -> float:
-        t = ctx.text_raw
-        tl = t.lower()
-        keys = ["家庭资料库", "资料库", "在资料库里", "搜内容", "保修", "说明书", "发票", "合同", "knowledge base", "home knowledge", "search home knowledge"]
-        hit = any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
-        return 0.86 if hit else 0.0
+        return 0.86 if ctx.has("rag") else 0.0
 
     def _handle_rag(ctx: RouterContext):
         rq, rf = _rag_extract_content_query(ctx.text_raw)
@@ -10242,6 +12616,20 @@ def _build_answer_route_rules_impl() -> list:
     ]
 
 
+_ANSWER_ROUTE_RULES_LOCK = threading.Lock()
+_ANSWER_ROUTE_RULES: list = []
+
+
+def _answer_route_rules() -> list:
+    # The rules are stateless closures over module functions; build them once per process.
+    if _ANSWER_ROUTE_RULES:
+        return _ANSWER_ROUTE_RULES
+    with _ANSWER_ROUTE_RULES_LOCK:
+        if not _ANSWER_ROUTE_RULES:
+            _ANSWER_ROUTE_RULES.extend(_build_answer_route_rules_impl())
+    return _ANSWER_ROUTE_RULES
+
+
 # --- ANSWER: debug helpers ---
 def _debug_pick_route_for_text(text: str, mode: str = "local_first") -> dict:
     ctx = RouterContext(
@@ -10252,7 +12640,7 @@ def _debug_pick_route_for_text(text: str, mode: str = "local_first") -> dict:
         last_clarify=_CLARIFY_MEMORY.get("default"),
         now_dt=_now_local(),
     )
-    rules = _build_answer_route_rules_impl()
+    rules = _answer_route_rules()
     picked = _score_and_pick_rule(rules, ctx)
     cands = sanitize_route_candidates(picked.get("candidates") or [])
     top = cands[0] if len(cands) > 0 else {}
@@ -10318,7 +12706,7 @@ def _skill_answer_question_impl(text: str, mode: str = "local_first") -> dict:
             "clarify_memory_get": lambda: _CLARIFY_MEMORY.get("default"),
             "now_local": _now_local,
             "consume_clarify_followup_route": _consume_clarify_followup_route,
-            "build_answer_route_rules": _build_answer_route_rules_impl,
+            "build_answer_route_rules": _answer_route_rules,
             "compose_compound_answer": _compose_compound_answer,
             "skill_wrap_any_result": _skill_wrap_any_result,
             "score_and_pick_rule": _score_and_pick_rule,
@@ -10327,6 +12715,7 @@ def _skill_answer_question_impl(text: str, mode: str = "local_first") -> dict:
             "env_get": lambda k, d="": str(os.environ.get(k) or d),
             "clarify_result": _clarify_result,
             "answer_fallback_local_first": _answer_fallback_local_first_impl,
+            "run_speculative": _answer_run_speculative if _answer_speculative_enabled() else None,
         },
     )
 
@@ -10472,7 +12861,7 @@ def debug_ha_connectivity() -> dict:
         headers = {}
         if token:
             headers["Authorization"] = "Bearer " + token
-        r = requests.get(base.rstrip("/") + "/api/", headers=headers, timeout=5)
+        r = http_pool.get(base.rstrip("/") + "/api/", upstream="ha", headers=headers, timeout=5)
         out["api_status"] = str(int(getattr(r, "status_code", 0) or 0))
         out["ok"] = bool(int(getattr(r, "status_code", 0) or 0) < 400)
     except Exception as e:
@@ -10771,76 +13160,29 @@ def _poi_cache_ttl() -> int:
     return n
 
 
-def _poi_cache_db_path() -> str:
-    return "/app/data/poi_cache.sqlite3"
-
-
-def _poi_cache_conn():
-    p = _poi_cache_db_path()
-    try:
-        os.makedirs(os.path.dirname(p), exist_ok=True)
-    except Exception:
-        pass
-    conn = sqlite3.connect(p)
-    cur = conn.cursor()
-    cur.execute("CREATE TABLE IF NOT EXISTS poi_cache(query_key TEXT PRIMARY KEY, ts INTEGER, text TEXT)")
-    cur.execute("CREATE TABLE IF NOT EXISTS poi_fee_cache(url_key TEXT PRIMARY KEY, ts INTEGER, domain TEXT, lines TEXT)")
-    conn.commit()
-    return conn
-
-
 def _poi_cache_key(query: str) -> str:
     base = "{0}|{1}|{2}|{3}".format(str(query or "").strip().lower(), _poi_region(), _poi_lang(), _poi_default_suffix())
     return hashlib.sha1(base.encode("utf-8", errors="ignore")).hexdigest()
 
 
 def _poi_cache_get(query: str):
-    key = _poi_cache_key(query)
-    ttl = _poi_cache_ttl()
-    now_i = int(time.time())
-    conn = None
     try:
-        conn = _poi_cache_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT ts,text FROM poi_cache WHERE query_key=? LIMIT 1", (key,))
-        r = cur.fetchone()
-        conn.close()
-        if not r:
-            return None
-        ts = int(r[0] or 0)
-        txt = str(r[1] or "")
-        if (now_i - ts) > ttl:
-            return None
-        if not txt.strip():
-            return None
-        return txt
+        txt = shared_cache.get("poi", _poi_cache_key(query), ttl=_poi_cache_ttl())
     except Exception:
-        try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
         return None
+    if not isinstance(txt, str) or not txt.strip():
+        return None
+    return txt
 
 
 def _poi_cache_put(query: str, text_out: str):
     val = str(text_out or "").strip()
     if not val:
         return
-    key = _poi_cache_key(query)
-    conn = None
     try:
-        conn = _poi_cache_conn()
-        cur = conn.cursor()
-        cur.execute("INSERT OR REPLACE INTO poi_cache(query_key,ts,text) VALUES(?,?,?)", (key, int(time.time()), val))
-        conn.commit()
-        conn.close()
+        shared_cache.put("poi", _poi_cache_key(query), val)
     except Exception:
-        try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
+        pass
 
 
 def _poi_clean_query(text: str) -> str:
@@ -10925,7 +13267,7 @@ def _poi_text_search(query: str, language_code: str):
         "X-Goog-FieldMask": "places.name,places.id,places.displayName,places.formattedAddress,places.googleMapsUri,places.websiteUri",
     }
     try:
-        r = requests.post(url, headers=headers, json=body, timeout=10)
+        r = http_pool.post(url, upstream="google", headers=headers, json=body, timeout=10)
         code = int(getattr(r, "status_code", 0) or 0)
         if code < 200 or code >= 300:
             return {"ok": False, "error": "poi_text_search_failed", "status": code, "message": (r.text or "")[:200]}
@@ -10953,7 +13295,7 @@ def _poi_place_details(place_ref: dict, language_code: str):
     }
     params = {"languageCode": language_code, "regionCode": _poi_region()}
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=10)
+        r = http_pool.get(url, upstream="google", headers=headers, params=params, timeout=10)
         code = int(getattr(r, "status_code", 0) or 0)
         if code < 200 or code >= 300:
             return {"ok": False, "error": "poi_details_failed", "status": code, "message": (r.text or "")[:200]}
@@ -10991,31 +13333,14 @@ def _poi_fee_cache_get(url: str, stage_version: str = "v2"):
     u = str(url or "").strip()
     if not u:
         return None
-    now_i = int(time.time())
-    ttl = _poi_cache_ttl()
-    conn = None
     try:
-        conn = _poi_cache_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT ts,domain,lines FROM poi_fee_cache WHERE url_key=? LIMIT 1", (_poi_fee_url_key(u, stage_version=stage_version),))
-        row = cur.fetchone()
-        conn.close()
-        if not row:
-            return None
-        ts = int(row[0] or 0)
-        if (now_i - ts) > ttl:
-            return None
-        domain = str(row[1] or "").strip()
-        text_lines = str(row[2] or "")
-        lines = [x.strip() for x in text_lines.split("\n") if str(x or "").strip()]
-        return {"domain": domain, "lines": lines[:3]}
+        it = shared_cache.get("poi", "fee:" + _poi_fee_url_key(u, stage_version=stage_version), ttl=_poi_cache_ttl())
     except Exception:
-        try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
         return None
+    if not isinstance(it, dict):
+        return None
+    lines = [str(x).strip() for x in (it.get("lines") or []) if str(x or "").strip()]
+    return {"domain": str(it.get("domain") or "").strip(), "lines": lines[:3]}
 
 
 def _poi_fee_cache_put(url: str, domain: str, lines: list, stage_version: str = "v2"):
@@ -11028,24 +13353,10 @@ def _poi_fee_cache_put(url: str, domain: str, lines: list, stage_version: str =
             ss = str(s or "").strip()
             if ss:
                 items.append(ss)
-    if len(items) > 3:
-        items = items[:3]
-    conn = None
     try:
-        conn = _poi_cache_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO poi_fee_cache(url_key,ts,domain,lines) VALUES(?,?,?,?)",
-            (_poi_fee_url_key(u, stage_version=stage_version), int(time.time()), str(domain or "").strip(), "\n".join(items)),
-        )
-        conn.commit()
-        conn.close()
+        shared_cache.put("poi", "fee:" + _poi_fee_url_key(u, stage_version=stage_version), {"domain": str(domain or "").strip(), "lines": items[:3]})
     except Exception:
-        try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
+        pass
 
 
 def _poi_fee_amount_match(s: str) -> bool:
@@ -11262,7 +13573,7 @@ def _poi_fee_extract_from_url(url: str, place_name: str = "", query_text: str =
                 "User-Agent": "Mozilla/5.0 (compatible; mcp-hello/1.0; +https://localhost)",
                 "Accept": "text/html,application/xhtml+xml",
             }
-            rp = requests.get(u, headers=hdr, timeout=12)
+            rp = http_pool.get(u, upstream="web", headers=hdr, timeout=12)
             if int(getattr(rp, "status_code", 0) or 0) >= 200 and int(getattr(rp, "status_code", 0) or 0) < 300:
                 html_raw = str(rp.text or "")
         except Exception:
@@ -11448,7 +13759,10 @@ def _bills_db_connect():
         os.makedirs(os.path.dirname(_BILLS_DB_PATH), exist_ok=True)
     except Exception:
         pass
-    conn = sqlite3.connect(_BILLS_DB_PATH)
+    return _sqlite_conn(_BILLS_DB_PATH, _bills_db_init, "bills")
+
+
+def _bills_db_init(conn):
     cur = conn.cursor()
     cur.execute("CREATE TABLE IF NOT EXISTS processed_messages(message_id TEXT PRIMARY KEY, processed_at TEXT)")
     cur.execute(
@@ -11486,8 +13800,6 @@ def _bills_db_connect():
             cur.execute("ALTER TABLE bills_calendar_sync ADD COLUMN calendar_entity TEXT")
     except Exception:
         pass
-    conn.commit()
-    return conn
 
 
 def _bills_is_processed(conn, message_id: str) -> bool:
@@ -12076,23 +14388,18 @@ def _bills_service_exists(domain: str, service: str) -> bool:
     return s in sv
 
 
-_HA_SERVICES_CACHE = {"ts": 0.0, "index": None}
+def _ha_services_index_cached(ttl_sec: int = 60) -> dict:
+    # Cached as {domain: [service, ...]}; a failed refresh keeps serving the last good index.
+    idx = shared_cache.get_or_load("ha_registry", "services_index", _ha_services_index_load, cacheable=lambda v: isinstance(v, dict), ttl=ttl_sec)
+    if not isinstance(idx, dict):
+        return {}
+    return {dom: set(sv or []) for dom, sv in idx.items()}
 
 
-def _ha_services_index_cached(ttl_sec: int = 60) -> dict:
-    now_ts = float(time.time())
-    try:
-        ts = float(_HA_SERVICES_CACHE.get("ts") or 0.0)
-    except Exception:
-        ts = 0.0
-    idx_old = _HA_SERVICES_CACHE.get("index")
-    if isinstance(idx_old, dict) and ((now_ts - ts) <= float(ttl_sec)):
-        return idx_old
+def _ha_services_index_load():
     rr = _ha_request("GET", "/api/services", timeout_sec=8)
     if not rr.get("ok"):
-        if isinstance(idx_old, dict):
-            return idx_old
-        return {}
+        return None
     data = rr.get("data") or []
     out = {}
     if isinstance(data, list):
@@ -12109,9 +14416,7 @@ def _ha_services_index_cached(ttl_sec: int = 60) -> dict:
                     kk = str(k or "").strip()
                     if kk:
                         keys.add(kk)
-            out[dom] = keys
-    _HA_SERVICES_CACHE["ts"] = now_ts
-    _HA_SERVICES_CACHE["index"] = out
+            out[dom] = sorted(keys)
     return out
 
 
@@ -13097,6 +15402,14 @@ def tools_selfcheck() -> dict:
         "HA_DEFAULT_CALENDAR_ENTITY": os.environ.get("HA_DEFAULT_CALENDAR_ENTITY") or "",
         "SEARXNG_URL": os.environ.get("SEARXNG_URL") or "http://192.168.1.162:8081",
         "WEB_SEARCH_FALLBACK_MODE": os.environ.get("WEB_SEARCH_FALLBACK_MODE") or "explicit",
+        "sqlite": _sqlite_stats(),
+        "embed_cache": _embed_cache_stats(),
+        "route_cache": _route_cache_stats(),
+        "warmup": warmup.stats(),
+        "news_enrich": _news_enrich_stats(),
+        "cache": shared_cache.stats(),
+        "local_ann": _skill_local_ann_stats(),
+        "http": http_pool.stats(),
         "note": "Externally exposed MCP tools are skill.* only.",
     }
     return out
@@ -13122,12 +15435,81 @@ def _build_asgi_app_from_mcp():
             continue
     return None
 
+# ---- Background warm-up (see warmup.py) ----
+def _warmup_weather():
+    eids = []
+    for k in ("HA_DEFAULT_WEATHER_ENTITY", "WARMUP_WEATHER_ENTITIES"):
+        for eid in str(os.environ.get(k) or "").split(","):
+            if eid.strip() and eid.strip() not in eids:
+                eids.append(eid.strip())
+    for eid in eids:
+        rr = _ha_weather_forecast_cached(eid, "daily", refresh=True)
+        if not (isinstance(rr, dict) and rr.get("ok")):
+            raise RuntimeError("weather " + eid + ": " + str((rr or {}).get("error") or "failed"))
+
+
+def _warmup_calendar():
+    cal = str(os.environ.get("HA_DEFAULT_CALENDAR_ENTITY") or "").strip()
+    if not cal:
+        return
+    extra = _calendar_extra_entity_for_merge()
+    if extra and extra != cal:
+        _calendar_entity_available(extra, refresh=True)
+    tz = _tzinfo()
+    now = _now_local()
+    today = dt_date(now.year, now.month, now.day)
+    # Same windows the "今天/明天的日程" path asks for, so those reads are cache hits.
+    for d in (today, today + timedelta(days=1)):
+        s_iso, e_iso = _iso_day_start_end(d, tz)
+        for eid in _calendar_entities_for_query(cal):
+            rr = _ha_calendar_events_cached(eid, s_iso, e_iso, refresh=True)
+            if not rr.get("ok"):
+                raise RuntimeError("calendar " + eid + ": " + str(rr.get("error") or rr.get("status_code") or "failed"))
+
+
+def _warmup_news():
+    _news_cache_refresh_if_due(False)
+    # Rows whose enrichment failed wait for a later pass; without new rows nothing else starts one.
+    if _news_enrich_stats().get("pending", 0) > 0:
+        _news_enrich_kick()
+
+
+def _warmup_news_digest():
+    _news_digest_refresh_known()
+
+
+def _warmup_registry():
+    shared_cache.refresh("ha_registry", "services_index", _ha_services_index_load, cacheable=lambda v: isinstance(v, dict))
+
+
+def _warmup_holidays():
+    y = _now_local().year
+    for yy in (y, y + 1):
+        shared_cache.refresh("holiday", "AU-VIC|" + str(yy), lambda yy=yy: _holiday_vic_compute(yy), cacheable=lambda v: isinstance(v, dict) and bool(v.get("ok")))
+
+
+def _warmup_register():
+    warmup.register("weather", _warmup_weather, every_sec=240, at="06:50")
+    warmup.register("calendar", _warmup_calendar, every_sec=240, at="06:50")
+    warmup.register("news", _warmup_news, every_sec=300, at="06:45,07:45")
+    warmup.register("news_digest", _warmup_news_digest, every_sec=300, at="06:45,07:45")
+    warmup.register("ha_registry", _warmup_registry, every_sec=300, learn=False)
+    warmup.register("holiday", _warmup_holidays, every_sec=86400, learn=False)
+
+
+def _warmup_start() -> bool:
+    _warmup_register()
+    return warmup.start()
+
+
 if __name__ == "__main__":
     host = os.environ.get("HOST") or "0.0.0.0"
     port = _safe_int(os.environ.get("PORT") or os.environ.get("MCP_PORT") or "19090", 19090)
 
     # In Docker/HA MCP Server usage, we want an HTTP(SSE/ASGI) server.
     # Do NOT call mcp.run() here (it may default to STDIO and exit cleanly in containers).
+    _sqlite_migrate_all()
+    _warmup_start()
     asgi = _build_asgi_app_from_mcp()
     if asgi is None:
         raise RuntimeError("Cannot build ASGI app from FastMCP. FastMCP API mismatch.")
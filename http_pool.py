@@ -0,0 +1,411 @@
+"""Shared HTTP client: one keep-alive connection pool per upstream.
+
+Every outbound call names its upstream ("ha", "ollama", "qdrant", ...). Each upstream
+gets its own requests.Session (sized connection pool, reused TCP/TLS connections),
+a connect timeout, a default read timeout, and a retry budget. Retries only happen
+for failures that are safe to repeat, and only while the upstream's budget allows.
+
+request()/get()/post()/put()/delete() are the sync entry points. arequest() is the
+asyncio one. It uses httpx.AsyncClient when httpx is installed (HTTP/2 if h2 is
+installed too) and otherwise runs the sync path in a thread.
+
+Per-upstream settings come from the defaults below or from env:
+HTTP_<UPSTREAM>_CONNECT_TIMEOUT, HTTP_<UPSTREAM>_TIMEOUT, HTTP_<UPSTREAM>_POOL,
+HTTP_<UPSTREAM>_RETRIES.
+
+A request-wide deadline (REQUEST_DEADLINE, set with deadline_set()) clamps every
+call's timeouts to the remaining budget; once it has passed, calls fail fast with
+DeadlineExceeded instead of going out.
+
+coalesced() is request() for reads that many requests ask at once: identical calls
+(same upstream, method, URL, params and body) share one in-flight request, and a
+successful response is reused for a short memo window afterwards
+(HTTP_<UPSTREAM>_COALESCE_MS, else HTTP_COALESCE_MS, default 2000; 0 = in-flight only).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx  # type: ignore
+except Exception:
+    httpx = None
+
+try:
+    import h2  # type: ignore  # noqa: F401
+
+    _HTTP2 = httpx is not None
+except Exception:
+    _HTTP2 = False
+
+
+# upstream -> (connect timeout s, default read timeout s, pool size, max retries)
+_UPSTREAM_DEFAULTS: Dict[str, Tuple[float, float, int, int]] = {
+    "ha": (1.5, 10.0, 16, 1),
+    "ollama": (1.5, 30.0, 8, 1),
+    "qdrant": (1.5, 15.0, 16, 1),
+    "miniflux": (2.0, 12.0, 8, 1),
+    "searxng": (2.0, 10.0, 8, 1),
+    "brave": (3.0, 10.0, 8, 1),
+    "google": (3.0, 10.0, 8, 1),
+    "web": (5.0, 12.0, 16, 0),
+    "default": (5.0, 15.0, 16, 0),
+}
+_IDEMPOTENT = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+_RETRY_STATUS = (502, 503, 504)
+_BUDGET_WINDOW_SEC = 60.0
+
+_MIN_CALL_SEC = 0.05
+
+# time.monotonic() value the current request must finish by; 0.0 = no deadline.
+REQUEST_DEADLINE: ContextVar = ContextVar("REQUEST_DEADLINE", default=0.0)
+
+_LOCK = threading.Lock()
+_SESSIONS: Dict[str, requests.Session] = {}
+_ASYNC_CLIENTS: Dict[Tuple[str, int], Any] = {}
+_STATS: Dict[str, Dict[str, Any]] = {}
+# coalesce key -> _Flight (in progress) / (expires monotonic, response) (memo)
+_FLIGHTS: Dict[str, "_Flight"] = {}
+_MEMO: Dict[str, Tuple[float, requests.Response]] = {}
+_MEMO_MAX = 256
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+def deadline_set(budget_sec: float) -> Token:
+    """Start a request-wide budget in the current context (<= 0 clears it)."""
+    b = float(budget_sec or 0.0)
+    return REQUEST_DEADLINE.set((time.monotonic() + b) if b > 0 else 0.0)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None when there is no deadline."""
+    dl = float(REQUEST_DEADLINE.get() or 0.0)
+    if dl <= 0.0:
+        return None
+    return dl - time.monotonic()
+
+
+def _env_num(name: str, default: float) -> float:
+    raw = str(os.environ.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except Exception:
+        return default
+
+
+def upstream_config(upstream: str) -> Dict[str, Any]:
+    name = str(upstream or "default").strip().lower() or "default"
+    connect, read, pool, retries = _UPSTREAM_DEFAULTS.get(name, _UPSTREAM_DEFAULTS["default"])
+    key = "HTTP_" + name.upper() + "_"
+    return {
+        "name": name,
+        "connect_timeout": max(0.2, _env_num(key + "CONNECT_TIMEOUT", connect)),
+        "timeout": max(0.5, _env_num(key + "TIMEOUT", read)),
+        "pool": max(1, int(_env_num(key + "POOL", pool))),
+        "retries": max(0, int(_env_num(key + "RETRIES", retries))),
+    }
+
+
+def _stats_for(name: str) -> Dict[str, Any]:
+    st = _STATS.get(name)
+    if st is None:
+        st = {"requests": 0, "errors": 0, "retries": 0, "retry_denied": 0, "deadline_skipped": 0, "coalesced": 0, "memo_hits": 0, "ms_total": 0.0, "ms_max": 0.0, "window_start": time.time(), "window_requests": 0, "window_retries": 0}
+        _STATS[name] = st
+    return st
+
+
+def session(upstream: str) -> requests.Session:
+    cfg = upstream_config(upstream)
+    name = cfg["name"]
+    with _LOCK:
+        s = _SESSIONS.get(name)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=cfg["pool"], max_retries=0)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _SESSIONS[name] = s
+        return s
+
+
+def _timeout(cfg: Dict[str, Any], timeout: Any):
+    # Callers keep passing one number (their read budget); connect gets the upstream's own cap.
+    if isinstance(timeout, tuple):
+        connect, read = float(timeout[0]), float(timeout[1])
+    else:
+        read = float(timeout) if timeout is not None else float(cfg["timeout"])
+        connect = min(float(cfg["connect_timeout"]), read)
+    rem = deadline_remaining()
+    if rem is None:
+        return (connect, read)
+    if rem < _MIN_CALL_SEC:
+        with _LOCK:
+            _stats_for(cfg["name"])["deadline_skipped"] += 1
+        raise DeadlineExceeded("request deadline exceeded before calling " + cfg["name"])
+    return (min(connect, rem), min(read, rem))
+
+
+def _retry_allowed(name: str, attempt: int, max_retries: int) -> bool:
+    if attempt >= max_retries:
+        return False
+    ratio = _env_num("HTTP_RETRY_BUDGET_RATIO", 0.1)
+    with _LOCK:
+        st = _stats_for(name)
+        # Retries are capped at ~10% of traffic (min 3 per window) so a dead upstream is not hammered.
+        if st["window_retries"] >= max(3.0, ratio * st["window_requests"]):
+            st["retry_denied"] += 1
+            return False
+        st["window_retries"] += 1
+        st["retries"] += 1
+        return True
+
+
+def _note(name: str, ms: float, error: bool):
+    with _LOCK:
+        st = _stats_for(name)
+        now = time.time()
+        if now - float(st["window_start"]) > _BUDGET_WINDOW_SEC:
+            st["window_start"] = now
+            st["window_requests"] = 0
+            st["window_retries"] = 0
+        st["requests"] += 1
+        st["window_requests"] += 1
+        st["ms_total"] += ms
+        if ms > st["ms_max"]:
+            st["ms_max"] = ms
+        if error:
+            st["errors"] += 1
+
+
+def _retryable_error(method: str, e: Exception) -> bool:
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True  # nothing reached the server
+    return (method in _IDEMPOTENT) and isinstance(e, requests.exceptions.ConnectionError)
+
+
+def request(method: str, url: str, upstream: str = "default", timeout: Any = None, **kwargs) -> requests.Response:
+    cfg = upstream_config(upstream)
+    name = cfg["name"]
+    m = str(method or "GET").upper()
+    s = session(name)
+    attempt = 0
+    while True:
+        to = _timeout(cfg, timeout)
+        t0 = time.perf_counter()
+        try:
+            r = s.request(m, url, timeout=to, **kwargs)
+        except Exception as e:
+            _note(name, (time.perf_counter() - t0) * 1000.0, True)
+            if _retryable_error(m, e) and _retry_allowed(name, attempt, cfg["retries"]):
+                attempt += 1
+                continue
+            raise
+        _note(name, (time.perf_counter() - t0) * 1000.0, int(r.status_code) >= 500)
+        if (int(r.status_code) in _RETRY_STATUS) and (m in _IDEMPOTENT) and _retry_allowed(name, attempt, cfg["retries"]):
+            r.close()
+            attempt += 1
+            continue
+        return r
+
+
+def get(url: str, upstream: str = "default", **kwargs) -> requests.Response:
+    return request("GET", url, upstream=upstream, **kwargs)
+
+
+def post(url: str, upstream: str = "default", **kwargs) -> requests.Response:
+    return request("POST", url, upstream=upstream, **kwargs)
+
+
+def put(url: str, upstream: str = "default", **kwargs) -> requests.Response:
+    return request("PUT", url, upstream=upstream, **kwargs)
+
+
+def delete(url: str, upstream: str = "default", **kwargs) -> requests.Response:
+    return request("DELETE", url, upstream=upstream, **kwargs)
+
+
+class _Flight:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[requests.Response] = None
+        self.error: Optional[BaseException] = None
+
+
+def _coalesce_key(name: str, method: str, url: str, kwargs: Dict[str, Any]) -> str:
+    parts = [name, method, url] + [kwargs.get(k) for k in ("params", "json", "data", "headers")]
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _coalesce_memo_sec(name: str, memo_sec: Optional[float]) -> float:
+    if memo_sec is not None:
+        return max(0.0, float(memo_sec))
+    ms = _env_num("HTTP_" + name.upper() + "_COALESCE_MS", _env_num("HTTP_COALESCE_MS", 2000.0))
+    return max(0.0, ms / 1000.0)
+
+
+def coalesced(method: str, url: str, upstream: str = "default", memo_sec: Optional[float] = None, **kwargs) -> requests.Response:
+    """request() with identical concurrent calls sharing one upstream request.
+
+    Only for reads: every caller gets the same Response object (body already read),
+    and a 2xx/3xx answer is memoized for memo_sec. Error statuses and exceptions
+    are handed to the callers that waited on them but never memoized.
+    """
+    cfg = upstream_config(upstream)
+    name = cfg["name"]
+    m = str(method or "GET").upper()
+    key = _coalesce_key(name, m, str(url or ""), kwargs)
+    now = time.monotonic()
+    with _LOCK:
+        hit = _MEMO.get(key)
+        if hit is not None and hit[0] > now:
+            _stats_for(name)["memo_hits"] += 1
+            return hit[1]
+        flight = _FLIGHTS.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _FLIGHTS[key] = flight
+        else:
+            _stats_for(name)["coalesced"] += 1
+    if not leader:
+        rem = deadline_remaining()
+        if not flight.done.wait(None if rem is None else max(0.0, rem)):
+            raise DeadlineExceeded("request deadline exceeded waiting for a shared " + name + " call")
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+    try:
+        r = request(m, url, upstream=name, **kwargs)
+        _ = r.content  # read the body now so every caller can use it after the connection is released
+        flight.response = r
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        memo = _coalesce_memo_sec(name, memo_sec)
+        with _LOCK:
+            _FLIGHTS.pop(key, None)
+            r0 = flight.response
+            if r0 is not None and memo > 0 and int(r0.status_code) < 400:
+                if len(_MEMO) >= _MEMO_MAX:
+                    t = time.monotonic()
+                    for k in [k for k, v in _MEMO.items() if v[0] <= t]:
+                        _MEMO.pop(k, None)
+                    while len(_MEMO) >= _MEMO_MAX:
+                        _MEMO.pop(next(iter(_MEMO)))
+                _MEMO[key] = (time.monotonic() + memo, r0)
+        flight.done.set()
+    return r
+
+
+def _async_client(cfg: Dict[str, Any]):
+    loop = asyncio.get_running_loop()
+    key = (cfg["name"], id(loop))
+    with _LOCK:
+        c = _ASYNC_CLIENTS.get(key)
+        if c is None:
+            limits = httpx.Limits(max_connections=cfg["pool"], max_keepalive_connections=cfg["pool"])
+            c = httpx.AsyncClient(limits=limits, http2=_HTTP2)
+            _ASYNC_CLIENTS[key] = c
+        return c
+
+
+async def arequest(method: str, url: str, upstream: str = "default", timeout: Any = None, **kwargs):
+    """asyncio entry point; same upstream pools, timeouts and retry budget as request()."""
+    if httpx is None:
+        return await asyncio.to_thread(request, method, url, upstream, timeout, **kwargs)
+    cfg = upstream_config(upstream)
+    name = cfg["name"]
+    m = str(method or "GET").upper()
+    if "allow_redirects" in kwargs:
+        kwargs["follow_redirects"] = bool(kwargs.pop("allow_redirects"))
+    client = _async_client(cfg)
+    attempt = 0
+    while True:
+        connect, read = _timeout(cfg, timeout)
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(m, url, timeout=httpx.Timeout(read, connect=connect), **kwargs)
+        except Exception as e:
+            _note(name, (time.perf_counter() - t0) * 1000.0, True)
+            safe = isinstance(e, httpx.ConnectTimeout) or ((m in _IDEMPOTENT) and isinstance(e, httpx.TransportError))
+            if safe and _retry_allowed(name, attempt, cfg["retries"]):
+                attempt += 1
+                continue
+            raise
+        _note(name, (time.perf_counter() - t0) * 1000.0, int(r.status_code) >= 500)
+        if (int(r.status_code) in _RETRY_STATUS) and (m in _IDEMPOTENT) and _retry_allowed(name, attempt, cfg["retries"]):
+            attempt += 1
+            continue
+        return r
+
+
+def _open_connections(s: requests.Session) -> int:
+    n = 0
+    # http:// and https:// share one adapter; count it once.
+    adapters = {id(a): a for a in s.adapters.values()}
+    for adapter in adapters.values():
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            try:
+                n += int(getattr(pools[key], "num_connections", 0) or 0)
+            except Exception:
+                pass
+    return n
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        names = sorted(set(_STATS.keys()) | set(_SESSIONS.keys()))
+        snap = {n: dict(_stats_for(n)) for n in names}
+        sessions = dict(_SESSIONS)
+    out = {"http2": bool(_HTTP2), "async": "httpx" if httpx is not None else "thread", "upstreams": {}}
+    for n in names:
+        st = snap[n]
+        cnt = int(st["requests"])
+        out["upstreams"][n] = {
+            "requests": cnt,
+            "errors": int(st["errors"]),
+            "retries": int(st["retries"]),
+            "retry_denied": int(st["retry_denied"]),
+            "deadline_skipped": int(st["deadline_skipped"]),
+            "coalesced": int(st["coalesced"]),
+            "memo_hits": int(st["memo_hits"]),
+            "ms_avg": round(float(st["ms_total"]) / cnt, 1) if cnt else 0.0,
+            "ms_max": round(float(st["ms_max"]), 1),
+            "connections_opened": _open_connections(sessions[n]) if n in sessions else 0,
+        }
+    return out
+
+
+def close():
+    with _LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+        _MEMO.clear()
+        # Async clients are bound to the loop that created them; drop them with the sessions.
+        _ASYNC_CLIENTS.clear()
+    for s in sessions:
+        try:
+            s.close()
+        except Exception:
+            pass
@@ -1,21 +1,25 @@
+import asyncio
 import json
 import os
 import re
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from typing import Any, Dict, List
 
-import requests
+import http_pool
+import shared_cache
+import warmup
 from starlette.applications import Starlette
-from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from starlette.routing import Route
 
 
 # Lazy-import app so startup stays fast and we only bind to stable wrappers.
 _APP_MODULE = None
 _ENTITY_ID_RE = re.compile(r"^[a-z_]+\.[a-z0-9_]+$")
-_HA_AREA_CACHE = {"ts": 0.0, "map": {}}
-_HA_ASSIST_VISIBLE_CACHE = {"ts": 0.0, "names": []}
 _ALLOWED_STATE_DOMAINS = ["light", "climate", "cover", "media_player", "sensor"]
 
 
@@ -28,6 +32,196 @@ def _load_app_module():
     return _APP_MODULE
 
 
+class _PoolBusy(Exception):
+    pass
+
+
+class _WorkerPool:
+    """Size-limited thread pool for blocking app/HA calls made from async handlers.
+
+    At most max_workers jobs run and max_queue wait; beyond that acquire() fails
+    and the handler answers 503 right away instead of queueing without bound.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gw-" + name)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "run_ms_total": 0.0}
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.stats["rejected"] += 1
+                return False
+            self.pending += 1
+            self.stats["submitted"] += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def note_start(self, wait_ms: float):
+        with self._lock:
+            self.running += 1
+            self.stats["wait_ms_total"] += wait_ms
+            if wait_ms > self.stats["wait_ms_max"]:
+                self.stats["wait_ms_max"] = wait_ms
+
+    def note_done(self, run_ms: float):
+        with self._lock:
+            self.running -= 1
+            self.stats["completed"] += 1
+            self.stats["run_ms_total"] += run_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            st = dict(self.stats)
+            running = self.running
+            pending = self.pending
+        done = int(st["completed"])
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queued": max(0, pending - running),
+            "submitted": int(st["submitted"]),
+            "rejected": int(st["rejected"]),
+            "completed": done,
+            "wait_ms_avg": round(float(st["wait_ms_total"]) / done, 1) if done else 0.0,
+            "wait_ms_max": round(float(st["wait_ms_max"]), 1),
+            "run_ms_avg": round(float(st["run_ms_total"]) / done, 1) if done else 0.0,
+        }
+
+
+_POOLS: Dict[str, _WorkerPool] = {}
+_POOLS_LOCK = threading.Lock()
+# HA control is quick and latency-sensitive; RAG/web/news/LLM work is slow. Keeping them
+# apart means a burst of slow skills cannot starve light switches (or /health).
+_POOL_DEFAULTS = {"ha": (8, 16), "slow": (4, 8)}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(str(os.environ.get(name) or default).strip())
+    except Exception:
+        return int(default)
+
+
+def _worker_pool(name: str) -> _WorkerPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            workers, queue = _POOL_DEFAULTS.get(name, (4, 8))
+            key = "GATEWAY_" + name.upper()
+            pool = _WorkerPool(name, _env_int(key + "_WORKERS", workers), _env_int(key + "_QUEUE", queue))
+            _POOLS[name] = pool
+        return pool
+
+
+def _pool_stats() -> Dict[str, Any]:
+    with _POOLS_LOCK:
+        names = sorted(_POOLS.keys())
+    return {n: _worker_pool(n).snapshot() for n in names}
+
+
+def _submit_to_pool(name: str, fn, *args) -> "asyncio.Future":
+    pool = _worker_pool(name)
+    if not pool.acquire():
+        raise _PoolBusy(name)
+    submitted = time.perf_counter()
+
+    def _job():
+        started = time.perf_counter()
+        pool.note_start((started - submitted) * 1000.0)
+        try:
+            return fn(*args)
+        finally:
+            pool.note_done((time.perf_counter() - started) * 1000.0)
+            # Released here, not in the awaiting coroutine: a client disconnect
+            # cancels the await but the thread still occupies the slot.
+            pool.release()
+
+    ctx = copy_context()
+    try:
+        return asyncio.get_running_loop().run_in_executor(pool.executor, ctx.run, _job)
+    except Exception:
+        pool.release()
+        raise
+
+
+# Voice-facing routes, where an answer after the client gave up is worthless. Admin and batch
+# endpoints (bill processing, memory upserts, lookups) run unbounded unless the caller asks.
+_DEFAULT_BUDGET_PATHS = ("/v1/chat/completions", "/invoke/answer_question")
+
+
+def _request_budget_sec(headers: Dict[str, str], path: str = "") -> float:
+    raw = str(headers.get("x-request-budget-ms") or "").strip()
+    default_ms = _env_int("GATEWAY_REQUEST_BUDGET_MS", 9000) if path in _DEFAULT_BUDGET_PATHS else 0
+    try:
+        ms = int(float(raw)) if raw else default_ms
+    except Exception:
+        ms = default_ms
+    return max(0, ms) / 1000.0
+
+
+class _DeadlineMiddleware:
+    """Start the request-wide deadline (http_pool.REQUEST_DEADLINE) when a request arrives.
+
+    Budget comes from the X-Request-Budget-Ms header on any route; without it the voice
+    routes get GATEWAY_REQUEST_BUDGET_MS (0 disables) and the rest none. Queue time in
+    the worker pools counts against it.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") == "http":
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+            http_pool.deadline_set(_request_budget_sec(headers, str(scope.get("path") or "")))
+        await self.app(scope, receive, send)
+
+
+def _busy_body(pool: str) -> Dict[str, Any]:
+    return {"success": False, "error": "gateway busy, please retry", "pool": pool}
+
+
+def _openai_busy_body(pool: str) -> Dict[str, Any]:
+    return {"error": {"message": "gateway busy, please retry", "type": "server_busy", "pool": pool}}
+
+
+def _late_response(pool: str, body: Dict[str, Any]):
+    return JSONResponse({"success": False, "error": "request deadline exceeded", "pool": pool}, status_code=504)
+
+
+def _openai_late_response(pool: str, body: Dict[str, Any]):
+    # Voice clients speak whatever comes back; a short apology beats the client's own timeout error.
+    model = str(body.get("model") or os.environ.get("OPENAI_COMPAT_MODEL_ID", "jarvis_mcp"))
+    return JSONResponse(_openai_chat_response(model, "这次处理超时了，请稍后再问一次。"))
+
+
+async def _run_pooled(name: str, fn, body: Dict[str, Any], busy=_busy_body, late=_late_response):
+    try:
+        fut = _submit_to_pool(name, fn, body)
+    except _PoolBusy:
+        return JSONResponse(busy(name), status_code=503, headers={"Retry-After": "1"})
+    rem = http_pool.deadline_remaining()
+    if rem is None:
+        return await fut
+    grace = max(0, _env_int("GATEWAY_DEADLINE_GRACE_MS", 500)) / 1000.0
+    try:
+        # Upstream calls already clamp to the deadline; this catches CPU-bound or non-HTTP waits.
+        return await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, rem) + grace)
+    except asyncio.TimeoutError:
+        return late(name, body)
+
+
 def _now_ts() -> int:
     return int(time.time())
 
@@ -151,7 +345,7 @@ def _ha_get_json(path: str):
         return None
     url = "{}/{}".format(base, str(path or "").lstrip("/"))
     try:
-        resp = requests.get(url, headers=headers, timeout=_ha_timeout())
+        resp = http_pool.get(url, upstream="ha", headers=headers, timeout=_ha_timeout())
         if int(resp.status_code) < 200 or int(resp.status_code) >= 300:
             return None
         return resp.json()
@@ -160,11 +354,11 @@ def _ha_get_json(path: str):
 
 
 def _ha_entity_area_map() -> Dict[str, str]:
-    now = time.time()
-    ts = float(_HA_AREA_CACHE.get("ts") or 0.0)
-    mp = _HA_AREA_CACHE.get("map") if isinstance(_HA_AREA_CACHE.get("map"), dict) else {}
-    if (now - ts) <= 60.0 and mp:
-        return mp
+    mp = shared_cache.get_or_load("ha_registry", "entity_area_map", _ha_entity_area_map_load, cacheable=lambda v: bool(v))
+    return mp if isinstance(mp, dict) else {}
+
+
+def _ha_entity_area_map_load() -> Dict[str, str]:
     entities = _ha_get_json("/api/config/entity_registry/list")
     areas = _ha_get_json("/api/config/area_registry/list")
     devices = _ha_get_json("/api/config/device_registry/list")
@@ -199,8 +393,6 @@ def _ha_entity_area_map() -> Dict[str, str]:
         area_name = area_id_to_name.get(aid, "") if aid else ""
         if area_name:
             out[eid] = area_name
-    _HA_AREA_CACHE["ts"] = now
-    _HA_AREA_CACHE["map"] = out
     return out
 
 
@@ -266,17 +458,15 @@ def _extract_names_from_assist_text(text: str) -> List[str]:
 
 
 def _ha_assist_visible_names() -> List[str]:
-    now = time.time()
-    ts = float(_HA_ASSIST_VISIBLE_CACHE.get("ts") or 0.0)
-    cached = _HA_ASSIST_VISIBLE_CACHE.get("names")
-    if (now - ts) <= 60.0 and isinstance(cached, list) and cached:
-        return cached
-
     base = _ha_base_url()
     headers = _ha_headers()
     if not base or (not headers):
         return []
+    names = shared_cache.get_or_load("ha_registry", "assist_visible_names", lambda: _ha_assist_visible_names_load(base, headers), cacheable=lambda v: bool(v))
+    return names if isinstance(names, list) else []
 
+
+def _ha_assist_visible_names_load(base: str, headers: Dict[str, str]) -> List[str]:
     payload = {
         "agent_id": str(os.environ.get("HA_ASSIST_AGENT_ID") or "conversation.ollama_conversation").strip(),
         "language": "zh-CN",
@@ -284,7 +474,7 @@ def _ha_assist_visible_names() -> List[str]:
     }
     url = "{}/api/conversation/process".format(base)
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=_ha_timeout())
+        resp = http_pool.post(url, upstream="ha", headers=headers, json=payload, timeout=_ha_timeout())
         if int(resp.status_code) < 200 or int(resp.status_code) >= 300:
             return []
         data = resp.json()
@@ -305,9 +495,6 @@ def _ha_assist_visible_names() -> List[str]:
                 continue
             seen.add(k)
             dedup.append(n)
-        if dedup:
-            _HA_ASSIST_VISIBLE_CACHE["ts"] = now
-            _HA_ASSIST_VISIBLE_CACHE["names"] = dedup
         return dedup
     except Exception:
         return []
@@ -940,7 +1127,12 @@ def _render_tool_content_as_text(raw: str) -> str:
 
 
 async def health(_: Any):
-    return JSONResponse({"ok": True, "service": "openai-compat-gateway"})
+    return JSONResponse({"ok": True, "service": "openai-compat-gateway", "pools": _pool_stats(), "http": http_pool.stats(), "warmup": warmup.stats()})
+
+
+async def cache_stats(_: Any):
+    # Per-namespace size and hit ratio of the shared cache; disk rows include the other container's entries.
+    return JSONResponse(await asyncio.to_thread(shared_cache.stats))
 
 
 async def openapi_json(_: Any):
@@ -969,18 +1161,16 @@ async def chat_completions(request: Any):
         body = await request.json()
     except Exception:
         return JSONResponse({"error": {"message": "Invalid JSON body"}}, status_code=400)
-
     if bool(body.get("stream")):
-        return JSONResponse(
-            {
-                "error": {
-                    "message": "stream=true is not supported in this gateway yet",
-                    "type": "invalid_request_error",
-                }
-            },
-            status_code=400,
-        )
+        return _chat_completions_stream(body)
+    return await _run_pooled("slow", _chat_completions_sync, body, busy=_openai_busy_body, late=_openai_late_response)
+
 
+def _chat_completions_sync(body: Dict[str, Any]):
+    return JSONResponse(_chat_completion(body))
+
+
+def _chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
     model = str(body.get("model") or os.environ.get("OPENAI_COMPAT_MODEL_ID", "jarvis_mcp"))
     messages = body.get("messages") if isinstance(body.get("messages"), list) else []
     declared_tools = _normalize_declared_tools(body.get("tools"))
@@ -990,32 +1180,146 @@ async def chat_completions(request: Any):
 
     tool_content = _last_tool_content(messages)
     if tool_content:
-        return JSONResponse(_openai_chat_response(model, _render_tool_content_as_text(tool_content)))
+        return _openai_chat_response(model, _render_tool_content_as_text(tool_content))
 
     user_text = _last_user_text(messages)
     if not user_text:
-        return JSONResponse(_openai_chat_response(model, "请先给我一个问题。"))
+        return _openai_chat_response(model, "请先给我一个问题。")
 
     if enable_tool_calls and declared_tools:
         selected_tool = _pick_declared_tool(declared_tools, tool_choice, user_text)
         if selected_tool:
             arguments = _tool_args_for_name(selected_tool, user_text)
             if not auto_execute_tools:
-                return JSONResponse(_openai_tool_call_response(model, selected_tool, arguments))
+                return _openai_tool_call_response(model, selected_tool, arguments)
             try:
                 tool_ret = _dispatch_tool(selected_tool, user_text)
                 content2 = _to_str((tool_ret or {}).get("final_text"))
-                return JSONResponse(_openai_chat_response(model, content2, request_tool=selected_tool))
+                return _openai_chat_response(model, content2, request_tool=selected_tool)
             except Exception as e:
-                return JSONResponse(_openai_chat_response(model, "服务暂时不可用：{}".format(str(e))))
+                return _openai_chat_response(model, "服务暂时不可用：{}".format(str(e)))
 
     tool_name = _route_tool_name(user_text)
     try:
         tool_ret = _dispatch_tool(tool_name, user_text)
         content = _to_str((tool_ret or {}).get("final_text"))
-        return JSONResponse(_openai_chat_response(model, content, request_tool=tool_name))
+        return _openai_chat_response(model, content, request_tool=tool_name)
+    except Exception as e:
+        return _openai_chat_response(model, "服务暂时不可用：{}".format(str(e)))
+
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？；\n])|(?<=[.!?;])(?=\s)")
+
+
+def _split_sentences(text: str) -> List[str]:
+    # Pieces concatenate back to the exact input, so clients that join deltas get the same text.
+    return [p for p in _SENTENCE_SPLIT_RE.split(str(text or "")) if p]
+
+
+def _sse(obj: Any) -> str:
+    return "data: " + json.dumps(obj, ensure_ascii=False) + "\n\n"
+
+
+def _openai_chunk(chat_id: str, model: str, delta: Dict[str, Any], finish_reason: Any = None) -> Dict[str, Any]:
+    return {
+        "id": chat_id,
+        "object": "chat.completion.chunk",
+        "created": _now_ts(),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _stream_remainder(final: str, parts: List[str]) -> str:
+    """The part of final the client has not received yet, given the parts already streamed."""
+    streamed = "".join(parts)
+    if final.startswith(streamed):
+        return final[len(streamed):]
+    # The answer was rewritten after the parts went out: skip past each streamed part found in
+    # it, in order, and send only what follows the last one.
+    pos = 0
+    for part in parts:
+        p = part.strip()
+        hit = final.find(p, pos) if p else -1
+        if hit >= 0:
+            pos = hit + len(p)
+    if pos > 0:
+        return final[pos:]
+    # Nothing recognisable: assume the streamed sentences stand in for as many leading ones.
+    return "".join(_split_sentences(final)[len(_split_sentences(streamed)):])
+
+
+def _chat_stream_job(body: Dict[str, Any], emit) -> Dict[str, Any]:
+    app_module = _load_app_module()
+    # Skills report finished parts of their answer through app._stream_emit while they run.
+    app_module._STREAM_SINK.set(emit)
+    try:
+        return _chat_completion(body)
     except Exception as e:
-        return JSONResponse(_openai_chat_response(model, "服务暂时不可用：{}".format(str(e))))
+        return _openai_chat_response(str(body.get("model") or ""), "服务暂时不可用：{}".format(str(e)))
+
+
+def _chat_completions_stream(body: Dict[str, Any]):
+    """SSE variant of chat_completions.
+
+    The role chunk goes out right away; text a skill emits while running is streamed
+    as soon as it exists, and the rest of the final answer follows sentence by
+    sentence so TTS can start on the first sentence.
+    """
+    model = str(body.get("model") or os.environ.get("OPENAI_COMPAT_MODEL_ID", "jarvis_mcp"))
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue" = asyncio.Queue()
+
+    def _emit(text: str):
+        loop.call_soon_threadsafe(queue.put_nowait, ("emit", str(text or "")))
+
+    try:
+        fut = _submit_to_pool("slow", _chat_stream_job, body, _emit)
+    except _PoolBusy:
+        return JSONResponse(_openai_busy_body("slow"), status_code=503, headers={"Retry-After": "1"})
+
+    def _done(f):
+        try:
+            queue.put_nowait(("done", f.result()))
+        except BaseException as e:
+            queue.put_nowait(("done", _openai_chat_response(model, "服务暂时不可用：{}".format(str(e)))))
+
+    fut.add_done_callback(_done)
+    chat_id = _chat_id()
+    heartbeat = max(1.0, float(_env_int("OPENAI_COMPAT_STREAM_HEARTBEAT_SEC", 10)))
+
+    async def _events():
+        yield _sse(_openai_chunk(chat_id, model, {"role": "assistant"}))
+        parts: List[str] = []
+        while True:
+            try:
+                kind, val = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # SSE comment keeps proxies and clients from timing out during slow skills.
+                yield ": keep-alive\n\n"
+                continue
+            if kind == "emit":
+                if val:
+                    for piece in _split_sentences(val):
+                        yield _sse(_openai_chunk(chat_id, model, {"content": piece}))
+                    parts.append(val)
+                continue
+            result = val if isinstance(val, dict) else {}
+            choice = ((result.get("choices") or [{}])[0]) if isinstance(result.get("choices"), list) else {}
+            msg = choice.get("message") if isinstance(choice.get("message"), dict) else {}
+            if msg.get("tool_calls"):
+                calls = [dict(c, index=i) for i, c in enumerate(msg.get("tool_calls") or [])]
+                yield _sse(_openai_chunk(chat_id, model, {"tool_calls": calls}))
+                yield _sse(_openai_chunk(chat_id, model, {}, "tool_calls"))
+            else:
+                final = str(msg.get("content") or "")
+                for piece in _split_sentences(_stream_remainder(final, parts)):
+                    yield _sse(_openai_chunk(chat_id, model, {"content": piece}))
+                yield _sse(_openai_chunk(chat_id, model, {}, "stop"))
+            yield "data: [DONE]\n\n"
+            return
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 async def invoke(request: Any):
@@ -1023,7 +1327,10 @@ async def invoke(request: Any):
         body = await request.json()
     except Exception:
         return JSONResponse({"success": False, "error": "Invalid JSON body"}, status_code=400)
+    return await _run_pooled("slow", _invoke_sync, body)
 
+
+def _invoke_sync(body: Dict[str, Any]):
     tool = str(body.get("tool") or "").strip()
     if not tool:
         return JSONResponse({"success": False, "error": "tool is required"}, status_code=400)
@@ -1087,6 +1394,10 @@ async def invoke_news_brief(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_news_brief_sync, body)
+
+
+def _invoke_news_brief_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     topic = str(body.get("topic") or "today").strip()
     if not topic:
@@ -1105,6 +1416,10 @@ async def invoke_answer_question(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_answer_question_sync, body)
+
+
+def _invoke_answer_question_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     text = str(body.get("text") or "").strip()
     mode = str(body.get("mode") or "local_first")
@@ -1117,6 +1432,10 @@ async def invoke_knowledge_lookup(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_knowledge_lookup_sync, body)
+
+
+def _invoke_knowledge_lookup_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     query = str(body.get("query") or "").strip()
     scope = str(body.get("scope") or "")
@@ -1129,6 +1448,10 @@ async def invoke_memory_upsert(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_memory_upsert_sync, body)
+
+
+def _invoke_memory_upsert_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     text = str(body.get("text") or "").strip()
     source = str(body.get("source") or "gateway")
@@ -1144,6 +1467,10 @@ async def invoke_memory_search(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_memory_search_sync, body)
+
+
+def _invoke_memory_search_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     query = str(body.get("query") or "").strip()
     top_k = int(body.get("top_k") or 5)
@@ -1158,6 +1485,10 @@ async def invoke_holiday_query(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_holiday_query_sync, body)
+
+
+def _invoke_holiday_query_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     mode = str(body.get("mode") or "next")
     out = app_module.skill_holiday_query(mode=mode)
@@ -1169,6 +1500,10 @@ async def invoke_finance_admin(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("slow", _invoke_finance_admin_sync, body)
+
+
+def _invoke_finance_admin_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     intent = str(body.get("intent") or "检查账单")
     out = app_module.skill_finance_admin(intent=intent)
@@ -1180,6 +1515,10 @@ async def invoke_music_control(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("ha", _invoke_music_control_sync, body)
+
+
+def _invoke_music_control_sync(body: Dict[str, Any]):
     app_module = _load_app_module()
     text = str(body.get("text") or "").strip()
     mode = str(body.get("mode") or "direct")
@@ -1192,7 +1531,10 @@ async def invoke_ha_execute_service(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("ha", _invoke_ha_execute_service_sync, body)
+
 
+def _invoke_ha_execute_service_sync(body: Dict[str, Any]):
     domain = str(body.get("domain") or "").strip().lower()
     service = str(body.get("service") or "").strip().lower()
     service_data = body.get("service_data") if isinstance(body.get("service_data"), dict) else {}
@@ -1214,7 +1556,7 @@ async def invoke_ha_execute_service(request: Any):
 
     url = "{}/api/services/{}/{}".format(base, domain, service)
     try:
-        resp = requests.post(url, headers=headers, json=service_data, timeout=_ha_timeout())
+        resp = http_pool.post(url, upstream="ha", headers=headers, json=service_data, timeout=_ha_timeout())
         ok = int(resp.status_code) >= 200 and int(resp.status_code) < 300
         try:
             payload = resp.json()
@@ -1239,7 +1581,10 @@ async def invoke_ha_get_state(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("ha", _invoke_ha_get_state_sync, body)
+
 
+def _invoke_ha_get_state_sync(body: Dict[str, Any]):
     entity_id = str(body.get("entity_id") or "").strip()
     name = str(body.get("name") or "").strip()
     domain = _normalize_domain(str(body.get("domain") or ""))
@@ -1267,7 +1612,7 @@ async def invoke_ha_get_state(request: Any):
     try:
         if entity_id:
             url = "{}/api/states/{}".format(base, entity_id)
-            resp = requests.get(url, headers=headers, timeout=_ha_timeout())
+            resp = http_pool.get(url, upstream="ha", headers=headers, timeout=_ha_timeout())
             try:
                 payload = resp.json()
             except Exception:
@@ -1279,7 +1624,7 @@ async def invoke_ha_get_state(request: Any):
             )
 
         url = "{}/api/states".format(base)
-        resp = requests.get(url, headers=headers, timeout=_ha_timeout())
+        resp = http_pool.get(url, upstream="ha", headers=headers, timeout=_ha_timeout())
         ok = int(resp.status_code) >= 200 and int(resp.status_code) < 300
         if not ok:
             return JSONResponse({"success": False, "tool": "ha_get_state", "status_code": int(resp.status_code), "error": str(resp.text or "")[:500]}, status_code=502)
@@ -1367,7 +1712,10 @@ async def invoke_ha_assist_context(request: Any):
         body = await request.json()
     except Exception:
         body = {}
+    return await _run_pooled("ha", _invoke_ha_assist_context_sync, body)
 
+
+def _invoke_ha_assist_context_sync(body: Dict[str, Any]):
     base = _ha_base_url()
     headers = _ha_headers()
     if not base or (not headers):
@@ -1388,7 +1736,7 @@ async def invoke_ha_assist_context(request: Any):
 
     url = "{}/api/conversation/process".format(base)
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=_ha_timeout())
+        resp = http_pool.post(url, upstream="ha", headers=headers, json=payload, timeout=_ha_timeout())
         ok = int(resp.status_code) >= 200 and int(resp.status_code) < 300
         try:
             data = resp.json()
@@ -1412,6 +1760,26 @@ async def invoke_ha_assist_context(request: Any):
         return JSONResponse({"success": False, "tool": "ha_assist_context", "error": str(e)}, status_code=502)
 
 
+def _warmup_start():
+    # This container has its own env (default weather entity etc.), so it warms its own keys;
+    # app is imported on the scheduler's side so the server still starts fast.
+    def boot():
+        try:
+            _load_app_module()._warmup_register()
+        except Exception:
+            pass
+        warmup.register(
+            "ha_area_map",
+            lambda: shared_cache.refresh("ha_registry", "entity_area_map", _ha_entity_area_map_load, cacheable=lambda v: bool(v)),
+            every_sec=300,
+            learn=False,
+        )
+        warmup.start()
+
+    if warmup.enabled():
+        threading.Thread(target=boot, name="warmup-boot", daemon=True).start()
+
+
 async def not_found(_: Any, __: Exception):
     return PlainTextResponse("Not Found", status_code=404)
 
@@ -1419,6 +1787,7 @@ async def not_found(_: Any, __: Exception):
 app = Starlette(
     routes=[
         Route("/health", health, methods=["GET"]),
+        Route("/cache/stats", cache_stats, methods=["GET"]),
         Route("/openapi.json", openapi_json, methods=["GET"]),
         Route("/invoke", invoke, methods=["POST"]),
         Route("/invoke/news_brief", invoke_news_brief, methods=["POST"]),
@@ -1437,6 +1806,7 @@ app = Starlette(
     ],
     exception_handlers={404: not_found},
 )
+app.add_middleware(_DeadlineMiddleware)
 
 
 if __name__ == "__main__":
@@ -1444,4 +1814,5 @@ if __name__ == "__main__":
 
     host = str(os.environ.get("HOST") or "0.0.0.0")
     port = int(os.environ.get("PORT") or "19100")
+    _warmup_start()
     uvicorn.run(app, host=host, port=port)
@@ -0,0 +1,350 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None
+
+
+def available() -> bool:
+    return np is not None
+
+
+class LocalVectorIndex:
+    """On-disk cosine index mirroring the Qdrant collection, for when Qdrant is unreachable.
+
+    Layout under path_dir:
+    - vectors.f32: row-major float32 matrix of L2-normalised vectors, opened with mmap.
+    - meta.sqlite3: one row per matrix row (point id, user_id, tags, payload, IVF list).
+    - ivf.npy: IVF centroids written by build(); without it every live row is scanned.
+
+    Upserts append rows (the previous row of the same id is tombstoned) inside a
+    SQLite write transaction, so the app and the sync scripts can share a directory.
+    Readers reload when the stored version changes. build() compacts and retrains.
+    """
+
+    def __init__(self, path_dir: str, dim: int, nprobe: int = 8, brute_force_max: int = 20000):
+        if np is None:
+            raise RuntimeError("numpy_not_installed")
+        self.dir = os.path.abspath(path_dir)
+        self.dim = int(dim)
+        self.nprobe = max(1, int(nprobe))
+        self.brute_force_max = max(0, int(brute_force_max))
+        os.makedirs(self.dir, exist_ok=True)
+        self._vec_path = os.path.join(self.dir, "vectors.f32")
+        self._ivf_path = os.path.join(self.dir, "ivf.npy")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(self.dir, "meta.sqlite3"), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points(row INTEGER PRIMARY KEY, pid TEXT NOT NULL, user_id TEXT, tags TEXT, payload TEXT, "
+            "deleted INTEGER DEFAULT 0, list INTEGER DEFAULT -1, gen INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_points_pid ON points(pid, deleted)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_points_gen ON points(gen)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta(k TEXT PRIMARY KEY, v TEXT)")
+        stored_dim = self._meta_get("dim")
+        if stored_dim and int(stored_dim) != self.dim:
+            # Embedding model changed: the old matrix is unusable.
+            self._reset()
+        self._meta_set("dim", str(self.dim))
+        if not self._meta_get("epoch"):
+            self._new_epoch()
+        self._loaded_epoch = None
+        self._loaded_gen = -1
+        self._clear_loaded()
+
+    # ---- metadata helpers ----
+    def _meta_get(self, k: str) -> str:
+        row = self._conn.execute("SELECT v FROM meta WHERE k=?", (k,)).fetchone()
+        return str(row[0]) if row and row[0] is not None else ""
+
+    def _meta_set(self, k: str, v: str) -> None:
+        self._conn.execute("INSERT INTO meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v", (k, str(v)))
+
+    def _new_epoch(self) -> None:
+        # Row numbers were rewritten (reset/build): readers must reload everything.
+        self._meta_set("epoch", "%d.%d" % (int(time.time() * 1000), os.getpid()))
+
+    def _next_gen(self) -> int:
+        # Every write stamps the rows it touches, so readers only re-read those.
+        g = int(self._meta_get("gen") or 0) + 1
+        self._meta_set("gen", str(g))
+        return g
+
+    def _reset(self) -> None:
+        self._conn.execute("DELETE FROM points")
+        for p in (self._vec_path, self._ivf_path):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+        self._new_epoch()
+
+    # ---- loading ----
+    def _clear_loaded(self) -> None:
+        self._mat = None
+        self._n = 0
+        self._pids: List[str] = []
+        self._live = np.zeros(0, dtype=bool)
+        self._users = np.zeros(0, dtype=np.int32)
+        self._row_lists = np.zeros(0, dtype=np.int32)
+        self._user_codes: Dict[str, int] = {}
+        self._tags: List[frozenset] = []
+        self._tag_masks: Dict[str, Any] = {}
+        self._centroids = None
+        self._lists: Dict[int, Any] = {}
+
+    def _refresh(self) -> None:
+        epoch = self._meta_get("epoch")
+        gen = int(self._meta_get("gen") or 0)
+        if epoch == self._loaded_epoch and gen == self._loaded_gen:
+            return
+        cols = "SELECT row, pid, user_id, tags, deleted, list FROM points"
+        if epoch != self._loaded_epoch:
+            self._clear_loaded()
+            self._centroids = np.load(self._ivf_path) if os.path.exists(self._ivf_path) else None
+            rows = self._conn.execute(cols + " ORDER BY row").fetchall()
+        else:
+            rows = self._conn.execute(cols + " WHERE gen>? ORDER BY row", (int(self._loaded_gen),)).fetchall()
+        self._apply_rows(rows)
+        self._loaded_epoch = epoch
+        self._loaded_gen = gen
+
+    def _apply_rows(self, rows: list) -> None:
+        size = os.path.getsize(self._vec_path) if os.path.exists(self._vec_path) else 0
+        top = (max(int(r[0]) for r in rows) + 1) if rows else 0
+        n = min(max(self._n, top), size // (4 * self.dim))
+        if n > self._n:
+            grow = n - self._n
+            self._pids.extend([""] * grow)
+            self._tags.extend([frozenset()] * grow)
+            self._live = np.concatenate([self._live, np.zeros(grow, dtype=bool)])
+            self._users = np.concatenate([self._users, np.full(grow, -1, dtype=np.int32)])
+            self._row_lists = np.concatenate([self._row_lists, np.full(grow, -1, dtype=np.int32)])
+            for t in list(self._tag_masks.keys()):
+                self._tag_masks[t] = np.concatenate([self._tag_masks[t], np.zeros(grow, dtype=bool)])
+            self._n = n
+            self._mat = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        for row, pid, uid, tag_json, deleted, lst in rows:
+            r = int(row)
+            if r >= self._n:
+                continue
+            self._pids[r] = str(pid)
+            self._live[r] = not int(deleted or 0)
+            u = str(uid or "")
+            if u not in self._user_codes:
+                self._user_codes[u] = len(self._user_codes)
+            self._users[r] = self._user_codes[u]
+            self._row_lists[r] = int(lst if lst is not None else -1)
+            try:
+                self._tags[r] = frozenset(json.loads(tag_json or "[]"))
+            except Exception:
+                self._tags[r] = frozenset()
+            for t, m in self._tag_masks.items():
+                m[r] = t in self._tags[r]
+        self._lists = {}
+        if self._centroids is not None and self._n:
+            order = np.argsort(self._row_lists, kind="stable")
+            bounds = np.searchsorted(self._row_lists[order], np.arange(-1, len(self._centroids) + 1))
+            for c in range(-1, len(self._centroids)):
+                self._lists[c] = order[bounds[c + 1] : bounds[c + 2]]
+
+    def _tag_mask(self, tag: str):
+        m = self._tag_masks.get(tag)
+        if m is None:
+            m = np.fromiter((tag in t for t in self._tags), dtype=bool, count=self._n)
+            self._tag_masks[tag] = m
+        return m
+
+    def _normalize(self, vecs):
+        arr = np.asarray(vecs, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return arr / norms
+
+    def _nearest_lists(self, arr):
+        if self._centroids is None:
+            return [-1] * len(arr)
+        return [int(x) for x in np.argmax(arr @ self._centroids.T, axis=1)]
+
+    # ---- writes ----
+    def upsert(self, points: List[Dict[str, Any]]) -> int:
+        items = [p for p in (points or []) if isinstance(p, dict) and p.get("id") is not None and p.get("vector") is not None and len(p.get("vector")) == self.dim]
+        if not items:
+            return 0
+        arr = self._normalize([p["vector"] for p in items])
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._loaded_epoch != self._meta_get("epoch"):
+                    # Only the centroids are needed to place new rows; skip the full reload.
+                    self._centroids = np.load(self._ivf_path) if os.path.exists(self._ivf_path) else None
+                row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM points").fetchone()
+                start = int(row[0] or 0)
+                gen = self._next_gen()
+                lists = self._nearest_lists(arr)
+                with open(self._vec_path, "ab") as f:
+                    f.truncate(start * 4 * self.dim)
+                    f.write(arr.astype(np.float32).tobytes())
+                    f.flush()
+                rows = []
+                for i, p in enumerate(items):
+                    payload = p.get("payload") if isinstance(p.get("payload"), dict) else {}
+                    tags = payload.get("tags") if isinstance(payload.get("tags"), list) else []
+                    pid = str(p.get("id"))
+                    self._conn.execute("UPDATE points SET deleted=1, gen=? WHERE pid=? AND deleted=0", (gen, pid))
+                    rows.append((start + i, pid, str(payload.get("user_id") or ""), json.dumps([str(t) for t in tags]), json.dumps(payload, ensure_ascii=False), lists[i], gen))
+                self._conn.executemany("INSERT INTO points(row, pid, user_id, tags, payload, deleted, list, gen) VALUES(?,?,?,?,?,0,?,?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(items)
+
+    def delete(self, ids: List[str]) -> int:
+        keys = [str(x) for x in (ids or []) if x is not None]
+        if not keys:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                n = 0
+                gen = self._next_gen()
+                for pid in keys:
+                    n += self._conn.execute("UPDATE points SET deleted=1, gen=? WHERE pid=? AND deleted=0", (gen, pid)).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return n
+
+    def build(self, nlist: int = 0, iters: int = 8, sample: int = 20000) -> Dict[str, Any]:
+        """Drop tombstoned rows and retrain IVF centroids (k-means on a sample)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._loaded_epoch = None
+                self._refresh()
+                live_rows = np.nonzero(self._live)[0] if self._n else np.zeros(0, dtype=np.int64)
+                mat = np.asarray(self._mat[live_rows]) if len(live_rows) else np.zeros((0, self.dim), dtype=np.float32)
+                k = int(nlist) if int(nlist or 0) > 0 else int(max(1, round(len(live_rows) ** 0.5)))
+                centroids = None
+                if len(live_rows) > self.brute_force_max and k > 1:
+                    rng = np.random.default_rng(0)
+                    pick = rng.choice(len(live_rows), size=min(int(sample), len(live_rows)), replace=False)
+                    train = mat[pick]
+                    centroids = train[rng.choice(len(train), size=k, replace=False)].copy()
+                    for _ in range(int(iters)):
+                        assign = np.argmax(train @ centroids.T, axis=1)
+                        for c in range(k):
+                            members = train[assign == c]
+                            if len(members):
+                                centroids[c] = members.mean(axis=0)
+                        centroids = self._normalize(centroids)
+                assign_all = np.full(len(live_rows), -1, dtype=np.int64)
+                if centroids is not None:
+                    for i in range(0, len(mat), 8192):
+                        assign_all[i : i + 8192] = np.argmax(mat[i : i + 8192] @ centroids.T, axis=1)
+                old = dict(
+                    (int(r), (pid, uid, tags, payload))
+                    for r, pid, uid, tags, payload in self._conn.execute("SELECT row, pid, user_id, tags, payload FROM points WHERE deleted=0")
+                )
+                tmp = self._vec_path + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(mat.astype(np.float32).tobytes())
+                self._conn.execute("DELETE FROM points")
+                self._conn.executemany(
+                    "INSERT INTO points(row, pid, user_id, tags, payload, deleted, list) VALUES(?,?,?,?,?,0,?)",
+                    [(i, *old[int(r)], int(assign_all[i])) for i, r in enumerate(live_rows) if int(r) in old],
+                )
+                os.replace(tmp, self._vec_path)
+                if centroids is not None:
+                    with open(self._ivf_path + ".tmp", "wb") as f:
+                        np.save(f, centroids.astype(np.float32))
+                    os.replace(self._ivf_path + ".tmp", self._ivf_path)
+                elif os.path.exists(self._ivf_path):
+                    os.remove(self._ivf_path)
+                self._new_epoch()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._loaded_epoch = None
+        return {"rows": int(len(live_rows)), "lists": int(len(centroids)) if centroids is not None else 0}
+
+    # ---- reads ----
+    def search(self, vector: List[float], top_k: int = 5, score_threshold: float = 0.0, user_id: str = "", tags: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        if vector is None or len(vector) != self.dim:
+            return []
+        q = self._normalize([vector])[0]
+        with self._lock:
+            self._refresh()
+            if self._n <= 0 or self._mat is None:
+                return []
+            ivf = self._centroids is not None and len(self._lists) > 0
+            if ivf:
+                probe = np.argsort(self._centroids @ q)[-self.nprobe :]
+                parts = [self._lists.get(int(c)) for c in probe] + [self._lists.get(-1)]
+                cand = np.concatenate([p for p in parts if p is not None and len(p)] or [np.zeros(0, dtype=np.int64)])
+            else:
+                cand = np.arange(self._n)
+            mask = self._live[cand]
+            uid = str(user_id or "").strip()
+            if uid:
+                code = self._user_codes.get(uid)
+                if code is None:
+                    return []
+                mask &= self._users[cand] == code
+            stags = [str(t) for t in (tags or []) if str(t or "").strip()]
+            if stags:
+                any_tag = np.zeros(len(cand), dtype=bool)
+                for t in stags:
+                    any_tag |= self._tag_mask(t)[cand]
+                mask &= any_tag
+            cand = np.sort(cand[mask])
+            if len(cand) == 0:
+                return []
+            if ivf:
+                scores = np.asarray(self._mat[cand]) @ q
+            else:
+                # Full scan: one pass over the mmap instead of gathering rows first.
+                scores = (self._mat @ q)[cand]
+            k = min(int(top_k or 5), len(cand))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            picked = [(int(cand[i]), float(scores[i])) for i in top if float(scores[i]) >= float(score_threshold or 0.0)]
+            if not picked:
+                return []
+            marks = ",".join(["?"] * len(picked))
+            payloads = dict(
+                (int(r), p) for r, p in self._conn.execute("SELECT row, payload FROM points WHERE row IN (" + marks + ")", [r for r, _s in picked])
+            )
+            out = []
+            for r, s in picked:
+                try:
+                    payload = json.loads(payloads.get(r) or "{}")
+                except Exception:
+                    payload = {}
+                out.append({"id": self._pids[r], "score": s, "payload": payload})
+            return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "rows": int(self._n),
+                "live": int(self._live.sum()) if self._live is not None else 0,
+                "lists": int(len(self._centroids)) if self._centroids is not None else 0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._mat = None
+            self._conn.close()
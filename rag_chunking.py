@@ -0,0 +1,182 @@
+import hashlib
+import re
+from typing import List, Tuple
+
+
+def split_text(text: str, chunk_size: int = 900, overlap: int = 120) -> List[str]:
+    raw = str(text or "").strip()
+    if not raw:
+        return []
+
+    # Simple paragraph-based packing; stable and language-agnostic.
+    paras = [p.strip() for p in raw.replace("\r", "\n").split("\n") if str(p or "").strip()]
+    chunks: List[str] = []
+    cur = ""
+    for p in paras:
+        if not cur:
+            cur = p
+            continue
+        if len(cur) + 1 + len(p) <= int(chunk_size):
+            cur += "\n" + p
+        else:
+            chunks.append(cur)
+            tail = cur[-int(overlap):] if int(overlap) > 0 else ""
+            cur = (tail + "\n" + p).strip() if tail else p
+    if cur:
+        chunks.append(cur)
+
+    out: List[str] = []
+    for c in chunks:
+        c = c.strip()
+        if not c:
+            continue
+        if len(c) <= int(chunk_size):
+            out.append(c)
+            continue
+        i = 0
+        step = max(1, int(chunk_size) - int(overlap))
+        while i < len(c):
+            out.append(c[i : i + int(chunk_size)])
+            i += step
+    return out
+
+
+def _paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    spans: List[Tuple[int, int]] = []
+    for m in re.finditer(r"[^\r\n]+", text):
+        s, e = m.start(), m.end()
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if e > s:
+            spans.append((s, e))
+    return spans
+
+
+def split_text_spans(text: str, chunk_size: int = 900, overlap: int = 120) -> List[Tuple[int, int]]:
+    """Same packing rules as split_text, returned as (start, end) offsets into text.
+
+    Chunks group the same paragraphs split_text would; text[start:end] keeps the
+    original line breaks between them, so offsets stay valid for highlighting.
+    """
+    raw = str(text or "")
+    size = int(chunk_size)
+    ov = int(overlap)
+    groups: List[Tuple[int, int]] = []
+    cur_start = -1
+    cur_end = -1
+    cur_len = 0
+    for s, e in _paragraph_spans(raw):
+        plen = e - s
+        if cur_start < 0:
+            cur_start, cur_end, cur_len = s, e, plen
+            continue
+        if cur_len + 1 + plen <= size:
+            cur_end = e
+            cur_len += 1 + plen
+        else:
+            groups.append((cur_start, cur_end))
+            if ov > 0:
+                cur_start = max(cur_start, cur_end - ov)
+                cur_len = (cur_end - cur_start) + 1 + plen
+            else:
+                cur_start = s
+                cur_len = plen
+            cur_end = e
+    if cur_start >= 0:
+        groups.append((cur_start, cur_end))
+
+    out: List[Tuple[int, int]] = []
+    for s, e in groups:
+        if (e - s) <= size:
+            out.append((s, e))
+            continue
+        i = s
+        step = max(1, size - ov)
+        while i < e:
+            out.append((i, min(e, i + size)))
+            i += step
+    return out
+
+
+# Content-defined chunking: boundaries depend on the text around them, not on
+# their offset, so an edit only re-cuts the chunks it touches.
+_CDC_GEAR = [int.from_bytes(hashlib.sha1(b"cdc-gear-%d" % i).digest()[:4], "big") for i in range(256)]
+_CDC_CHAR_MASK = (1 << 9) - 1
+_CDC_PARA_MOD = 4
+
+
+def _cdc_char_spans(text: str, start: int, end: int, min_size: int, max_size: int) -> List[Tuple[int, int]]:
+    # Gear rolling hash over characters, for paragraphs longer than one chunk.
+    out: List[Tuple[int, int]] = []
+    s = start
+    h = 0
+    i = start
+    while i < end:
+        h = ((h << 1) + _CDC_GEAR[ord(text[i]) & 0xFF]) & 0xFFFFFFFF
+        i += 1
+        n = i - s
+        if n < min_size:
+            continue
+        if ((h & _CDC_CHAR_MASK) == 0) or (n >= max_size):
+            out.append((s, i))
+            s = i
+            h = 0
+    if s < end:
+        out.append((s, end))
+    return out
+
+
+def _cdc_is_boundary(unit: str) -> bool:
+    d = hashlib.sha1(unit.encode("utf-8", errors="ignore")).digest()
+    return (d[0] % _CDC_PARA_MOD) == 0
+
+
+def split_text_cdc_spans(text: str, chunk_size: int = 900, min_size: int = 0) -> List[Tuple[int, int]]:
+    """Chunk (start, end) offsets with content-defined boundaries.
+
+    Paragraphs are packed until the chunk is at least min_size (default a third
+    of chunk_size) and a paragraph whose hash marks a boundary closes it; a
+    Markdown heading also starts a new chunk. chunk_size is a hard cap.
+    Paragraphs longer than chunk_size are cut with a rolling hash.
+    """
+    raw = str(text or "")
+    size = max(16, int(chunk_size))
+    lo = int(min_size) if int(min_size or 0) > 0 else size // 3
+    lo = min(lo, size)
+    units: List[Tuple[int, int]] = []
+    for s, e in _paragraph_spans(raw):
+        if (e - s) > size:
+            units.extend(_cdc_char_spans(raw, s, e, lo, size))
+        else:
+            units.append((s, e))
+
+    out: List[Tuple[int, int]] = []
+    cs = -1
+    ce = -1
+    for s, e in units:
+        if cs >= 0:
+            heading = raw[s] == "#"
+            if ((e - cs) > size) or (heading and (ce - cs) >= lo):
+                out.append((cs, ce))
+                cs = -1
+        if cs < 0:
+            cs = s
+        ce = e
+        if ((ce - cs) >= lo) and _cdc_is_boundary(raw[s:e]):
+            out.append((cs, ce))
+            cs = -1
+    if cs >= 0:
+        out.append((cs, ce))
+    return out
+
+
+def split_text_cdc(text: str, chunk_size: int = 900, min_size: int = 0) -> List[str]:
+    raw = str(text or "").replace("\r\n", "\n").replace("\r", "\n")
+    out: List[str] = []
+    for s, e in split_text_cdc_spans(raw, chunk_size=chunk_size, min_size=min_size):
+        c = raw[s:e].strip()
+        if c:
+            out.append(c)
+    return out
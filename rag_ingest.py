@@ -0,0 +1,225 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+
+def ollama_embed_batch(ollama_base: str, model: str, texts: List[str], timeout_sec: float) -> List[List[float]]:
+    # /api/embed accepts a list input and returns one embedding per item, in order.
+    payload = {"model": model, "input": list(texts)}
+    r = requests.post(ollama_base.rstrip("/") + "/api/embed", json=payload, timeout=timeout_sec)
+    if int(getattr(r, "status_code", 0) or 0) >= 400:
+        raise RuntimeError(f"embed_failed_http_{int(r.status_code)}")
+    obj = r.json() if hasattr(r, "json") else {}
+    embs = obj.get("embeddings") if isinstance(obj, dict) else []
+    if not isinstance(embs, list) or len(embs) != len(texts) or any((not isinstance(e, list)) for e in embs):
+        raise RuntimeError("embed_invalid_response")
+    return [[float(x) for x in e] for e in embs]
+
+
+def qdrant_upsert(qdrant_url: str, collection: str, points: List[Dict[str, Any]], timeout_sec: float, wait: bool = True) -> None:
+    url = qdrant_url.rstrip("/") + f"/collections/{collection}/points?wait=" + ("true" if wait else "false")
+    r = requests.put(url, json={"points": points}, timeout=timeout_sec)
+    if int(getattr(r, "status_code", 0) or 0) >= 400:
+        raise RuntimeError(f"qdrant_upsert_http_{int(r.status_code)}:{str(getattr(r, 'text', ''))[:200]}")
+
+
+def chunk_sha1(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8", errors="ignore")).hexdigest()
+
+
+class ChunkVectorStore:
+    """content_sha1 -> float32 vector, per (model, dim), shared by every sync script.
+
+    Identical chunk text in another file, a moved file or the other connector
+    reuses the stored vector instead of calling the embedding model again.
+    """
+
+    def __init__(self, path: str, model: str, dim: int):
+        self.model = str(model or "")
+        self.dim = int(dim)
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_vectors(sha1 TEXT NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB, ts INTEGER, "
+            "PRIMARY KEY(sha1, model, dim))"
+        )
+        self._conn.commit()
+
+    def get_many(self, shas: List[str]) -> Dict[str, List[float]]:
+        keys = sorted(set([str(x) for x in shas if x]))
+        out: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                q = "SELECT sha1, vec FROM chunk_vectors WHERE model=? AND dim=? AND sha1 IN (" + ",".join(["?"] * len(part)) + ")"
+                for sha, blob in self._conn.execute(q, [self.model, self.dim] + part).fetchall():
+                    arr = array("f")
+                    arr.frombytes(bytes(blob or b""))
+                    if len(arr) == self.dim:
+                        out[str(sha)] = [float(x) for x in arr]
+        return out
+
+    def put_many(self, items: List[Tuple[str, List[float]]]) -> None:
+        now = int(time.time())
+        rows = [(sha, self.model, self.dim, sqlite3.Binary(array("f", vec).tobytes()), now) for sha, vec in items if sha and len(vec) == self.dim]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunk_vectors(sha1, model, dim, vec, ts) VALUES(?,?,?,?,?)", rows)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbedUpsertPipeline:
+    """Batch chunks into /api/embed calls and stream the vectors into Qdrant.
+
+    add() buffers (point_id, text, payload); every embed_batch items go to a worker
+    that embeds them in one request and upserts the resulting points. At most
+    concurrency batches are in flight; add() blocks when the pipeline is full.
+    close() drains everything and re-raises the first worker error.
+    With a ChunkVectorStore, chunks whose content_sha1 is already stored are
+    upserted with the stored vector and only new content is embedded.
+    With a local_index (rag_ann.LocalVectorIndex), upserted points are mirrored
+    into it so the app's local fallback search stays in sync.
+    """
+
+    def __init__(
+        self,
+        ollama_base: str,
+        model: str,
+        vector_size: int,
+        qdrant_url: str,
+        collection: str,
+        embed_batch: int = 32,
+        concurrency: int = 2,
+        timeout_sec: float = 20.0,
+        wait: bool = False,
+        store: Optional[ChunkVectorStore] = None,
+        local_index: Any = None,
+    ):
+        self.ollama_base = ollama_base
+        self.model = model
+        self.vector_size = int(vector_size)
+        self.qdrant_url = qdrant_url
+        self.collection = collection
+        self.embed_batch = max(1, int(embed_batch))
+        self.concurrency = max(1, int(concurrency))
+        self.timeout_sec = float(timeout_sec)
+        self.wait = bool(wait)
+        self.store = store
+        self.local_index = local_index
+        self._buf: List[tuple] = []
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._t0 = time.perf_counter()
+        self.stats = {"chunks": 0, "embedded": 0, "upserted": 0, "reused": 0, "embed_calls": 0, "embed_sec": 0.0, "upsert_sec": 0.0}
+
+    def add(self, point_id: str, text: str, payload: Dict[str, Any]) -> None:
+        self._raise_if_failed()
+        self._buf.append((point_id, text, payload))
+        self.stats["chunks"] += 1
+        if len(self._buf) >= self.embed_batch:
+            self._submit()
+
+    def _submit(self) -> None:
+        if not self._buf:
+            return
+        batch = self._buf
+        self._buf = []
+        self._slots.acquire()
+        try:
+            self._pool.submit(self._run_batch, batch)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run_batch(self, batch: List[tuple]) -> None:
+        try:
+            if self._error is not None:
+                return
+            t0 = time.perf_counter()
+            shas = [str((p or {}).get("content_sha1") or "") or chunk_sha1(t) for _pid, t, p in batch]
+            known = self.store.get_many(shas) if self.store is not None else {}
+            todo = []
+            queued = set()
+            for sha, (_pid, text, _p) in zip(shas, batch):
+                if (sha not in known) and (sha not in queued):
+                    queued.add(sha)
+                    todo.append((sha, text))
+            fresh: List[Tuple[str, List[float]]] = []
+            if todo:
+                vecs = ollama_embed_batch(self.ollama_base, self.model, [t for _sha, t in todo], timeout_sec=self.timeout_sec)
+                for (sha, _text), vec in zip(todo, vecs):
+                    if len(vec) != self.vector_size:
+                        raise RuntimeError(f"vector_size_mismatch got={len(vec)} expected={self.vector_size}")
+                    fresh.append((sha, vec))
+                    known[sha] = vec
+            t1 = time.perf_counter()
+            points = []
+            for sha, (pid, _text, payload) in zip(shas, batch):
+                points.append({"id": pid, "vector": known[sha], "payload": payload})
+            qdrant_upsert(self.qdrant_url, self.collection, points, timeout_sec=self.timeout_sec, wait=self.wait)
+            if fresh and (self.store is not None):
+                self.store.put_many(fresh)
+            if self.local_index is not None:
+                self.local_index.upsert(points)
+            t2 = time.perf_counter()
+            with self._lock:
+                if todo:
+                    self.stats["embed_calls"] += 1
+                self.stats["embedded"] += len(fresh)
+                self.stats["reused"] += len(points) - len(fresh)
+                self.stats["upserted"] += len(points)
+                self.stats["embed_sec"] += t1 - t0
+                self.stats["upsert_sec"] += t2 - t1
+        except BaseException as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+        finally:
+            self._slots.release()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> Dict[str, Any]:
+        try:
+            if self._error is None:
+                self._submit()
+        finally:
+            self._pool.shutdown(wait=True)
+        self._raise_if_failed()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(1e-6, time.perf_counter() - self._t0)
+        with self._lock:
+            st = dict(self.stats)
+        return {
+            "chunks": int(st["chunks"]),
+            "embedded": int(st["embedded"]),
+            "reused": int(st["reused"]),
+            "upserted": int(st["upserted"]),
+            "embed_calls": int(st["embed_calls"]),
+            "elapsed_sec": round(elapsed, 2),
+            "embed_sec": round(float(st["embed_sec"]), 2),
+            "upsert_sec": round(float(st["upsert_sec"]), 2),
+            "chunks_per_sec": round(float(st["upserted"]) / elapsed, 1),
+        }
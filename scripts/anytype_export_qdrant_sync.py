@@ -7,6 +7,12 @@ It does NOT require Anytype Local API to be running.
 Design:
 - Deterministic point IDs per (relpath, chunk_index) so updates overwrite.
 - State file stores previous chunk_total; when chunk_total shrinks we delete extra old points.
+- State file also keeps each chunk's content_sha1; unchanged chunks are not re-embedded.
+- Chunk boundaries are content-defined (--chunker cdc), so an edit only changes nearby chunks.
+- Vectors are stored by content_sha1 in a store shared with anytype_qdrant_sync.py;
+  moved/renamed files and repeated text reuse them instead of re-embedding.
+- Chunks are embedded in batches (list input to /api/embed) with a bounded number of
+  requests in flight, and upserted with wait=false as each batch completes.
 """
 
 import argparse
@@ -28,6 +34,12 @@ try:
 except Exception:
     PdfReader = None
 
+# Chunkers shared with app.py's doc_chunks store and the Anytype API sync.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rag_chunking import split_text as _split_text, split_text_cdc as _split_text_cdc  # noqa: E402
+from rag_ingest import ChunkVectorStore, EmbedUpsertPipeline  # noqa: E402
+import rag_ann  # noqa: E402
+
 
 def _env(name: str, default: str = "") -> str:
     return str(os.environ.get(name) or default).strip()
@@ -101,63 +113,6 @@ def _extract_text(path: str, ext: str, max_bytes: int = 2_000_000, max_chars: in
     return ""
 
 
-def _split_text(text: str, chunk_size: int = 900, overlap: int = 120) -> List[str]:
-    raw = str(text or "").strip()
-    if not raw:
-        return []
-
-    # Simple paragraph-based packing; stable and language-agnostic.
-    paras = [p.strip() for p in raw.replace("\r", "\n").split("\n") if str(p or "").strip()]
-    chunks: List[str] = []
-    cur = ""
-    for p in paras:
-        if not cur:
-            cur = p
-            continue
-        if len(cur) + 1 + len(p) <= int(chunk_size):
-            cur += "\n" + p
-        else:
-            chunks.append(cur)
-            tail = cur[-int(overlap):] if int(overlap) > 0 else ""
-            cur = (tail + "\n" + p).strip() if tail else p
-    if cur:
-        chunks.append(cur)
-
-    out: List[str] = []
-    for c in chunks:
-        c = c.strip()
-        if not c:
-            continue
-        if len(c) <= int(chunk_size):
-            out.append(c)
-            continue
-        i = 0
-        step = max(1, int(chunk_size) - int(overlap))
-        while i < len(c):
-            out.append(c[i : i + int(chunk_size)])
-            i += step
-    return out
-
-
-def _ollama_embed(ollama_base: str, model: str, text: str, timeout_sec: float) -> List[float]:
-    payload = {"model": model, "input": text}
-    r = requests.post(ollama_base.rstrip("/") + "/api/embed", json=payload, timeout=timeout_sec)
-    if int(getattr(r, "status_code", 0) or 0) >= 400:
-        raise RuntimeError(f"embed_failed_http_{int(r.status_code)}")
-    obj = r.json() if hasattr(r, "json") else {}
-    embs = obj.get("embeddings") if isinstance(obj, dict) else []
-    if not isinstance(embs, list) or len(embs) <= 0 or (not isinstance(embs[0], list)):
-        raise RuntimeError("embed_invalid_response")
-    return [float(x) for x in embs[0]]
-
-
-def _qdrant_upsert(qdrant_url: str, collection: str, points: List[Dict[str, Any]], timeout_sec: float) -> None:
-    url = qdrant_url.rstrip("/") + f"/collections/{collection}/points?wait=true"
-    r = requests.put(url, json={"points": points}, timeout=timeout_sec)
-    if int(getattr(r, "status_code", 0) or 0) >= 400:
-        raise RuntimeError(f"qdrant_upsert_http_{int(r.status_code)}:{str(getattr(r, 'text', ''))[:200]}")
-
-
 def _qdrant_delete_ids(qdrant_url: str, collection: str, ids: List[str], timeout_sec: float) -> None:
     if not ids:
         return
@@ -256,8 +211,29 @@ def run(args) -> int:
 
     scanned = 0
     changed = 0
-    upserted = 0
+    skipped = 0
     deleted = 0
+    pipe = None
+    store = None
+    local_index = None
+    if not args.dry_run:
+        if args.vector_store:
+            store = ChunkVectorStore(args.vector_store, embed_model, vector_size)
+        if args.local_ann_dir and rag_ann.available():
+            local_index = rag_ann.LocalVectorIndex(args.local_ann_dir, vector_size)
+        pipe = EmbedUpsertPipeline(
+            ollama_base,
+            embed_model,
+            vector_size,
+            qdrant_url,
+            qdrant_collection,
+            embed_batch=args.embed_batch,
+            concurrency=args.embed_concurrency,
+            timeout_sec=args.timeout_sec,
+            wait=False,
+            store=store,
+            local_index=local_index,
+        )
 
     for p in paths:
         scanned += 1
@@ -270,6 +246,9 @@ def run(args) -> int:
         prev_mtime = float((prev or {}).get("mtime") or 0.0) if isinstance(prev, dict) else 0.0
         prev_size = int((prev or {}).get("size") or 0) if isinstance(prev, dict) else 0
         prev_chunks = int((prev or {}).get("chunk_total") or 0) if isinstance(prev, dict) else 0
+        prev_shas = (prev or {}).get("chunk_sha1") if isinstance(prev, dict) else None
+        if (not isinstance(prev_shas, list)) or args.full_reindex:
+            prev_shas = []
 
         if (not args.full_reindex) and (abs(prev_mtime - mtime) < 0.000001) and (prev_size == size):
             continue
@@ -280,7 +259,10 @@ def run(args) -> int:
             files_state[rel] = {"mtime": mtime, "size": size, "chunk_total": 0, "sha1": ""}
             continue
 
-        chunks = _split_text(text, chunk_size=args.chunk_size, overlap=args.chunk_overlap)
+        if args.chunker == "fixed":
+            chunks = _split_text(text, chunk_size=args.chunk_size, overlap=args.chunk_overlap)
+        else:
+            chunks = _split_text_cdc(text, chunk_size=args.chunk_size)
         chunks = [c for c in chunks if c.strip()]
 
         changed += 1
@@ -289,16 +271,19 @@ def run(args) -> int:
         if (not args.dry_run) and prev_chunks > len(chunks) and prev_chunks > 0:
             ids = [_point_id_for(rel, i) for i in range(len(chunks), prev_chunks)]
             _qdrant_delete_ids(qdrant_url, qdrant_collection, ids, timeout_sec=args.timeout_sec)
+            if local_index is not None:
+                local_index.delete(ids)
             deleted += len(ids)
 
-        if not args.dry_run:
-            points: List[Dict[str, Any]] = []
+        file_sha1 = _sha1_bytes(_read_file_bytes(p, 2_000_000))
+        chunk_shas = [_sha1_text(c) for c in chunks]
+        if pipe is not None:
+            ext = os.path.splitext(rel)[1].lower().lstrip(".")
             for idx, chunk in enumerate(chunks):
-                vec = _ollama_embed(ollama_base, embed_model, chunk, timeout_sec=args.timeout_sec)
-                if len(vec) != vector_size:
-                    raise RuntimeError(f"vector_size_mismatch got={len(vec)} expected={vector_size}")
-                pid = _point_id_for(rel, idx)
-                ext = os.path.splitext(rel)[1].lower().lstrip(".")
+                # Same point id and same text: the stored vector is still valid.
+                if idx < len(prev_shas) and prev_shas[idx] == chunk_shas[idx]:
+                    skipped += 1
+                    continue
                 payload = {
                     "source": "anytype_export",
                     "connector": "anytype_export",
@@ -311,38 +296,43 @@ def run(args) -> int:
                     "chunk_index": idx,
                     "chunk_total": len(chunks),
                     "updated_at": datetime.utcfromtimestamp(mtime).replace(microsecond=0).isoformat() + "Z",
-                    "content_sha1": _sha1_text(chunk),
-                    "file_sha1": _sha1_bytes(_read_file_bytes(p, 2_000_000)),
+                    "content_sha1": chunk_shas[idx],
+                    "file_sha1": file_sha1,
                     "sync_at": _now_iso(),
                 }
-                points.append({"id": pid, "vector": vec, "payload": payload})
-
-                # Avoid huge request bodies.
-                if len(points) >= 32:
-                    _qdrant_upsert(qdrant_url, qdrant_collection, points, timeout_sec=args.timeout_sec)
-                    upserted += len(points)
-                    points = []
-
-            if points:
-                _qdrant_upsert(qdrant_url, qdrant_collection, points, timeout_sec=args.timeout_sec)
-                upserted += len(points)
+                pipe.add(_point_id_for(rel, idx), chunk, payload)
 
         files_state[rel] = {
             "mtime": mtime,
             "size": size,
             "chunk_total": len(chunks),
-            "sha1": _sha1_bytes(_read_file_bytes(p, 2_000_000)),
+            "chunk_sha1": chunk_shas,
+            "sha1": file_sha1,
             "updated_at": _now_iso(),
         }
 
+    try:
+        pipe_stats = pipe.close() if pipe is not None else {}
+    finally:
+        if store is not None:
+            store.close()
+        if local_index is not None:
+            local_index.close()
+
     out_state = {
         "export_dir": export_dir,
         "last_run": _now_iso(),
         "stats": {
             "scanned": scanned,
             "changed": changed,
-            "upserted": upserted,
+            "upserted": int(pipe_stats.get("upserted") or 0),
+            "embedded": int(pipe_stats.get("embedded") or 0),
+            "reused_vectors": int(pipe_stats.get("reused") or 0),
+            "skipped_unchanged": skipped,
             "deleted": deleted,
+            "embed_calls": int(pipe_stats.get("embed_calls") or 0),
+            "elapsed_sec": float(pipe_stats.get("elapsed_sec") or 0.0),
+            "chunks_per_sec": float(pipe_stats.get("chunks_per_sec") or 0.0),
             "dry_run": bool(args.dry_run),
             "full_reindex": bool(args.full_reindex),
         },
@@ -364,6 +354,11 @@ def main() -> None:
     ap.add_argument("--chunk-size", type=int, default=900)
     ap.add_argument("--chunk-overlap", type=int, default=120)
     ap.add_argument("--timeout-sec", type=float, default=20.0)
+    ap.add_argument("--chunker", choices=["cdc", "fixed"], default=_env("CHUNKER", "cdc") or "cdc")
+    ap.add_argument("--vector-store", default=_env("CHUNK_VECTOR_DB", "/app/data/chunk_vectors.sqlite3"))
+    ap.add_argument("--local-ann-dir", default=(_env("LOCAL_ANN_DIR", "/app/data/local_ann") if _env("LOCAL_ANN_ENABLE").lower() in ("1", "true", "yes", "on") else ""))
+    ap.add_argument("--embed-batch", type=int, default=int(_env("EMBED_BATCH_SIZE", "32") or "32"))
+    ap.add_argument("--embed-concurrency", type=int, default=int(_env("EMBED_CONCURRENCY", "2") or "2"))
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--full-reindex", action="store_true")
     args = ap.parse_args()
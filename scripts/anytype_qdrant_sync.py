@@ -12,6 +12,11 @@ from typing import Any, Dict, List, Tuple
 
 import requests
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rag_chunking import split_text as _split_text, split_text_cdc as _split_text_cdc  # noqa: E402
+from rag_ingest import ChunkVectorStore, EmbedUpsertPipeline  # noqa: E402
+import rag_ann  # noqa: E402
+
 
 def _env(name: str, default: str = "") -> str:
     return str(os.environ.get(name) or default).strip()
@@ -70,41 +75,6 @@ def _tags_for_anytype(space_id: str, object_id: str, title: str = "") -> List[st
     return out
 
 
-def _split_text(text: str, chunk_size: int = 900, overlap: int = 120) -> List[str]:
-    raw = str(text or "").strip()
-    if not raw:
-        return []
-    paras = [p.strip() for p in raw.replace("\r", "\n").split("\n") if str(p or "").strip()]
-    chunks = []
-    cur = ""
-    for p in paras:
-        if not cur:
-            cur = p
-            continue
-        if len(cur) + 1 + len(p) <= chunk_size:
-            cur += "\n" + p
-        else:
-            chunks.append(cur)
-            tail = cur[-overlap:] if overlap > 0 else ""
-            cur = (tail + "\n" + p).strip() if tail else p
-    if cur:
-        chunks.append(cur)
-    out = []
-    for c in chunks:
-        c = c.strip()
-        if not c:
-            continue
-        if len(c) <= chunk_size:
-            out.append(c)
-            continue
-        i = 0
-        step = max(1, chunk_size - overlap)
-        while i < len(c):
-            out.append(c[i : i + chunk_size])
-            i += step
-    return out
-
-
 def _flatten_text(obj: Any) -> str:
     lines: List[str] = []
 
@@ -305,26 +275,6 @@ def _record_title(rec: Dict[str, Any]) -> str:
     return ""
 
 
-def _ollama_embed(ollama_base: str, model: str, text: str, timeout_sec: float) -> List[float]:
-    payload = {"model": model, "input": text}
-    r = requests.post(ollama_base.rstrip("/") + "/api/embed", json=payload, timeout=timeout_sec)
-    if int(getattr(r, "status_code", 0) or 0) >= 400:
-        raise RuntimeError(f"embed_failed_http_{int(r.status_code)}")
-    obj = r.json() if hasattr(r, "json") else {}
-    embs = obj.get("embeddings") if isinstance(obj, dict) else []
-    if not isinstance(embs, list) or len(embs) <= 0 or (not isinstance(embs[0], list)):
-        raise RuntimeError("embed_invalid_response")
-    return [float(x) for x in embs[0]]
-
-
-def _qdrant_upsert(qdrant_url: str, collection: str, points: List[Dict[str, Any]], timeout_sec: float) -> None:
-    url = qdrant_url.rstrip("/") + f"/collections/{collection}/points?wait=true"
-    body = {"points": points}
-    r = requests.put(url, json=body, timeout=timeout_sec)
-    if int(getattr(r, "status_code", 0) or 0) >= 400:
-        raise RuntimeError(f"qdrant_upsert_http_{int(r.status_code)}:{str(getattr(r, 'text', ''))[:200]}")
-
-
 def _load_json(path: str, default: Any) -> Any:
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -357,6 +307,10 @@ def run(args) -> int:
     os.makedirs(os.path.dirname(args.state_file), exist_ok=True)
     state = _load_json(args.state_file, {})
     cursor = "" if args.full_reindex else str(state.get("cursor") or "")
+    # object_id -> content_sha1 per chunk index, to skip re-embedding unchanged chunks.
+    objects_state = state.get("objects") if isinstance(state, dict) else None
+    if (not isinstance(objects_state, dict)) or args.full_reindex:
+        objects_state = {}
 
     client = AnytypeClient(anytype_base, anytype_key, anytype_space, timeout_sec=args.timeout_sec)
 
@@ -364,8 +318,29 @@ def run(args) -> int:
     max_updated = cursor
     scanned = 0
     changed = 0
-    upserted = 0
+    skipped = 0
     pages = 0
+    pipe = None
+    store = None
+    local_index = None
+    if not args.dry_run:
+        if args.vector_store:
+            store = ChunkVectorStore(args.vector_store, embed_model, vector_size)
+        if args.local_ann_dir and rag_ann.available():
+            local_index = rag_ann.LocalVectorIndex(args.local_ann_dir, vector_size)
+        pipe = EmbedUpsertPipeline(
+            ollama_base,
+            embed_model,
+            vector_size,
+            qdrant_url,
+            qdrant_collection,
+            embed_batch=args.embed_batch,
+            concurrency=args.embed_concurrency,
+            timeout_sec=args.timeout_sec,
+            wait=False,
+            store=store,
+            local_index=local_index,
+        )
 
     while pages < args.max_pages:
         page = client.search_objects(offset=offset, limit=args.page_size, since_iso=("" if args.full_reindex else cursor))
@@ -396,20 +371,24 @@ def run(args) -> int:
             if not obj_text:
                 continue
 
-            chunks = _split_text(obj_text, chunk_size=args.chunk_size, overlap=args.chunk_overlap)
+            if args.chunker == "fixed":
+                chunks = _split_text(obj_text, chunk_size=args.chunk_size, overlap=args.chunk_overlap)
+            else:
+                chunks = _split_text_cdc(obj_text, chunk_size=args.chunk_size)
             if not chunks:
                 continue
 
             changed += 1
-            points = []
+            prev_shas = objects_state.get(oid) if isinstance(objects_state.get(oid), list) else []
+            chunk_shas = [_sha1(c) for c in chunks]
             for idx, chunk in enumerate(chunks):
                 if len(chunk.strip()) < 4:
                     continue
-                if args.dry_run:
+                if pipe is None:
+                    continue
+                if idx < len(prev_shas) and prev_shas[idx] == chunk_shas[idx]:
+                    skipped += 1
                     continue
-                vec = _ollama_embed(ollama_base, embed_model, chunk, timeout_sec=args.timeout_sec)
-                if len(vec) != vector_size:
-                    raise RuntimeError(f"vector_size_mismatch got={len(vec)} expected={vector_size}")
                 pid = str(uuid.uuid5(uuid.NAMESPACE_URL, f"anytype|{oid}|{idx}"))
                 payload = {
                     "source": "anytype",
@@ -422,14 +401,11 @@ def run(args) -> int:
                     "chunk_index": idx,
                     "chunk_total": len(chunks),
                     "updated_at": updated,
-                    "content_sha1": _sha1(chunk),
+                    "content_sha1": chunk_shas[idx],
                     "sync_at": _now_iso(),
                 }
-                points.append({"id": pid, "vector": vec, "payload": payload})
-
-            if (not args.dry_run) and points:
-                _qdrant_upsert(qdrant_url, qdrant_collection, points, timeout_sec=args.timeout_sec)
-                upserted += len(points)
+                pipe.add(pid, chunk, payload)
+            objects_state[oid] = chunk_shas
 
             if updated and ((not max_updated) or _iso_ge(updated, max_updated)):
                 max_updated = updated
@@ -438,6 +414,14 @@ def run(args) -> int:
             break
         offset += args.page_size
 
+    try:
+        pipe_stats = pipe.close() if pipe is not None else {}
+    finally:
+        if store is not None:
+            store.close()
+        if local_index is not None:
+            local_index.close()
+
     next_cursor = max_updated or cursor
     out_state = {
         "cursor": next_cursor,
@@ -445,16 +429,23 @@ def run(args) -> int:
         "stats": {
             "scanned": scanned,
             "changed": changed,
-            "upserted": upserted,
+            "upserted": int(pipe_stats.get("upserted") or 0),
+            "embedded": int(pipe_stats.get("embedded") or 0),
+            "reused_vectors": int(pipe_stats.get("reused") or 0),
+            "skipped_unchanged": skipped,
+            "embed_calls": int(pipe_stats.get("embed_calls") or 0),
+            "elapsed_sec": float(pipe_stats.get("elapsed_sec") or 0.0),
+            "chunks_per_sec": float(pipe_stats.get("chunks_per_sec") or 0.0),
             "pages": pages,
             "dry_run": bool(args.dry_run),
             "full_reindex": bool(args.full_reindex),
         },
+        "objects": objects_state,
     }
     if not args.dry_run:
         _save_json(args.state_file, out_state)
 
-    print(json.dumps(out_state, ensure_ascii=False, indent=2))
+    print(json.dumps({"cursor": next_cursor, "stats": out_state.get("stats")}, ensure_ascii=False, indent=2))
     return 0
 
 
@@ -466,6 +457,11 @@ def main():
     ap.add_argument("--chunk-size", type=int, default=900)
     ap.add_argument("--chunk-overlap", type=int, default=120)
     ap.add_argument("--timeout-sec", type=float, default=20.0)
+    ap.add_argument("--chunker", choices=["cdc", "fixed"], default=_env("CHUNKER", "cdc") or "cdc")
+    ap.add_argument("--vector-store", default=_env("CHUNK_VECTOR_DB", "/app/data/chunk_vectors.sqlite3"))
+    ap.add_argument("--local-ann-dir", default=(_env("LOCAL_ANN_DIR", "/app/data/local_ann") if _env("LOCAL_ANN_ENABLE").lower() in ("1", "true", "yes", "on") else ""))
+    ap.add_argument("--embed-batch", type=int, default=int(_env("EMBED_BATCH_SIZE", "32") or "32"))
+    ap.add_argument("--embed-concurrency", type=int, default=int(_env("EMBED_CONCURRENCY", "2") or "2"))
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--full-reindex", action="store_true")
     args = ap.parse_args()
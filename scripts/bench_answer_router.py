@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: answer-router cost per utterance (no network).
+
+Runs the part of skill.answer_question that happens before any handler is called:
+fetch the route rules, build a RouterContext, score every rule and pick one, plus the
+keyword intent helpers the compound/clarify paths use. Utterances come from
+evaluation/cases.json (every case list, de-duplicated).
+
+    HA_DEFAULT_CALENDAR_ENTITY=calendar.x python scripts/bench_answer_router.py --rounds 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+import answer  # noqa: E402
+import app  # noqa: E402
+
+_HELPERS = [
+    answer.has_weather_intent,
+    answer.has_calendar_intent,
+    answer.has_news_intent,
+    answer.looks_like_parking_fee_query,
+    answer.looks_like_open_advice_general_query,
+    answer.looks_like_property_info_query,
+    answer.looks_like_home_health_check_query,
+]
+
+
+def _load_texts(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    out = []
+    for rows in data.values():
+        for row in rows if isinstance(rows, list) else []:
+            txt = str((row.get("text") if isinstance(row, dict) else row) or "").strip()
+            if txt and txt not in out:
+                out.append(txt)
+    return out
+
+
+def _rules():
+    # Same entry point skill_answer_question_core uses for its rule list.
+    fn = getattr(app, "_answer_route_rules", None) or app._build_answer_route_rules_impl
+    return fn()
+
+
+def _route_once(text: str, now, cold: bool = True) -> str:
+    cache = getattr(answer, "text_features", None)
+    if cold and cache is not None:
+        # Every real request brings a new utterance; do not let the feature cache hide the scan.
+        cache.cache_clear()
+    rules = _rules()
+    ctx = app.RouterContext(text_raw=text, language="zh", mode="local_first", debug=False, last_clarify=None, now_dt=now)
+    picked = app._score_and_pick_rule(rules, ctx)
+    for fn in _HELPERS:
+        fn(text)
+    return "clarify" if picked.get("special") == "clarify" else str((picked.get("chosen") or {}).get("name") or "")
+
+
+def run(args) -> int:
+    texts = _load_texts(args.cases)
+    now = app._now_local()
+    routes = {t: _route_once(t, now) for t in texts}
+    per_round = []
+    for _ in range(max(1, args.rounds)):
+        t0 = time.perf_counter()
+        for t in texts:
+            _route_once(t, now, not args.warm)
+        per_round.append((time.perf_counter() - t0) * 1e6 / len(texts))
+    t0 = time.perf_counter()
+    for _ in range(max(1, args.rounds)):
+        _rules()
+    rules_us = (time.perf_counter() - t0) * 1e6 / max(1, args.rounds)
+    report = {
+        "utterances": len(texts),
+        "rounds": args.rounds,
+        "feature_cache": "warm" if args.warm else "cold",
+        "us_per_utterance_median": round(statistics.median(per_round), 1),
+        "us_per_utterance_min": round(min(per_round), 1),
+        "us_rule_build": round(rules_us, 1),
+    }
+    if args.show_routes:
+        report["routes"] = routes
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="answer-router cost per utterance")
+    ap.add_argument("--cases", default=os.path.join(ROOT, "evaluation", "cases.json"))
+    ap.add_argument("--rounds", type=int, default=200)
+    ap.add_argument("--warm", action="store_true", help="keep the keyword-feature cache between repeats of an utterance")
+    ap.add_argument("--show-routes", action="store_true", help="also print the route picked for each utterance")
+    sys.exit(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Seed / rebuild the local ANN fallback index (rag_ann) from the Qdrant collection.
+
+The app mirrors skill.memory_upsert writes and the Anytype sync scripts mirror their
+upserts, but points written before LOCAL_ANN_ENABLE was turned on only reach the local
+index through this script. It scrolls the collection (vectors + payloads), upserts
+everything, then compacts tombstones and retrains the IVF lists.
+
+Run it once after enabling the index, and again occasionally (e.g. weekly) so the IVF
+centroids follow the data.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import rag_ann  # noqa: E402
+
+
+def _env(name: str, default: str = "") -> str:
+    return str(os.environ.get(name) or default).strip()
+
+
+def _qdrant_scroll(qdrant_url: str, collection: str, offset: Any, limit: int, timeout_sec: float) -> Tuple[List[Dict[str, Any]], Any]:
+    url = qdrant_url.rstrip("/") + f"/collections/{collection}/points/scroll"
+    body: Dict[str, Any] = {"limit": int(limit), "with_payload": True, "with_vector": True}
+    if offset is not None:
+        body["offset"] = offset
+    r = requests.post(url, json=body, timeout=timeout_sec)
+    if int(getattr(r, "status_code", 0) or 0) >= 400:
+        raise RuntimeError(f"qdrant_scroll_http_{int(r.status_code)}:{str(getattr(r, 'text', ''))[:200]}")
+    obj = r.json() if hasattr(r, "json") else {}
+    res = obj.get("result") if isinstance(obj, dict) else {}
+    pts = res.get("points") if isinstance(res, dict) else []
+    return [p for p in (pts or []) if isinstance(p, dict)], (res.get("next_page_offset") if isinstance(res, dict) else None)
+
+
+def run(args) -> int:
+    if not rag_ann.available():
+        print("ERROR: numpy is not installed", file=sys.stderr)
+        return 2
+    qdrant_url = _env("QDRANT_URL", "http://127.0.0.1:6333")
+    collection = _env("QDRANT_COLLECTION", "ha_memory_qwen3")
+    vector_size = int(_env("QDRANT_VECTOR_SIZE", "1024") or "1024")
+
+    t0 = time.perf_counter()
+    index = rag_ann.LocalVectorIndex(args.local_ann_dir, vector_size)
+    seeded = 0
+    try:
+        if not args.no_seed:
+            offset = None
+            while True:
+                pts, offset = _qdrant_scroll(qdrant_url, collection, offset, args.page_size, args.timeout_sec)
+                batch = []
+                for p in pts:
+                    vec = p.get("vector")
+                    if isinstance(vec, dict):
+                        # Named vectors: take the default/unnamed one if present, else the first.
+                        vec = vec.get("") if "" in vec else next(iter(vec.values()), None)
+                    if isinstance(vec, list) and len(vec) == vector_size:
+                        batch.append({"id": p.get("id"), "vector": vec, "payload": p.get("payload") or {}})
+                seeded += index.upsert(batch)
+                if (offset is None) or (not pts):
+                    break
+        built = index.build(nlist=args.nlist)
+        stats = index.stats()
+    finally:
+        index.close()
+
+    print(
+        json.dumps(
+            {"seeded": seeded, "rows": built.get("rows"), "ivf_lists": built.get("lists"), "index": stats, "elapsed_sec": round(time.perf_counter() - t0, 2)},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+    return 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Qdrant collection -> local ANN fallback index")
+    ap.add_argument("--local-ann-dir", default=_env("LOCAL_ANN_DIR", "/app/data/local_ann"))
+    ap.add_argument("--page-size", type=int, default=256)
+    ap.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = sqrt(rows))")
+    ap.add_argument("--timeout-sec", type=float, default=30.0)
+    ap.add_argument("--no-seed", action="store_true", help="only compact and retrain, do not scroll Qdrant")
+    args = ap.parse_args()
+    try:
+        rc = run(args)
+    except Exception as e:
+        print("ERROR:", str(e), file=sys.stderr)
+        rc = 1
+    sys.exit(rc)
+
+
+if __name__ == "__main__":
+    main()
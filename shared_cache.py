@@ -0,0 +1,507 @@
+"""Shared upstream-response cache: memory LRU per namespace in front of one SQLite file.
+
+Both containers (mcp-hello and openai-mcp-gateway) mount ./data at /app/data, so the
+SQLite tier (SHARED_CACHE_DB, default data/shared_cache.sqlite3 next to this module) is
+shared: an entry fetched by one process is a disk hit for the other.
+
+Every entry lives in a namespace with its own policy:
+  ttl    seconds an entry is fresh
+  stale  extra seconds it may still be served while one background refresh runs
+         (stale-while-revalidate); 0 disables that
+  mem    max entries kept in this process's memory tier
+
+Policies come from the defaults below or from env: CACHE_<NS>_TTL_SEC,
+CACHE_<NS>_STALE_SEC, CACHE_<NS>_MEM_ITEMS. SHARED_CACHE_ENABLE=0 turns caching off.
+
+get_or_load() is the main entry point; refresh() reloads a key ahead of need (the warm-up
+scheduler uses it); get_many()/put_many() serve batch callers with one SQLite round trip. Concurrent misses for one key in a process share
+a single loader call (single-flight). When a load fails and an expired copy exists,
+that copy is served rather than nothing. Values must be JSON-serializable, and the
+returned objects are shared between callers: treat them as read-only.
+
+invalidate() also stamps the namespace on disk; every process compares that stamp with
+the last one it saw before trusting its memory tier, and drops the namespace's memory
+entries when it moved, so an invalidation in one container is seen at once by the other.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# namespace -> (ttl s, stale-while-revalidate s, memory items)
+_NAMESPACE_DEFAULTS: Dict[str, Tuple[float, float, int]] = {
+    "ha_registry": (60.0, 600.0, 64),
+    "weather_forecast": (300.0, 1800.0, 64),
+    "brave": (1800.0, 7200.0, 512),
+    "holiday": (7 * 86400.0, 30 * 86400.0, 16),
+    "calendar": (300.0, 600.0, 64),
+    "translation": (30 * 86400.0, 0.0, 4096),
+    "poi": (86400.0, 0.0, 512),
+    "miniflux": (3600.0, 86400.0, 16),
+    "warmup": (30 * 86400.0, 0.0, 32),
+    "default": (300.0, 0.0, 256),
+}
+
+_LOCK = threading.Lock()
+_MEM: Dict[str, "OrderedDict[str, Tuple[Any, float]]"] = {}
+_STATS: Dict[str, Dict[str, int]] = {}
+_INFLIGHT: Dict[Tuple[str, str], "_Flight"] = {}
+# namespace -> invalidation stamp this process's memory tier is consistent with
+_SEEN_INVALIDATION: Dict[str, float] = {}
+_LOCAL = threading.local()
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_STATE = {"writes": 0}
+_PURGE_EVERY = 500
+_PURGE_MIN_AGE_SEC = 7 * 86400.0
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _env_num(name: str, default: float) -> float:
+    raw = str(os.environ.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except Exception:
+        return default
+
+
+def enabled() -> bool:
+    v = str(os.environ.get("SHARED_CACHE_ENABLE") or "1").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def policy(ns: str) -> Dict[str, Any]:
+    name = str(ns or "default").strip().lower() or "default"
+    ttl, stale, mem = _NAMESPACE_DEFAULTS.get(name, _NAMESPACE_DEFAULTS["default"])
+    key = "CACHE_" + name.upper() + "_"
+    return {
+        "name": name,
+        "ttl": max(1.0, _env_num(key + "TTL_SEC", ttl)),
+        "stale": max(0.0, _env_num(key + "STALE_SEC", stale)),
+        "mem": max(1, int(_env_num(key + "MEM_ITEMS", mem))),
+    }
+
+
+def db_path() -> str:
+    p = str(os.environ.get("SHARED_CACHE_DB") or "").strip()
+    if not p:
+        p = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shared_cache.sqlite3")
+    return p
+
+
+def _conn() -> sqlite3.Connection:
+    path = db_path()
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = {}
+        _LOCAL.conns = conns
+    c = conns.get(path)
+    if c is None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        except Exception:
+            pass
+        c = sqlite3.connect(path, timeout=5)
+        for stmt in ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA busy_timeout=5000"]:
+            try:
+                c.execute(stmt)
+            except Exception:
+                pass
+        c.execute("CREATE TABLE IF NOT EXISTS cache(ns TEXT, key TEXT, value TEXT, ts REAL, PRIMARY KEY(ns, key))")
+        c.execute("CREATE TABLE IF NOT EXISTS invalidations(ns TEXT PRIMARY KEY, ts REAL)")
+        c.commit()
+        conns[path] = c
+    return c
+
+
+def _stat(ns: str, field: str, n: int = 1):
+    st = _STATS.get(ns)
+    if st is None:
+        st = {"hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "dedup_waits": 0, "refreshes": 0}
+        _STATS[ns] = st
+    st[field] += n
+
+
+def _mem_get(ns: str, key: str):
+    with _LOCK:
+        m = _MEM.get(ns)
+        it = m.get(key) if m is not None else None
+        if it is not None:
+            m.move_to_end(key)
+        return it
+
+
+def _mem_put(pol: Dict[str, Any], key: str, value: Any, ts: float):
+    with _LOCK:
+        m = _MEM.setdefault(pol["name"], OrderedDict())
+        m[key] = (value, ts)
+        m.move_to_end(key)
+        while len(m) > pol["mem"]:
+            m.popitem(last=False)
+
+
+def _sync_invalidation(ns: str):
+    # One primary-key read: if any process invalidated ns since we last looked, our memory copy is suspect.
+    if not os.path.exists(db_path()):
+        return
+    try:
+        row = _conn().execute("SELECT ts FROM invalidations WHERE ns=?", (ns,)).fetchone()
+    except Exception:
+        return
+    stamp = float(row[0] or 0.0) if row else 0.0
+    with _LOCK:
+        if stamp > _SEEN_INVALIDATION.get(ns, 0.0):
+            _SEEN_INVALIDATION[ns] = stamp
+            m = _MEM.get(ns)
+            if m is not None:
+                m.clear()
+
+
+def _disk_get(ns: str, key: str):
+    if not os.path.exists(db_path()):
+        return None  # nothing stored yet; a read should not create the file
+    try:
+        row = _conn().execute("SELECT value, ts FROM cache WHERE ns=? AND key=? LIMIT 1", (ns, key)).fetchone()
+    except Exception:
+        return None
+    if not row:
+        return None
+    try:
+        return (json.loads(row[0]), float(row[1] or 0.0))
+    except Exception:
+        return None
+
+
+def _disk_put(pol: Dict[str, Any], key: str, value: Any, ts: float):
+    ns = pol["name"]
+    with _LOCK:
+        _STATE["writes"] += 1
+        do_purge = (_STATE["writes"] % _PURGE_EVERY) == 0
+    try:
+        c = _conn()
+        c.execute(
+            "INSERT INTO cache(ns, key, value, ts) VALUES(?,?,?,?) ON CONFLICT(ns, key) DO UPDATE SET value=excluded.value, ts=excluded.ts",
+            (ns, key, json.dumps(value, ensure_ascii=False), ts),
+        )
+        if do_purge:
+            # Callers may pass a longer ttl than the namespace default, so keep at least a week.
+            c.execute("DELETE FROM cache WHERE ns=? AND ts<?", (ns, ts - max(_PURGE_MIN_AGE_SEC, pol["ttl"] + pol["stale"])))
+        c.commit()
+    except Exception:
+        pass
+
+
+def _lookup(pol: Dict[str, Any], key: str):
+    # Memory first; if it is missing or no longer fresh, another process may have refreshed the disk copy.
+    ns = pol["name"]
+    now = time.time()
+    _sync_invalidation(ns)
+    it = _mem_get(ns, key)
+    if it is not None and (now - it[1]) <= pol["ttl"]:
+        return it, "mem"
+    d = _disk_get(ns, key)
+    if d is not None and (it is None or d[1] > it[1]):
+        _mem_put(pol, key, d[0], d[1])
+        return d, "disk"
+    return it, "mem"
+
+
+def _age(it) -> float:
+    return time.time() - float(it[1])
+
+
+def get(ns: str, key: str, ttl: Optional[float] = None) -> Any:
+    """Fresh value or None."""
+    if not enabled():
+        return None
+    pol = policy(ns)
+    if ttl is not None:
+        pol["ttl"] = float(ttl)
+    it, tier = _lookup(pol, str(key))
+    with _LOCK:
+        if it is not None and _age(it) <= pol["ttl"]:
+            _stat(pol["name"], "disk_hits" if tier == "disk" else "hits")
+            return it[0]
+        _stat(pol["name"], "misses")
+    return None
+
+
+def put(ns: str, key: str, value: Any):
+    if not enabled():
+        return
+    pol = policy(ns)
+    now = time.time()
+    _mem_put(pol, str(key), value, now)
+    _disk_put(pol, str(key), value, now)
+
+
+def get_many(ns: str, keys: List[str], ttl: Optional[float] = None) -> Dict[str, Any]:
+    """Fresh values for the keys that have one; memory first, then one disk query for the rest."""
+    if not enabled():
+        return {}
+    pol = policy(ns)
+    if ttl is not None:
+        pol["ttl"] = float(ttl)
+    name = pol["name"]
+    now = time.time()
+    _sync_invalidation(name)
+    out: Dict[str, Any] = {}
+    held: Dict[str, Any] = {}
+    for k in dict.fromkeys(str(x) for x in keys):
+        it = _mem_get(name, k)
+        if it is not None and (now - it[1]) <= pol["ttl"]:
+            out[k] = it[0]
+        else:
+            held[k] = it
+    mem_hits = len(out)
+    disk_hits = 0
+    todo = list(held)
+    if todo and os.path.exists(db_path()):
+        try:
+            c = _conn()
+            for i in range(0, len(todo), 500):
+                part = todo[i : i + 500]
+                rows = c.execute(
+                    "SELECT key, value, ts FROM cache WHERE ns=? AND key IN (%s)" % ",".join("?" * len(part)),
+                    [name] + part,
+                ).fetchall()
+                for k, raw, ts in rows:
+                    ts = float(ts or 0.0)
+                    old = held.get(k)
+                    if old is not None and ts <= old[1]:
+                        continue
+                    try:
+                        v = json.loads(raw)
+                    except Exception:
+                        continue
+                    _mem_put(pol, k, v, ts)
+                    if (now - ts) <= pol["ttl"]:
+                        out[k] = v
+                        disk_hits += 1
+        except Exception:
+            pass
+    with _LOCK:
+        _stat(name, "hits", mem_hits)
+        _stat(name, "disk_hits", disk_hits)
+        _stat(name, "misses", len(held) - disk_hits)
+    return out
+
+
+def put_many(ns: str, items: Dict[str, Any]):
+    """Store several keys in one transaction."""
+    if not enabled() or not items:
+        return
+    pol = policy(ns)
+    now = time.time()
+    for k, v in items.items():
+        _mem_put(pol, str(k), v, now)
+    with _LOCK:
+        _STATE["writes"] += len(items)
+    try:
+        c = _conn()
+        c.executemany(
+            "INSERT INTO cache(ns, key, value, ts) VALUES(?,?,?,?) ON CONFLICT(ns, key) DO UPDATE SET value=excluded.value, ts=excluded.ts",
+            [(pol["name"], str(k), json.dumps(v, ensure_ascii=False), now) for k, v in items.items()],
+        )
+        c.commit()
+    except Exception:
+        pass
+
+
+def invalidate(ns: str, key: Optional[str] = None):
+    """Drop one key, or the whole namespace when key is None.
+
+    Other processes drop their whole memory tier for ns on their next lookup (the stamp is
+    per namespace); entries still on disk are simply read back from there.
+    """
+    pol = policy(ns)
+    now = time.time()
+    try:
+        c = _conn()
+        if key is None:
+            c.execute("DELETE FROM cache WHERE ns=?", (pol["name"],))
+        else:
+            c.execute("DELETE FROM cache WHERE ns=? AND key=?", (pol["name"], str(key)))
+        c.execute(
+            "INSERT INTO invalidations(ns, ts) VALUES(?,?) ON CONFLICT(ns) DO UPDATE SET ts=MAX(ts, excluded.ts)",
+            (pol["name"], now),
+        )
+        c.commit()
+    except Exception:
+        pass
+    with _LOCK:
+        # This process knows exactly what it dropped; later lookups need not clear more.
+        _SEEN_INVALIDATION[pol["name"]] = max(now, _SEEN_INVALIDATION.get(pol["name"], 0.0))
+        m = _MEM.get(pol["name"])
+        if m is not None:
+            if key is None:
+                m.clear()
+            else:
+                m.pop(str(key), None)
+
+
+def _run_flight(pol: Dict[str, Any], key: str, flight: _Flight, loader: Callable[[], Any], cacheable: Callable[[Any], bool]):
+    ns = pol["name"]
+    try:
+        v = loader()
+        flight.value = v
+        with _LOCK:
+            _stat(ns, "loads")
+        if cacheable(v):
+            put(ns, key, v)
+    except BaseException as e:
+        flight.error = e
+        with _LOCK:
+            _stat(ns, "load_errors")
+    finally:
+        with _LOCK:
+            _INFLIGHT.pop((ns, key), None)
+        flight.done.set()
+
+
+def _refresh(pol: Dict[str, Any], key: str, loader: Callable[[], Any], cacheable: Callable[[Any], bool]):
+    with _LOCK:
+        if (pol["name"], key) in _INFLIGHT:
+            return
+        flight = _Flight()
+        _INFLIGHT[(pol["name"], key)] = flight
+        _stat(pol["name"], "refreshes")
+    _REFRESH_POOL.submit(_run_flight, pol, key, flight, loader, cacheable)
+
+
+def _claim(name: str, key: str) -> Tuple[_Flight, bool]:
+    # Caller holds _LOCK. Returns the flight for (name, key) and whether this caller leads it.
+    flight = _INFLIGHT.get((name, key))
+    if flight is not None:
+        return flight, False
+    flight = _Flight()
+    _INFLIGHT[(name, key)] = flight
+    return flight, True
+
+
+def _wait_sec() -> float:
+    return max(1.0, _env_num("SHARED_CACHE_FLIGHT_WAIT_SEC", 30.0))
+
+
+def get_or_load(
+    ns: str,
+    key: str,
+    loader: Callable[[], Any],
+    cacheable: Optional[Callable[[Any], bool]] = None,
+    ttl: Optional[float] = None,
+) -> Any:
+    """Cached value for (ns, key), calling loader() on a miss.
+
+    cacheable(value) decides whether a loaded value is stored (default: not None). A stale
+    entry inside the namespace's stale window is returned at once while one background
+    refresh runs. Loader exceptions reach the caller unless an expired copy can be served.
+    """
+    ok = cacheable if callable(cacheable) else (lambda v: v is not None)
+    if not enabled():
+        return loader()
+    pol = policy(ns)
+    if ttl is not None:
+        pol["ttl"] = float(ttl)
+    k = str(key)
+    name = pol["name"]
+    it, tier = _lookup(pol, k)
+    if it is not None:
+        age = _age(it)
+        if age <= pol["ttl"]:
+            with _LOCK:
+                _stat(name, "disk_hits" if tier == "disk" else "hits")
+            return it[0]
+        if age <= pol["ttl"] + pol["stale"]:
+            with _LOCK:
+                _stat(name, "stale_hits")
+            _refresh(pol, k, loader, ok)
+            return it[0]
+    with _LOCK:
+        _stat(name, "misses")
+        flight, leader = _claim(name, k)
+        if not leader:
+            _stat(name, "dedup_waits")
+    if leader:
+        _run_flight(pol, k, flight, loader, ok)
+    elif not flight.done.wait(_wait_sec()):
+        return loader()
+    if flight.error is None and ok(flight.value):
+        return flight.value
+    if it is not None:
+        # Upstream failed or gave an unusable answer: an old copy beats nothing.
+        with _LOCK:
+            _stat(name, "stale_hits")
+        return it[0]
+    if flight.error is not None:
+        raise flight.error
+    return flight.value
+
+
+def refresh(ns: str, key: str, loader: Callable[[], Any], cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+    """Call loader() now and store the result, however fresh the cached copy is.
+
+    A load already in flight for the key is joined rather than repeated; readers that
+    miss meanwhile wait for this one. Loader exceptions reach the caller.
+    """
+    ok = cacheable if callable(cacheable) else (lambda v: v is not None)
+    if not enabled():
+        return loader()
+    pol = policy(ns)
+    k = str(key)
+    with _LOCK:
+        flight, leader = _claim(pol["name"], k)
+        _stat(pol["name"], "refreshes" if leader else "dedup_waits")
+    if leader:
+        _run_flight(pol, k, flight, loader, ok)
+    elif not flight.done.wait(_wait_sec()):
+        raise TimeoutError("shared cache refresh still in flight: " + pol["name"])
+    if flight.error is not None:
+        raise flight.error
+    return flight.value
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        snap = {ns: dict(v) for ns, v in _STATS.items()}
+        mem = {ns: len(m) for ns, m in _MEM.items()}
+    disk: Dict[str, int] = {}
+    try:
+        for ns, n in _conn().execute("SELECT ns, COUNT(*) FROM cache GROUP BY ns").fetchall():
+            disk[str(ns)] = int(n)
+    except Exception:
+        pass
+    out = {"enabled": enabled(), "db": db_path(), "namespaces": {}}
+    for ns in sorted(set(snap) | set(mem) | set(disk)):
+        st = snap.get(ns) or {}
+        served = int(st.get("hits", 0)) + int(st.get("disk_hits", 0)) + int(st.get("stale_hits", 0))
+        total = served + int(st.get("misses", 0))
+        pol = policy(ns)
+        out["namespaces"][ns] = dict(
+            st,
+            mem_items=int(mem.get(ns, 0)),
+            disk_rows=int(disk.get(ns, 0)),
+            hit_ratio=round(float(served) / total, 3) if total else 0.0,
+            ttl_sec=pol["ttl"],
+            stale_sec=pol["stale"],
+        )
+    return out
+
+
+def clear():
+    """Drop the memory tier and counters of this process (the SQLite file is left alone)."""
+    with _LOCK:
+        _MEM.clear()
+        _STATS.clear()
+        _SEEN_INVALIDATION.clear()
@@ -0,0 +1,68 @@
+import json
+import os
+import unittest
+
+import answer
+import app
+
+CASES = os.path.join(os.path.dirname(__file__), "..", "evaluation", "cases.json")
+
+TEXTS = [
+    "今天温度多少",
+    "明天会下雨吗？要带伞吗",
+    "Show me the HEADLINES",
+    "检查账单 BPAY",
+    "Overdue bills this week",
+    "找一下 Tax Invoice Template",
+    "在家庭资料库里搜内容 daikin",
+    "what day today",
+    "play music in the Media Player",
+    "下一首歌",
+    "讲个笑话吧",
+    "Search home knowledge for the warranty",
+    "墨尔本 car park 停车费",
+    "",
+]
+
+
+def _legacy_hit(text, keys):
+    # The per-scorer loops this table replaced: CJK keys on the raw text, ASCII keys lowercased.
+    t = str(text or "")
+    tl = t.lower()
+    return any(k in t for k in keys if not k.isascii()) or any(k in tl for k in keys if k.isascii())
+
+
+class KeywordFeatureTableTests(unittest.TestCase):
+    def test_one_scan_matches_every_keyword_loop(self):
+        with open(CASES, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        texts = list(TEXTS)
+        for rows in data.values():
+            texts += [str(r.get("text") if isinstance(r, dict) else r) for r in rows]
+        for text in texts:
+            for name, keys in answer.ROUTE_KEYWORD_FEATURES.items():
+                self.assertEqual(answer.text_has(text, name), _legacy_hit(text, keys), (text, name))
+
+    def test_contained_keys_are_reported_with_the_longer_match(self):
+        table = answer.KeywordFeatureTable({"short": ["温", "bill"], "long": ["温度", "bills"]})
+        m = table.scan("温度 Bills")
+        self.assertTrue(m & table.bit("short"))
+        self.assertTrue(m & table.bit("long"))
+        self.assertEqual(table.scan("bil"), 0)
+
+    def test_router_context_scans_once(self):
+        ctx = app.RouterContext(text_raw="明天天气和新闻")
+        self.assertTrue(ctx.has("weather") and ctx.has("news"))
+        self.assertFalse(ctx.has("bills"))
+        self.assertIsNotNone(ctx._features)
+
+    def test_rules_are_built_once_and_route_cases_still_pass(self):
+        self.assertIs(app._answer_route_rules(), app._answer_route_rules())
+        with open(CASES, "r", encoding="utf-8") as f:
+            cases = json.load(f)["route_cases"]
+        for c in cases:
+            self.assertIn(app._debug_pick_route_for_text(c["text"])["route"], c["expected"], c["text"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import app
+from answer import speculative_route_pair
+
+
+def _leg(text, delay):
+    def fn():
+        time.sleep(delay)
+        return app._skill_result(text)
+
+    return fn
+
+
+STRONG = "明天墨尔本多云，最高气温二十二度，傍晚有小雨。"
+
+
+class SpeculativeRouteTests(unittest.TestCase):
+    def test_pair_only_for_near_ties(self):
+        cands = [
+            {"name": "weather", "final": 30.6, "rule": object()},
+            {"name": "calendar", "final": 30.4, "rule": object()},
+            {"name": "news", "final": 20.9, "rule": object()},
+        ]
+        self.assertEqual([c["name"] for c in speculative_route_pair(cands, set(), 0.3)], ["weather", "calendar"])
+        self.assertEqual(speculative_route_pair(cands, set(), 0.1), [])
+        self.assertEqual(speculative_route_pair(cands, {"weather", "news"}, 0.3), [])
+
+    def test_routes_with_side_effects_never_run_speculatively(self):
+        cands = [
+            {"name": "bills", "final": 30.6, "rule": object()},
+            {"name": "calendar", "final": 30.5, "rule": object()},
+        ]
+        self.assertEqual(speculative_route_pair(cands, set(), 0.3), [])
+        cands[0]["name"] = "template_web"
+        self.assertEqual(speculative_route_pair(cands, set(), 0.3), [])
+
+    def test_only_the_winner_streams(self):
+        got = []
+
+        def leg(text, delay):
+            def fn():
+                app._stream_emit(text[:6])
+                time.sleep(delay)
+                return app._skill_result(text)
+
+            return fn
+
+        token = app._STREAM_SINK.set(got.append)
+        try:
+            spec = app._answer_run_speculative([("rag", leg("没找到相关资料。", 0.01)), ("weather", leg(STRONG, 0.1))])
+        finally:
+            app._STREAM_SINK.reset(token)
+        self.assertEqual(spec["winner"], "weather")
+        self.assertEqual(got, [STRONG[:6]])
+
+    def test_fast_strong_leg_wins_and_slow_leg_is_not_waited_for(self):
+        t0 = time.perf_counter()
+        spec = app._answer_run_speculative([("rag", _leg(STRONG, 0.6)), ("web", _leg(STRONG, 0.05))])
+        self.assertLess(time.perf_counter() - t0, 0.5)
+        self.assertEqual(spec["winner"], "web")
+        self.assertEqual(spec["legs"]["web"]["status"], "won")
+        self.assertEqual(spec["legs"]["rag"]["status"], "cancelled")
+
+    def test_weak_first_result_does_not_win(self):
+        spec = app._answer_run_speculative([("rag", _leg("没找到。", 0.01)), ("web", _leg(STRONG, 0.2))])
+        self.assertEqual(spec["winner"], "web")
+        self.assertEqual(spec["legs"]["rag"]["status"], "weak")
+        self.assertIn("rag", spec["results"])
+
+    def test_deadline_bounds_latency(self):
+        with patch.dict(os.environ, {"ANSWER_SPECULATIVE_DEADLINE_MS": "500"}):
+            t0 = time.perf_counter()
+            spec = app._answer_run_speculative([("rag", _leg(STRONG, 1.5)), ("web", _leg("暂无", 0.01))])
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertEqual(spec["winner"], "")
+        self.assertEqual(spec["legs"]["rag"]["status"], "timeout")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app
+
+
+class EmbedCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            "EMBED_CACHE_DB": os.path.join(self.tmp.name, "embed_cache.sqlite3"),
+            "EMBED_MODEL": "test-embed",
+            "QDRANT_VECTOR_SIZE": "8",
+        })
+        self.env.start()
+        self.calls = []
+
+        def fake_request(q):
+            self.calls.append(q)
+            return [0.5] * 7 + [float(len(self.calls))]
+
+        self.req = patch.object(app, "_skill_embed_text_request", side_effect=fake_request)
+        self.req.start()
+
+    def tearDown(self):
+        self.req.stop()
+        self.env.stop()
+        with app._EMBED_CACHE_LOCK:
+            app._EMBED_CACHE_MEM.clear()
+            app._EMBED_CACHE_STATE["sig"] = ""
+        self.tmp.cleanup()
+
+    def test_repeat_query_skips_embedding(self):
+        v1 = app._skill_embed_text("明天  天气 ")
+        v2 = app._skill_embed_text("明天 天气")
+        self.assertEqual(v1, v2)
+        self.assertEqual(len(self.calls), 1)
+        # Drop the memory tier: the SQLite store still answers.
+        with app._EMBED_CACHE_LOCK:
+            app._EMBED_CACHE_MEM.clear()
+        before = app._embed_cache_stats()["hits_disk"]
+        self.assertEqual(app._skill_embed_text("明天 天气"), v1)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(app._embed_cache_stats()["hits_disk"] - before, 1)
+
+    def test_original_text_is_embedded_and_documents_bypass_the_cache(self):
+        app._skill_embed_text("ＡＢＣ  型号 ")
+        self.assertEqual(self.calls, ["ＡＢＣ  型号"])
+        app._skill_embed_text("ABC 型号")
+        self.assertEqual(len(self.calls), 1)
+        app._skill_embed_text("ABC 型号", cache=False)
+        app._skill_embed_text("a note to remember", cache=False)
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(app._embed_cache_stats()["mem_items"], 1)
+
+    def test_model_change_invalidates(self):
+        app._skill_embed_text("hello")
+        with patch.dict(os.environ, {"EMBED_MODEL": "other-embed"}):
+            app._skill_embed_text("hello")
+        self.assertEqual(len(self.calls), 2)
+        conn = app._embed_cache_conn()
+        n = conn.execute("SELECT COUNT(*) FROM embed_cache").fetchone()[0]
+        conn.close()
+        self.assertEqual(n, 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
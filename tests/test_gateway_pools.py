@@ -0,0 +1,59 @@
+import asyncio
+import json
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import openai_compat_gateway as gw
+
+
+class GatewayWorkerPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.env = patch.dict(os.environ, {"GATEWAY_HA_WORKERS": "1", "GATEWAY_HA_QUEUE": "0"})
+        self.env.start()
+        with gw._POOLS_LOCK:
+            self.saved = dict(gw._POOLS)
+            gw._POOLS.clear()
+
+    def tearDown(self):
+        with gw._POOLS_LOCK:
+            for p in gw._POOLS.values():
+                p.executor.shutdown(wait=False)
+            gw._POOLS.clear()
+            gw._POOLS.update(self.saved)
+        self.env.stop()
+
+    def test_saturated_pool_returns_503_and_loop_stays_responsive(self):
+        gate = threading.Event()
+        started = threading.Event()
+
+        def slow_state(body):
+            started.set()
+            gate.wait(5)
+            return gw.JSONResponse({"success": True})
+
+        async def scenario():
+            with patch.object(gw, "_invoke_ha_get_state_sync", side_effect=slow_state):
+                first = asyncio.ensure_future(gw._run_pooled("ha", gw._invoke_ha_get_state_sync, {}))
+                while not started.is_set():
+                    await asyncio.sleep(0.01)
+                busy = await gw._run_pooled("ha", gw._invoke_ha_get_state_sync, {})
+                health = await asyncio.wait_for(gw.health(None), timeout=1)
+                gate.set()
+                ok = await first
+            return busy, health, ok
+
+        busy, health, ok = asyncio.run(scenario())
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(busy.headers.get("retry-after"), "1")
+        self.assertEqual(ok.status_code, 200)
+        pools = json.loads(health.body)["pools"]
+        self.assertEqual(pools["ha"]["rejected"], 1)
+        self.assertEqual(pools["ha"]["running"], 1)
+        snap = gw._worker_pool("ha").snapshot()
+        self.assertEqual((snap["running"], snap["queued"], snap["completed"]), (0, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import openai_compat_gateway as gw
+
+
+def _events(resp):
+    out = []
+    for block in resp.text.split("\n\n"):
+        block = block.strip()
+        if block.startswith("data: "):
+            data = block[len("data: "):]
+            out.append(data if data == "[DONE]" else json.loads(data))
+    return out
+
+
+class GatewayStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(gw.app)
+        self.body = {"model": "jarvis_mcp", "stream": True, "messages": [{"role": "user", "content": "今天天气和日程"}]}
+
+    def _content(self, events):
+        return "".join([e["choices"][0]["delta"].get("content", "") for e in events if isinstance(e, dict)])
+
+    def test_final_answer_is_streamed_sentence_by_sentence(self):
+        final = "今天多云，最高22度。下午三点有牙医预约。 Bring an umbrella. Done"
+        with patch.object(gw, "_dispatch_tool", return_value={"tool": "skill.answer_question", "final_text": final}):
+            resp = self.client.post("/v1/chat/completions", json=self.body)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("text/event-stream"))
+        events = _events(resp)
+        self.assertEqual(events[0]["choices"][0]["delta"], {"role": "assistant"})
+        self.assertEqual(events[-1], "[DONE]")
+        self.assertEqual(events[-2]["choices"][0]["finish_reason"], "stop")
+        pieces = [e["choices"][0]["delta"]["content"] for e in events[1:-2]]
+        self.assertEqual(pieces[0], "今天多云，最高22度。")
+        self.assertEqual(len(pieces), 4)
+        self.assertEqual(self._content(events), final)
+
+    def test_emitted_parts_go_first_and_are_not_repeated(self):
+        app_module = gw._load_app_module()
+
+        def dispatch(tool_name, user_text):
+            app_module._stream_emit("今天多云。")
+            return {"tool": tool_name, "final_text": "今天多云。 明天没有日程。"}
+
+        with patch.object(gw, "_dispatch_tool", side_effect=dispatch):
+            events = _events(self.client.post("/v1/chat/completions", json=self.body))
+        self.assertEqual(events[1]["choices"][0]["delta"]["content"], "今天多云。")
+        self.assertEqual(self._content(events), "今天多云。 明天没有日程。")
+
+    def test_rewritten_answer_sends_only_the_unstreamed_rest(self):
+        app_module = gw._load_app_module()
+
+        def dispatch(tool_name, user_text):
+            app_module._stream_emit("今天多云。")
+            return {"tool": tool_name, "final_text": "天气：今天多云。 明天没有日程。"}
+
+        with patch.object(gw, "_dispatch_tool", side_effect=dispatch):
+            events = _events(self.client.post("/v1/chat/completions", json=self.body))
+        self.assertEqual(self._content(events), "今天多云。 明天没有日程。")
+        self.assertEqual(gw._stream_remainder("1) A\n2) B", ["1) X"]), "2) B")
+
+    def test_declared_tool_call_is_streamed_as_tool_calls_delta(self):
+        body = dict(self.body, tools=[{"type": "function", "function": {"name": "skill.news_brief", "parameters": {}}}], tool_choice="required")
+        with patch.dict("os.environ", {"OPENAI_COMPAT_AUTO_EXECUTE_TOOLS": "0"}):
+            events = _events(self.client.post("/v1/chat/completions", json=body))
+        delta = events[1]["choices"][0]["delta"]
+        self.assertEqual(delta["tool_calls"][0]["function"]["name"], "skill.news_brief")
+        self.assertEqual(delta["tool_calls"][0]["index"], 0)
+        self.assertEqual(events[2]["choices"][0]["finish_reason"], "tool_calls")
+
+    def test_budget_header_bounds_a_stuck_request(self):
+        def dispatch(tool_name, user_text):
+            time.sleep(1.0)
+            return {"tool": tool_name, "final_text": "太晚了。"}
+
+        body = dict(self.body, stream=False)
+        with patch.object(gw, "_dispatch_tool", side_effect=dispatch), patch.dict("os.environ", {"GATEWAY_DEADLINE_GRACE_MS": "0"}):
+            t0 = time.perf_counter()
+            resp = self.client.post("/v1/chat/completions", json=body, headers={"X-Request-Budget-Ms": "200"})
+        self.assertLess(time.perf_counter() - t0, 0.9)
+        self.assertIn("超时", resp.json()["choices"][0]["message"]["content"])
+
+    def test_admin_routes_get_no_default_budget(self):
+        seen = []
+
+        def slow_admin(body):
+            seen.append(gw.http_pool.deadline_remaining())
+            time.sleep(0.5)
+            return gw.JSONResponse({"success": True})
+
+        # A 200 ms default stands in for the 9 s one: bill processing must not be cut off by it.
+        with patch.object(gw, "_invoke_finance_admin_sync", side_effect=slow_admin), \
+                patch.dict("os.environ", {"GATEWAY_REQUEST_BUDGET_MS": "200", "GATEWAY_DEADLINE_GRACE_MS": "0"}):
+            resp = self.client.post("/invoke/finance_admin", json={})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(seen, [None])
+            self.assertEqual(gw._request_budget_sec({"x-request-budget-ms": "300"}, "/invoke/finance_admin"), 0.3)
+            self.assertEqual(gw._request_budget_sec({}, "/invoke/answer_question"), 0.2)
+
+    def test_non_stream_response_is_unchanged(self):
+        with patch.object(gw, "_dispatch_tool", return_value={"tool": "skill.answer_question", "final_text": "好的。"}):
+            resp = self.client.post("/v1/chat/completions", json=dict(self.body, stream=False))
+        self.assertEqual(resp.json()["choices"][0]["message"]["content"], "好的。")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import http_pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+        code = self.server.codes.pop(0) if self.server.codes else 200
+        body = b'{"ok": true}'
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.connections = 0
+        self.server.hits = 0
+        self.server.codes = []
+        self.server.delay = 0.0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d/api" % self.server.server_address[1]
+        http_pool.close()
+        http_pool._STATS.clear()
+
+    def tearDown(self):
+        http_pool.close()
+        http_pool._STATS.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive_reuses_one_connection(self):
+        for _ in range(5):
+            r = http_pool.get(self.url, upstream="qdrant", timeout=5)
+            self.assertEqual(r.json(), {"ok": True})
+        self.assertEqual(self.server.connections, 1)
+        st = http_pool.stats()["upstreams"]["qdrant"]
+        self.assertEqual(st["requests"], 5)
+        self.assertEqual(st["connections_opened"], 1)
+
+    def test_retries_idempotent_5xx_but_not_post(self):
+        self.server.codes = [503]
+        r = http_pool.get(self.url, upstream="ha", timeout=5)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.server.hits, 2)
+        self.server.codes = [503]
+        r = http_pool.post(self.url, upstream="ha", json={"x": 1}, timeout=5)
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(http_pool.stats()["upstreams"]["ha"]["retries"], 1)
+
+    def test_retry_budget_stops_retry_storm(self):
+        self.server.codes = [503] * 20
+        with patch.dict(os.environ, {"HTTP_HA_RETRIES": "1"}):
+            for _ in range(6):
+                http_pool.get(self.url, upstream="ha", timeout=5)
+        st = http_pool.stats()["upstreams"]["ha"]
+        self.assertEqual(st["retries"], 3)
+        self.assertEqual(st["retry_denied"], 3)
+
+    def test_deadline_clamps_timeout_and_fails_fast_when_spent(self):
+        ctx = contextvars.copy_context()
+
+        def run():
+            http_pool.deadline_set(0.3)
+            connect, read = http_pool._timeout(http_pool.upstream_config("ollama"), 45)
+            self.assertTrue(0.2 < read <= 0.3 and connect <= read)
+            http_pool.deadline_set(0.01)
+            with self.assertRaises(http_pool.DeadlineExceeded):
+                http_pool.get(self.url, upstream="ollama", timeout=5)
+
+        ctx.run(run)
+        self.assertIsNone(http_pool.deadline_remaining())
+        self.assertEqual(self.server.hits, 0)
+        self.assertEqual(http_pool.stats()["upstreams"]["ollama"]["deadline_skipped"], 1)
+
+    def test_identical_concurrent_reads_share_one_call(self):
+        self.server.delay = 0.2
+        out = []
+
+        def call(q):
+            out.append(http_pool.coalesced("GET", self.url, upstream="miniflux", params={"q": q}, timeout=5).json())
+
+        threads = [threading.Thread(target=call, args=("a",)) for _ in range(5)] + [threading.Thread(target=call, args=("b",))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(out, [{"ok": True}] * 6)
+        self.assertEqual(self.server.hits, 2)
+        st = http_pool.stats()["upstreams"]["miniflux"]
+        self.assertEqual(st["requests"], 2)
+        self.assertEqual(st["coalesced"] + st["memo_hits"], 4)
+
+    def test_memo_window_and_errors(self):
+        with patch.dict(os.environ, {"HTTP_SEARXNG_COALESCE_MS": "150"}):
+            http_pool.coalesced("GET", self.url, upstream="searxng", timeout=5)
+            http_pool.coalesced("GET", self.url, upstream="searxng", timeout=5)
+            self.assertEqual(self.server.hits, 1)
+            time.sleep(0.2)
+            self.server.codes = [404]
+            self.assertEqual(http_pool.coalesced("GET", self.url, upstream="searxng", timeout=5).status_code, 404)
+            self.assertEqual(http_pool.coalesced("GET", self.url, upstream="searxng", timeout=5).status_code, 200)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(http_pool.stats()["upstreams"]["searxng"]["memo_hits"], 1)
+        http_pool.coalesced("GET", self.url, upstream="ha", memo_sec=0, timeout=5)
+        http_pool.coalesced("GET", self.url, upstream="ha", memo_sec=0, timeout=5)
+        self.assertEqual(self.server.hits, 5)
+
+    def test_async_entry_point(self):
+        async def scenario():
+            rs = await asyncio.gather(*[http_pool.arequest("GET", self.url, upstream="ollama", timeout=5) for _ in range(3)])
+            return [r.status_code for r in rs]
+
+        self.assertEqual(asyncio.run(scenario()), [200, 200, 200])
+        self.assertEqual(http_pool.stats()["upstreams"]["ollama"]["requests"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,395 @@
+import json
+import os
+import re
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import app
+import shared_cache
+
+
+class _FakeMiniflux:
+    def __init__(self):
+        self.entries = []
+        self.calls = []
+
+    def add(self, n, title="Story"):
+        for _ in range(n):
+            i = len(self.entries) + 1
+            self.entries.append({"id": i, "title": "%s %d" % (title, i), "url": "https://x.test/%d" % i, "content": "<p>Body %d</p>" % i, "feed": {"title": "Feed"}})
+
+    def req(self, path, params=None):
+        p = dict(params or {})
+        self.calls.append(p)
+        if p.get("order") == "id":
+            rows = [e for e in self.entries if e["id"] > int(p.get("after_entry_id") or 0)]
+        else:
+            rows = sorted(self.entries, key=lambda e: -e["id"])
+        return {"ok": True, "data": {"total": len(rows), "entries": rows[: int(p.get("limit") or 100)]}}
+
+
+class NewsIncrementalIngestTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"NEWS_CACHE_DB": os.path.join(self.tmp.name, "news_cache.sqlite3"), "NEWS_CACHE_FETCH_LIMIT": "300"})
+        self.env.start()
+        self.mf = _FakeMiniflux()
+        self.ai = []
+        self.tr = []
+        self.patches = [
+            patch.object(app, "_skill_miniflux_req", side_effect=self.mf.req),
+            patch.object(app, "_news_keywords_extract_ai", side_effect=lambda t, s: self.ai.append(t) or {"keywords_en": ["story"]}),
+            patch.object(app, "_news__translate_batch_to_zh", side_effect=lambda pairs, **kw: self.tr.extend(pairs) or [{"title": "标题", "snippet": ""} for _ in pairs]),
+            patch.object(app, "_news_enrich_kick"),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def _refresh(self):
+        app._news_cache_set_meta("last_refresh_ts", "0")
+        app._news_cache_refresh_if_due(False)
+
+    def _count(self):
+        conn = app._news_cache_conn()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM news_cache_entries").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_only_new_entries_are_fetched_and_enriched(self):
+        self.mf.add(3)
+        self._refresh()
+        self.assertEqual(app._news_enrich_pending(), 3)
+        self.assertEqual((len(self.ai), len(self.tr), self._count()), (3, 3, 3))
+        self.assertEqual(app._news_cache_get_meta("miniflux_cursor_entry_id"), "3")
+
+        self.mf.add(1)
+        self.mf.calls.clear()
+        self._refresh()
+        self.assertEqual(self.mf.calls, [{"order": "id", "direction": "asc", "after_entry_id": 3, "limit": 100}])
+        self.assertEqual(app._news_enrich_pending(), 1)
+        self.assertEqual((len(self.ai), len(self.tr), self._count()), (4, 4, 4))
+
+        # Nothing new: one cheap request, no enrichment, the cursor stays.
+        self.mf.calls.clear()
+        self._refresh()
+        self.assertEqual(len(self.mf.calls), 1)
+        self.assertEqual(len(self.ai), 4)
+        self.assertIn('"incremental"', app._news_cache_get_meta("last_refresh_info"))
+
+    def test_backlog_is_paged_and_full_resync_skips_unchanged_rows(self):
+        self.mf.add(2)
+        self._refresh()
+        self.mf.add(150)
+        self.mf.calls.clear()
+        self._refresh()
+        self.assertEqual([c["after_entry_id"] for c in self.mf.calls], [2, 102])
+        self.assertEqual(self._count(), 152)
+        self.assertEqual(app._news_cache_get_meta("miniflux_cursor_entry_id"), "152")
+
+        app._news_enrich_pending(max_rows=1000)
+        self.ai.clear()
+        self.mf.entries[-1]["content"] = "<p>Edited</p>"
+        app._news_cache_refresh_if_due(True)
+        app._news_enrich_pending()
+        self.assertEqual(self.ai, ["Story 152"])
+
+    def test_refresh_does_not_wait_for_enrichment(self):
+        self.mf.add(2)
+        self._refresh()
+        # Queryable right away with heuristic keywords, before any LLM call.
+        self.assertEqual((self.ai, self.tr), ([], []))
+        self.assertEqual(app._news_enrich_stats()["pending"], 2)
+        got = app._news_cache_query("story", limit=5, do_refresh=False)["items"]
+        self.assertEqual(sorted(it["title"] for it in got), ["Story 1", "Story 2"])
+        self.assertEqual(app._news_enrich_pending(), 2)
+        conn = app._news_cache_conn()
+        try:
+            rows = conn.execute("SELECT title_zh, enriched_ts FROM news_cache_entries").fetchall()
+        finally:
+            conn.close()
+        self.assertTrue(all(r[0] == "标题" and r[1] > 0 for r in rows))
+        self.assertEqual(app._news_enrich_stats()["pending"], 0)
+
+    def test_enrichment_skips_rows_rewritten_meanwhile(self):
+        self.mf.add(1)
+        self._refresh()
+        self.mf.entries[0]["title"] = "Story 1 updated"
+
+        def refresh_during_extract(t, s):
+            # The next refresh lands while the LLM call for the old content is in flight.
+            app._news_cache_refresh_if_due(True)
+            return {"keywords_en": ["stale"]}
+
+        with patch.object(app, "_news_keywords_extract_ai", side_effect=refresh_during_extract):
+            app._news_enrich_pending(max_rows=1)
+        conn = app._news_cache_conn()
+        try:
+            row = conn.execute("SELECT title, enriched_ts FROM news_cache_entries").fetchone()
+            stale = conn.execute("SELECT COUNT(*) FROM news_keywords WHERE term='stale'").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual((tuple(row), stale), (("Story 1 updated", 0), 0))
+
+    def test_failed_enrichment_is_retried_after_backoff(self):
+        self.mf.add(1)
+        self._refresh()
+        with patch.object(app, "_news_keywords_extract_ai", return_value={}):
+            app._news_enrich_pending()
+        self.assertEqual(app._news_enrich_stats()["pending"], 1)
+        # Backing off: the next pass leaves the row alone.
+        self.assertEqual(app._news_enrich_pending(), 0)
+        conn = app._news_cache_conn()
+        try:
+            conn.execute("UPDATE news_cache_entries SET enrich_retry_ts=1")
+            conn.commit()
+        finally:
+            conn.close()
+        self.assertEqual(app._news_enrich_pending(), 1)
+        self.assertEqual(app._news_enrich_stats()["pending"], 0)
+
+        self.mf.add(1)
+        self._refresh()
+        with patch.dict(os.environ, {"NEWS_ENRICH_MAX_ATTEMPTS": "1"}), patch.object(app, "_news_keywords_extract_ai", return_value={}):
+            app._news_enrich_pending()
+        # Out of attempts: settles on the heuristic keywords.
+        self.assertEqual(app._news_enrich_stats()["pending"], 0)
+
+    def test_news_warmup_kicks_the_worker_while_rows_are_pending(self):
+        self.mf.add(1)
+        self._refresh()
+        app._news_enrich_kick.reset_mock()
+        app._warmup_news()
+        app._news_enrich_kick.assert_called_once_with()
+        app._news_enrich_pending()
+        app._news_enrich_kick.reset_mock()
+        app._warmup_news()
+        app._news_enrich_kick.assert_not_called()
+
+
+class _FakeMinifluxCategories:
+    def __init__(self):
+        self.entries = []
+        self.calls = []
+
+    def add(self, title, content="", minutes_ago=5):
+        i = len(self.entries) + 1
+        pub = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+        self.entries.append({"id": i, "title": title, "url": "https://g.test/%d" % i, "content": content, "published_at": pub.strftime("%Y-%m-%dT%H:%M:%SZ"), "feed": {"title": "Feed"}})
+
+    def req(self, path, params=None):
+        p = dict(params or {})
+        self.calls.append((path, p))
+        if path == "/v1/categories":
+            return {"ok": True, "data": [{"id": 3, "title": "world（世界新闻）"}, {"id": 7, "title": "gaming（电子游戏）"}]}
+        rows = [e for e in self.entries if e["id"] > int(p.get("after_entry_id") or 0)]
+        if p.get("order") != "id":
+            rows = sorted(rows, key=lambda e: e["published_at"], reverse=True)
+        return {"ok": True, "data": {"total": len(rows), "entries": rows[: int(p.get("limit") or 100)]}}
+
+
+class NewsDigestWindowTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(
+            os.environ,
+            {
+                "NEWS_CACHE_DB": os.path.join(self.tmp.name, "news_cache.sqlite3"),
+                "SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3"),
+                "MINIFLUX_API_TOKEN": "t",
+            },
+        )
+        self.env.start()
+        shared_cache.clear()
+        self.mf = _FakeMinifluxCategories()
+        self.req = patch.object(app, "_skill_miniflux_req", side_effect=self.mf.req)
+        self.req.start()
+
+    def tearDown(self):
+        self.req.stop()
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def _titles(self, **kw):
+        return [it["title"] for it in app.news_digest("gaming", prefer_lang="en", **kw)["items"]]
+
+    def test_digest_reads_the_local_window_after_the_first_sync(self):
+        self.mf.add("Steam sale starts", minutes_ago=30)
+        self.mf.add("Football final recap", minutes_ago=20)
+        self.mf.add("Nintendo Switch update", minutes_ago=10)
+        self.mf.add("Old patch notes", minutes_ago=25 * 60)
+        self.assertEqual(self._titles(limit=2), ["Nintendo Switch update", "Steam sale starts"])
+        self.mf.calls.clear()
+        # Warm: no Miniflux round trip at all, and the precomputed blacklist still applies.
+        self.assertEqual(self._titles(limit=2), ["Nintendo Switch update", "Steam sale starts"])
+        self.assertEqual(self.mf.calls, [])
+
+        self.mf.add("New DLC trailer", minutes_ago=1)
+        app._news_digest_refresh_known()
+        self.assertEqual([c[1].get("after_entry_id") for c in self.mf.calls], [4])
+        self.assertEqual(self._titles(limit=1), ["New DLC trailer"])
+
+    def test_stale_window_is_served_while_refreshing_in_background(self):
+        self.mf.add("Steam sale starts")
+        self._titles()
+        app._news_cache_set_meta("digest_cat:7", json.dumps({"cursor": 1, "synced_ts": 1}))
+        self.mf.add("PS5 price cut")
+        with patch.object(app, "_news_digest_refresh_async") as kick:
+            self.assertEqual(self._titles(), ["Steam sale starts"])
+        kick.assert_called_once_with(7)
+        self.assertEqual(app.news_digest("no_such_cat")["final"], "Miniflux 中找不到对应分类：no_such_cat")
+        self.assertEqual(sorted(app._news_digest_keys()), ["gaming"])
+
+    def _window_rows(self, cat_id):
+        conn = app._news_cache_conn()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM news_digest_window WHERE cat_id=?", (cat_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_aliases_share_one_window_with_their_own_filters(self):
+        self.mf.add("Steam sale starts", minutes_ago=20)
+        self.mf.add("Football final recap", minutes_ago=10)
+        a = app._news_digest_window("gaming", 20)
+        self.mf.calls.clear()
+        b = app._news_digest_window("gaming（电子游戏）", 20)
+        self.assertEqual(self.mf.calls, [])
+        self.assertEqual((a["cat_id"], b["cat_id"], self._window_rows(7)), (7, 7, 2))
+        # The configured "gaming" blacklist drops the football story; the bare title key has no filters.
+        self.assertEqual([it["_filter"][0] for it in a["items"]], [0, 1])
+        self.assertEqual([it["_filter"] for it in b["items"]], [(1, 1, 1), (1, 1, 1)])
+
+    def test_windows_unused_for_keep_days_expire(self):
+        self.mf.add("Steam sale starts")
+        app._news_digest_window("gaming", 20)
+        app._news_digest_window("world", 20)
+        app._news_cache_set_meta("digest:world", json.dumps({"cat_id": 3, "used_ts": int(time.time()) - 8 * 86400}))
+        self.mf.calls.clear()
+        app._news_digest_refresh_known()
+        self.assertEqual(list(app._news_digest_keys()), ["gaming"])
+        self.assertEqual([c[0] for c in self.mf.calls if c[0] != "/v1/categories"], ["/v1/categories/7/entries"])
+        self.assertEqual((self._window_rows(3), self._window_rows(7)), (0, 1))
+        self.assertEqual(app._news_cache_get_meta("digest_cat:3"), "")
+
+    def test_spoken_answer_streams_before_the_translation_passes(self):
+        self.mf.add("Steam sale starts", minutes_ago=20)
+        self.mf.add("Nintendo Switch update", minutes_ago=10)
+        emitted = []
+        with patch.object(app.translation_memory, "translate", side_effect=lambda *a: emitted.append("translate") or []):
+            token = app._STREAM_SINK.set(emitted.append)
+            try:
+                ret = app.news_digest("gaming", limit=2, prefer_lang="zh")
+            finally:
+                app._STREAM_SINK.reset(token)
+        self.assertEqual(emitted[0], ret["final_voice"])
+        self.assertIn("translate", emitted[1:])
+
+
+def _legacy_query(conn, topic, limit):
+    # The row-by-row Python scorer _news_cache_query used before the SQL index.
+    q_raw = topic
+    q_en = app._skill_translate_news_query_to_en(q_raw)
+    prof = app._news_query_anchor_profile(q_raw, q_en)
+    groups, anchors = prof["groups"], prof["anchors"]
+    tset_zh, tset_en = [], []
+    for x in re.findall(r"[\u4e00-\u9fff]{2,}", q_raw):
+        s = app._news_normalize_keyword_zh(x)
+        if s and s not in tset_zh:
+            tset_zh.append(s)
+    for x in re.findall(r"[a-zA-Z][a-zA-Z0-9\-\+]{2,}", q_en.lower()):
+        s = app._news_normalize_keyword_en(x)
+        if s and s not in tset_en:
+            tset_en.append(s)
+    rows = conn.execute("SELECT url, title, snippet, source, topic_tags, keywords_en, keywords_zh FROM news_cache_entries ORDER BY published_at DESC LIMIT 400").fetchall()
+    scored = []
+    for url, title, snippet, source, tj, ej, zj in rows:
+        tags, kws_en, kws_zh = json.loads(tj), json.loads(ej), json.loads(zj)
+        score = 0.0
+        tl = (title + " " + snippet).lower()
+        for t in tset_en:
+            score += 3.0 if t in [x.lower() for x in tags] else 0.0
+            score += 2.5 if t in [x.lower() for x in kws_en] else 0.0
+            score += 1.4 if t in tl else 0.0
+        for t in tset_zh:
+            score += 2.5 if t in kws_zh else 0.0
+            score += 1.4 if t in title + " " + snippet else 0.0
+        mix = " ".join(x.lower() for x in [title, snippet, source, " ".join(tags), " ".join(kws_en), " ".join(kws_zh)]).strip()
+        hits = sum(1 for a in anchors if a.lower().strip() and a.lower().strip() in mix)
+        if hits > 0:
+            score += hits * 2.2
+        elif groups:
+            score -= 2.5
+        if ("墨尔本" in q_raw) and any(k in source.lower() for k in ("abc", "9news", "the age", "smh", "guardian")):
+            score += 0.7
+        if not (tset_en or tset_zh):
+            score += 0.2
+        if score > 0:
+            scored.append((score, hits, url))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    out = scored[:limit]
+    anchored = [x for x in scored if x[1] > 0]
+    if groups and anchored:
+        out = anchored[:limit]
+        out += [x for x in scored if x not in out][: limit - len(out)]
+    return [x[2] for x in out]
+
+
+class NewsIndexedQueryTests(unittest.TestCase):
+    ITEMS = [
+        ("Gold price hits record as markets wobble", "Gold and XAU futures rally.", "ABC News"),
+        ("Bitcoin slides below key level", "Crypto traders brace for a rate decision.", "Reuters"),
+        ("Nvidia unveils new AI chips", "The technology giant showed new GPUs.", "The Verge"),
+        ("墨尔本电车线路周末停运", "维州交通部门表示将安排替代巴士。", "9News Melbourne"),
+        ("黄金价格创新高", "投资者涌入避险资产，金价上涨。", "新华网"),
+        ("Football final draws record crowd", "Sports fans packed the MCG.", "The Age"),
+        ("Rental prices keep climbing", "Housing affordability worsens in Melbourne.", "SMH"),
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"NEWS_CACHE_DB": os.path.join(self.tmp.name, "news_cache.sqlite3")})
+        self.env.start()
+        rows = []
+        for i, (title, snippet, source) in enumerate(self.ITEMS):
+            it = {"title": title, "snippet": snippet, "source": source, "url": "https://n.test/%d" % i, "published_at": "2026-03-0%dT08:00:00Z" % (i + 1)}
+            rows.append(app._news_cache_row(it, use_ai=False))
+        app._news_cache_write(rows)
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_sql_scoring_matches_row_by_row_scorer(self):
+        conn = app._news_cache_conn()
+        try:
+            for topic in ["gold price", "黄金 价格", "墨尔本 交通", "AI chips news", "rental housing", "bitcoin", "", "完全无关的话题"]:
+                got = [it["url"] for it in app._news_cache_query(topic, limit=3, do_refresh=False)["items"]]
+                self.assertEqual(got, _legacy_query(conn, topic, 3), topic)
+        finally:
+            conn.close()
+
+    def test_keyword_index_follows_rewrites(self):
+        conn = app._news_cache_conn()
+        try:
+            before = conn.execute("SELECT COUNT(*) FROM news_keywords WHERE url='https://n.test/0'").fetchone()[0]
+            self.assertGreater(before, 0)
+            app._news_cache_upsert_item({"title": "Weather alert", "snippet": "Storms tonight", "url": "https://n.test/0"}, use_ai=False)
+            terms = {r[0] for r in conn.execute("SELECT term FROM news_keywords WHERE url='https://n.test/0'").fetchall()}
+        finally:
+            conn.close()
+        self.assertNotIn("gold", terms)
+        self.assertIn("storms", terms)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
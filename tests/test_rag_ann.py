@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app
+import rag_ann
+
+
+def _vec(i: int, dim: int = 8) -> list:
+    v = [0.0] * dim
+    v[i % dim] = 1.0
+    v[(i + 1) % dim] = 0.1 * (i // dim)
+    return v
+
+
+@unittest.skipUnless(rag_ann.available(), "numpy not installed")
+class LocalVectorIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _points(self, n: int) -> list:
+        return [
+            {"id": "p%d" % i, "vector": _vec(i), "payload": {"text": "t%d" % i, "user_id": "u%d" % (i % 2), "tags": ["dir:%d" % (i % 3)]}}
+            for i in range(n)
+        ]
+
+    def test_search_filters_and_tombstones(self):
+        idx = rag_ann.LocalVectorIndex(self.tmp.name, 8)
+        idx.upsert(self._points(24))
+        hits = idx.search(_vec(3), top_k=3)
+        self.assertEqual(hits[0]["id"], "p3")
+        self.assertAlmostEqual(hits[0]["score"], 1.0, places=4)
+        hits = idx.search(_vec(3), top_k=5, user_id="u0", tags=["dir:2"])
+        self.assertTrue(hits)
+        self.assertTrue(all(h["payload"]["user_id"] == "u0" and "dir:2" in h["payload"]["tags"] for h in hits))
+        # A second handle (another process) writes; the first sees it on the next search.
+        other = rag_ann.LocalVectorIndex(self.tmp.name, 8)
+        other.upsert([{"id": "p3", "vector": _vec(5), "payload": {"text": "moved"}}])
+        other.delete(["p5"])
+        other.close()
+        hits = idx.search(_vec(5), top_k=2)
+        self.assertEqual(hits[0]["id"], "p3")
+        self.assertNotIn("p5", [h["id"] for h in hits])
+        idx.close()
+
+    def test_ivf_build_keeps_results(self):
+        idx = rag_ann.LocalVectorIndex(self.tmp.name, 8, nprobe=8, brute_force_max=0)
+        idx.upsert(self._points(64))
+        before = [h["id"] for h in idx.search(_vec(10), top_k=3)]
+        idx.delete(["p63"])
+        built = idx.build(nlist=4)
+        self.assertEqual(built, {"rows": 63, "lists": 4})
+        self.assertEqual([h["id"] for h in idx.search(_vec(10), top_k=3)], before)
+        idx.upsert([{"id": "new", "vector": _vec(10), "payload": {}}])
+        self.assertIn("new", [h["id"] for h in idx.search(_vec(10), top_k=3)])
+        idx.close()
+
+
+@unittest.skipUnless(rag_ann.available(), "numpy not installed")
+class QdrantLocalFallbackTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"LOCAL_ANN_ENABLE": "1", "LOCAL_ANN_DIR": self.tmp.name, "QDRANT_VECTOR_SIZE": "8"})
+        self.env.start()
+
+    def tearDown(self):
+        with app._LOCAL_ANN_LOCK:
+            idx = app._LOCAL_ANN_STATE.get("index")
+            app._LOCAL_ANN_STATE.update({"index": None, "key": ""})
+        if idx is not None:
+            idx.close()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_search_falls_back_when_qdrant_is_down(self):
+        put_resp = type("R", (), {"status_code": 200, "text": "", "json": lambda self: {"result": {}}})()
+        with patch.object(app.http_pool, "put", return_value=put_resp):
+            rr = app._skill_qdrant_upsert_points([{"id": "m1", "vector": _vec(2), "payload": {"text": "wifi password", "user_id": "default"}}])
+        self.assertTrue(rr.get("ok"))
+        with patch.object(app, "_skill_embed_text", return_value=_vec(2)), \
+                patch.object(app.http_pool, "post", side_effect=app.requests.exceptions.ConnectTimeout("down")):
+            hits = app._skill_qdrant_search("wifi", top_k=3, user_id="default", scope_tags=["dir:none"])
+        self.assertEqual([h["id"] for h in hits], ["m1"])
+        self.assertEqual(hits[0]["via"], "local_ann")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,45 @@
+import unittest
+
+import rag_chunking as rc
+
+
+class RagChunkingTests(unittest.TestCase):
+    def test_spans_follow_split_text_grouping(self):
+        paras = ["Paragraph %d " % i + ("word " * 40) for i in range(12)]
+        text = "\n\n".join(paras)
+        chunks = rc.split_text(text, chunk_size=500, overlap=0)
+        spans = rc.split_text_spans(text, chunk_size=500, overlap=0)
+        self.assertEqual(len(chunks), len(spans))
+        for chunk, (s, e) in zip(chunks, spans):
+            self.assertEqual(chunk.split("\n"), [p.strip() for p in text[s:e].split("\n") if p.strip()])
+
+    def test_long_paragraph_is_windowed(self):
+        text = "x" * 2000
+        spans = rc.split_text_spans(text, chunk_size=900, overlap=120)
+        self.assertEqual(spans[0], (0, 900))
+        self.assertEqual(spans[1][0], 780)
+        self.assertEqual(spans[-1][1], 2000)
+
+    def test_empty_text(self):
+        self.assertEqual(rc.split_text_spans("  \n\n "), [])
+        self.assertEqual(rc.split_text(""), [])
+
+    def test_cdc_chunks_survive_edit_at_top(self):
+        paras = ["Note %d: " % i + ("alpha beta gamma %d " % i) * 6 for i in range(80)]
+        before = rc.split_text_cdc("\n".join(paras), chunk_size=600)
+        after = rc.split_text_cdc("\n".join(["A new first line."] + paras), chunk_size=600)
+        self.assertGreater(len(before), 5)
+        self.assertTrue(all(len(c) <= 600 for c in before + after))
+        self.assertGreaterEqual(len(set(before) & set(after)), len(before) - 2)
+
+    def test_cdc_long_paragraph_is_capped(self):
+        text = "".join("word%d " % i for i in range(1500))
+        spans = rc.split_text_cdc_spans(text, chunk_size=900)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(text.rstrip()))
+        self.assertTrue(all(0 < e - s <= 900 for s, e in spans))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(spans, spans[1:])))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import app
+
+
+class RagContentSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "rag_index.sqlite3")
+        self.patches = [
+            patch.object(app, "_rag_index_db_path", return_value=self.db_path),
+            patch.object(app, "_rag_content_exts_from_sources", return_value=["md", "txt", "pdf"]),
+        ]
+        for p in self.patches:
+            p.start()
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        docs = [
+            ("/mnt/nas/manuals/washer.md", 100.0, "Washing machine manual. Clean the lint filter every month."),
+            ("/mnt/nas/contracts/home.md", 200.0, "家庭保险合同：保险期限一年，到期前需续保 insurance renewal。"),
+        ]
+        # Older than the 30-candidate window to prove the index covers the whole corpus.
+        for i in range(40):
+            docs.append(("/mnt/nas/notes/n%02d.md" % i, 1000.0 + i, "plain note number %d" % i))
+        for path, mtime, text in docs:
+            app._rag_db_upsert_file(conn, {"path": path, "name": os.path.basename(path), "ext": "md", "mtime": mtime, "size": 1})
+            app._rag_db_upsert_doc_text(conn, path, mtime, text)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_fts_finds_old_document_with_snippet(self):
+        out = app._rag_search_content("lint filter", "zh")
+        self.assertIn("manuals/washer.md", out)
+        self.assertIn("lint filter", out)
+
+    def test_short_cjk_terms_use_instr_filter(self):
+        out = app._rag_search_content("续保 insurance", "zh")
+        self.assertIn("contracts/home.md", out)
+        self.assertNotIn("washer.md", out)
+
+    def test_short_term_only_query_searches_whole_corpus(self):
+        # No trigram term: the bigram index finds home.md although it is older than every candidate.
+        self.assertIn("contracts/home.md", app._rag_search_content("续保", "zh"))
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        app._rag_db_upsert_file(conn, {"path": "/mnt/nas/contracts/car.md", "name": "car.md", "ext": "md", "mtime": 5000.0, "size": 1})
+        app._rag_db_upsert_doc_text(conn, "/mnt/nas/contracts/car.md", 5000.0, "车险下月续保。")
+        conn.commit()
+        conn.close()
+        out = app._rag_search_content("续保", "zh")
+        self.assertIn("contracts/car.md", out)
+        self.assertIn("contracts/home.md", out)
+        self.assertIn("contracts/home.md", app._rag_search_content("险 | 发票", "zh"))
+        self.assertIn("未检索到", app._rag_search_content("保修", "zh"))
+
+    def test_terms_in_different_passages_still_match_the_document(self):
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        app._rag_db_upsert_file(conn, {"path": "/mnt/nas/manuals/dryer.pdf", "name": "dryer.pdf", "ext": "pdf", "mtime": 50.0, "size": 1})
+        app._rag_db_write_chunks(conn, "/mnt/nas/manuals/dryer.pdf", [(1, "Dryer warranty lasts two years."), (7, "Empty the lint filter after each load.")])
+        conn.commit()
+        conn.close()
+        res = app._rag_search_content_matches("warranty lint filter")
+        # dryer.pdf has every term (on different pages); washer.md lacks "warranty" and is out.
+        self.assertEqual([m["path"] for m in res["matches"]], ["/mnt/nas/manuals/dryer.pdf"])
+        m = res["matches"][0]
+        self.assertTrue(m.get("partial"))
+        self.assertEqual(m["coverage"], 3)
+        self.assertEqual([sn[:5] for sn in m["snippets"]], ["[第1页]", "[第7页]"])
+
+    def test_long_document_does_not_crowd_out_other_files(self):
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        app._rag_db_upsert_file(conn, {"path": "/n/big.pdf", "name": "big.pdf", "ext": "pdf", "mtime": 10.0, "size": 1})
+        app._rag_db_write_chunks(conn, "/n/big.pdf", [(i, "Page %d: replace the lint filter seal." % i) for i in range(1, 80)])
+        for name in ("a.md", "b.md", "c.md"):
+            app._rag_db_upsert_file(conn, {"path": "/n/" + name, "name": name, "ext": "md", "mtime": 20.0, "size": 1})
+            app._rag_db_upsert_doc_text(conn, "/n/" + name, 20.0, "Notes on the lint filter of " + name)
+        conn.commit()
+        conn.close()
+        paths = [m["path"] for m in app._rag_search_content_matches("lint filter")["matches"]]
+        self.assertEqual(sorted(paths), ["/mnt/nas/manuals/washer.md", "/n/a.md", "/n/b.md", "/n/big.pdf", "/n/c.md"])
+
+    def test_upsert_and_delete_keep_index_in_sync(self):
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        app._rag_db_upsert_doc_text(conn, "/mnt/nas/manuals/washer.md", 300.0, "Dryer vent cleaning guide")
+        conn.commit()
+        conn.close()
+        self.assertIn("未检索到", app._rag_search_content("lint filter", "zh"))
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_delete_path(conn, "/mnt/nas/manuals/washer.md")
+        conn.commit()
+        counts = [conn.execute("SELECT COUNT(*) FROM " + t).fetchone()[0] for t in ("doc_chunks", "doc_chunks_cjk")]
+        conn.close()
+        self.assertEqual(counts[0], counts[1])
+        self.assertIn("未检索到", app._rag_search_content("dryer vent", "zh"))
+
+    def test_passages_carry_page_numbers(self):
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        path = "/mnt/nas/manuals/oven.pdf"
+        pages = [(1, "Oven overview."), (37, "Error E4 means the door sensor failed.")]
+        app._rag_db_upsert_file(conn, {"path": path, "name": "oven.pdf", "ext": "pdf", "mtime": 50.0, "size": 1})
+        app._rag_db_upsert_doc_text(conn, path, 50.0, "\n".join([t for _p, t in pages]), pages)
+        conn.commit()
+        row = conn.execute("SELECT page, char_start, char_end FROM doc_chunks WHERE path=? AND page=37", (path,)).fetchone()
+        text = conn.execute("SELECT text FROM doc_text WHERE path=?", (path,)).fetchone()[0]
+        conn.close()
+        self.assertEqual(text[row[1]:row[2]], pages[1][1])
+        out = app._rag_search_content("door sensor", "zh")
+        self.assertIn("manuals/oven.pdf", out)
+        self.assertIn("[第37页]", out)
+
+    def test_scan_fallback_without_fts(self):
+        with patch.dict(os.environ, {"RAG_FTS_ENABLE": "0"}):
+            out = app._rag_search_content("number 39", "zh")
+        self.assertIn("notes/n39.md", out)
+
+    def test_hybrid_fuses_vector_and_keyword_hits(self):
+        vec_hits = [
+            {"id": "a", "score": 0.8, "payload": {"title": "Washer notes", "path": "manuals/washer.md", "text": "lint filter monthly"}},
+            {"id": "b", "score": 0.7, "payload": {"title": "Fridge", "path": "manuals/fridge.md", "text": "defrost"}},
+        ]
+        with patch.dict(os.environ, {"RAG_RETRIEVAL_MODE": "hybrid", "MEMORY_BILINGUAL_ENABLE": "0"}), \
+                patch.object(app, "_skill_qdrant_search", return_value=vec_hits), \
+                patch.object(app, "_skill_translate_rag_query", return_value=""):
+            rr = app._skill_rag_lookup_core("lint filter", "", "zh")
+        self.assertEqual(rr.get("route"), "hybrid")
+        self.assertEqual(rr.get("hit_count"), 2)
+        self.assertEqual(rr.get("keyword_hit_count"), 1)
+        self.assertEqual(set(rr.get("legs").keys()), {"vector", "keyword", "keyword_alt"})
+        lines = rr.get("final_text").splitlines()
+        self.assertIn("manuals/washer.md", lines[2])
+
+
+class RagExtractServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "nas")
+        self.db_path = os.path.join(self.tmp.name, "rag_index.sqlite3")
+        sources_path = os.path.join(self.tmp.name, "rag_sources.json")
+        with open(sources_path, "w", encoding="utf-8") as f:
+            f.write('{"nas": {"connector": "nas", "target": "%s", "filetypes": "md,txt"}}' % self.root)
+        self.patches = [
+            patch.object(app, "_rag_index_db_path", return_value=self.db_path),
+            patch.object(app, "_rag_sources_path", return_value=sources_path),
+        ]
+        for p in self.patches:
+            p.start()
+        os.makedirs(os.path.join(self.root, "manuals"))
+        conn = sqlite3.connect(self.db_path)
+        app._rag_db_init(conn)
+        for i in range(6):
+            path = os.path.join(self.root, "manuals", "m%d.md" % i)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("Manual %d: descale the kettle monthly." % i)
+            app._rag_db_upsert_file(conn, {"path": path, "name": os.path.basename(path), "ext": "md", "mtime": os.stat(path).st_mtime, "size": 1})
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_prewarm_reports_parallel_timing(self):
+        out = app._rag_prewarm_source("nas", "zh").get("final")
+        self.assertIn("新增/更新=6", out)
+        self.assertIn("失败=0", out)
+        self.assertIn("单文件平均=", out)
+        out = app._rag_prewarm_source("nas", "zh").get("final")
+        self.assertIn("命中缓存=6", out)
+
+    def test_prewarm_counts_jobs_still_running_apart_from_failures(self):
+        def submit(path, ext, mtime):
+            return {"path": path, "ext": ext, "mtime": mtime, "status": "", "elapsed": 0.0, "written": threading.Event()}
+
+        with patch.object(app, "_rag_extract_submit", side_effect=submit), patch.object(app, "_rag_extract_wait", return_value=0):
+            out = app._rag_prewarm_source("nas", "zh").get("final")
+        self.assertIn("失败=0", out)
+        self.assertIn("未完成（后台继续）=6", out)
+
+    def test_cold_search_extracts_within_budget(self):
+        with patch.dict(os.environ, {"RAG_SEARCH_EXTRACT_BUDGET_MS": "10000"}):
+            out = app._rag_search_content("descale", "zh")
+        self.assertIn("manuals/m", out)
+        self.assertNotIn("后台提取", out)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import rag_ingest
+
+
+class _Resp:
+    def __init__(self, obj=None, status_code=200):
+        self._obj = obj or {}
+        self.status_code = status_code
+        self.text = ""
+
+    def json(self):
+        return self._obj
+
+
+class EmbedUpsertPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.embed_inputs = []
+        self.upserts = []
+
+        def fake_post(url, json=None, timeout=None):
+            self.embed_inputs.append(list(json["input"]))
+            return _Resp({"embeddings": [[0.1, 0.2, 0.3] for _ in json["input"]]})
+
+        def fake_put(url, json=None, timeout=None):
+            self.upserts.append((url, [p["id"] for p in json["points"]]))
+            return _Resp()
+
+        self.patches = [
+            patch.object(rag_ingest.requests, "post", side_effect=fake_post),
+            patch.object(rag_ingest.requests, "put", side_effect=fake_put),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def _pipe(self, **kw):
+        return rag_ingest.EmbedUpsertPipeline("http://ollama", "m", 3, "http://qdrant", "c", **kw)
+
+    def test_batches_embed_calls_and_streams_upserts(self):
+        pipe = self._pipe(embed_batch=4, concurrency=2)
+        for i in range(10):
+            pipe.add("p%d" % i, "chunk %d" % i, {"i": i})
+        stats = pipe.close()
+        self.assertEqual(sorted(len(x) for x in self.embed_inputs), [2, 4, 4])
+        self.assertEqual(stats["embedded"], 10)
+        self.assertEqual(stats["embed_calls"], 3)
+        self.assertTrue(all(url.endswith("wait=false") for url, _ids in self.upserts))
+        self.assertEqual(sorted(i for _url, ids in self.upserts for i in ids), sorted("p%d" % i for i in range(10)))
+
+    def test_vector_size_mismatch_raises_on_close(self):
+        pipe = rag_ingest.EmbedUpsertPipeline("http://ollama", "m", 8, "http://qdrant", "c", embed_batch=2)
+        pipe.add("a", "x", {})
+        pipe.add("b", "y", {})
+        with self.assertRaises(RuntimeError):
+            pipe.close()
+        self.assertEqual(self.upserts, [])
+
+    def test_vector_store_reuses_known_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = rag_ingest.ChunkVectorStore(os.path.join(tmp, "vec.sqlite3"), "m", 3)
+            pipe = self._pipe(embed_batch=8, store=store)
+            pipe.add("a0", "shared text", {})
+            pipe.add("b0", "shared text", {})
+            pipe.add("a1", "only in a", {})
+            stats = pipe.close()
+            self.assertEqual(self.embed_inputs, [["shared text", "only in a"]])
+            self.assertEqual((stats["embedded"], stats["reused"], stats["upserted"]), (2, 1, 3))
+            # A moved file: same content under new point ids, no embedding call.
+            pipe = self._pipe(embed_batch=8, store=store)
+            pipe.add("c0", "shared text", {})
+            pipe.add("c1", "only in a", {})
+            stats = pipe.close()
+            store.close()
+            self.assertEqual(len(self.embed_inputs), 1)
+            self.assertEqual(stats["reused"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
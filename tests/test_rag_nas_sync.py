@@ -0,0 +1,89 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app
+
+
+class RagNasSyncTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "nas")
+        self.db_path = os.path.join(self.tmp.name, "rag_index.sqlite3")
+        self.patch = patch.object(app, "_rag_index_db_path", return_value=self.db_path)
+        self.patch.start()
+        self.source = {"target": self.root, "filetypes": "md,pdf"}
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def _write(self, rel: str, body: str = "x"):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        return path
+
+    def _paths(self) -> set:
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT path FROM files").fetchall()
+        conn.close()
+        return set(os.path.relpath(r[0], self.root) for r in rows)
+
+    def test_incremental_diff_and_prune(self):
+        self._write("a/one.md")
+        self._write("a/two.md")
+        self._write("b/c/three.md")
+        self._write("b/skip.txt")
+        out = app._rag_sync_nas_index(self.source, "nas", "zh")
+        self.assertIn("新增/更新=3", out)
+        self.assertEqual(self._paths(), {"a/one.md", "a/two.md", "b/c/three.md"})
+
+        out = app._rag_sync_nas_index(self.source, "nas", "zh")
+        self.assertIn("新增/更新=0", out)
+
+        self._write("a/one.md", "changed body")
+        os.remove(os.path.join(self.root, "a/two.md"))
+        shutil.rmtree(os.path.join(self.root, "b/c"))
+        out = app._rag_sync_nas_index(self.source, "nas", "zh", full=True)
+        self.assertIn("新增/更新=1", out)
+        self.assertIn("删除=2", out)
+        self.assertEqual(self._paths(), {"a/one.md"})
+
+    def test_incremental_run_picks_up_in_place_edit(self):
+        self._write("a/one.md", "first")
+        self._write("a/two.md")
+        app._rag_sync_nas_index(self.source, "nas", "zh")
+        path = self._write("a/one.md", "rewritten with a longer body")
+        d = os.path.dirname(path)
+        st = os.stat(d)
+        os.utime(d, (st.st_atime, st.st_mtime))  # the directory entry list did not change
+        out = app._rag_sync_nas_index(self.source, "nas", "zh")
+        self.assertIn("新增/更新=1", out)
+        self.assertIn("未变化=1", out)
+        conn = sqlite3.connect(self.db_path)
+        size = conn.execute("SELECT size FROM files WHERE path=?", (path,)).fetchone()[0]
+        conn.close()
+        self.assertEqual(size, os.path.getsize(path))
+
+    def test_cursor_resumes_across_runs(self):
+        for d in ["d1", "d2", "d3"]:
+            for i in range(60):
+                self._write("%s/f%02d.md" % (d, i))
+        with patch.dict(os.environ, {"RAG_NAS_SYNC_MAX_ENTRIES": "100"}):
+            out1 = app._rag_sync_nas_index(self.source, "nas", "zh")
+            self.assertIn("下次同步继续", out1)
+            self.assertLess(len(self._paths()), 180)
+            for _ in range(5):
+                out = app._rag_sync_nas_index(self.source, "nas", "zh")
+                if "下次同步继续" not in out:
+                    break
+        self.assertEqual(len(self._paths()), 180)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import app
+
+
+class _Resp:
+    status_code = 200
+
+    def __init__(self, content):
+        self._content = content
+
+    def json(self):
+        return {"message": {"content": self._content}}
+
+
+class RouteCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            "ROUTE_CACHE_DB": os.path.join(self.tmp.name, "route_cache.sqlite3"),
+            "ROUTER_LLM_ENABLE": "1",
+            "ROUTER_LLM_MODEL": "test-router",
+        })
+        self.env.start()
+        self._reset()
+
+    def tearDown(self):
+        self.env.stop()
+        self._reset()
+        self.tmp.cleanup()
+
+    def _reset(self):
+        with app._ROUTE_CACHE_LOCK:
+            app._ROUTE_CACHE_MEM.clear()
+            app._ROUTE_CACHE_STATS.clear()
+            app._ROUTE_CACHE_STATE["loaded_path"] = ""
+
+    def test_llm_decision_survives_restart(self):
+        resp = _Resp("label=weather;confidence=0.91;reason=rain")
+        with patch.object(app.http_pool, "post", return_value=resp) as post:
+            dec = app._llm_route_decide("明天要带伞吗", "zh")
+            self.assertEqual(dec["label"], "weather")
+            # A restart loses the memory tier; the SQLite copy is loaded back.
+            self._reset()
+            again = app._llm_route_decide("明天要带伞吗", "zh")
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(again["label"], "weather")
+        self.assertTrue(again["cached"])
+        self.assertEqual(app._route_cache_stats()["hit_rate"], 1.0)
+
+    def test_failed_llm_decision_is_not_cached_and_ttl_expires(self):
+        with patch.object(app.http_pool, "post", side_effect=[_Resp("no idea"), _Resp("label=news;confidence=0.8;reason=x"), _Resp("label=web;confidence=0.8;reason=x")]) as post:
+            self.assertIsNone(app._llm_route_decide("最近有什么事", "zh"))
+            self.assertEqual(app._llm_route_decide("最近有什么事", "zh")["label"], "news")
+            with patch.object(app.time, "time", return_value=time.time() + 8 * 86400):
+                self.assertEqual(app._llm_route_decide("最近有什么事", "zh")["label"], "web")
+        self.assertEqual(post.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
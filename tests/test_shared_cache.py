@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import shared_cache
+
+
+class SharedCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3")})
+        self.env.start()
+        shared_cache.clear()
+        self.calls = []
+
+    def tearDown(self):
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def _loader(self, value, delay=0.0):
+        def fn():
+            self.calls.append(value)
+            time.sleep(delay)
+            return value
+
+        return fn
+
+    def test_hit_and_disk_tier_shared_with_other_process(self):
+        self.assertEqual(shared_cache.get_or_load("holiday", "2026", self._loader({"ok": True})), {"ok": True})
+        self.assertEqual(shared_cache.get_or_load("holiday", "2026", self._loader({"ok": False})), {"ok": True})
+        # Another process starts with an empty memory tier but the same SQLite file.
+        shared_cache.clear()
+        self.assertEqual(shared_cache.get_or_load("holiday", "2026", self._loader({"ok": False})), {"ok": True})
+        self.assertEqual(len(self.calls), 1)
+        ns = shared_cache.stats()["namespaces"]["holiday"]
+        self.assertEqual((ns["disk_hits"], ns["misses"], ns["disk_rows"]), (1, 0, 1))
+
+    def test_concurrent_misses_share_one_load(self):
+        out = []
+        threads = [threading.Thread(target=lambda: out.append(shared_cache.get_or_load("brave", "q", self._loader({"results": [1]}, 0.2)))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(out, [{"results": [1]}] * 5)
+        self.assertEqual(shared_cache.stats()["namespaces"]["brave"]["dedup_waits"], 4)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        with patch.dict(os.environ, {"CACHE_WEATHER_FORECAST_TTL_SEC": "1", "CACHE_WEATHER_FORECAST_STALE_SEC": "60"}):
+            shared_cache.get_or_load("weather_forecast", "w", self._loader("old"))
+            with patch.object(shared_cache.time, "time", return_value=time.time() + 5):
+                t0 = time.perf_counter()
+                self.assertEqual(shared_cache.get_or_load("weather_forecast", "w", self._loader("new", 0.3)), "old")
+                self.assertLess(time.perf_counter() - t0, 0.2)
+                deadline = time.time() + 3
+                while shared_cache._INFLIGHT and time.time() < deadline:
+                    time.sleep(0.02)
+                self.assertEqual(shared_cache.get_or_load("weather_forecast", "w", self._loader("newer")), "new")
+        self.assertEqual(self.calls, ["old", "new"])
+
+    def test_failed_load_falls_back_to_expired_copy(self):
+        shared_cache.get_or_load("ha_registry", "services_index", self._loader({"light": ["turn_on"]}))
+
+        def boom():
+            raise RuntimeError("ha down")
+
+        with patch.object(shared_cache.time, "time", return_value=time.time() + 3600):
+            self.assertEqual(shared_cache.get_or_load("ha_registry", "services_index", boom), {"light": ["turn_on"]})
+            with self.assertRaises(RuntimeError):
+                shared_cache.get_or_load("ha_registry", "other", boom)
+            self.assertIsNone(shared_cache.get_or_load("ha_registry", "empty", lambda: None))
+
+    def test_invalidation_in_another_process_drops_this_memory_copy(self):
+        shared_cache.get_or_load("calendar", "today", self._loader({"events": ["dentist"]}))
+        shared_cache.get_or_load("calendar", "tomorrow", self._loader({"events": []}))
+        here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", "import shared_cache; shared_cache.invalidate('calendar', 'today')"], cwd=here, check=True)
+        self.assertEqual(shared_cache.get_or_load("calendar", "today", self._loader({"events": ["moved"]})), {"events": ["moved"]})
+        # Keys the other process left alone come back from disk rather than upstream.
+        self.assertEqual(shared_cache.get_or_load("calendar", "tomorrow", self._loader({"events": ["x"]})), {"events": []})
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(shared_cache.stats()["namespaces"]["calendar"]["disk_hits"], 1)
+
+    def test_gateway_inspection_endpoint(self):
+        import openai_compat_gateway as gw
+
+        shared_cache.put("translation", "k", {"title": "标题"})
+        self.assertEqual(shared_cache.get("translation", "k"), {"title": "标题"})
+        body = TestClient(gw.app).get("/cache/stats").json()
+        self.assertEqual(body["namespaces"]["translation"]["mem_items"], 1)
+        self.assertEqual(body["namespaces"]["translation"]["hit_ratio"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app
+
+
+class SqliteConnectionManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"NEWS_CACHE_DB": os.path.join(self.tmp.name, "news_cache.sqlite3")})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_connection_reused_and_wal_enabled(self):
+        before = app._sqlite_stats()["opens"]
+        app._news_cache_set_meta("k", "v1")
+        self.assertEqual(app._news_cache_get_meta("k"), "v1")
+        app._news_cache_init()
+        self.assertEqual(app._sqlite_stats()["opens"] - before, 1)
+        conn = app._news_cache_conn()
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        self.assertEqual(str(mode).lower(), "wal")
+
+    def test_release_rolls_back_unfinished_write(self):
+        conn = app._news_cache_conn()
+        conn.execute("INSERT INTO news_cache_meta(k, v) VALUES('tmp', 'x')")
+        conn.close()
+        self.assertEqual(app._news_cache_get_meta("tmp", "none"), "none")
+
+    def test_double_close_does_not_release_an_outer_handle(self):
+        outer = app._news_cache_conn()
+        inner = app._news_cache_conn()
+        inner.close()
+        inner.close()
+        outer.execute("INSERT INTO news_cache_meta(k, v) VALUES('tmp', 'x')")
+        # The outer handle still holds the connection: nobody rolled its write back.
+        self.assertEqual(outer.execute("SELECT v FROM news_cache_meta WHERE k='tmp'").fetchone()[0], "x")
+        outer.commit()
+        outer.close()
+        self.assertEqual(app._news_cache_get_meta("tmp"), "x")
+
+    def test_recreated_file_gets_its_schema_again(self):
+        app._news_cache_set_meta("k", "v1")
+        os.remove(os.environ["NEWS_CACHE_DB"])
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(os.environ["NEWS_CACHE_DB"] + suffix):
+                os.remove(os.environ["NEWS_CACHE_DB"] + suffix)
+        self.assertEqual(app._news_cache_get_meta("k", "none"), "none")
+        app._news_cache_set_meta("k", "v2")
+        self.assertEqual(app._news_cache_get_meta("k"), "v2")
+        self.assertTrue(os.path.exists(os.environ["NEWS_CACHE_DB"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
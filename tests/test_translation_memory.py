@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import shared_cache
+import translation_memory as tm
+
+
+class TranslationMemoryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3")})
+        self.env.start()
+        shared_cache.clear()
+        self.calls = []
+
+    def tearDown(self):
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def _fn(self, miss):
+        self.calls.append(list(miss))
+        return ["zh:" + m for m in miss]
+
+    def test_batch_sends_only_unseen_texts_once(self):
+        self.assertEqual(tm.translate("m", "zh", ["Gold rallies", "Rates hold"], self._fn), ["zh:Gold rallies", "zh:Rates hold"])
+        got = tm.translate("m", "zh", ["Rates  hold", "Gold rallies", "New story", "New story", ""], self._fn)
+        self.assertEqual(got, ["zh:Rates hold", "zh:Gold rallies", "zh:New story", "zh:New story", ""])
+        self.assertEqual(self.calls, [["Gold rallies", "Rates hold"], ["New story"]])
+        # Keyed by model and direction as well as the text.
+        tm.translate("other", "zh", ["Gold rallies"], self._fn)
+        tm.translate("m", "rag_query:en", ["Gold rallies"], self._fn)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_memory_survives_restart_and_failures_are_not_stored(self):
+        tm.translate("m", "zh", ["Gold rallies"], self._fn)
+        tm.translate("m", "zh", ["Echo", "Blank"], lambda miss: ["Echo", ""])
+        tm.translate("m", "zh", ["Short"], lambda miss: [])
+        shared_cache.clear()  # another process / a restart: empty memory tier
+        self.assertEqual(tm.lookup("m", "zh", ["Gold rallies", "Echo", "Blank", "Short"]), ["zh:Gold rallies", None, None, None])
+        ns = shared_cache.stats()["namespaces"]["translation"]
+        self.assertEqual((ns["disk_hits"], ns["misses"], ns["disk_rows"]), (1, 3, 1))
+
+    def test_memory_tier_is_bounded(self):
+        with patch.dict(os.environ, {"CACHE_TRANSLATION_MEM_ITEMS": "3"}):
+            tm.translate("m", "zh", ["a1", "a2", "a3", "a4", "a5"], self._fn)
+            self.assertEqual(shared_cache.stats()["namespaces"]["translation"]["mem_items"], 3)
+            self.assertEqual(tm.lookup("m", "zh", ["a1"]), ["zh:a1"])
+
+
+class TranslationCallerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3")})
+        self.env.start()
+        shared_cache.clear()
+
+    def tearDown(self):
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def test_news_pairs_and_lines_reuse_earlier_translations(self):
+        import app
+
+        class _Resp:
+            status_code = 200
+
+            def __init__(self, content):
+                self.text = json.dumps({"message": {"content": content}}, ensure_ascii=False)
+
+            def json(self):
+                return json.loads(self.text)
+
+        prompts = []
+
+        def fake_post(url, **kw):
+            user = kw["json"]["messages"][1]["content"]
+            prompts.append(user)
+            if "TITLE:" in user:
+                n = user.count("TITLE:")
+                return _Resp("\n".join("%d) 标题%d ||| 摘要%d" % (i, i, i) for i in range(1, n + 1)))
+            n = sum(1 for ln in user.splitlines() if ln[:1].isdigit())
+            return _Resp("\n".join("%d) 行%d" % (i, i) for i in range(1, n + 1)))
+
+        pairs = [{"title": "Gold rallies", "snippet": "Prices up"}, {"title": "Rates hold", "snippet": "Steady"}]
+        with patch.object(app.http_pool, "post", side_effect=fake_post), patch.object(app, "_skill_budget_allows", return_value=True):
+            first = app._news__translate_batch_to_zh(pairs, model="m")
+            again = app._news__translate_batch_to_zh(pairs + [{"title": "Fresh one", "snippet": ""}], model="m")
+            self.assertEqual(again[:2], first)
+            self.assertEqual(sum(p.count("TITLE:") for p in prompts), 3)
+
+            prompts.clear()
+            self.assertEqual(app._skill_translate_lines_to_zh(["Line a", "Line b"]), ["行1", "行2"])
+            self.assertEqual(app._skill_translate_lines_to_zh(["Line b", "Line c"]), ["行2", "行1"])
+            self.assertEqual(len(prompts), 2)
+            self.assertIn("1) Line c", prompts[1])
+            self.assertNotIn("Line b", prompts[1])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
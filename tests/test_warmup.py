@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import shared_cache
+import warmup
+
+
+class WarmupSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3")})
+        self.env.start()
+        shared_cache.clear()
+        warmup._JOBS.clear()
+        self.calls = []
+
+    def tearDown(self):
+        warmup._JOBS.clear()
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def _job(self, name):
+        return lambda: self.calls.append(name)
+
+    def test_interval_and_daily_times(self):
+        warmup.register("news", self._job("news"), every_sec=3600, at="06:45")
+        self.assertEqual(warmup.run_pending(datetime(2026, 3, 2, 6, 0)), ["news"])
+        self.assertEqual(warmup.run_pending(datetime(2026, 3, 2, 6, 5)), [])
+        self.assertEqual(warmup.run_pending(datetime(2026, 3, 2, 6, 45, 10)), ["news"])
+        self.assertEqual(warmup.run_pending(datetime(2026, 3, 2, 6, 50)), [])
+        self.assertEqual(warmup.stats()["jobs"]["news"]["last_reason"], "at 06:45")
+        self.assertEqual(warmup.run_pending(datetime(2026, 3, 2, 7, 46)), ["news"])
+        self.assertEqual(len(self.calls), 3)
+
+    def test_learned_hour_runs_once_ahead_of_it(self):
+        with patch.dict(os.environ, {"WARMUP_LEAD_MIN": "10", "WARMUP_LEARN_MIN_HITS": "3"}):
+            warmup.register("weather", self._job("weather"), every_sec=0)
+            for day in (1, 2, 3, 4, 5):
+                warmup.note_use("weather", datetime(2026, 3, day, 7, 12))
+            self.assertEqual(warmup.run_pending(datetime(2026, 3, 6, 6, 40)), [])
+            self.assertEqual(warmup.run_pending(datetime(2026, 3, 6, 6, 52)), ["weather"])
+            self.assertEqual(warmup.run_pending(datetime(2026, 3, 6, 7, 20)), [])
+            self.assertEqual(warmup.stats()["jobs"]["weather"]["learned_hours"], [7])
+            # The learned pattern survives a restart through the shared cache.
+            warmup._save_learned(force=True)
+            warmup._JOBS.clear()
+            warmup.register("weather", self._job("weather"), every_sec=0)
+            self.assertEqual(warmup.run_pending(datetime(2026, 3, 7, 6, 55)), ["weather"])
+
+    def test_failing_job_is_recorded_and_does_not_stop_others(self):
+        def boom():
+            raise RuntimeError("ha down")
+
+        warmup.register("calendar", boom, every_sec=60)
+        warmup.register("holiday", self._job("holiday"), every_sec=60)
+        self.assertEqual(sorted(warmup.run_pending(datetime(2026, 3, 2, 7, 0))), ["calendar", "holiday"])
+        st = warmup.stats()["jobs"]["calendar"]
+        self.assertEqual((st["errors"], st["last_ok"]), (1, 0))
+        self.assertIn("ha down", st["last_error"])
+        self.assertEqual(self.calls, ["holiday"])
+
+
+class WarmReadTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"SHARED_CACHE_DB": os.path.join(self.tmp.name, "shared_cache.sqlite3"), "HA_TOKEN": "t"})
+        self.env.start()
+        shared_cache.clear()
+
+    def tearDown(self):
+        self.env.stop()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def test_warmed_calendar_window_is_read_without_a_call_and_writes_invalidate_it(self):
+        import app
+
+        events = {"ok": True, "status_code": 200, "data": [{"summary": "dentist", "start": {"dateTime": "2026-03-02T09:00:00+11:00"}}]}
+        with patch.object(app, "_ha_request", return_value=events) as req:
+            app._ha_calendar_events_cached("calendar.family", "2026-03-02T00:00:00+11:00", "2026-03-03T00:00:00+11:00", refresh=True)
+            ev, errs = app._calendar_fetch_merged_events(["calendar.family"], "2026-03-02T00:00:00+11:00", "2026-03-03T00:00:00+11:00")
+            self.assertEqual(req.call_count, 1)
+            self.assertEqual((len(ev), errs), (1, []))
+            # The cached copy is not changed by the merge.
+            self.assertNotIn("__entity_id", events["data"][0])
+            app.ha_call_service("calendar", "create_event", {"summary": "x"})
+            app._calendar_fetch_merged_events(["calendar.family"], "2026-03-02T00:00:00+11:00", "2026-03-03T00:00:00+11:00")
+        self.assertEqual(req.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
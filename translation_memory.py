@@ -0,0 +1,95 @@
+"""Translation memory: every Ollama translation is remembered and reused.
+
+A translation is keyed by (model, direction, hash of the normalized source text), so the
+same headline or user query is translated once per model however many code paths ask
+for it. Direction names the target and, for query rewrites, the prompt family
+("zh", "en", "rag_query:en", "news_query:en").
+
+Storage is the shared_cache "translation" namespace: a memory LRU in front of the shared
+SQLite file, so entries survive restarts and are shared by both containers. Its TTL and
+memory size are set with CACHE_TRANSLATION_TTL_SEC / CACHE_TRANSLATION_MEM_ITEMS.
+
+translate() is the batch entry point: hits come from one lookup, duplicates collapse,
+and only the misses reach the caller's translate function. Empty results and results
+equal to the source are treated as failures and not stored.
+"""
+
+import hashlib
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+import shared_cache
+
+NS = "translation"
+
+
+def normalize(text) -> str:
+    s = unicodedata.normalize("NFKC", str(text or ""))
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def key(model: str, direction: str, text) -> str:
+    h = hashlib.sha1(normalize(text).encode("utf-8", "ignore")).hexdigest()
+    return "tm:" + str(model or "").strip() + ":" + str(direction or "").strip() + ":" + h
+
+
+def lookup(model: str, direction: str, texts: List[str]) -> List[Optional[str]]:
+    """Stored translation per text (None on a miss), in input order."""
+    keys = [key(model, direction, t) for t in texts]
+    try:
+        found = shared_cache.get_many(NS, keys)
+    except Exception:
+        found = {}
+    out: List[Optional[str]] = []
+    for k in keys:
+        v = found.get(k)
+        out.append(v if isinstance(v, str) and v else None)
+    return out
+
+
+def _usable(src, dst) -> bool:
+    d = normalize(dst)
+    return bool(d) and d != normalize(src)
+
+
+def store(model: str, direction: str, pairs) -> int:
+    """Remember (source, translation) pairs; returns how many were stored."""
+    items: Dict[str, str] = {}
+    for src, dst in pairs:
+        if normalize(src) and _usable(src, dst):
+            items[key(model, direction, src)] = str(dst).strip()
+    if items:
+        try:
+            shared_cache.put_many(NS, items)
+        except Exception:
+            return 0
+    return len(items)
+
+
+def translate(model: str, direction: str, texts: List[str], fn: Callable[[List[str]], List[str]]) -> List[str]:
+    """Translate texts, calling fn(misses) at most once; "" where no translation is known.
+
+    fn must return one translation per input, in order; a result of any other length is
+    treated as a failed call.
+    """
+    src = [str(t or "") for t in texts]
+    got = lookup(model, direction, src)
+    misses: List[str] = []
+    seen = set()
+    for t, v in zip(src, got):
+        n = normalize(t)
+        if v is None and n and n not in seen:
+            seen.add(n)
+            misses.append(t)
+    fresh: Dict[str, str] = {}
+    if misses:
+        try:
+            res = fn(misses)
+        except Exception:
+            res = None
+        if isinstance(res, list) and len(res) == len(misses):
+            done = [(s, str(d or "").strip()) for s, d in zip(misses, res) if _usable(s, d)]
+            store(model, direction, done)
+            fresh = {normalize(s): d for s, d in done}
+    return [v if v is not None else fresh.get(normalize(t), "") for t, v in zip(src, got)]
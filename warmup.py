@@ -0,0 +1,272 @@
+"""Background warm-up: refresh caches before the requests that need them arrive.
+
+Usage is periodic (weather and calendar around 7am, news at breakfast), so each cold
+upstream is refreshed by a daemon thread instead of inside the first user request.
+A job is a name plus a function, and it runs when any of these is due:
+
+  every   fixed interval in seconds (WARMUP_<NAME>_EVERY_SEC); also runs once at start
+  at      daily local times "HH:MM,HH:MM" (WARMUP_<NAME>_AT)
+  learned note_use(name) records the hour of day each real request for the job's data
+          came in; an hour that has seen WARMUP_LEARN_MIN_HITS requests gets the job run
+          WARMUP_LEAD_MIN minutes before it starts. Counts decay daily and are kept in
+          shared_cache ("warmup" namespace) across restarts.
+
+Jobs run one at a time on the scheduler thread; a failing job is logged in stats and
+retried on its next slot. WARMUP_ENABLE=0 keeps the thread from starting.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover
+    ZoneInfo = None
+
+import shared_cache
+
+_LOCK = threading.Lock()
+_JOBS: Dict[str, "_Job"] = {}
+_STATE: Dict[str, Any] = {"thread": None, "stop": None, "saved_ts": 0.0}
+_DECAY_PER_DAY = 0.9
+_SAVE_EVERY_SEC = 60.0
+
+
+class _Job:
+    def __init__(self, name: str, fn: Callable[[], Any], every_sec: float, at: List[str], learn: bool):
+        self.name = name
+        self.fn = fn
+        self.every_sec = every_sec
+        self.at = at
+        self.learn = learn
+        self.hours = [0.0] * 24
+        self.hours_day = ""
+        self.dirty = False
+        self.last_run = 0.0
+        self.last_ok = 0.0
+        self.last_ms = 0.0
+        self.last_error = ""
+        self.last_reason = ""
+        self.runs = 0
+        self.errors = 0
+
+
+def _env_num(name: str, default: float) -> float:
+    raw = str(os.environ.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except Exception:
+        return default
+
+
+def enabled() -> bool:
+    v = str(os.environ.get("WARMUP_ENABLE") or "1").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def _now() -> datetime:
+    tz_name = str(os.environ.get("TZ") or "Australia/Melbourne").strip()
+    try:
+        return datetime.now(ZoneInfo(tz_name))
+    except Exception:
+        return datetime.now()
+
+
+def _parse_at(raw: Any) -> List[str]:
+    items = raw.split(",") if isinstance(raw, str) else list(raw or [])
+    out = []
+    for it in items:
+        s = str(it or "").strip()
+        try:
+            hh, mm = s.split(":", 1)
+            h, m = int(hh), int(mm)
+        except Exception:
+            continue
+        if 0 <= h < 24 and 0 <= m < 60:
+            out.append("%02d:%02d" % (h, m))
+    return sorted(set(out))
+
+
+def register(name: str, fn: Callable[[], Any], every_sec: float, at: Any = (), learn: bool = True):
+    """Add or replace a job; env WARMUP_<NAME>_EVERY_SEC / WARMUP_<NAME>_AT override the schedule."""
+    key = "WARMUP_" + str(name).upper() + "_"
+    every = max(0.0, _env_num(key + "EVERY_SEC", float(every_sec or 0.0)))
+    at_env = os.environ.get(key + "AT")
+    job = _Job(str(name), fn, every, _parse_at(at_env if at_env is not None else at), bool(learn))
+    saved = shared_cache.get("warmup", "hours:" + job.name)
+    if isinstance(saved, dict) and isinstance(saved.get("hours"), list) and len(saved["hours"]) == 24:
+        job.hours = [float(x or 0.0) for x in saved["hours"]]
+        job.hours_day = str(saved.get("day") or "")
+    with _LOCK:
+        _JOBS[job.name] = job
+
+
+def jobs() -> List[str]:
+    with _LOCK:
+        return sorted(_JOBS.keys())
+
+
+def _decay(job: _Job, now: datetime):
+    day = now.strftime("%Y-%m-%d")
+    if not job.hours_day:
+        job.hours_day = day
+        return
+    if job.hours_day == day:
+        return
+    try:
+        days = (now.date() - datetime.strptime(job.hours_day, "%Y-%m-%d").date()).days
+    except Exception:
+        days = 1
+    f = _DECAY_PER_DAY ** max(1, days)
+    job.hours = [h * f for h in job.hours]
+    job.hours_day = day
+    job.dirty = True
+
+
+def note_use(name: str, now: Optional[datetime] = None):
+    """A user request just read this job's data; learn the hour of day."""
+    t = now or _now()
+    with _LOCK:
+        job = _JOBS.get(str(name))
+        if job is None or not job.learn:
+            return
+        _decay(job, t)
+        job.hours[t.hour] += 1.0
+        job.dirty = True
+
+
+def _due_reason(job: _Job, now: datetime) -> str:
+    ts = now.timestamp()
+    if job.every_sec > 0 and (ts - job.last_run) >= job.every_sec:
+        return "every"
+    for hm in job.at:
+        h, m = int(hm[:2]), int(hm[3:])
+        slot = now.replace(hour=h, minute=m, second=0, microsecond=0)
+        if slot <= now and job.last_run < slot.timestamp():
+            return "at " + hm
+    if job.learn:
+        lead = timedelta(minutes=max(0.0, _env_num("WARMUP_LEAD_MIN", 10.0)))
+        ahead = now + lead
+        if job.hours[ahead.hour] >= max(1.0, _env_num("WARMUP_LEARN_MIN_HITS", 3.0)):
+            window = ahead.replace(minute=0, second=0, microsecond=0) - lead
+            if job.last_run < window.timestamp():
+                return "learned %02d:00" % ahead.hour
+    return ""
+
+
+def _run(job: _Job, reason: str, now: datetime):
+    t0 = time.perf_counter()
+    err = ""
+    try:
+        job.fn()
+    except Exception as e:
+        err = (type(e).__name__ + ": " + str(e))[:200]
+    with _LOCK:
+        job.last_run = now.timestamp()
+        job.last_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        job.last_reason = reason
+        job.runs += 1
+        if err:
+            job.errors += 1
+            job.last_error = err
+        else:
+            job.last_ok = job.last_run
+            job.last_error = ""
+
+
+def _save_learned(force: bool = False):
+    now_ts = time.time()
+    if (not force) and (now_ts - float(_STATE["saved_ts"])) < _SAVE_EVERY_SEC:
+        return
+    _STATE["saved_ts"] = now_ts
+    with _LOCK:
+        rows = [(j.name, list(j.hours), j.hours_day) for j in _JOBS.values() if j.dirty]
+        for j in _JOBS.values():
+            j.dirty = False
+    for name, hours, day in rows:
+        shared_cache.put("warmup", "hours:" + name, {"hours": hours, "day": day})
+
+
+def run_pending(now: Optional[datetime] = None) -> List[str]:
+    """Run every job that is due at `now` (one scheduler tick); returns the names run."""
+    t = now or _now()
+    with _LOCK:
+        due = []
+        for job in _JOBS.values():
+            _decay(job, t)
+            reason = _due_reason(job, t)
+            if reason:
+                due.append((job, reason))
+    for job, reason in due:
+        _run(job, reason, t)
+    _save_learned()
+    return [job.name for job, _reason in due]
+
+
+def _loop(stop: threading.Event):
+    if stop.wait(max(0.0, _env_num("WARMUP_START_DELAY_SEC", 5.0))):
+        return
+    tick = max(1.0, _env_num("WARMUP_TICK_SEC", 30.0))
+    while not stop.is_set():
+        try:
+            run_pending()
+        except Exception:
+            pass
+        stop.wait(tick)
+
+
+def start() -> bool:
+    """Start the scheduler thread once per process; False when disabled or already running."""
+    if not enabled():
+        return False
+    with _LOCK:
+        t = _STATE.get("thread")
+        if t is not None and t.is_alive():
+            return False
+        stop = threading.Event()
+        t = threading.Thread(target=_loop, args=(stop,), name="warmup", daemon=True)
+        _STATE["thread"] = t
+        _STATE["stop"] = stop
+    t.start()
+    return True
+
+
+def stop():
+    with _LOCK:
+        ev = _STATE.get("stop")
+        _STATE["thread"] = None
+        _STATE["stop"] = None
+    if ev is not None:
+        ev.set()
+    _save_learned(force=True)
+
+
+def running() -> bool:
+    t = _STATE.get("thread")
+    return bool(t is not None and t.is_alive())
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        out = {"enabled": enabled(), "running": running(), "jobs": {}}
+        for name in sorted(_JOBS):
+            j = _JOBS[name]
+            busy = [h for h in range(24) if j.hours[h] >= max(1.0, _env_num("WARMUP_LEARN_MIN_HITS", 3.0))]
+            out["jobs"][name] = {
+                "every_sec": j.every_sec,
+                "at": list(j.at),
+                "learned_hours": busy if j.learn else [],
+                "runs": j.runs,
+                "errors": j.errors,
+                "last_run": int(j.last_run),
+                "last_ok": int(j.last_ok),
+                "last_ms": j.last_ms,
+                "last_reason": j.last_reason,
+                "last_error": j.last_error,
+            }
+    return out